@@ -0,0 +1,126 @@
+"""
+Benchmark for comparing the times for building indexes with different
+``optlevel``/``kind`` combinations, both in serial mode and sorting
+slices in several threads.
+
+The indexes that are built in several threads are checked to be
+identical to the ones built in a single thread.
+"""
+
+import sys
+import os
+import tempfile
+from time import time
+
+import numpy
+import tables
+from tables.utils import detectNumberOfCores
+
+kinds = ('ultralight', 'light', 'medium', 'full')
+optlevels = (0, 3, 6, 9)
+
+
+def get_nrows(nrows_str):
+    if nrows_str.endswith("k"):
+        return int(float(nrows_str[:-1])*1000)
+    elif nrows_str.endswith("m"):
+        return int(float(nrows_str[:-1])*1000*1000)
+    elif nrows_str.endswith("g"):
+        return int(float(nrows_str[:-1])*1000*1000*1000)
+    else:
+        raise ValueError, "value of nrows must end with either 'k', 'm' or 'g' suffixes."
+
+
+def create_table(filename, nrows, dtype, userandom):
+    f = tables.openFile(filename, 'w')
+    table = f.createTable('/', 'table', {'col': tables.Col.from_dtype(
+        numpy.dtype(dtype))}, expectedrows=nrows)
+    bufsize = 1000*1000
+    for start in xrange(0, nrows, bufsize):
+        stop = min(start+bufsize, nrows)
+        if userandom:
+            data = numpy.random.randint(0, nrows, stop-start)
+        else:
+            data = numpy.arange(start, stop)
+        table.append([data.astype(dtype)])
+    f.close()
+
+
+def build_index(filename, kind, optlevel, nthreads):
+    f = tables.openFile(filename, 'a', MAX_THREADS=nthreads)
+    col = f.root.table.cols.col
+    if col.index is not None:
+        col.removeIndex()
+    t1 = time()
+    col.createIndex(kind=kind, optlevel=optlevel)
+    f.flush()
+    tbuild = time()-t1
+    index = col.index
+    arrays = (index.sorted[:], index.indices[:],
+              index.sortedLR[:], index.indicesLR[:])
+    f.close()
+    return tbuild, arrays
+
+
+if __name__=="__main__":
+    import getopt
+
+    usage = """usage: %s [-m] [-n nrows] [-t nthreads] [-k kinds] [-O optlevels] [-d datatype] [-f filename]
+            -m use random values to fill the table
+            -n sets the number of rows (with 'k', 'm' or 'g' suffixes, def. '1m')
+            -t number of threads for the threaded build (def. number of cores)
+            -k comma separated list of index kinds (def. all)
+            -O comma separated list of optlevels (def. '0,3,6,9')
+            -d data type of the indexed column (def. 'float64')
+            -f file name for the table (def. a temporary file)
+            \n""" % sys.argv[0]
+
+    try:
+        opts, pargs = getopt.getopt(sys.argv[1:], 'mn:t:k:O:d:f:')
+    except:
+        sys.stderr.write(usage)
+        sys.exit(1)
+
+    # default options
+    userandom = 0
+    nrows = get_nrows('1m')
+    nthreads = detectNumberOfCores()
+    dtype = 'float64'
+    filename = None
+
+    # Get the options
+    for option in opts:
+        if option[0] == '-m':
+            userandom = 1
+        elif option[0] == '-n':
+            nrows = get_nrows(option[1])
+        elif option[0] == '-t':
+            nthreads = int(option[1])
+        elif option[0] == '-k':
+            kinds = option[1].split(',')
+        elif option[0] == '-O':
+            optlevels = [int(o) for o in option[1].split(',')]
+        elif option[0] == '-d':
+            dtype = option[1]
+        elif option[0] == '-f':
+            filename = option[1]
+
+    if filename is None:
+        filename = tempfile.mktemp(suffix='.h5')
+    print "Creating a table with %d rows of '%s'..." % (nrows, dtype)
+    create_table(filename, nrows, dtype, userandom)
+
+    print "%-12s %8s %12s %12s %8s" % (
+        "kind", "optlevel", "1 thread (s)", "%d threads (s)" % nthreads,
+        "speed-up")
+    for kind in kinds:
+        for optlevel in optlevels:
+            tserial, sarrays = build_index(filename, kind, optlevel, 1)
+            tthreads, tarrays = build_index(filename, kind, optlevel, nthreads)
+            for sarray, tarray in zip(sarrays, tarrays):
+                assert (sarray == tarray).all(), \
+                       "Threaded index differs from the serial one!"
+            print "%-12s %8d %12.3f %12.3f %7.2fx" % (
+                kind, optlevel, tserial, tthreads, tserial/tthreads)
+
+    os.remove(filename)
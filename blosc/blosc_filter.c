@@ -166,6 +166,7 @@ size_t blosc_filter(unsigned flags, size_t cd_nelmts,
     int status = 0;              /* Return code from Blosc routines */
     size_t typesize;
     size_t outbuf_size;
+    size_t cbytes, blocksize;    /* Sizes in the header of Blosc buffers */
     int clevel = 5;              /* Compression level default */
     int doshuffle = 1;           /* Shuffle default */
 
@@ -218,6 +219,10 @@ size_t blosc_filter(unsigned flags, size_t cd_nelmts,
         fprintf(stderr, "Blosc: Decompress %zd chunk w/buffer %zd\n", nbytes, outbuf_size);
 #endif
 
+        /* The size of the chunk may differ from the computed one if
+           other filters (like delta) change sizes in the pipeline */
+        blosc_cbuffer_sizes(*buf, &outbuf_size, &cbytes, &blocksize);
+
         free(outbuf);
         outbuf = malloc(outbuf_size);
 
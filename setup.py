@@ -623,6 +623,7 @@ extensions = [
                          "src/utils.c",
                          "src/H5ARRAY.c",
                          "src/H5ATTR.c",
+                         "src/H5Zdelta.c",
                          ] + blosc_files,
                library_dirs=lib_dirs,
                libraries=utilsExtension_libs,
@@ -5,6 +5,7 @@
 #include "H5Zlzo.h"  		       /* Import FILTER_LZO */
 #include "H5Zbzip2.h"  		       /* Import FILTER_BZIP2 */
 #include "../blosc/blosc_filter.h"     /* Import FILTER_BLOSC */
+#include "H5Zdelta.h"                  /* Import FILTER_DELTA */
 
 #include <string.h>
 #include <stdlib.h>
@@ -44,6 +45,7 @@ herr_t H5ARRAYmake( hid_t loc_id,
 		    char  *complib,
 		    int   shuffle,
 		    int   fletcher32,
+		    int   delta,
 		    const void *data)
 {
 
@@ -102,6 +104,11 @@ herr_t H5ARRAYmake( hid_t loc_id,
      if ( H5Pset_fletcher32( plist_id) < 0 )
        return -1;
    }
+   /* Then delta, so that differences are shuffled and compressed */
+   if (delta) {
+     if ( H5Pset_filter( plist_id, FILTER_DELTA, H5Z_FLAG_MANDATORY, 0, NULL) < 0 )
+       return -1;
+   }
    /* Then shuffle (not if blosc is activated) */
    if ((shuffle) && (strcmp(complib, "blosc") != 0)) {
      if ( H5Pset_shuffle( plist_id) < 0 )
@@ -28,6 +28,7 @@ herr_t H5ARRAYmake( hid_t loc_id,
 		    char  *complib,
 		    int   shuffle,
 		    int   fletcher32,
+		    int   delta,
 		    const void *data);
 
 herr_t H5ARRAYappend_records( hid_t dataset_id,
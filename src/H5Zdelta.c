@@ -0,0 +1,216 @@
+#include <string.h>
+#include <stdlib.h>
+#include <hdf5.h>
+
+#include "H5Zdelta.h"
+#include "tables.h"
+
+/* The delta filter replaces every element in a chunk by its difference
+   with the previous one (the first element is kept as is).  Elements
+   are taken as unsigned integers of the size of the dataset type, so
+   differences wrap around and the filter is lossless for any type of 1,
+   2, 4 or 8 bytes (other sizes are left untouched).  Sorted values and
+   near-sequential row numbers become long runs of small numbers, which
+   shuffle and the compressors that follow in the pipeline pack in very
+   little space.
+
+   Differences are only kept for chunks where they are smaller than the
+   range of values (for instance, the row numbers of a random column are
+   better left alone).  A byte is appended to every chunk telling
+   whether it holds differences or the original values.
+
+   The filter parameters are:
+
+   0. The filter revision.
+   1. The size of the elements (in bytes).
+   2. Whether elements must be byteswapped for doing the arithmetic. */
+
+size_t delta_filter(unsigned flags, size_t cd_nelmts,
+		    const unsigned cd_values[], size_t nbytes,
+		    size_t *buf_size, void **buf);
+
+herr_t delta_set_local(hid_t dcpl, hid_t type, hid_t space);
+
+
+int register_delta(void) {
+
+/* The conditional below is somewhat messy, but it is necessary because
+  the THG team has decided to fix an API inconsistency in the definition
+  of the H5Z_class_t structure in version 1.8.3 */
+#if (H5_VERS_MAJOR == 1 && H5_VERS_MINOR < 7) || \
+    (H5_USE_16_API && (H5_VERS_MAJOR > 1 || \
+      (H5_VERS_MAJOR == 1 && (H5_VERS_MINOR > 8 || \
+        (H5_VERS_MINOR == 8 && H5_VERS_RELEASE >= 3)))))
+   /* 1.6.x */
+  H5Z_class_t filter_class = {
+    (H5Z_filter_t)(FILTER_DELTA),          /* filter_id */
+    "delta",                               /* comment */
+    NULL,                                  /* can_apply_func */
+    (H5Z_set_local_func_t)(delta_set_local), /* set_local_func */
+    (H5Z_func_t)(delta_filter)             /* filter_func */
+  };
+#else
+   /* 1.8.x where x < 3 */
+  H5Z_class_t filter_class = {
+    H5Z_CLASS_T_VERS,                      /* H5Z_class_t version */
+    (H5Z_filter_t)(FILTER_DELTA),          /* filter_id */
+    1, 1,                                  /* Encoding and decoding enabled */
+    "delta",                               /* comment */
+    NULL,                                  /* can_apply_func */
+    (H5Z_set_local_func_t)(delta_set_local), /* set_local_func */
+    (H5Z_func_t)(delta_filter)             /* filter_func */
+  };
+#endif
+
+  if (H5Zregister(&filter_class) < 0)
+    return 0;
+  return 1;
+}
+
+
+/* Record the filter revision, the size of elements and whether they
+   have to be byteswapped in the filter parameters. */
+herr_t delta_set_local(hid_t dcpl, hid_t type, hid_t space) {
+
+  unsigned int flags;
+  size_t nelements = 3;
+  unsigned int values[] = {0, 0, 0};
+  H5T_order_t order;
+
+#if (H5_VERS_MAJOR == 1 && H5_VERS_MINOR < 8)
+  if (H5Pget_filter_by_id(dcpl, FILTER_DELTA, &flags, &nelements,
+			  values, 0, NULL) < 0)
+    return -1;
+#else
+  if (H5Pget_filter_by_id2(dcpl, FILTER_DELTA, &flags, &nelements,
+			   values, 0, NULL, NULL) < 0)
+    return -1;
+#endif
+
+  values[0] = FILTER_DELTA_VERSION;
+  values[1] = (unsigned int)H5Tget_size(type);
+  if (values[1] == 0)
+    return -1;
+  order = H5Tget_order(type);
+  values[2] = ((order == H5T_ORDER_LE || order == H5T_ORDER_BE) &&
+	       order != H5Tget_order(H5T_NATIVE_INT));
+
+  if (H5Pmodify_filter(dcpl, FILTER_DELTA, flags, 3, values) < 0)
+    return -1;
+  return 1;
+}
+
+
+static void byteswap(unsigned char *data, size_t nelements, size_t size) {
+  size_t i, j;
+  unsigned char tmp;
+
+  for (i = 0; i < nelements; i++, data += size) {
+    for (j = 0; j < size/2; j++) {
+      tmp = data[j];
+      data[j] = data[size-1-j];
+      data[size-1-j] = tmp;
+    }
+  }
+}
+
+
+/* Use differences only if the biggest one (in zigzag encoding, so that
+   negative differences count as positive ones) is less than the range
+   of values in the chunk. */
+#define DELTA_WANTED(type, stype) {				\
+    type *x = (type *)data;					\
+    type lo = x[0], hi = x[0], d, z, zmax = 0;			\
+    for (i = 1; i < nelements; i++) {				\
+      if (x[i] < lo) lo = x[i];					\
+      if (x[i] > hi) hi = x[i];					\
+      d = x[i] - x[i-1];					\
+      z = ((stype)d < 0) ? ~(type)(d << 1) : (type)(d << 1);	\
+      if (z > zmax) zmax = z;					\
+    }								\
+    wanted = zmax < (type)(hi - lo);				\
+  }
+
+#define DELTA_ENCODE(type) {					\
+    type *x = (type *)data;					\
+    for (i = nelements - 1; i > 0; i--)				\
+      x[i] -= x[i-1];						\
+  }
+
+#define DELTA_DECODE(type) {					\
+    type *x = (type *)data;					\
+    for (i = 1; i < nelements; i++)				\
+      x[i] += x[i-1];						\
+  }
+
+
+size_t delta_filter(unsigned flags, size_t cd_nelmts,
+		    const unsigned cd_values[], size_t nbytes,
+		    size_t *buf_size, void **buf) {
+
+  unsigned char *data;
+  size_t size, nelements, i;
+  int swap, wanted = 0;
+
+  if (cd_nelmts < 3)
+    return 0;
+  size = cd_values[1];
+  swap = cd_values[2];
+  if (size != 1 && size != 2 && size != 4 && size != 8)
+    return nbytes;  /* nothing to do */
+
+  if (!(flags & H5Z_FLAG_REVERSE)) {
+    /* Make room for the trailing byte */
+    if (*buf_size < nbytes + 1) {
+      data = (unsigned char *)realloc(*buf, nbytes + 1);
+      if (data == NULL)
+	return 0;
+      *buf = data;
+      *buf_size = nbytes + 1;
+    }
+    data = (unsigned char *)*buf;
+    nelements = nbytes / size;
+    if (nelements > 1) {
+      if (swap)
+	byteswap(data, nelements, size);
+      switch (size) {
+      case 1: DELTA_WANTED(unsigned char, signed char); break;
+      case 2: DELTA_WANTED(unsigned short, short); break;
+      case 4: DELTA_WANTED(unsigned int, int); break;
+      case 8: DELTA_WANTED(unsigned long long, long long); break;
+      }
+      if (wanted) {
+	switch (size) {
+	case 1: DELTA_ENCODE(unsigned char); break;
+	case 2: DELTA_ENCODE(unsigned short); break;
+	case 4: DELTA_ENCODE(unsigned int); break;
+	case 8: DELTA_ENCODE(unsigned long long); break;
+	}
+      }
+      if (swap)
+	byteswap(data, nelements, size);
+    }
+    data[nbytes] = (unsigned char)wanted;
+    return nbytes + 1;
+  }
+  else {
+    if (nbytes < 1)
+      return 0;
+    data = (unsigned char *)*buf;
+    nbytes--;
+    nelements = nbytes / size;
+    if (data[nbytes] && nelements > 1) {
+      if (swap)
+	byteswap(data, nelements, size);
+      switch (size) {
+      case 1: DELTA_DECODE(unsigned char); break;
+      case 2: DELTA_DECODE(unsigned short); break;
+      case 4: DELTA_DECODE(unsigned int); break;
+      case 8: DELTA_DECODE(unsigned long long); break;
+      }
+      if (swap)
+	byteswap(data, nelements, size);
+    }
+    return nbytes;
+  }
+}
@@ -0,0 +1,16 @@
+#ifndef __H5ZDELTA_H__
+#define __H5ZDELTA_H__ 1
+
+/* Filter revision number, starting at 1 */
+#define FILTER_DELTA_VERSION 1
+
+/* Provisional filter ID, in the range reserved by HDF5 for testing
+   and non-distributed uses.  A proper ID must be registered with The
+   HDF Group (as done for LZO, bzip2 and Blosc) before this filter is
+   used by default.  Indexes record the ID in their ``deltafilter``
+   attribute, so that a change of ID can be detected. */
+#define FILTER_DELTA 32768
+
+int register_delta(void);
+
+#endif /* ! defined __H5ZDELTA_H__ */
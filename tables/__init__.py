@@ -39,7 +39,7 @@ First Level Functions
 =====================
 
 openFile, copyFile, test,  print_versions, whichLibVersion,
-isPyTablesFile, isHDF5File
+isPyTablesFile, isHDF5File, join
 
 Misc variables
 ==============
@@ -87,6 +87,7 @@ from tables.atom import *
 from tables.flavor import restrict_flavors
 from tables.description import *
 from tables.filters import Filters
+from tables.querystats import QueryStats
 
 # Import the user classes from the proper modules
 from tables.exceptions import *
@@ -101,6 +102,7 @@ from tables.earray import EArray
 from tables.vlarray import VLArray
 from tables.unimplemented import UnImplemented, Unknown
 from tables.expression import Expr
+from tables.tablejoin import join
 from tables.tests import print_versions, test
 
 
@@ -117,9 +119,10 @@ __all__ = [
     # Functions:
     'isHDF5File', 'isPyTablesFile', 'whichLibVersion',
     'copyFile', 'openFile', 'print_versions', 'test',
-    'split_type', 'restrict_flavors', 'lrange',
+    'split_type', 'restrict_flavors', 'lrange', 'join',
     # Helper classes:
     'IsDescription', 'Description', 'Filters', 'Cols', 'Column',
+    'QueryStats',
     # Types:
     'Enum',
     # Atom types:
@@ -0,0 +1,441 @@
+"""
+Out-of-core aggregation of table rows.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`Aggregator`
+    Running partial state of a set of aggregations.
+`SpillingAggregator`
+    Aggregator spilling partial states to disk when there are too
+    many groups.
+
+Functions
+=========
+
+`_parseAggregates`
+    Get the aggregation functions and expressions in a mapping.
+`_groupOrder`
+    Get the order and the start of the groups of equal keys.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import os
+import re
+import tempfile
+
+import numpy
+
+from tables.bloomfilter import _hashValues
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private variables
+# =================
+_aggregateRE = re.compile(r'^\s*([A-Za-z_]\w*)\s*\((.*)\)\s*$', re.DOTALL)
+"""Regular expression matching an aggregation like ``sum(a*b)``."""
+
+_combiners = {
+    'count': (numpy.add,),
+    'sum': (numpy.add,),
+    'min': (numpy.minimum,),
+    'max': (numpy.maximum,),
+    'mean': (numpy.add, numpy.add), }
+"""The ufuncs combining the partial states of every aggregation."""
+
+_spillPartitions = 16
+"""The number of partitions of the keys spilled to disk."""
+
+
+# Private functions
+# =================
+def _parseAggregates(exprs):
+    """
+    Get the aggregation functions and expressions in a mapping.
+
+    `exprs` maps result names to aggregations like ``'sum(a*b)'`` or
+    ``'count()'``.  A list of ``(name, func, expr)`` tuples sorted by
+    name is returned, with `expr` being `None` for ``count()``.
+    """
+    aggs = []
+    names = exprs.keys()
+    names.sort()
+    for name in names:
+        aggexpr = exprs[name]
+        match = _aggregateRE.match(aggexpr)
+        if match is None:
+            raise ValueError( "aggregation ``%s`` is not a function call "
+                              "like ``sum(col)``" % (aggexpr,) )
+        func, expr = match.group(1), match.group(2).strip()
+        if func not in _combiners:
+            funcs = _combiners.keys()
+            funcs.sort()
+            raise ValueError( "unsupported aggregation function ``%s``; "
+                              "valid ones are: %s"
+                              % (func, ', '.join(funcs)) )
+        if func == 'count':
+            if expr:
+                raise ValueError("``count()`` does not take arguments")
+            expr = None
+        elif not expr:
+            raise ValueError( "aggregation ``%s`` needs an expression"
+                              % (aggexpr,) )
+        aggs.append((name, func, expr))
+    return aggs
+
+
+def _groupOrder(keys):
+    """
+    Get the order and the start of the groups of equal keys.
+
+    A ``(order, starts)`` tuple is returned, where `order` sorts the
+    `keys` (stably) and `starts` holds the positions in the sorted keys
+    where every group of equal keys begins.
+    """
+    order = keys.argsort(kind='mergesort')
+    skeys = keys[order]
+    if len(skeys) == 0:
+        return order, numpy.zeros(0, dtype=numpy.intp)
+    changes = numpy.flatnonzero(skeys[1:] != skeys[:-1]) + 1
+    starts = numpy.concatenate(([0], changes)).astype(numpy.intp)
+    return order, starts
+
+
+def _sumDtype(dtype):
+    """Get the type used for accumulating sums of values of `dtype`."""
+    if dtype.kind in 'bi':
+        return numpy.dtype(numpy.int64)
+    if dtype.kind == 'u':
+        return numpy.dtype(numpy.uint64)
+    if dtype.kind == 'c':
+        return numpy.dtype(numpy.complex128)
+    return numpy.dtype(numpy.float64)
+
+
+# Public classes
+# ==============
+class Aggregator(object):
+    """
+    Running partial state of a set of aggregations.
+
+    Blocks of values are reduced as they come with `update()` and only
+    the partial state of every aggregation (like running sums and
+    counts for means) is kept, so memory does not depend on the number
+    of rows aggregated.  When keys are given, a partial state is kept
+    for every distinct key, sorted by key.  Aggregators on different
+    parts of a table can be combined with `merge()`.
+
+    Public instance variables
+    -------------------------
+
+    aggs
+        The ``(name, func, expr)`` tuples of the aggregations.
+    keys
+        The distinct keys seen so far (sorted), or `None` when not
+        grouping or no rows have been seen yet.
+
+    Public methods
+    --------------
+
+    update(values, nrows[, keys][, sortedkeys])
+        Account for a block of rows.
+    merge(other)
+        Account for the rows seen by `other`.
+    splitLast()
+        Take out all the groups but the last one.
+    result([keynames])
+        Get the final values of the aggregations.
+    """
+
+    def __init__(self, aggs):
+        self.aggs = aggs
+        """The ``(name, func, expr)`` tuples of the aggregations."""
+        self.keys = None
+        """The distinct keys seen so far, if grouping."""
+        self._partials = None
+        """The arrays with partial states, or `None` if no rows seen."""
+        self._combiners = []
+        """The ufuncs combining every array of partial states."""
+        for name, func, expr in aggs:
+            self._combiners.extend(_combiners[func])
+
+
+    def update(self, values, nrows, keys=None, sortedkeys=False):
+        """
+        Account for a block of `nrows` rows.
+
+        `values` maps the expressions of the aggregations to arrays with
+        their values for the rows (scalars are broadcast).  If `keys` is
+        given, the values are aggregated by key.  If `sortedkeys` is
+        true, `keys` must be already sorted, and they are not sorted
+        again.  Empty blocks are only used for getting the types of the
+        results of grouped aggregations.
+        """
+        if nrows == 0:
+            if keys is not None and self._partials is None:
+                self._setEmpty(values, keys)
+            return
+        if keys is None:
+            order, starts = None, numpy.zeros(1, dtype=numpy.intp)
+        elif sortedkeys:
+            order = None
+            changes = numpy.flatnonzero(keys[1:] != keys[:-1]) + 1
+            starts = numpy.concatenate(([0], changes)).astype(numpy.intp)
+            keys = keys[starts]
+        else:
+            order, starts = _groupOrder(keys)
+            keys = keys[order][starts]
+        counts = numpy.diff(numpy.concatenate((starts, [nrows])))
+        partials = []
+        for name, func, expr in self.aggs:
+            if func == 'count':
+                partials.append(counts.astype(numpy.int64))
+                continue
+            value = numpy.asarray(values[expr])
+            if value.shape[:1] != (nrows,):
+                value = numpy.repeat(value[numpy.newaxis], nrows, axis=0)
+            if order is not None:
+                value = value[order]
+            if func in ('sum', 'mean'):
+                value = value.astype(_sumDtype(value.dtype))
+                partials.append(numpy.add.reduceat(value, starts))
+                if func == 'mean':
+                    partials.append(counts.astype(numpy.int64))
+            elif func == 'min':
+                partials.append(numpy.minimum.reduceat(value, starts))
+            else:
+                partials.append(numpy.maximum.reduceat(value, starts))
+        self._merge(keys, partials)
+
+
+    def _setEmpty(self, values, keys):
+        """Set an empty partial state with the types of `values`."""
+        partials = []
+        for name, func, expr in self.aggs:
+            if func == 'count':
+                partials.append(numpy.zeros(0, dtype=numpy.int64))
+                continue
+            value = numpy.atleast_1d(values[expr])
+            if func in ('sum', 'mean'):
+                partials.append(value[:0].astype(_sumDtype(value.dtype)))
+                if func == 'mean':
+                    partials.append(numpy.zeros(0, dtype=numpy.int64))
+            else:
+                partials.append(value[:0])
+        self.keys, self._partials = keys[:0], partials
+
+
+    def merge(self, other):
+        """Account for the rows seen by the `other` aggregator."""
+        if other._partials is not None:
+            self._merge(other.keys, other._partials)
+
+
+    def splitLast(self):
+        """
+        Take out all the groups but the last one.
+
+        A new aggregator with the state of the groups taken out is
+        returned.  This is useful for emitting the groups which are
+        complete when rows come sorted by key.
+        """
+        finished = Aggregator(self.aggs)
+        if self.keys is not None and len(self.keys) > 1:
+            finished.keys = self.keys[:-1]
+            finished._partials = [ partial[:-1]
+                                   for partial in self._partials ]
+            self.keys = self.keys[-1:]
+            self._partials = [ partial[-1:] for partial in self._partials ]
+        return finished
+
+
+    def _merge(self, keys, partials):
+        """Combine partial states for `keys` with the existing ones."""
+        if self._partials is None:
+            self.keys, self._partials = keys, partials
+            return
+        if keys is None:
+            self._partials = [
+                combiner(old, new) for combiner, old, new
+                in zip(self._combiners, self._partials, partials) ]
+            return
+        allkeys = numpy.concatenate((self.keys, keys))
+        order, starts = _groupOrder(allkeys)
+        self.keys = allkeys[order][starts]
+        self._partials = [
+            combiner.reduceat(numpy.concatenate((old, new))[order], starts)
+            for combiner, old, new
+            in zip(self._combiners, self._partials, partials) ]
+
+
+    def _finalValues(self):
+        """Get a list with the final array of values of every aggregation."""
+        results = []
+        partials = iter(self._partials)
+        for name, func, expr in self.aggs:
+            value = partials.next()
+            if func == 'mean':
+                value = value / partials.next().astype(numpy.float64)
+            results.append(value)
+        return results
+
+
+    def result(self, keynames=None):
+        """
+        Get the final values of the aggregations.
+
+        If not grouping (`keynames` is `None`), a dictionary mapping the
+        names of the aggregations to their values is returned.  When no
+        rows have been aggregated, counts and sums are zero and other
+        aggregations are `None`.
+
+        Otherwise, a record array is returned with a row per distinct
+        key (sorted), having fields for the keys (named after
+        `keynames`) followed by fields for the aggregations.
+        """
+        if keynames is None:
+            if self._partials is None:
+                result = {}
+                for name, func, expr in self.aggs:
+                    if func in ('count', 'sum'):
+                        result[name] = 0
+                    else:
+                        result[name] = None
+                return result
+            result = {}
+            for (name, func, expr), value in zip(self.aggs,
+                                                 self._finalValues()):
+                result[name] = value[0]
+            return result
+
+        keys, values = self.keys, self._finalValues()
+        descr = []
+        if len(keynames) == 1:
+            descr.append((keynames[0], keys.dtype))
+        else:
+            descr.extend([ (kname, keys.dtype[i])
+                           for i, kname in enumerate(keynames) ])
+        for (name, func, expr), value in zip(self.aggs, values):
+            descr.append((name, value.dtype, value.shape[1:]))
+        result = numpy.empty(len(keys), dtype=descr)
+        if len(keynames) == 1:
+            result[keynames[0]] = keys
+        else:
+            for i, kname in enumerate(keynames):
+                result[kname] = keys[keys.dtype.names[i]]
+        for (name, func, expr), value in zip(self.aggs, values):
+            result[name] = value
+        return result
+
+
+
+class SpillingAggregator(Aggregator):
+    """
+    Aggregator spilling partial states to disk when there are too
+    many groups.
+
+    When the number of groups kept in memory exceeds `maxgroups`, their
+    partial states are moved to a temporary file in `tmp_dir`, split in
+    partitions by the hash of their keys.  Getting the result then
+    aggregates every partition in turn, so that just the groups in a
+    partition need to be kept in memory at once (besides the result).
+    The temporary file is removed when the result is computed.
+    """
+
+    def __init__(self, aggs, maxgroups, tmp_dir=None):
+        super(SpillingAggregator, self).__init__(aggs)
+        self.maxgroups = maxgroups
+        """The maximum number of groups kept in memory."""
+        self.tmp_dir = tmp_dir
+        """The directory for the temporary file."""
+        self._tmpfile = None
+        """The temporary file with spilled states, if created."""
+        self._tmpfilename = None
+        """The name of the temporary file, if created."""
+
+
+    def _merge(self, keys, partials):
+        super(SpillingAggregator, self)._merge(keys, partials)
+        if self.keys is not None and len(self.keys) > self.maxgroups:
+            self._spill()
+
+
+    def _spill(self):
+        """Move the partial states in memory to the temporary file."""
+        if self._tmpfile is None:
+            from tables.file import openFile
+            fd, self._tmpfilename = tempfile.mkstemp(
+                ".tmp", "pytables-", self.tmp_dir)
+            # Close the file descriptor so as to avoid leaks
+            os.close(fd)
+            self._tmpfile = openFile(self._tmpfilename, "w")
+        keys, partials = self.keys, self._partials
+        descr = [('key', keys.dtype)]
+        descr.extend([ ('p%d' % i, partial.dtype)
+                       for i, partial in enumerate(partials) ])
+        states = numpy.empty(len(keys), dtype=descr)
+        states['key'] = keys
+        for i, partial in enumerate(partials):
+            states['p%d' % i] = partial
+        parts = _hashValues(keys) % numpy.uint64(_spillPartitions)
+        root = self._tmpfile.root
+        for npart in xrange(_spillPartitions):
+            name = 'part%d' % npart
+            if name not in root:
+                self._tmpfile.createTable(
+                    root, name, states.dtype, expectedrows=self.maxgroups)
+            root._f_getChild(name).append(states[parts == npart])
+        self.keys, self._partials = None, None
+
+
+    def result(self, keynames=None):
+        if self._tmpfile is None or keynames is None:
+            return super(SpillingAggregator, self).result(keynames)
+        try:
+            if self._partials is not None:
+                self._spill()
+            keys, results = [], []
+            for table in self._tmpfile.root._f_iterNodes():
+                aggregator = Aggregator(self.aggs)
+                for start in xrange(0, table.nrows, self.maxgroups):
+                    states = table.read(start, start + self.maxgroups)
+                    aggregator._merge(
+                        states['key'], [ states['p%d' % i] for i
+                                         in xrange(len(self._combiners)) ])
+                if aggregator.keys is not None:
+                    keys.append(aggregator.keys)
+                    results.append(aggregator.result(keynames))
+        finally:
+            self._tmpfile.close()
+            os.remove(self._tmpfilename)
+            self._tmpfile = None
+        # Put the groups of all the partitions in order
+        order = _groupOrder(numpy.concatenate(keys))[0]
+        return numpy.concatenate(results)[order]
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
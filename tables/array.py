@@ -678,6 +678,7 @@ class Array(hdf5Extension.Array, Leaf):
             array5 = array[np.where(array[:] > 4)]  # point selection
             array6 = array[array[:] > 4]            # boolean selection
         """
+        self._drainAppender()
         try:
             # First, try with a regular selection
             startl, stopl, stepl, shape = self._interpret_indexing(key)
@@ -738,6 +739,7 @@ class Array(hdf5Extension.Array, Leaf):
         if nparr.size == 0:
             return
 
+        self._drainAppender()
         try:
             startl, stopl, stepl, shape = self._interpret_indexing(key)
             self._writeSlice(startl, stopl, stepl, shape, nparr)
@@ -0,0 +1,253 @@
+"""
+Write-behind appending of data to leaves.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`AsyncAppender`
+    Appends data to a leaf from a background writer thread.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import sys
+import threading
+import Queue
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Public classes
+# ==============
+class AsyncAppender(object):
+    """
+    Appends data to a leaf from a background writer thread.
+
+    Instances of this class are returned by `Table.asyncAppender()` and
+    `EArray.asyncAppender()`.  While an appender is active, the buffers
+    filled by ``Row.append()``, ``Table.append()`` or ``EArray.append()``
+    are handed to a writer thread, which converts, compresses and writes
+    them to disk (and updates indexes and other structures of the leaf)
+    while the caller goes on producing data.  Up to `queue_depth`
+    buffers may be waiting to be written; further appends block until
+    the writer catches up.
+
+    Calling ``flush()`` on the appender or the leaf waits for all the
+    pending buffers to be written.  If writing a buffer fails, the
+    exception is raised by the next append, flush or close, the buffers
+    queued after the failing one are discarded and the appender is
+    closed.  Closing the leaf or its file closes the appender.
+
+    Until the appender is flushed, the ``nrows`` of the leaf lags behind
+    the rows appended.  Reading, modifying or removing data from the
+    leaf waits for the pending buffers to be written first.  As the
+    writer calls HDF5 without holding the Python global interpreter
+    lock, HDF5 operations on other nodes performed meanwhile require
+    the HDF5 library to have been built with thread-safety enabled.
+
+    Example of use::
+
+        appender = table.asyncAppender(queue_depth=4)
+        row = table.row
+        for i in xrange(nrows):
+            row['col1'] = i
+            row.append()
+        appender.close()
+
+    Public instance variables
+    -------------------------
+
+    leaf
+        The leaf being appended to (`None` once closed).
+    pending
+        The number of buffers waiting to be written.
+    queue_depth
+        The maximum number of buffers waiting to be written.
+
+    Public methods
+    --------------
+
+    append(rows)
+        Append `rows` to the leaf in the background.
+    close()
+        Flush the leaf and stop the writer.
+    flush()
+        Flush the leaf, waiting for pending buffers to be written.
+    """
+
+    # Properties
+    # ~~~~~~~~~~
+    def _getpending(self):
+        return self._pending
+
+    pending = property(_getpending, None, None,
+                       "The number of buffers waiting to be written.")
+
+
+    def __init__(self, leaf, queue_depth=4):
+        if leaf._asyncAppender is not None:
+            raise ValueError( "leaf ``%s`` already has an asynchronous "
+                              "appender" % leaf._v_pathname )
+        if queue_depth < 1:
+            raise ValueError( "``queue_depth`` must be positive: %r"
+                              % (queue_depth,) )
+        leaf._v_file._checkWritable()
+
+        self.leaf = leaf
+        """The leaf being appended to (`None` once closed)."""
+        self.queue_depth = queue_depth
+        """The maximum number of buffers waiting to be written."""
+        self._queue = Queue.Queue(queue_depth)
+        """The buffers waiting to be written (with their writers)."""
+        self._pending = 0
+        """The number of buffers queued and not yet written."""
+        self._written = threading.Condition()
+        """Signalled when the writer has no more pending buffers."""
+        self._excinfo = None
+        """The information of an exception raised by the writer."""
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+        leaf._asyncAppender = self
+
+
+    def _run(self):
+        """Write the queued buffers until the end is signalled."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            function, args = item
+            # Once a buffer has failed, the next ones are discarded
+            if self._excinfo is None:
+                try:
+                    function(*args)
+                except:
+                    self._excinfo = sys.exc_info()
+            self._written.acquire()
+            try:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._written.notifyAll()
+            finally:
+                self._written.release()
+
+
+    def _put(self, function, *args):
+        """
+        Queue a call of `function` with `args` in the writer thread.
+
+        This blocks while the queue is full.  An exception raised by a
+        previous call is raised here.
+        """
+        self._checkError()
+        self._written.acquire()
+        try:
+            self._pending += 1
+        finally:
+            self._written.release()
+        self._queue.put((function, args))
+
+
+    def _drain(self):
+        """
+        Wait for all the pending buffers to be written.
+
+        An exception raised by the writer is raised here.  Nothing is
+        done when called from the writer itself (e.g. while updating
+        indexes).
+        """
+        if threading.currentThread() is self._thread:
+            return
+        self._written.acquire()
+        try:
+            while self._pending > 0:
+                self._written.wait()
+        finally:
+            self._written.release()
+        self._checkError()
+
+
+    def _checkError(self):
+        """Close the appender and raise an exception of the writer."""
+        excinfo = self._excinfo
+        if excinfo is not None:
+            self._excinfo = None
+            self._stop()
+            raise excinfo[0], excinfo[1], excinfo[2]
+
+
+    def _stop(self):
+        """Stop the writer thread and detach from the leaf."""
+        if self.leaf is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self.leaf._asyncAppender = None
+        self.leaf = None
+
+
+    def _checkOpen(self):
+        if self.leaf is None:
+            raise ValueError("the asynchronous appender is closed")
+
+
+    def append(self, rows):
+        """
+        Append `rows` to the leaf in the background.
+
+        This is the same as calling the ``append()`` method of the leaf.
+        """
+        self._checkOpen()
+        self.leaf.append(rows)
+
+
+    def flush(self):
+        """
+        Flush the leaf, waiting for pending buffers to be written.
+
+        This is the same as calling the ``flush()`` method of the leaf.
+        """
+        self._checkOpen()
+        self.leaf.flush()
+
+
+    def close(self):
+        """
+        Flush the leaf and stop the writer.
+
+        Later appends to the leaf are written synchronously.  Closing an
+        already closed appender does nothing.
+        """
+        if self.leaf is None:
+            return
+        try:
+            self.leaf.flush()
+        finally:
+            self._stop()
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
@@ -0,0 +1,293 @@
+"""
+Bitmap indexes for columns with few distinct values.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`BitmapIndex`
+    Bitmaps of the rows holding every distinct value of a column.
+
+Functions
+=========
+
+`_bitmapNameOf`
+    Get the name of the bitmap indexes group of a table.
+`_bitmapPathnameOf`
+    Get the path name of the bitmap indexes group of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import weakref
+
+import numpy
+
+from tables.atom import Atom, UInt8Atom
+from tables.earray import EArray
+from tables.filters import Filters
+from tables.group import Group
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _bitmapNameOf(node):
+    return '_p_bmap_%s' % node._v_name
+
+def _bitmapPathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _bitmapNameOf(node))
+
+
+# Public classes
+# ==============
+class BitmapIndex(object):
+    """
+    Bitmaps of the rows holding every distinct value of a column.
+
+    Bitmap indexes are kept in a hidden group beside the table
+    (``_p_bmap_<name>``), with a group for each column holding a
+    ``values`` array with the distinct values of the column (in order
+    of appearance) and a ``b<n>`` array for every value, with a bit per
+    row of the table (set for the rows holding the value, packed in
+    bytes).  Bitmaps are compressed chunk by chunk, which encodes the
+    long runs of zeros and ones of low cardinality columns in little
+    space.
+
+    Bitmap indexes are updated whenever the table is modified.  The
+    bitmaps of the comparisons in a condition are combined with bitwise
+    operations, which gives the exact rows fulfilling the condition
+    when it only involves columns with bitmap indexes (with ``&``,
+    ``|``, ``~`` and ``!=`` to any depth), without reading the table.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    nvalues
+        The number of distinct values in the column.
+    table
+        The `Table` of the column.
+
+    Public methods
+    --------------
+
+    get_bitmap(ops, limits, nrows)
+        Get the bitmap of the rows fulfilling a comparison.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=False)
+
+    ops = frozenset(['lt', 'le', 'gt', 'ge', 'eq'])
+    """The comparisons that can be used with bitmap indexes."""
+
+    # Properties
+    # ~~~~~~~~~~
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` of the column.")
+
+    def _getgroup(self):
+        table = self.table
+        return table._v_file._getNode(
+            joinPath(_bitmapPathnameOf(table), self.colpathname))
+
+    _group = property(_getgroup)
+
+    def _getnvalues(self):
+        return len(self._getValues())
+
+    nvalues = property(_getnvalues, None, None,
+                       "The number of distinct values in the column.")
+
+
+    def __init__(self, table, colpathname, new=False):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self.colpathname = colpathname
+        """The path name of the column."""
+        self._values = None
+        """The array of distinct values kept in memory, if read."""
+        self._bitmaps = {}
+        """The bitmaps kept in memory, by number of value."""
+        if new:
+            self._create()
+
+
+    def _create(self):
+        """Create the group and array of values for the bitmap index."""
+        table = self.table
+        parent = table._v_parent
+        name = _bitmapNameOf(table)
+        for gname in [name] + self.colpathname.split('/'):
+            if gname in parent._v_groups or gname in parent._v_hidden:
+                parent = parent._f_getChild(gname)
+            else:
+                parent = Group( parent, gname, new=True,
+                                filters=self._filters, _log=False )
+        dtype = table.coldtypes[self.colpathname]
+        EArray( parent, 'values', Atom.from_dtype(dtype), (0,),
+                "Distinct values of the column", self._filters, 256,
+                _log=False )
+
+
+    def _getValues(self):
+        """Get the array of distinct values."""
+        if self._values is None:
+            self._values = self._group.values.read()
+        return self._values
+
+
+    def _getBitmap(self, nvalue):
+        """Get the bitmap of the `nvalue`-th value (maybe too short)."""
+        bitmap = self._bitmaps.get(nvalue)
+        if bitmap is None:
+            bitmap = self._group._f_getChild('b%d' % nvalue).read()
+            self._bitmaps[nvalue] = bitmap
+        return bitmap
+
+
+    def _addValues(self, values):
+        """Add new distinct `values`, with an (empty) bitmap for each."""
+        group = self._group
+        nvalues = group.values.nrows
+        expectedrows = self.table.nrows // 8 + 1
+        for i in xrange(len(values)):
+            EArray( group, 'b%d' % (nvalues + i), UInt8Atom(), (0,),
+                    "Bitmap of rows", self._filters, expectedrows,
+                    _log=False )
+        group.values.append(values)
+        self._values = None
+
+
+    def append(self, start, values):
+        """Account for `values` being appended at row `start`."""
+        self._write(start, values)
+
+
+    def refresh(self, nchunk, values):
+        """
+        Recompute the bitmaps of chunks from their `values`.
+
+        `values` must hold the values of whole chunks starting at chunk
+        number `nchunk` (the last one may be partially filled).
+        """
+        self._write(nchunk * self.table.chunkshape[0], values)
+
+
+    def _write(self, start, values):
+        """Set the bits of rows starting at `start` from their `values`."""
+        nrows = len(values)
+        if nrows == 0:
+            return
+        uniques, inverse = numpy.unique(values, return_inverse=True)
+        known = dict([ (value, i) for i, value
+                       in enumerate(self._getValues().tolist()) ])
+        uniques = uniques.tolist()
+        new = [ value for value in uniques if value not in known ]
+        if new:
+            self._addValues(new)
+            known = dict([ (value, i) for i, value
+                           in enumerate(self._getValues().tolist()) ])
+        present = dict([ (known[value], j)
+                         for j, value in enumerate(uniques) ])
+
+        # Bits are written in whole bytes, keeping the ones of other rows
+        bstart, lead = divmod(start, 8)
+        bstop = (start + nrows + 7) // 8
+        tail = bstop * 8 - (start + nrows)
+        group = self._group
+        for nvalue in xrange(len(known)):
+            array = group._f_getChild('b%d' % nvalue)
+            if nvalue not in present and array.nrows <= bstart:
+                continue  # no bits set there, and none to be set
+            bits = numpy.zeros((bstop - bstart) * 8, dtype=numpy.bool_)
+            if nvalue in present:
+                bits[lead:lead+nrows] = (inverse == present[nvalue])
+            if lead and array.nrows > bstart:
+                bits[:lead] = numpy.unpackbits(array[bstart:bstart+1])[:lead]
+            if tail and array.nrows >= bstop:
+                bits[-tail:] = numpy.unpackbits(array[bstop-1:bstop])[-tail:]
+            packed = numpy.packbits(bits)
+            if array.nrows < bstart:
+                array.append(numpy.zeros(bstart - array.nrows, numpy.uint8))
+            nexisting = min(array.nrows - bstart, len(packed))
+            if nexisting > 0:
+                array[bstart:bstart+nexisting] = packed[:nexisting]
+            if nexisting < len(packed):
+                array.append(packed[nexisting:])
+        self._bitmaps.clear()
+
+
+    def truncate(self, nchunks):
+        """Forget about chunks after the first `nchunks`."""
+        nbytes = (nchunks * self.table.chunkshape[0] + 7) // 8
+        group = self._group
+        for nvalue in xrange(group.values.nrows):
+            array = group._f_getChild('b%d' % nvalue)
+            if array.nrows > nbytes:
+                array.truncate(nbytes)
+        self._bitmaps.clear()
+
+
+    def get_bitmap(self, ops, limits, nrows):
+        """
+        Get the bitmap of the rows fulfilling a comparison.
+
+        `ops` and `limits` describe the comparison as in the index
+        expressions of compiled conditions (for instance, ``('gt',
+        'le')`` and ``(1, 3)`` for ``(1 < col) & (col <= 3)``).  The
+        bitmaps of the values fulfilling it are or-ed.  An array with
+        the bits of the first `nrows` rows packed in bytes is returned
+        (bits of rows after the end of the table may be set).
+        """
+        values = self._getValues()
+        selected = numpy.ones(len(values), dtype=numpy.bool_)
+        for op, limit in zip(ops, limits):
+            if op == 'lt':
+                selected &= values < limit
+            elif op == 'le':
+                selected &= values <= limit
+            elif op == 'gt':
+                selected &= values > limit
+            elif op == 'ge':
+                selected &= values >= limit
+            elif op == 'eq':
+                selected &= values == limit
+        nbytes = (nrows + 7) // 8
+        result = numpy.zeros(nbytes, dtype=numpy.uint8)
+        for nvalue in numpy.flatnonzero(selected):
+            bitmap = self._getBitmap(nvalue)
+            n = min(len(bitmap), nbytes)
+            result[:n] |= bitmap[:n]
+        return result
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
@@ -0,0 +1,321 @@
+"""
+Per-chunk Bloom filters for pruning equality queries.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`BloomFilter`
+    Bloom filter of the values of a column in every table chunk.
+
+Functions
+=========
+
+`_bloomNameOf`
+    Get the name of the Bloom filters group of a table.
+`_bloomPathnameOf`
+    Get the path name of the Bloom filters group of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import math
+import weakref
+
+import numpy
+
+from tables.atom import UInt8Atom
+from tables.earray import EArray
+from tables.filters import Filters
+from tables.group import Group
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private variables
+# =================
+_fnvOffset = numpy.uint64(14695981039346656037L)
+_fnvPrime = numpy.uint64(1099511628211L)
+
+
+# Private functions
+# =================
+def _bloomNameOf(node):
+    return '_p_bloom_%s' % node._v_name
+
+def _bloomPathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _bloomNameOf(node))
+
+def _hashValues(values):
+    """
+    Get the 64-bit FNV-1a hashes of the `values` of a column.
+
+    Values are hashed on their little-endian binary representation, so
+    hashes do not depend on the platform.
+    """
+    dtype = values.dtype
+    if dtype.byteorder not in '|<':
+        dtype = dtype.newbyteorder('<')
+    values = numpy.ascontiguousarray(values, dtype=dtype)
+    if dtype.kind == 'f':
+        values = values + 0.0  # make -0.0 hash like 0.0
+    bytes = values.view(numpy.uint8).reshape((len(values), dtype.itemsize))
+    hashes = numpy.empty(len(values), dtype=numpy.uint64)
+    hashes[:] = _fnvOffset
+    for i in xrange(dtype.itemsize):
+        hashes ^= bytes[:, i]
+        hashes *= _fnvPrime
+    return hashes
+
+
+# Public classes
+# ==============
+class BloomFilter(object):
+    """
+    Bloom filter of the values of a column in every table chunk.
+
+    Bloom filters are kept in a hidden group beside the table
+    (``_p_bloom_<name>``), with a ``bits`` array for each column
+    holding a row of bits per chunk.  They are updated whenever the
+    table is modified, and they are used for building the chunkmap of
+    equality queries (like ``col == value``) on columns without a
+    usable index, so that most chunks not containing the value are
+    never read.  Unlike zone maps, they are effective on columns with
+    many distinct values scattered over the table.
+
+    The size of the filters is chosen so that the probability of a
+    chunk not containing the value being read (the false positive
+    rate, ``FPP`` attribute of the ``bits`` array) is the given one
+    when all the values in the chunk are distinct.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    nbits
+        The number of bits in the filter of every chunk.
+    nchunks
+        The number of chunks described by the Bloom filter.
+    nhashes
+        The number of bits set for every value.
+    table
+        The `Table` of the column.
+
+    Public methods
+    --------------
+
+    get_chunkmap(ops, limits, nchunks)
+        Get the chunks that may fulfill an equality condition.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=False)
+
+    ops = frozenset(['eq'])
+    """The comparisons that can be used with Bloom filters."""
+
+    # Properties
+    # ~~~~~~~~~~
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` of the column.")
+
+    def _getgroup(self):
+        table = self.table
+        return table._v_file._getNode(
+            joinPath(_bloomPathnameOf(table), self.colpathname))
+
+    _group = property(_getgroup)
+
+    def _getnchunks(self):
+        return self._group.bits.nrows
+
+    nchunks = property(_getnchunks, None, None,
+                       "The number of chunks described by the Bloom filter.")
+
+
+    def __init__(self, table, colpathname, new=False, fpp=0.01):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self.colpathname = colpathname
+        """The path name of the column."""
+        self._cache = None
+        """The ``bits`` array kept in memory, if read."""
+        if new:
+            self._create(fpp)
+        attrs = self._group.bits._v_attrs
+        self.nbits = int(attrs.NBITS)
+        """The number of bits in the filter of every chunk."""
+        self.nhashes = int(attrs.NHASHES)
+        """The number of bits set for every value."""
+
+
+    def _create(self, fpp):
+        """Create the group and array for the Bloom filter."""
+        if not 0 < fpp < 1:
+            raise ValueError( "the false positive probability must be "
+                              "between 0 and 1, not %r" % (fpp,) )
+        table = self.table
+        parent = table._v_parent
+        name = _bloomNameOf(table)
+        for gname in [name] + self.colpathname.split('/'):
+            if gname in parent._v_groups or gname in parent._v_hidden:
+                parent = parent._f_getChild(gname)
+            else:
+                parent = Group( parent, gname, new=True,
+                                filters=self._filters, _log=False )
+        # Optimal sizes for a chunk of distinct values
+        chunksize = table.chunkshape[0]
+        nbits = -chunksize * math.log(fpp) / math.log(2)**2
+        nbytes = max(int(math.ceil(nbits / 8)), 1)
+        nhashes = max(int(round(nbytes * 8. / chunksize * math.log(2))), 1)
+        expectedrows = table.nrows // chunksize + 1
+        bits = EArray( parent, 'bits', UInt8Atom(), (0, nbytes),
+                       "Bloom filters of chunks", self._filters,
+                       expectedrows, _log=False )
+        bits._v_attrs.NBITS = nbytes * 8
+        bits._v_attrs.NHASHES = nhashes
+        bits._v_attrs.FPP = fpp
+
+
+    def _positions(self, values):
+        """
+        Get the positions of the bits set for `values`.
+
+        An array with a row of ``nhashes`` positions per value is
+        returned.  Double hashing is used for deriving them from a
+        single 64-bit hash.
+        """
+        hashes = _hashValues(values)
+        h1 = hashes & numpy.uint64(0xffffffff)
+        h2 = (hashes >> numpy.uint64(32)) | numpy.uint64(1)
+        i = numpy.arange(self.nhashes, dtype=numpy.uint64)
+        positions = (h1[:, numpy.newaxis] + i * h2[:, numpy.newaxis])
+        return (positions % numpy.uint64(self.nbits)).astype(numpy.intp)
+
+
+    def _chunkBits(self, values, offset):
+        """
+        Get the filters of the chunks covered by `values`.
+
+        `values` are the column values starting at row `offset`
+        (counted from the start of the first chunk).
+        """
+        chunksize = self.table.chunkshape[0]
+        nchunks = (len(values) + offset + chunksize - 1) // chunksize
+        positions = self._positions(values)
+        chunks = (numpy.arange(len(values)) + offset) // chunksize
+        bits = numpy.zeros((nchunks, self.nbits), dtype=numpy.bool_)
+        bits[chunks[:, numpy.newaxis], positions] = True
+        return numpy.packbits(bits, axis=1)
+
+
+    def append(self, start, values):
+        """
+        Account for `values` being appended at row `start`.
+
+        The filter of the last (partially filled) chunk is merged with
+        the one of the new values.
+        """
+        if len(values) == 0:
+            return
+        chunksize = self.table.chunkshape[0]
+        nchunk, offset = divmod(start, chunksize)
+        bits = self._chunkBits(values, offset)
+        if offset > 0 and nchunk < self.nchunks:
+            # Merge with the filter of the existing rows
+            bits[0] |= self._group.bits[nchunk]
+        self._write(nchunk, bits)
+
+
+    def refresh(self, nchunk, values):
+        """
+        Recompute the filters of chunks from their `values`.
+
+        `values` must hold the values of whole chunks starting at chunk
+        number `nchunk` (the last one may be partially filled).
+        """
+        if len(values) == 0:
+            return
+        self._write(nchunk, self._chunkBits(values, 0))
+
+
+    def _write(self, nchunk, bits):
+        """Write filters for chunks starting at `nchunk`."""
+        array = self._group.bits
+        nexisting = min(max(array.nrows - nchunk, 0), len(bits))
+        if nexisting > 0:
+            array[nchunk:nchunk+nexisting] = bits[:nexisting]
+        if nexisting < len(bits):
+            array.append(bits[nexisting:])
+        self._cache = None
+
+
+    def truncate(self, nchunks):
+        """Forget about chunks after the first `nchunks`."""
+        array = self._group.bits
+        if array.nrows > nchunks:
+            array.truncate(nchunks)
+            self._cache = None
+
+
+    def get_chunkmap(self, ops, limits, nchunks):
+        """
+        Get the chunks that may fulfill an equality condition.
+
+        `ops` and `limits` describe the condition as in the index
+        expressions of compiled conditions (only ``('eq',)`` is
+        supported).  A boolean array of `nchunks` elements is returned.
+        Chunks without filters are always selected.
+        """
+        if tuple(ops) != ('eq',):
+            raise ValueError( "Bloom filters only support equality "
+                              "conditions, not %r" % (ops,) )
+        if self._cache is None:
+            self._cache = self._group.bits.read()
+        bits = self._cache
+        n = min(len(bits), nchunks)
+        chunkmap = numpy.ones(nchunks, dtype='bool')
+        # Values not representable in the column never match
+        dtype = self.table.coldtypes[self.colpathname]
+        limit = limits[0]
+        try:
+            value = numpy.array([limit]).astype(dtype)
+            representable = (value[0] == limit)
+        except (TypeError, ValueError):
+            representable = False
+        if not representable:
+            chunkmap[:n] = False
+            return chunkmap
+        selected = chunkmap[:n]
+        for pos in self._positions(value)[0]:
+            selected &= (bits[:n, pos >> 3] & (0x80 >> (pos & 7))) != 0
+        return chunkmap
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
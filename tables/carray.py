@@ -99,6 +99,10 @@ class CArray(Array):
     # Class identifier.
     _c_classId = 'CARRAY'
 
+    _v_delta = False
+    """Whether new data is stored as differences between consecutive
+    elements (only used by the arrays of indexes)."""
+
 
     # Properties
     # ~~~~~~~~~~
@@ -0,0 +1,328 @@
+"""
+Indexes over an ordered tuple of columns.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`CompositeIndex`
+    Index over the compound key of several columns of a table.
+
+Functions
+=========
+
+`_compositeNameOf`
+    Get the name of the composite indexes group of a table.
+`_compositePathnameOf`
+    Get the path name of the composite indexes group of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import weakref
+
+import numpy
+
+from tables.atom import Int64Atom
+from tables.earray import EArray
+from tables.exceptions import NoSuchNodeError
+from tables.filters import Filters
+from tables.group import Group
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _compositeNameOf(node):
+    return '_p_cidx_%s' % node._v_name
+
+def _compositePathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _compositeNameOf(node))
+
+def _compositeIndexName(colpathnames):
+    """Get the name of the group of a composite index."""
+    return '__'.join([ pathname.replace('/', '_')
+                       for pathname in colpathnames ])
+
+
+def _bisect(keys, key, right):
+    """
+    Find the position of `key` in the sorted sequence of records `keys`.
+
+    `keys` may be a list of tuples or a structured array, of which only
+    the probed records are converted to tuples.  Only the first
+    ``len(key)`` fields of the records are compared.  The position of
+    the first record not less than `key` (or greater than it if `right`
+    is true) is returned.
+    """
+    nkey = len(key)
+    lo, hi = 0, len(keys)
+    if isinstance(keys, numpy.ndarray):
+        getkey = lambda i: keys[i].item()[:nkey]
+    else:
+        getkey = lambda i: keys[i][:nkey]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mkey = getkey(mid)
+        if mkey < key or (right and mkey == key):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# Public classes
+# ==============
+class CompositeIndex(object):
+    """
+    Index over the compound key of several columns of a table.
+
+    Composite indexes are kept in a hidden group beside the table
+    (``_p_cidx_<name>``), with a group for each index holding a
+    ``sorted`` table with the compound keys of all the rows in
+    lexicographical order, an ``indices`` array with the row numbers
+    of these keys, and a ``bounds`` table with the first key in every
+    chunk of ``sorted`` (which is kept in memory).  Conditions with
+    equalities on a leading prefix of the columns and optionally a
+    range on the next one select a contiguous slice of ``sorted``,
+    which is found by a single bisection over the compound keys.
+
+    Composite indexes are not updated when rows are appended or
+    modified.  They are marked as dirty instead, and they are not used
+    until they are rebuilt by `Table.reIndex()` or
+    `Table.reIndexDirty()` (this is done automatically after
+    operations which move rows if ``Table.autoIndex`` is true).
+
+    Public instance variables
+    -------------------------
+
+    colpathnames
+        The path names of the indexed columns, in key order.
+    dirty
+        Whether the index is out of sync with the table.
+    nelements
+        The number of rows in the index.
+    table
+        The `Table` of the index.
+
+    Public methods
+    --------------
+
+    build()
+        Build the index from the current contents of the table.
+    search(exprs)
+        Get the row numbers selected by composite expressions.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=True)
+
+    # Properties
+    # ~~~~~~~~~~
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` of the index.")
+
+    def _getgroup(self):
+        table = self.table
+        return table._v_file._getNode(
+            joinPath(_compositePathnameOf(table),
+                     _compositeIndexName(self.colpathnames)))
+
+    _group = property(_getgroup)
+
+    def _getdirty(self):
+        return bool(self._group._v_attrs.DIRTY)
+
+    def _setdirty(self, dirty):
+        if bool(dirty) == self.dirty:
+            return
+        self._group._v_attrs.DIRTY = bool(dirty)
+        # Conditions compiled before may use (or not) the index wrongly
+        self.table._conditionCache.clear()
+
+    dirty = property(_getdirty, _setdirty, None,
+                     "Whether the index is out of sync with the table.")
+
+    def _getnelements(self):
+        return self._group.indices.nrows
+
+    nelements = property(_getnelements, None, None,
+                         "The number of rows in the index.")
+
+
+    def __init__(self, table, colpathnames, new=False):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self.colpathnames = tuple(colpathnames)
+        """The path names of the indexed columns, in key order."""
+        self._bounds = None
+        """The first keys of the chunks of ``sorted``, if read."""
+        if new:
+            self._create()
+
+
+    def _create(self):
+        """Create the group of the index (but do not fill it)."""
+        table = self.table
+        parent = table._v_parent
+        name = _compositeNameOf(table)
+        try:
+            group = table._v_file._getNode(_compositePathnameOf(table))
+        except NoSuchNodeError:
+            group = Group( parent, name, "Composite indexes", new=True,
+                           filters=self._filters, _log=False )
+        group = Group( group, _compositeIndexName(self.colpathnames),
+                       "Composite index", new=True, filters=self._filters,
+                       _log=False )
+        group._v_attrs.COLUMNS = list(self.colpathnames)
+        group._v_attrs.DIRTY = True
+
+
+    def _keyDtype(self):
+        """Get the compound type of the keys."""
+        coldtypes = self.table.coldtypes
+        return numpy.dtype([ ('k%d' % i, coldtypes[colpathname])
+                             for i, colpathname
+                             in enumerate(self.colpathnames) ])
+
+
+    def build(self):
+        """
+        Build the index from the current contents of the table.
+
+        The key columns of all the rows are read and sorted in memory.
+        The number of indexed rows is returned.
+        """
+        from tables.table import Table
+        table = self.table
+        group = self._group
+        nrows = table.nrows
+        keys = numpy.empty(nrows, dtype=self._keyDtype())
+        for i, pathname in enumerate(self.colpathnames):
+            keys['k%d' % i] = table._read(0, nrows, 1, pathname)
+        # Stable sorts from the last column to the first one give the
+        # lexicographical order (faster than ``numpy.lexsort()``)
+        order = numpy.arange(nrows)
+        for i in xrange(len(self.colpathnames)-1, -1, -1):
+            column = keys['k%d' % i][order]
+            order = order[column.argsort(kind='mergesort')]
+        keys = keys[order]
+
+        for name in ['sorted', 'indices', 'bounds']:
+            if name in group._v_children:
+                group._v_children[name]._g_remove(False, False)
+        sortedkeys = Table( group, 'sorted', keys.dtype, "Sorted keys",
+                            filters=self._filters,
+                            expectedrows=max(nrows, 1), _log=False )
+        indices = EArray( group, 'indices', Int64Atom(), (0,),
+                          "Row numbers of sorted keys", self._filters,
+                          max(nrows, 1), _log=False )
+        if nrows > 0:
+            sortedkeys.append(keys)
+            indices.append(order.astype('int64'))
+        bounds = Table( group, 'bounds', keys.dtype,
+                        "First keys of sorted chunks", filters=self._filters,
+                        expectedrows=nrows // sortedkeys.chunkshape[0] + 1,
+                        _log=False )
+        if nrows > 0:
+            bounds.append(keys[::sortedkeys.chunkshape[0]])
+        self._bounds = None
+        self.dirty = False
+        return nrows
+
+
+    def _getBounds(self):
+        """Get the first keys of the chunks of ``sorted`` as tuples."""
+        if self._bounds is None:
+            self._bounds = self._group.bounds.read().tolist()
+        return self._bounds
+
+
+    def _locate(self, key, right):
+        """
+        Find the position of `key` among the sorted keys.
+
+        Keys are compared on their first ``len(key)`` columns, and the
+        position of the first key not less than `key` (or greater than
+        it if `right` is true) is returned.  Just the chunk of
+        ``sorted`` where the position lies is read.
+        """
+        sortedkeys = self._group.sorted
+        chunksize = sortedkeys.chunkshape[0]
+        nchunk = _bisect(self._getBounds(), key, right)
+        if nchunk == 0:
+            return 0
+        start = (nchunk - 1) * chunksize
+        keys = sortedkeys.read(start, start + chunksize)
+        return start + _bisect(keys, key, right)
+
+
+    def search(self, exprs):
+        """
+        Get the row numbers selected by composite expressions.
+
+        `exprs` is a list of ``(var, ops, limits)`` expressions on the
+        leading columns of the index (in order), where all of them but
+        the last one are equalities, and the last one may be a range.
+        The selected row numbers are returned sorted.
+        """
+        eqvalues = []
+        for var, ops, limits in exprs[:-1]:
+            eqvalues.append(limits[0])
+        var, ops, limits = exprs[-1]
+        lowkey = highkey = tuple(eqvalues)
+        lowright, highright = False, True
+        for op, limit in zip(ops, limits):
+            if op == 'eq':
+                lowkey = highkey = tuple(eqvalues) + (limit,)
+            elif op in ('gt', 'ge'):
+                lowkey = tuple(eqvalues) + (limit,)
+                lowright = (op == 'gt')
+            else:
+                highkey = tuple(eqvalues) + (limit,)
+                highright = (op == 'le')
+        start = self._locate(lowkey, lowright)
+        stop = self._locate(highkey, highright)
+        if start >= stop:
+            return numpy.empty(0, dtype='int64')
+        coords = self._group.indices.read(start, stop)
+        coords.sort()
+        return coords
+
+
+    def remove(self):
+        """Remove the index from disk."""
+        group = self._group
+        parent = group._v_parent
+        group._g_remove(recursive=True)
+        if not parent._v_children:
+            parent._g_remove(recursive=True)
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
@@ -53,8 +53,8 @@ def _check_indexable_cmp(getidxcmp):
     This does some extra checking that Numexpr would perform later on
     the comparison if it was compiled within a complete condition.
     """
-    def newfunc(exprnode, indexedcols):
-        result = getidxcmp(exprnode, indexedcols)
+    def newfunc(exprnode, indexedcols, colnames=frozenset()):
+        result = getidxcmp(exprnode, indexedcols, colnames)
         if result[0] is not None:
             try:
                 typeCompileAst(expressionToAST(exprnode))
@@ -66,16 +66,32 @@ def _check_indexable_cmp(getidxcmp):
     newfunc.__doc__ = getidxcmp.__doc__
     return newfunc
 
+def _is_usable_cmp(indexedcols, var, op):
+    """
+    Can the comparison `op` on variable `var` be used with `indexedcols`?
+
+    `indexedcols` is either a set of variable names (all comparisons
+    being usable on them) or a mapping from variable names to the set
+    of comparisons usable on each of them.
+    """
+    if var not in indexedcols:
+        return False
+    if isinstance(indexedcols, dict):
+        return op in indexedcols[var]
+    return True
+
 @_check_indexable_cmp
-def _get_indexable_cmp(exprnode, indexedcols):
+def _get_indexable_cmp(exprnode, indexedcols, colnames=frozenset()):
     """
     Get the indexable variable-constant comparison in `exprnode`.
 
     A tuple of (variable, operation, constant) is returned if
     `exprnode` is a variable-constant (or constant-variable)
-    comparison, and the variable is in `indexedcols`.  A normal
+    comparison, and the variable is in `indexedcols` (see
+    `_is_usable_cmp()`).  A normal
     variable can also be used instead of a constant: a tuple with its
-    name will appear instead of its value.
+    name will appear instead of its value.  Variables in `colnames`
+    (columns) can not, since they have no single value.
 
     Otherwise, the values in the tuple are ``None``.
     """
@@ -88,8 +104,11 @@ def _get_indexable_cmp(exprnode, indexedcols):
 
     def get_cmp(var, const, op):
         var_value, const_value = var.value, const.value
-        if ( var.astType == 'variable' and var_value in indexedcols
-             and const.astType in ['constant', 'variable'] ):
+        if ( var.astType == 'variable'
+             and _is_usable_cmp(indexedcols, var_value, op)
+             and (const.astType == 'constant'
+                  or (const.astType == 'variable'
+                      and const_value not in colnames)) ):
             if const.astType == 'variable':
                 const_value = (const_value, )
             return (var_value, op, const_value)
@@ -98,7 +117,7 @@ def _get_indexable_cmp(exprnode, indexedcols):
     def is_indexed_boolean(node):
         return ( node.astType == 'variable'
                  and node.astKind == 'bool'
-                 and node.value in indexedcols )
+                 and _is_usable_cmp(indexedcols, node.value, 'eq') )
 
     # Boolean variables are indexable by themselves.
     if is_indexed_boolean(exprnode):
@@ -130,7 +149,8 @@ def _get_indexable_cmp(exprnode, indexedcols):
     return not_indexable
 
 
-def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
+def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr,
+                          colnames):
     """Here lives the actual implementation of the get_idx_expr() wrapper.
 
     'idxexprs' is a list of expressions in the form ``(var, (ops),
@@ -139,7 +159,8 @@ def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
     for the first time and populated during the different recursive
     calls.  Finally, they are returned in the last level to the
     original wrapper.  If 'exprnode' is not indexable, it will return
-    the tuple ([], ['']) so as to signal this.
+    the tuple ([], ['']) so as to signal this.  'colnames' are the
+    variables which are columns.
     """
     not_indexable =  ([], [''])
     op_conv = { 'and': '&',
@@ -157,20 +178,23 @@ def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
             invert ^= True
             # The information about the negated node is in first position
             exprnode = idxcmp[0]
-            idxcmp = _get_indexable_cmp(exprnode, indexedcols)
+            idxcmp = _get_indexable_cmp(exprnode, indexedcols, colnames)
         return idxcmp, exprnode, invert
 
     # Indexable variable-constant comparison.
-    idxcmp = _get_indexable_cmp(exprnode, indexedcols)
+    idxcmp = _get_indexable_cmp(exprnode, indexedcols, colnames)
     idxcmp, exprnode, invert = fix_invert(idxcmp, exprnode, indexedcols)
     if idxcmp[0]:
         if invert:
             var, op, value = idxcmp
-            if op == 'eq' and value in [True, False]:
+            if op == 'eq' and type(value) is bool:
                 # ``var`` must be a boolean index.  Flip its value.
                 value ^= True
-            else:
+            elif op in negcmp:
                 op = negcmp[op]
+            else:
+                # Negated equalities are not indexable.
+                return not_indexable
             expr = (var, (op,), (value,))
             invert = False
         else:
@@ -190,9 +214,9 @@ def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
 
     left, right = exprnode.children
     # Get the expression at left
-    lcolvar, lop, llim = _get_indexable_cmp(left, indexedcols)
+    lcolvar, lop, llim = _get_indexable_cmp(left, indexedcols, colnames)
     # Get the expression at right
-    rcolvar, rop, rlim = _get_indexable_cmp(right, indexedcols)
+    rcolvar, rop, rlim = _get_indexable_cmp(right, indexedcols, colnames)
 
     # Use conjunction of indexable VC comparisons like
     # ``(a <[=] x) & (x <[=] b)`` or ``(a >[=] x) & (x >[=] b)``
@@ -207,8 +231,10 @@ def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
             return [expr]
 
     # Recursively get the expressions at the left and the right
-    lexpr = _get_idx_expr_recurse(left, indexedcols, idxexprs, strexpr)
-    rexpr = _get_idx_expr_recurse(right, indexedcols, idxexprs, strexpr)
+    lexpr = _get_idx_expr_recurse(
+        left, indexedcols, idxexprs, strexpr, colnames)
+    rexpr = _get_idx_expr_recurse(
+        right, indexedcols, idxexprs, strexpr, colnames)
 
     def add_expr(expr, idxexprs, strexpr):
         """Add a single expression to the list."""
@@ -238,7 +264,7 @@ def _get_idx_expr_recurse(exprnode, indexedcols, idxexprs, strexpr):
     return not_indexable
 
 
-def _get_idx_expr(expr, indexedcols):
+def _get_idx_expr(expr, indexedcols, colnames=frozenset()):
     """
     Extract an indexable expression out of `exprnode`.
 
@@ -266,7 +292,163 @@ def _get_idx_expr(expr, indexedcols):
     * ``a != 1`` and  ``c_bool != False``
     * ``~((a > 0) & (c_bool))``
     """
-    return _get_idx_expr_recurse(expr, indexedcols, [], [''])
+    return _get_idx_expr_recurse(expr, indexedcols, [], [''], colnames)
+
+
+def _get_composite_expr(expr, compositecols, colnames=frozenset()):
+    """
+    Extract an expression usable by a composite index out of `expr`.
+
+    `compositecols` is a mapping from the keys of composite indexes to
+    the tuples of variable names of their columns (in key order), with
+    `None` for columns not appearing in the condition.  Comparisons
+    and-ed at the top level of `expr` are looked for, and the index
+    covering more columns with equalities on a leading prefix of them
+    and optionally a range (or equality) on the next one is chosen.
+    Only indexes covering two columns at least are considered, and
+    comparisons with the columns in `colnames` are not usable.
+
+    A tuple of ``(key, exprs, exact)`` is returned, where `key` is the
+    key of the chosen index (or `None`), `exprs` is a list of
+    expressions in the form ``(var, (ops), (limits))`` for the covered
+    columns (in key order), and `exact` tells whether the covered
+    comparisons are all the condition.
+    """
+    # Get the comparisons and-ed at the top level
+    conjuncts = []
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if node.astType == 'op' and node.value == 'and':
+            stack.extend(node.children)
+        else:
+            conjuncts.append(node)
+    compositevars = set()
+    for varnames in compositecols.itervalues():
+        compositevars.update([var for var in varnames if var is not None])
+    cmps = {}
+    for nconj, node in enumerate(conjuncts):
+        var, op, limit = _get_indexable_cmp(node, compositevars, colnames)
+        if var is not None and op != 'invert':
+            cmps.setdefault(var, []).append((op, limit, nconj))
+
+    best = (None, [], False)
+    for key, varnames in compositecols.iteritems():
+        exprs, used = [], set()
+        for var in varnames:
+            if var is None or var not in cmps:
+                break
+            eqs = [ cmp_ for cmp_ in cmps[var] if cmp_[0] == 'eq' ]
+            if eqs:
+                op, limit, nconj = eqs[0]
+                exprs.append((var, (op,), (limit,)))
+                used.add(nconj)
+                continue
+            ops, limits = [], []
+            for ranges in [('gt', 'ge'), ('lt', 'le')]:
+                bounds = [ cmp_ for cmp_ in cmps[var] if cmp_[0] in ranges ]
+                if bounds:
+                    op, limit, nconj = bounds[0]
+                    ops.append(op)
+                    limits.append(limit)
+                    used.add(nconj)
+            if ops:
+                exprs.append((var, tuple(ops), tuple(limits)))
+            break
+        if len(exprs) >= 2 and len(exprs) > len(best[1]):
+            best = (key, exprs, len(used) == len(conjuncts))
+    return best
+
+
+def _get_bitmap_expr(expr, bitmapcols, colnames=frozenset()):
+    """
+    Extract an expression usable by bitmap indexes out of `expr`.
+
+    Comparisons (including ``!=``) and boolean values of the variables
+    in `bitmapcols` are looked for, combined by ``&``, ``|`` and ``~``
+    to any depth, since bitmaps give the exact rows fulfilling them.
+    If not all of `expr` can be resolved with bitmaps, only the usable
+    comparisons and-ed at its top level are taken.  Comparisons with
+    the columns in `colnames` are not usable.
+
+    A tuple of ``(exprs, strexpr, exact)`` is returned, where `exprs`
+    is a list of expressions in the form ``(var, (ops), (limits))``,
+    `strexpr` combines their bitmaps (``b0``, ``b1``...) with bitwise
+    operators, and `exact` tells whether `strexpr` is equivalent to
+    the whole condition.
+    """
+    op_conv = { 'and': '&',
+                'or': '|', }
+    turncmp = { 'lt': 'gt',
+                'le': 'ge',
+                'eq': 'eq',
+                'ne': 'ne',
+                'ge': 'le',
+                'gt': 'lt', }
+    exprs = []
+
+    def get_cmp(node):
+        if ( node.astType == 'variable' and node.astKind == 'bool'
+             and node.value in bitmapcols ):
+            return (node.value, 'eq', True)
+        if node.astType != 'op' or node.value not in turncmp:
+            return None
+        left, right = node.children
+        for var, const, op in [ (left, right, node.value),
+                                (right, left, turncmp[node.value]) ]:
+            if ( var.astType == 'variable' and var.value in bitmapcols
+                 and (const.astType == 'constant'
+                      or (const.astType == 'variable'
+                          and const.value not in colnames)) ):
+                const_value = const.value
+                if const.astType == 'variable':
+                    const_value = (const_value, )
+                return (var.value, op, const_value)
+        return None
+
+    def get_string(node):
+        # Expressions added for a subtree which is not usable are undone
+        nexprs = len(exprs)
+        if node.astType == 'op' and node.value == 'invert':
+            strexpr = get_string(node.children[0])
+            if strexpr:
+                return '~' + strexpr
+        elif node.astType == 'op' and node.value in op_conv:
+            lstrexpr = get_string(node.children[0])
+            rstrexpr = lstrexpr and get_string(node.children[1])
+            if lstrexpr and rstrexpr:
+                return '(%s %s %s)' % (lstrexpr, op_conv[node.value],
+                                       rstrexpr)
+        else:
+            cmp_ = get_cmp(node)
+            if cmp_ is not None:
+                var, op, value = cmp_
+                if op == 'ne':
+                    exprs.append((var, ('eq',), (value,)))
+                    return '~b%d' % (len(exprs) - 1)
+                exprs.append((var, (op,), (value,)))
+                return 'b%d' % (len(exprs) - 1)
+        del exprs[nexprs:]
+        return None
+
+    strexpr = get_string(expr)
+    if strexpr:
+        return (exprs, strexpr, True)
+    # Get the usable comparisons and-ed at the top level
+    conjuncts = []
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if node.astType == 'op' and node.value == 'and':
+            stack.extend(node.children)
+        else:
+            conjuncts.append(node)
+    strexprs = []
+    for node in conjuncts:
+        strexpr = get_string(node)
+        if strexpr:
+            strexprs.append(strexpr)
+    return (exprs, ' & '.join(strexprs), False)
 
 
 
@@ -287,7 +469,9 @@ class CompiledCondition(object):
         return frozenset(idxvars)
 
 
-    def __init__(self, func, params, idxexprs, strexpr):
+    def __init__(self, func, params, idxexprs, strexpr,
+                 csexprs=[], csstrexpr='', cidxkey=None, cidxexprs=[],
+                 cidxexact=False, bmexprs=[], bmstrexpr='', bmexact=False):
         self.function = func
         """The compiled function object corresponding to this condition."""
         self.parameters = params
@@ -296,6 +480,28 @@ class CompiledCondition(object):
         """A list of expressions in the form ``(var, (ops), (limits))``."""
         self.string_expression = strexpr
         """The indexable expression in string format."""
+        self.chunkstats_expressions = csexprs
+        """A list of expressions in the form ``(var, (ops), (limits))``
+        for columns with chunk statistics, like zone maps or Bloom
+        filters (only when no index is usable)."""
+        self.chunkstats_string = csstrexpr
+        """The expression on chunk statistics in string format."""
+        self.composite_index = cidxkey
+        """The key of the usable composite index (a tuple of column
+        path names), or `None`."""
+        self.composite_expressions = cidxexprs
+        """A list of expressions in the form ``(var, (ops), (limits))``
+        for the columns covered by the composite index (in key
+        order)."""
+        self.composite_exact = cidxexact
+        """Whether the composite expressions are all the condition."""
+        self.bitmap_expressions = bmexprs
+        """A list of expressions in the form ``(var, (ops), (limits))``
+        for columns with bitmap indexes."""
+        self.bitmap_string = bmstrexpr
+        """The expression on bitmaps in string format."""
+        self.bitmap_exact = bmexact
+        """Whether the expression on bitmaps is all the condition."""
 
     def __repr__(self):
         return ( "idxexprs: %s\nstrexpr: %s\nidxvars: %s"
@@ -310,25 +516,37 @@ class CompiledCondition(object):
         A new compiled condition is returned.  Values are taken from
         the `condvars` mapping and converted to Python scalars.
         """
-        exprs = self.index_expressions
-        exprs2 = []
-        for expr in exprs:
-            idxlims = expr[2]  # the limits are in third place
-            limit_values = []
-            for idxlim in idxlims:
-                if type(idxlim) is tuple:  # variable
-                    idxlim = condvars[idxlim[0]]  # look up value
-                    idxlim = idxlim.tolist()  # convert back to Python
-                limit_values.append(idxlim)
-            # Add this replaced entry to the new exprs2
-            var, ops, _ = expr
-            exprs2.append((var, ops, tuple(limit_values)))
         # Create a new container for the converted values
         newcc = CompiledCondition(
-            self.function, self.parameters, exprs2, self.string_expression )
+            self.function, self.parameters,
+            _replace_vars(self.index_expressions, condvars),
+            self.string_expression,
+            _replace_vars(self.chunkstats_expressions, condvars),
+            self.chunkstats_string, self.composite_index,
+            _replace_vars(self.composite_expressions, condvars),
+            self.composite_exact,
+            _replace_vars(self.bitmap_expressions, condvars),
+            self.bitmap_string, self.bitmap_exact )
         return newcc
 
 
+def _replace_vars(exprs, condvars):
+    """Replace limit variables in `exprs` with their values."""
+    exprs2 = []
+    for expr in exprs:
+        idxlims = expr[2]  # the limits are in third place
+        limit_values = []
+        for idxlim in idxlims:
+            if type(idxlim) is tuple:  # variable
+                idxlim = condvars[idxlim[0]]  # look up value
+                idxlim = idxlim.tolist()  # convert back to Python
+            limit_values.append(idxlim)
+        # Add this replaced entry to the new exprs2
+        var, ops, _ = expr
+        exprs2.append((var, ops, tuple(limit_values)))
+    return exprs2
+
+
 def _get_variable_names(expression):
     """Return the list of variable names in the Numexpr `expression`."""
     names = []
@@ -342,7 +560,23 @@ def _get_variable_names(expression):
     return list(set(names))  # remove repeated names
 
 
-def compile_condition(condition, typemap, indexedcols, copycols):
+def _get_expr_and_string(expr, cols, colnames):
+    """Get the usable expressions and their string form for `cols`."""
+    idxexprs = _get_idx_expr(expr, cols, colnames)
+    # Post-process the answer
+    if type(idxexprs) == list:
+        # Simple expression
+        strexpr = ['e0']
+    else:
+        # Complex expression
+        idxexprs, strexpr = idxexprs
+    # Get rid of the unneccessary list wrapper for strexpr
+    return idxexprs, strexpr[0]
+
+
+def compile_condition(condition, typemap, indexedcols, copycols,
+                      chunkstatscols=frozenset(), compositecols={},
+                      bitmapcols=frozenset(), colnames=frozenset()):
     """
     Compile a condition and extract usable index conditions.
 
@@ -350,6 +584,13 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     involving the indexed columns whose variable names appear in
     `indexedcols`.  The part of `condition` having usable indexes is
     returned as a compiled condition in a `CompiledCondition` container.
+    If no index is usable, the same is done for the columns with chunk
+    statistics (zone maps or Bloom filters) in `chunkstatscols`, a
+    mapping from variable names to the comparisons usable on them.
+    Comparisons usable by the composite indexes in `compositecols` are
+    extracted too (see `_get_composite_expr()`), and so are the ones
+    usable by the bitmap indexes of the columns whose variable names
+    appear in `bitmapcols` (see `_get_bitmap_expr()`).
 
     Expressions such as '0 < c1 <= 1' do not work as expected.  The
     Numexpr types of *all* variables must be given in the `typemap`
@@ -362,6 +603,10 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     referenced.  This seems to accelerate access to unaligned,
     *unidimensional* arrays up to 2x (multidimensional arrays still
     need to be copied by `call_on_recarr()`.).
+
+    The variable names of *all* the columns in the condition must be
+    given in `colnames`, so that comparisons between columns are not
+    taken as comparisons with constants.
     """
 
     # Get the expression tree and extract index conditions.
@@ -369,16 +614,19 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     if expr.astKind != 'bool':
         raise TypeError( "condition ``%s`` does not have a boolean type"
                          % condition )
-    idxexprs = _get_idx_expr(expr, indexedcols)
-    # Post-process the answer
-    if type(idxexprs) == list:
-        # Simple expression
-        strexpr = ['e0']
-    else:
-        # Complex expression
-        idxexprs, strexpr = idxexprs
-    # Get rid of the unneccessary list wrapper for strexpr
-    strexpr = strexpr[0]
+    idxexprs, strexpr = _get_expr_and_string(expr, indexedcols, colnames)
+    csexprs, csstrexpr = [], ''
+    if not idxexprs and chunkstatscols:
+        csexprs, csstrexpr = _get_expr_and_string(
+            expr, chunkstatscols, colnames)
+    cidxkey, cidxexprs, cidxexact = None, [], False
+    if compositecols:
+        cidxkey, cidxexprs, cidxexact = _get_composite_expr(
+            expr, compositecols, colnames)
+    bmexprs, bmstrexpr, bmexact = [], '', False
+    if bitmapcols:
+        bmexprs, bmstrexpr, bmexact = _get_bitmap_expr(
+            expr, bitmapcols, colnames)
 
     # Get the variable names used in the condition.
     # At the same time, build its signature.
@@ -395,7 +643,9 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     params = varnames
 
     # This is more comfortable to handle about than a tuple.
-    return CompiledCondition(func, params, idxexprs, strexpr)
+    return CompiledCondition(
+        func, params, idxexprs, strexpr, csexprs, csstrexpr,
+        cidxkey, cidxexprs, cidxexact, bmexprs, bmstrexpr, bmexact)
 
 
 def call_on_recarr(func, params, recarr, param2arg=None):
@@ -0,0 +1,275 @@
+"""
+Bitmap of the rows of a table marked as removed.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`DeadRows`
+    Bitmap of the rows removed lazily from a table.
+
+Functions
+=========
+
+`_deadrowsNameOf`
+    Get the name of the removed rows bitmap of a table.
+`_deadrowsPathnameOf`
+    Get the path name of the removed rows bitmap of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import weakref
+
+import numpy
+
+from tables.atom import UInt8Atom
+from tables.earray import EArray
+from tables.filters import Filters
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _deadrowsNameOf(node):
+    return '_p_dead_%s' % node._v_name
+
+def _deadrowsPathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _deadrowsNameOf(node))
+
+
+# Public classes
+# ==============
+class DeadRows(object):
+    """
+    Bitmap of the rows removed lazily from a table.
+
+    When the ``REMOVE_ROWS_LAZILY`` parameter is true,
+    `Table.removeRows()` just sets the bits of the removed rows in a
+    hidden array beside the table (``_p_dead_<name>``), and reads skip
+    them until `Table.compact()` moves the remaining rows for good.
+    Rows after the end of the bitmap are alive, so appending rows does
+    not need to touch it.  The whole bitmap is kept in memory (one bit
+    per row) while the table is open.
+
+    Public instance variables
+    -------------------------
+
+    ndead
+        The number of rows marked as removed.
+    table
+        The `Table` of the bitmap.
+
+    Public methods
+    --------------
+
+    live(coords)
+        Get which rows in `coords` are not removed.
+    liveRange(start, stop, step)
+        Get which rows in a range are not removed.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=False)
+
+    # Properties
+    # ~~~~~~~~~~
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` of the bitmap.")
+
+    def _getbits(self):
+        if self._bits is None:
+            array = self._getArray()
+            if array is None:
+                self._bits = numpy.zeros(0, dtype=numpy.uint8)
+            else:
+                self._bits = array.read()
+        return self._bits
+
+    bits = property(_getbits, None, None,
+                    "The packed bits of the removed rows.")
+
+    def _getndead(self):
+        if self._ndead is None:
+            array = self._getArray()
+            if array is None:
+                self._ndead = 0
+            else:
+                self._ndead = int(array._v_attrs.NDEAD)
+        return self._ndead
+
+    ndead = property(_getndead, None, None,
+                     "The number of rows marked as removed.")
+
+
+    def __init__(self, table):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self._bits = None
+        """The packed bits kept in memory, if read."""
+        self._ndead = None
+        """The number of removed rows, if known."""
+
+
+    def _getArray(self, create=False):
+        """
+        Get the array of the bitmap.
+
+        `None` is returned if it does not exist, unless `create` is
+        true.
+        """
+        table = self.table
+        pathname = _deadrowsPathnameOf(table)
+        if table._v_file._hasNode(pathname):
+            return table._v_file._getNode(pathname)
+        if not create:
+            return None
+        array = EArray( table._v_parent, _deadrowsNameOf(table),
+                        UInt8Atom(), (0,), "Bitmap of removed rows",
+                        self._filters, table.nrows // 8 + 1, _log=False )
+        array._v_attrs.NDEAD = 0
+        return array
+
+
+    def _save(self, bits, bstart, bstop, ndead):
+        """
+        Save the `bits`, changed in bytes ``[bstart, bstop)``, to disk.
+
+        `ndead` is the new number of removed rows.
+        """
+        if ndead == 0:
+            self.clear()
+            return
+        array = self._getArray(create=True)
+        if array.nrows > len(bits):
+            array.truncate(len(bits))
+        nexisting = array.nrows
+        bstop = min(bstop, nexisting)
+        if bstart < bstop:
+            array[bstart:bstop] = bits[bstart:bstop]
+        if nexisting < len(bits):
+            array.append(bits[nexisting:])
+        array._v_attrs.NDEAD = ndead
+        self._bits = bits
+        self._ndead = ndead
+
+
+    def mark(self, start, stop):
+        """
+        Mark the rows in ``[start, stop)`` as removed.
+
+        Only the affected part of the bitmap is touched.  The number of
+        rows which were not already removed is returned.
+        """
+        if start >= stop:
+            return 0
+        bits = self.bits
+        bstart, bstop = start // 8, (stop + 7) // 8
+        if len(bits) < bstop:
+            bits = numpy.concatenate(
+                (bits, numpy.zeros(bstop - len(bits), dtype=numpy.uint8)))
+        dead = numpy.unpackbits(bits[bstart:bstop]).astype(numpy.bool_)
+        offset = start - bstart * 8
+        nmarked = (stop - start) - int(dead[offset:offset+stop-start].sum())
+        dead[offset:offset+stop-start] = True
+        bits[bstart:bstop] = numpy.packbits(dead)
+        self._save(bits, bstart, bstop, self.ndead + nmarked)
+        return nmarked
+
+
+    def remove(self, start, nrows):
+        """
+        Account for the `nrows` rows after `start` being moved out.
+
+        The bits of the following rows are shifted accordingly.
+        """
+        if self.ndead == 0 or len(self.bits) * 8 <= start:
+            return
+        bstart = start // 8
+        dead = self._unpack(bstart * 8, len(self.bits) * 8)
+        offset = start - bstart * 8
+        dead = numpy.concatenate((dead[:offset], dead[offset+nrows:]))
+        bits = numpy.concatenate(
+            (self.bits[:bstart], numpy.packbits(dead)))
+        ndead = int(numpy.unpackbits(bits).sum())
+        self._save(bits, bstart, len(bits), ndead)
+
+
+    def truncate(self, nrows):
+        """Forget about rows after the first `nrows`."""
+        if self.ndead == 0 or len(self.bits) * 8 <= nrows:
+            return
+        bstart = nrows // 8
+        bits = numpy.concatenate(
+            (self.bits[:bstart],
+             numpy.packbits(self._unpack(bstart * 8, nrows))))
+        ndead = int(numpy.unpackbits(bits).sum())
+        self._save(bits, bstart, len(bits), ndead)
+
+
+    def clear(self):
+        """Forget about all the removed rows."""
+        array = self._getArray()
+        if array is not None:
+            array._g_remove(False, False)
+        self._bits = numpy.zeros(0, dtype=numpy.uint8)
+        self._ndead = 0
+
+
+    def _unpack(self, start, stop):
+        """Get a boolean array telling which rows in a range are removed."""
+        bits = self.bits
+        nbyte = start // 8
+        dead = numpy.unpackbits(bits[nbyte:(stop + 7) // 8])
+        dead = dead[start - nbyte * 8:stop - nbyte * 8].astype(numpy.bool_)
+        if len(dead) < stop - start:
+            alive = numpy.zeros(stop - start - len(dead), dtype=numpy.bool_)
+            dead = numpy.concatenate((dead, alive))
+        return dead
+
+
+    def live(self, coords):
+        """Get a boolean array telling which rows in `coords` are alive."""
+        coords = numpy.asarray(coords, dtype=numpy.int64)
+        bits = self.bits
+        mask = numpy.ones(len(coords), dtype=numpy.bool_)
+        inbits = coords < len(bits) * 8
+        incoords = coords[inbits]
+        mask[inbits] = ((bits[incoords >> 3] >> (7 - (incoords & 7))) & 1) == 0
+        return mask
+
+
+    def liveRange(self, start, stop, step=1):
+        """Get a boolean array telling which rows in a range are alive."""
+        if start >= stop:
+            return numpy.ones(0, dtype=numpy.bool_)
+        return ~self._unpack(start, stop)[::step]
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
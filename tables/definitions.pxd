@@ -383,6 +383,7 @@ cdef extern from "hdf5.h":
   herr_t H5Dvlen_reclaim(hid_t type_id, hid_t space_id, hid_t plist_id,
                          void *buf)
   hid_t H5Dget_create_plist(hid_t dataset_id)
+  haddr_t H5Dget_offset(hid_t dset_id)
 
   # Functions for dealing with dataspaces
   hid_t H5Screate_simple(int rank, hsize_t dims[], hsize_t maxdims[])
@@ -417,6 +418,7 @@ cdef extern from "hdf5.h":
   int    H5Tget_nmembers(hid_t type_id)
   char  *H5Tget_member_name(hid_t type_id, unsigned membno)
   hid_t  H5Tget_member_type(hid_t type_id, unsigned membno)
+  int    H5Tget_member_index(hid_t type_id, char *field_name)
   hid_t  H5Tget_native_type(hid_t type_id, H5T_direction_t direction)
   herr_t H5Tget_member_value(hid_t type_id, int membno, void *value)
   int    H5Tget_offset(hid_t type_id)
@@ -35,6 +35,7 @@ from tables.utils import convertToNPAtom, convertToNPAtom2, SizeType
 from tables.atom import Atom, EnumAtom, split_type
 from tables.leaf import Leaf
 from tables.carray import CArray
+from tables.asyncappend import AsyncAppender
 
 __version__ = "$Revision$"
 
@@ -68,6 +69,8 @@ class EArray(CArray):
 
     append(sequence)
         Add a ``sequence`` of data to the end of the dataset.
+    asyncAppender([queue_depth])
+        Start appending data to the array in a background thread.
 
     Example of use
     --------------
@@ -223,7 +226,35 @@ differ in non-enlargeable dimension %d""" % (self._v_pathname, i))
         self._checkShapeAppend(nparr)
         # If the size of the nparr is zero, don't do anything else
         if nparr.size > 0:
-            self._append(nparr)
+            appender = self._asyncAppender
+            if appender is not None:
+                # The sequence may be modified by the caller before it
+                # is written
+                appender._put(self._append, nparr.copy())
+            else:
+                self._append(nparr)
+
+
+    def asyncAppender(self, queue_depth=4):
+        """
+        Start appending data to the array in a background thread.
+
+        From now on, the data passed to `EArray.append()` is compressed
+        and written to disk by a writer thread, so that the caller can
+        go on producing data meanwhile.  Up to `queue_depth` sequences
+        may be waiting to be written before appends block.  An
+        `AsyncAppender` object is returned; closing it (or the array)
+        writes all the pending data and goes back to synchronous
+        appends.
+
+        Calling `Leaf.flush()` waits for all the pending data to be
+        written, and it raises any exception raised while writing it.
+        Until then, ``nrows`` and ``shape`` do not account for it, but
+        reading, modifying or truncating the array waits for it to be
+        written first.  A `ValueError` is raised if the array already
+        has an active appender.
+        """
+        return AsyncAppender(self, queue_depth)
 
 
     def _g_copyWithStats(self, group, name, start, stop, step,
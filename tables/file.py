@@ -1455,6 +1455,29 @@ you may want to use the ``overwrite`` argument""" % dstfilename)
             return True
 
 
+    def _hasNode(self, path):
+        """
+        Is there a node with that `path`?
+
+        Unlike `File.__contains__()`, only the names of the children
+        known by the groups along `path` are looked at, so no HDF5 call
+        fails when the node is missing.  Failed HDF5 calls outside the
+        main thread leave error stacks behind, so use this method in
+        code which may be run by other threads.
+        """
+
+        node = self.root
+        for name in path.split('/'):
+            if not name:
+                continue
+            if not isinstance(node, Group):
+                return False
+            if name not in node._v_children and name not in node._v_hidden:
+                return False
+            node = node._f_getChild(name)
+        return True
+
+
     def __iter__(self):
         """
         Recursively iterate over the nodes in the tree.
@@ -64,7 +64,7 @@ from definitions cimport  \
      PyString_FromStringAndSize, PyDict_Contains, PyDict_GetItem, \
      Py_INCREF, Py_DECREF, \
      import_array, ndarray, dtype, \
-     time_t, size_t, uintptr_t, hid_t, herr_t, hsize_t, hvl_t, \
+     time_t, size_t, uintptr_t, hid_t, herr_t, hsize_t, haddr_t, hvl_t, \
      H5S_seloper_t, H5D_FILL_VALUE_UNDEFINED, \
      H5G_UNKNOWN, H5G_GROUP, H5G_DATASET, H5G_LINK, H5G_TYPE, \
      H5T_class_t, H5T_sign_t, H5T_NATIVE_INT, \
@@ -76,7 +76,7 @@ from definitions cimport  \
      H5Fflush, H5Fget_vfd_handle, \
      H5Gcreate, H5Gopen, H5Gclose, H5Gunlink, H5Gmove, H5Gmove2, \
      H5Dopen, H5Dclose, H5Dread, H5Dwrite, H5Dget_type, \
-     H5Dget_space, H5Dvlen_reclaim, \
+     H5Dget_space, H5Dvlen_reclaim, H5Dget_offset, \
      H5Tget_native_type, H5Tget_super, H5Tget_class, H5Tcopy, \
      H5Tclose, H5Tis_variable_str, H5Tget_sign, \
      H5Adelete, H5Aget_num_attrs, H5Aget_name, H5Aopen_idx, \
@@ -111,7 +111,7 @@ cdef extern from "H5ARRAY.h":
                      int rank, hsize_t *dims, int extdim,
                      hid_t type_id, hsize_t *dims_chunk, void *fill_data,
                      int complevel, char  *complib, int shuffle,
-                     int fletcher32, void *data)
+                     int fletcher32, int delta, void *data)
 
   herr_t H5ARRAYappend_records(hid_t dataset_id, hid_t type_id,
                                int rank, hsize_t *dims_orig,
@@ -788,6 +788,20 @@ cdef class Leaf(Node):
       raise ValueError, "Unexpected classname:", classname
 
 
+  def _g_getStorageOffset(self):
+    """Get the offset in the file of the data of a contiguous dataset.
+
+    -1 is returned if the data is not stored contiguously in the file
+    (e.g. it is chunked or it has not been written yet).
+    """
+    cdef haddr_t offset
+
+    offset = H5Dget_offset(self.dataset_id)
+    if <long long>offset < 0:   # HADDR_UNDEF
+      return -1
+    return offset
+
+
   def _g_flush(self):
     # Flush the dataset (in fact, the entire buffers in file!)
     if self.dataset_id >= 0:
@@ -845,7 +859,7 @@ cdef class Array(Leaf):
                                   self.extdim, self.disk_type_id, NULL, NULL,
                                   self.filters.complevel, complib,
                                   self.filters.shuffle,
-                                  self.filters.fletcher32,
+                                  self.filters.fletcher32, 0,
                                   rbuf)
     if self.dataset_id < 0:
       raise HDF5ExtError("Problems creating the %s." % self.__class__.__name__)
@@ -906,7 +920,8 @@ cdef class Array(Leaf):
       self.parent_id, self.name, version, self.rank,
       self.dims, self.extdim, self.disk_type_id, self.dims_chunk,
       fill_data, self.filters.complevel, complib,
-      self.filters.shuffle, self.filters.fletcher32, rbuf)
+      self.filters.shuffle, self.filters.fletcher32,
+      self._v_delta, rbuf)
     if self.dataset_id < 0:
       raise HDF5ExtError("Problems creating the %s." % self.__class__.__name__)
 
@@ -546,6 +546,32 @@ def nextafter(x, direction, dtype, itemsize):
     raise TypeError("data type ``%s`` is not supported" % dtype)
 
 
+def matchItems(values, los, his):
+    """Match `values` against sorted, non-overlapping ``[lo, hi]`` items.
+
+    `los` and `his` are the (inclusive) lower and upper limits of the
+    items.  For equality keys, `los` and `his` are the same array.
+    Return a tuple with the positions in `values` that fall in some
+    item and the number of the item they fall in.
+    """
+    pos = los.searchsorted(values, 'right') - 1
+    cpos = pos.clip(0, len(los)-1)
+    valid = (pos >= 0) & (values <= his[cpos])
+    rows = valid.nonzero()[0]
+    return rows, pos[rows]
+
+
+def groupCoords(coords, owners, nitems):
+    """Group `coords` by the item in `owners` they belong to.
+
+    Return a list with an ascending array of coordinates for every one
+    of the `nitems` items.
+    """
+    order = numpy.lexsort((coords, owners))
+    coords, owners = coords[order], owners[order]
+    return numpy.split(coords, owners.searchsorted(numpy.arange(1, nitems)))
+
+
 
 ## Local Variables:
 ## mode: python
@@ -29,6 +29,7 @@ Misc variables:
 """
 
 import sys
+import threading
 from bisect import bisect_left, bisect_right
 from time import time, clock
 import os, os.path
@@ -39,7 +40,7 @@ import warnings
 import numpy
 
 from tables.idxutils import (
-    calcChunksize, calcoptlevels, get_reduction_level,
+    calcChunksize, calcoptlevels, get_reduction_level, groupCoords,
     nextafter, infType )
 
 from tables import indexesExtension
@@ -47,14 +48,16 @@ from tables import utilsExtension
 from tables.attributeset import AttributeSet
 from tables.node import NotLoggedMixin
 from tables.atom import IntAtom, UIntAtom, Atom
+from tables.array import Array
 from tables.earray import EArray
 from tables.carray import CArray
 from tables.leaf import Filters
 from tables.indexes import CacheArray, LastRowArray, IndexArray
 from tables.group import Group
 from tables.path import joinPath
-from tables.exceptions import PerformanceWarning
-from tables.utils import is_idx, idx2long, lazyattr
+from tables.exceptions import PerformanceWarning, OldIndexWarning, \
+     ExperimentalFeatureWarning
+from tables.utils import is_idx, idx2long, lazyattr, SizeType
 from tables.lrucacheExtension import ObjectCache
 
 
@@ -112,6 +115,143 @@ def _tableColumnPathnameOfIndex(indexpathname):
     return (tablepathname, colpathname)
 
 
+def _isSorted(arr):
+    """Whether the values in `arr` are already in ascending order."""
+    if len(arr) < 2:
+        return True
+    # NaNs are not sorted, but they should not be warned about either
+    # (``with`` is not available in Python 2.4)
+    errstate = numpy.errstate(invalid='ignore')
+    errstate.__enter__()
+    try:
+        return bool((arr[:-1] <= arr[1:]).all())
+    finally:
+        errstate.__exit__()
+
+
+def _histogramPosition(edges, value, side):
+    """Get the (fractional) number of bins of a histogram below `value`.
+
+    `edges` are the edges of the bins of an equi-depth histogram.  The
+    bins holding values lower than `value` (or lower or equal to it if
+    `side` is ``'right'``) are counted, and the bin where `value` falls
+    is counted partially, by linear interpolation for numerical values,
+    or as a half for the rest.
+    """
+    nbins = len(edges) - 1
+    i = edges.searchsorted(value, side)
+    if i == 0:
+        return 0.0
+    if i > nbins:
+        return float(nbins)
+    lo, hi = edges[i-1], edges[i]
+    if value == lo:
+        fraction = 0.0
+    elif value == hi:
+        fraction = 1.0
+    elif edges.dtype.kind == 'f':
+        fraction = float(value - lo) / (hi - lo)
+    else:
+        fraction = 0.5
+    return i - 1 + fraction
+
+
+def _threadedMap(func, args, nthreads):
+    """Call `func` for every tuple in `args` using up to `nthreads` threads.
+
+    The results are returned in the same order than `args`.  The first
+    exception raised in a worker thread (if any) is propagated to the
+    caller once all the threads have finished.
+    """
+    nthreads = min(nthreads, len(args))
+    if nthreads <= 1:
+        return [func(*arg) for arg in args]
+    results = [None] * len(args)
+    errors = []
+    pending = range(len(args))
+    pending.reverse()
+    lock = threading.Lock()
+
+    def work():
+        while not errors:
+            lock.acquire()
+            try:
+                if not pending:
+                    return
+                i = pending.pop()
+            finally:
+                lock.release()
+            try:
+                results[i] = func(*args[i])
+            except:
+                errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=work) for i in xrange(nthreads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+    return results
+
+
+class _SliceReader(object):
+    """Read the slices of a pair of sorted & indices leaves in advance.
+
+    Every time that a slice is requested via `get()`, the next one
+    starts being read in a background thread, so that the reading
+    overlaps with the processing of the current slice.  All the I/O
+    is done while holding `iolock`.
+    """
+
+    def __init__(self, index, sorted, indices, nslices, iolock):
+        self.index = index
+        self.sorted = sorted
+        self.indices = indices
+        self.nslices = nslices
+        self.iolock = iolock
+        self.sbuffer = numpy.empty(index.slicesize, dtype=index.dtype)
+        self.ibuffer = numpy.empty(index.slicesize,
+                                   dtype='u%d' % index.indsize)
+        self.nslice = None
+        self.thread = None
+        self.error = None
+
+    def _read(self, nslice, sbuffer, ibuffer):
+        try:
+            self.index.read_slices(self.iolock,
+                                   ((self.sorted, nslice, sbuffer),
+                                    (self.indices, nslice, ibuffer)))
+        except:
+            self.error = sys.exc_info()
+
+    def get(self, nslice, sbuffer, ibuffer):
+        """Put the `nslice` slice in `sbuffer` and `ibuffer`."""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            exc_type, exc_value, exc_tb = self.error
+            self.error = None
+            raise exc_type, exc_value, exc_tb
+        if self.nslice == nslice:
+            sbuffer[:] = self.sbuffer
+            ibuffer[:] = self.ibuffer
+        else:
+            self.index.read_slices(self.iolock,
+                                   ((self.sorted, nslice, sbuffer),
+                                    (self.indices, nslice, ibuffer)))
+        self.nslice = None
+        if nslice + 1 < self.nslices:
+            self.nslice = nslice + 1
+            self.thread = threading.Thread(
+                target=self._read,
+                args=(self.nslice, self.sbuffer, self.ibuffer))
+            self.thread.start()
+
+
 class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
     """
@@ -259,6 +399,22 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         None, None,
         "Whether we should try to build a completely sorted index or not.")
 
+    def _g_ndeltas(self):
+        ndeltas = len(self._getremoved())
+        if 'dcoords' in self._v_children:
+            ndeltas += self.dcoords.nrows
+        return ndeltas
+    ndeltas = property(_g_ndeltas, None, None,
+        "The number of changes (modified rows and ranges of removed rows) "
+        "not merged in the sorted arrays yet.")
+
+    def _g_nremoved(self):
+        removed = self._getremoved()
+        return long((removed[:,1] - removed[:,0]).sum())
+    nremoved = property(_g_nremoved, None, None,
+        "The number of indexed rows that have been removed from the table "
+        "since the index was built.")
+
     def _is_CSI(self):
         if self.nelements == 0:
             # An index with 0 indexed elements is not a CSI one (by definition)
@@ -266,6 +422,9 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         if self.indsize < 8:
             # An index that is not full cannot be completely sorted
             return False
+        if self.ndeltas > 0:
+            # Changes kept apart are not in the sorted arrays
+            return False
         # Try with the 'is_CSI' attribute
         if 'is_CSI' in self._v_attrs:
             return self._v_attrs.is_CSI
@@ -357,6 +516,8 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
         self._v_version = None
         """The object version of this index."""
+        self._v_unsupported = False
+        """Whether the data of this index can not be read by this version."""
         self.optlevel = optlevel
         """The optimization level for this index."""
         self.tmp_dir = tmp_dir
@@ -408,6 +569,17 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         sorted index. -1 means that this number is not computed yet."""
         self.tprof = 0
         """Time counter for benchmarking purposes."""
+        self._deltas = None
+        """The pending modifications of rows, if read (see `update_rows()`)."""
+        self._removed = None
+        """The ranges of removed rows, if read (see `remove_rows()`)."""
+        self._deltacoords = None
+        """The modified rows selected by the last `search()`."""
+        self.mappedcaches = None
+        """The ranges and bounds of slices mapped in memory, if any (see
+        `restorecache()`)."""
+        self._histogram = None
+        """The edges of the histogram of the index, if read."""
 
         from tables.file import openFile
         self._openFile = openFile
@@ -437,6 +609,17 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             self.blocksizes = (self.superblocksize, self.blocksize,
                                self.slicesize, self.chunksize)
             self.optlevel = int(attrs.optlevel)
+            # Differences may have been stored with a delta filter which
+            # is not the one in this version
+            deltafilter = getattr(attrs, 'deltafilter', None)
+            if (deltafilter is not None and
+                deltafilter != utilsExtension.delta_filter_id):
+                warnings.warn(
+                    "index ``%s`` uses a delta filter with ID %d, which is "
+                    "not supported by this version of PyTables; it will be "
+                    "ignored.  Please remove and recreate the index."
+                    % (self._v_pathname, deltafilter), OldIndexWarning)
+                self._v_unsupported = True
             sorted = self.sorted
             indices = self.indices
             self.dtype = sorted.atom.dtype
@@ -507,13 +690,27 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         # Save the reduction level
         self._v_attrs.reduction = self.reduction
 
+        # Differences of sorted values and row numbers compress better
+        delta = self._v_file.params['INDEX_DELTA_ENCODING']
+        if delta:
+            warnings.warn(
+                "the delta filter for indexes uses a provisional filter ID; "
+                "future versions of PyTables may not be able to read "
+                "index ``%s``" % self._v_pathname,
+                ExperimentalFeatureWarning)
+            # Tell which filter is used to the versions reading the index
+            self._v_attrs.deltafilter = numpy.uint32(
+                utilsExtension.delta_filter_id)
+
         # Create the IndexArray for sorted values
         sorted = IndexArray(self, 'sorted', atom, "Sorted Values",
-                            filters, self.byteorder)
+                            filters, self.byteorder,
+                            delta and atom.dtype.kind in 'biuf')
 
         # Create the IndexArray for index values
         IndexArray(self, 'indices', UIntAtom(itemsize=self.indsize),
-                   "Number of chunk in table", filters, self.byteorder)
+                   "Number of chunk in table", filters, self.byteorder,
+                   delta)
 
         # Create the cache for range values  (1st order cache)
         CacheArray(self, 'ranges', atom, (0,2), "Range Values", filters,
@@ -574,12 +771,22 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         """Compute an initial indices arrays for data to be indexed."""
         if profile: tref = time()
         if profile: show_stats("Entering initial_append", tref)
+        arr, idx = self.init_slice(xarr, nrow, self.nelementsILR)
+        larr, arr, idx = self.sort_slice(arr, idx, reduction)
+        if profile: show_stats("Exiting initial_append", tref)
+        return larr, arr, idx
+
+
+    def init_slice(self, xarr, nrow, nelementsILR):
+        """Get the values and the initial indices of a slice to be sorted.
+
+        Only this part of the initial append does I/O, so it must be
+        called from the thread that owns the file.
+        """
         arr = xarr.pop()
         indsize = self.indsize
         slicesize = self.slicesize
         blocksize = self.blocksize
-        nelementsILR = self.nelementsILR
-        if profile: show_stats("Before creating idx", tref)
         if indsize == 8:
             idx = numpy.arange(0, len(arr), dtype="uint64") + nrow*slicesize
         elif indsize == 4:
@@ -622,9 +829,25 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             assert len(arr) > nelementsILR
             self.read_sliceLR(self.sortedLR, arr[:nelementsILR])
             self.read_sliceLR(self.indicesLR, idx[:nelementsILR])
-        # In-place sorting
+        # A completely sorted index is not longer possible after an
+        # append of an index with already one slice.
+        if nrow > 0:
+            self._v_attrs.is_CSI = False
+        return arr, idx
+
+
+    def sort_slice(self, arr, idx, reduction):
+        """Sort `arr` & `idx` in-place and reduce the sorted values.
+
+        This does not touch the file, so several slices can be sorted
+        concurrently from different threads.
+        """
+        if profile: tref = time()
         if profile: show_stats("Before keysort", tref)
-        indexesExtension.keysort(arr, idx)
+        # Slices of monotone columns (timestamps, counters...) are
+        # already sorted, so just one pass is needed for checking them
+        if not _isSorted(arr):
+            indexesExtension.keysort(arr, idx)
         larr = arr[-1]
         if reduction > 1:
             # It's important to do a copy() here in order to ensure that
@@ -634,11 +857,6 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             if profile: show_stats("After reduction", tref)
             arr = reduc
             if profile: show_stats("After arr <-- reduc", tref)
-        # A completely sorted index is not longer possible after an
-        # append of an index with already one slice.
-        if nrow > 0:
-            self._v_attrs.is_CSI = False
-        if profile: show_stats("Exiting initial_append", tref)
         return larr, arr, idx
 
 
@@ -664,20 +882,80 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
         if profile: tref = time()
         if profile: show_stats("Entering append", tref)
+        where, reduction = self._appendTarget(update)
+        nrows = where.sorted.nrows  # before sorted.append()
+        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
+        self.append_sorted(where, reduction, larr, arr, idx)
+        if update:
+            self.build_histogram()
+        if profile: show_stats("Exiting append", tref)
+
+
+    def append_slices(self, xarrs, update=False):
+        """Append several complete slices to the index objects.
+
+        The slices are sorted concurrently in up to ``MAX_THREADS``
+        threads, but they are written in the same order than they come
+        in `xarrs`, so the resulting index is exactly the same than the
+        one obtained by calling `append()` for every slice.  The caller
+        is responsible for keeping the number of slices in `xarrs`
+        within the memory budget (see `build_nslices()`).
+        """
+
+        if profile: tref = time()
+        if profile: show_stats("Entering append_slices", tref)
+        where, reduction = self._appendTarget(update)
+        nrows = where.sorted.nrows  # before sorted.append()
+        nelementsILR = self.nelementsILR
+        work = []
+        for i, xarr in enumerate(xarrs):
+            arr, idx = self.init_slice(xarr, nrows+i, nelementsILR)
+            work.append((arr, idx, reduction))
+            # Only the first slice can take the values of the last row
+            nelementsILR = 0
+        nthreads = self._v_file.params['MAX_THREADS'] or 1
+        sorted_slices = _threadedMap(self.sort_slice, work, nthreads)
+        del work
+        while sorted_slices:
+            larr, arr, idx = sorted_slices.pop(0)
+            self.append_sorted(where, reduction, larr, arr, idx)
+        if update:
+            self.build_histogram()
+        if profile: show_stats("Exiting append_slices", tref)
+
+
+    def build_nslices(self):
+        """Return the number of slices to be sorted at a time.
+
+        This is bounded by ``MAX_THREADS`` and by the
+        ``INDEX_BUILD_MAX_MEMORY`` budget for the slices (values plus
+        indices) that are held in memory at the same time.
+        """
+        params = self._v_file.params
+        nthreads = params['MAX_THREADS'] or 1
+        slicebytes = self.slicesize * (self.dtype.itemsize + self.indsize)
+        return max(1, min(nthreads,
+                          params['INDEX_BUILD_MAX_MEMORY'] // slicebytes))
+
+
+    def _appendTarget(self, update):
+        """Return the group to be appended and the reduction to apply."""
         if not update and self.temp_required:
-            where = self.tmp
             # The reduction will take place *after* the optimization process
-            reduction = 1
-        else:
-            where = self
-            reduction = self.reduction
+            return self.tmp, 1
+        return self, self.reduction
+
+
+    def append_sorted(self, where, reduction, larr, arr, idx):
+        """Write an already sorted slice at the end of `where` leaves."""
+
+        if profile: tref = time()
         sorted = where.sorted; indices = where.indices
         ranges = where.ranges; mranges = where.mranges
         bounds = where.bounds; mbounds = where.mbounds
         abounds = where.abounds; zbounds = where.zbounds
         sortedLR = where.sortedLR; indicesLR = where.indicesLR
         nrows = sorted.nrows  # before sorted.append()
-        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
         # Save the sorted array
         sorted.append(arr.reshape(1, arr.size))
         cs = self.chunksize/reduction;  ncs = self.nchunkslice
@@ -697,7 +975,6 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         if self.indsize == 4:
             idx = self.final_idx32(idx, nrows*self.slicesize)
         indices.append(idx.reshape(1, idx.size))
-        if profile: show_stats("Before deleting idx", tref)
         del idx
         # Update counters after a successful append
         self.nrows = nrows + 1
@@ -710,7 +987,6 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         sortedLR.attrs.nelements = self.nelementsSLR
         indicesLR.attrs.nelements = self.nelementsILR
         self.dirtycache = True   # the cache is dirty now
-        if profile: show_stats("Exiting append", tref)
 
 
     def appendLastRow(self, xarr, update=False):
@@ -768,6 +1044,7 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         """
 
         if not self.temp_required:
+            self.build_histogram()
             return
 
         if verbose == True:
@@ -786,9 +1063,21 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         if debug:
             print "optvalues:", opts
 
+        # The slices of sorted columns do not overlap, and swapping
+        # their chunks or slices would not improve them.  This is also
+        # the case for nearly sorted columns whose slices overlap very
+        # little (using the same threshold than `swap()`), unless a
+        # complete sort is wanted, which needs the swaps to be done.
+        (nover, mult, tover) = self.compute_overlaps(
+            self.tmp, "init", self.verbose)
+        presorted = (nover == 0 or
+                     (not self.want_complete_sort and 0. <= tover < 0.01))
+        if self.verbose and presorted:
+            print "Slices are (nearly) sorted: skipping swaps"
+
         self.create_temp2()
         # Start the optimization process
-        while True:
+        while not presorted:
             if optfull:
                 for niter in range(optfull):
                     if self.swap('chunks', 'median'): break
@@ -823,6 +1112,7 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
         # Close and delete the temporal optimization index file
         self.cleanup_temp()
+        self.build_histogram()
         return
 
 
@@ -1246,37 +1536,71 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
 
     def reorder_slice(self, nslice, sorted, indices, ssorted, sindices,
-                      tmp_sorted, tmp_indices):
-        """Copy & reorder the slice in source to final destination."""
+                      tmp_sorted, tmp_indices, iolock=None, reader=None):
+        """Copy & reorder the slice in source to final destination.
+
+        If given, `iolock` is held during every I/O operation and
+        `reader` is a `_SliceReader` that has (possibly) read the
+        source slice in advance.
+        """
         ss = self.slicesize
         # Load the second part in buffers
-        self.read_slice(tmp_sorted, nslice, ssorted[ss:])
-        self.read_slice(tmp_indices, nslice, sindices[ss:])
+        if reader is not None:
+            reader.get(nslice, ssorted[ss:], sindices[ss:])
+        else:
+            self.read_slices(iolock, ((tmp_sorted, nslice, ssorted[ss:]),
+                                      (tmp_indices, nslice, sindices[ss:])))
         indexesExtension.keysort(ssorted, sindices)
-        # Write the first part of the buffers to the regular leaves
-        self.write_slice(sorted, nslice-1, ssorted[:ss])
-        self.write_slice(indices, nslice-1, sindices[:ss])
-        # Update caches
-        self.update_caches(nslice-1, ssorted[:ss])
+        if iolock is not None:
+            iolock.acquire()
+        try:
+            # Write the first part of the buffers to the regular leaves
+            self.write_slice(sorted, nslice-1, ssorted[:ss])
+            self.write_slice(indices, nslice-1, sindices[:ss])
+            # Update caches
+            self.update_caches(nslice-1, ssorted[:ss])
+        finally:
+            if iolock is not None:
+                iolock.release()
         # Shift the slice in the end to the beginning
         ssorted[:ss] = ssorted[ss:]; sindices[:ss] = sindices[ss:]
 
 
-    def update_caches(self, nslice, ssorted):
-        """Update the caches for faster lookups."""
+    def read_slices(self, iolock, slices):
+        """Read several ``(where, nslice, buffer)`` `slices` at once.
+
+        `iolock` (if not None) is held while reading.
+        """
+        if iolock is not None:
+            iolock.acquire()
+        try:
+            for where, nslice, buffer in slices:
+                self.read_slice(where, nslice, buffer)
+        finally:
+            if iolock is not None:
+                iolock.release()
+
+
+    def update_caches(self, nslice, ssorted, where=None):
+        """Update the caches for faster lookups.
+
+        The caches in `where` are updated (the temporary ones by
+        default).
+        """
         cs = self.chunksize
         ncs = self.nchunkslice
-        tmp = self.tmp
+        if where is None:
+            where = self.tmp
         # update first & second cache bounds (ranges & bounds)
-        tmp.ranges[nslice] = ssorted[[0,-1]]
-        tmp.bounds[nslice] = ssorted[cs::cs]
+        where.ranges[nslice] = ssorted[[0,-1]]
+        where.bounds[nslice] = ssorted[cs::cs]
         # update start & stop bounds
-        tmp.abounds[nslice*ncs:(nslice+1)*ncs] = ssorted[0::cs]
-        tmp.zbounds[nslice*ncs:(nslice+1)*ncs] = ssorted[cs-1::cs]
+        where.abounds[nslice*ncs:(nslice+1)*ncs] = ssorted[0::cs]
+        where.zbounds[nslice*ncs:(nslice+1)*ncs] = ssorted[cs-1::cs]
         # update median bounds
         smedian = ssorted[cs/2::cs]
-        tmp.mbounds[nslice*ncs:(nslice+1)*ncs] = smedian
-        tmp.mranges[nslice] = smedian[ncs/2]
+        where.mbounds[nslice*ncs:(nslice+1)*ncs] = smedian
+        where.mranges[nslice] = smedian[ncs/2]
 
 
     def reorder_slices(self, tmp):
@@ -1310,27 +1634,39 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             tmp_sorted = tmp.sorted; tmp_indices = tmp.indices
         cs = self.chunksize
         ss = self.slicesize
-        nsb = self.blocksize / self.slicesize
-        nslices = self.nslices
         nblocks = self.nblocks
         nelementsLR = self.nelementsILR
-        # Create the buffer for reordering 2 slices at a time
-        ssorted = numpy.empty(shape=ss*2, dtype=self.dtype)
-        sindices = numpy.empty(shape=ss*2,
-                               dtype=numpy.dtype('u%d' % self.indsize))
+        nworkers = self.build_nslices()
+        if nworkers > 1:
+            # Every thread doing I/O on the index will hold this lock
+            iolock = threading.Lock()
+        else:
+            iolock = None
 
         if self.indsize == 8:
+            # Create the buffer for reordering 2 slices at a time
+            ssorted = numpy.empty(shape=ss*2, dtype=self.dtype)
+            sindices = numpy.empty(shape=ss*2, dtype='u8')
             # Bootstrap the process for reordering
             # Read the first slice in buffers
             self.read_slice(tmp_sorted, 0, ssorted[:ss])
             self.read_slice(tmp_indices, 0, sindices[:ss])
 
+            # Sorting two slices at a time makes every slice depend on
+            # the previous one, so the next slice is just read in
+            # advance while the current one is being sorted.
+            if iolock is not None:
+                reader = _SliceReader(self, tmp_sorted, tmp_indices,
+                                      sorted.nrows, iolock)
+            else:
+                reader = None
             nslice = 0   # Just in case the loop behind executes nothing
             # Loop over the remainding slices in block
             for nslice in xrange(1, sorted.nrows):
                 self.reorder_slice(nslice, sorted, indices,
                                    ssorted, sindices,
-                                   tmp_sorted, tmp_indices)
+                                   tmp_sorted, tmp_indices, iolock, reader)
+            del reader
 
             # End the process (enrolling the lastrow if necessary)
             if nelementsLR > 0:
@@ -1358,29 +1694,51 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             self.update_caches(nslice, ssorted[:ss])
         else:
             # Iterate over each block.  No data should cross block
-            # boundaries to avoid adressing problems with short indices.
-            for nb in xrange(nblocks):
-                # Bootstrap the process for reordering
-                # Read the first slice in buffers
-                nrow = nb * nsb
-                self.read_slice(tmp_sorted, nrow, ssorted[:ss])
-                self.read_slice(tmp_indices, nrow, sindices[:ss])
-
-                # Loop over the remainding slices in block
-                lrb = nrow + nsb
-                if lrb > nslices:
-                    lrb = nslices
-                nslice = nrow   # Just in case the loop behind executes nothing
-                for nslice in xrange(nrow+1, lrb):
-                    self.reorder_slice(nslice, sorted, indices,
-                                       ssorted, sindices,
-                                       tmp_sorted, tmp_indices)
-
-                # Write the first part of the buffers to the regular leaves
-                self.write_slice(sorted, nslice, ssorted[:ss])
-                self.write_slice(indices, nslice, sindices[:ss])
-                # Update caches for this slice
-                self.update_caches(nslice, ssorted[:ss])
+            # boundaries to avoid adressing problems with short indices,
+            # so different blocks can be reordered concurrently.
+            # Every block takes buffers for two slices.
+            blocks = [(nb, sorted, indices, tmp_sorted, tmp_indices, iolock)
+                      for nb in xrange(nblocks)]
+            _threadedMap(self.reorder_block, blocks, max(nworkers // 2, 1))
+
+
+    def reorder_block(self, nb, sorted, indices, tmp_sorted, tmp_indices,
+                      iolock=None):
+        """Reorder the slices in the block `nb` (see `reorder_slices()`)."""
+        ss = self.slicesize
+        nsb = self.blocksize / self.slicesize
+        nslices = self.nslices
+        # Create the buffer for reordering 2 slices at a time
+        ssorted = numpy.empty(shape=ss*2, dtype=self.dtype)
+        sindices = numpy.empty(shape=ss*2,
+                               dtype=numpy.dtype('u%d' % self.indsize))
+        # Bootstrap the process for reordering
+        # Read the first slice in buffers
+        nrow = nb * nsb
+        self.read_slices(iolock, ((tmp_sorted, nrow, ssorted[:ss]),
+                                  (tmp_indices, nrow, sindices[:ss])))
+
+        # Loop over the remainding slices in block
+        lrb = nrow + nsb
+        if lrb > nslices:
+            lrb = nslices
+        nslice = nrow   # Just in case the loop behind executes nothing
+        for nslice in xrange(nrow+1, lrb):
+            self.reorder_slice(nslice, sorted, indices,
+                               ssorted, sindices,
+                               tmp_sorted, tmp_indices, iolock)
+
+        if iolock is not None:
+            iolock.acquire()
+        try:
+            # Write the first part of the buffers to the regular leaves
+            self.write_slice(sorted, nslice, ssorted[:ss])
+            self.write_slice(indices, nslice, sindices[:ss])
+            # Update caches for this slice
+            self.update_caches(nslice, ssorted[:ss])
+        finally:
+            if iolock is not None:
+                iolock.release()
 
 
     def swap_slices(self, mode="median"):
@@ -1676,7 +2034,9 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         """Return the sorted values of index in the specified range.
 
         The meaning of the `start`, `stop` and `step` arguments is the
-        same as in `Table.readSorted()`.
+        same as in `Table.readSorted()`.  Rows removed lazily from the
+        table are still included; use `Table.readSorted()` or
+        `Table.itersorted()` in order to skip them.
         """
         return self.read_sorted_indices('sorted', start, stop, step)
 
@@ -1685,7 +2045,9 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         """Return the indices values of index in the specified range.
 
         The meaning of the `start`, `stop` and `step` arguments is the
-        same as in `Table.readSorted()`.
+        same as in `Table.readSorted()`.  Rows removed lazily from the
+        table are still included; use `Table.readSorted()` or
+        `Table.itersorted()` in order to skip them.
         """
         return self.read_sorted_indices('indices', start, stop, step)
 
@@ -1763,10 +2125,65 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         the last row, and mainly useful for small indexes."""
         self.starts = numpy.empty(shape=self.nrows, dtype=numpy.int32)
         self.lengths = numpy.empty(shape=self.nrows, dtype=numpy.int32)
+        self.mappedcaches = self._get_mapped_caches()
         self.sorted._initSortedSlice(self)
         self.dirtycache = False
 
 
+    def _get_mapped_caches(self):
+        """Get the ranges and bounds of slices mapped in memory.
+
+        This is only done when the ``INDEX_MAPPED_CACHES`` parameter is
+        true.  Contiguous and uncompressed copies of the ``ranges`` and
+        ``bounds`` arrays are mapped, which are written first if they
+        are missing or out of date (and the file is writable).  `None`
+        is returned if the caches can not be mapped.
+        """
+        nslices = self.nslices
+        if not self._v_file.params['INDEX_MAPPED_CACHES'] or nslices == 0:
+            return None
+        children = self._v_children
+        if ('cranges' not in children or 'cbounds' not in children
+            or children['cranges'].nrows != nslices):
+            if not self._v_file._isWritable():
+                return None
+            self._save_mapped_caches()
+        ranges = self._map_cache(children['cranges'])
+        bounds = self._map_cache(children['cbounds'])
+        if ranges is None or bounds is None:
+            return None
+        return ranges, bounds
+
+
+    def _save_mapped_caches(self):
+        """Write contiguous copies of the ranges and bounds of slices."""
+        self._remove_mapped_caches()
+        Array(self, 'cranges', self.ranges[:], "Range Values (contiguous)",
+              byteorder=sys.byteorder, _log=False)
+        cbounds = Array(self, 'cbounds', self.bounds[:],
+                        "Boundary Values (contiguous)",
+                        byteorder=sys.byteorder, _log=False)
+        # Data must be in the file before mapping it
+        cbounds.flush()
+
+
+    def _remove_mapped_caches(self):
+        """Remove the contiguous copies of the ranges and bounds."""
+        self.mappedcaches = None
+        for name in ['cranges', 'cbounds']:
+            if name in self._v_children:
+                self._v_children[name]._g_remove(False, False)
+
+
+    def _map_cache(self, array):
+        """Map the data of a contiguous `array` in memory (or `None`)."""
+        offset = array._g_getStorageOffset()
+        if offset < 0 or array.byteorder not in (sys.byteorder, 'irrelevant'):
+            return None
+        return numpy.memmap(self._v_file.filename, dtype=array.atom.dtype,
+                            mode='r', offset=offset, shape=array.shape)
+
+
     def search(self, item):
         """Do a binary search in this index for an item"""
 
@@ -1783,14 +2200,18 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         if not item or item[0] > item[1]:
             self.starts[:] = 0
             self.lengths[:] = 0
+            self._deltacoords = None
             return 0
 
-        tlen = 0
+        # Modified rows are looked up apart (see `update_rows()`)
+        tlen = self.search_deltas(item)
         # Check whether the item tuple is in the limits cache or not
         nslot = self.limboundscache.getslot(item)
         if nslot >= 0:
             startlengths = self.limboundscache.getitem(nslot)
-            # Reset the lengths array (not necessary for starts)
+            # Reset the starts and lengths arrays (starts are used by
+            # `get_chunkmap()` even for empty lengths if reduction > 1)
+            self.starts[:] = 0
             self.lengths[:] = 0
             # Now, set the interesting rows
             for nrow in xrange(len(startlengths)):
@@ -1807,29 +2228,29 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
                 # CPU functions consumptions from python profiles.
                 # You may want to de-activate them during profiling.
                 if self.type == "int32":
-                    tlen = sorted._searchBinNA_i(*item)
+                    tlen += sorted._searchBinNA_i(*item)
                 elif self.type == "int64":
-                    tlen = sorted._searchBinNA_ll(*item)
+                    tlen += sorted._searchBinNA_ll(*item)
                 elif self.type == "float32":
-                    tlen = sorted._searchBinNA_f(*item)
+                    tlen += sorted._searchBinNA_f(*item)
                 elif self.type == "float64":
-                    tlen = sorted._searchBinNA_d(*item)
+                    tlen += sorted._searchBinNA_d(*item)
                 elif self.type == "uint32":
-                    tlen = sorted._searchBinNA_ui(*item)
+                    tlen += sorted._searchBinNA_ui(*item)
                 elif self.type == "uint64":
-                    tlen = sorted._searchBinNA_ull(*item)
+                    tlen += sorted._searchBinNA_ull(*item)
                 elif self.type == "int8":
-                    tlen = sorted._searchBinNA_b(*item)
+                    tlen += sorted._searchBinNA_b(*item)
                 elif self.type == "int16":
-                    tlen = sorted._searchBinNA_s(*item)
+                    tlen += sorted._searchBinNA_s(*item)
                 elif self.type == "uint8":
-                    tlen = sorted._searchBinNA_ub(*item)
+                    tlen += sorted._searchBinNA_ub(*item)
                 elif self.type == "uint16":
-                    tlen = sorted._searchBinNA_us(*item)
+                    tlen += sorted._searchBinNA_us(*item)
                 else:
                     assert False, "This can't happen!"
             else:
-                tlen = self.search_scalar(item, sorted)
+                tlen += self.search_scalar(item, sorted)
         # Get possible remaining values in last row
         if self.nelementsSLR > 0:
             # Look for more indexes in the last row
@@ -1844,9 +2265,12 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             # the bounds info. Moreover, the .couldenablecache()
             # is doing a good work so as to avoid computing this
             # when it is not necessary to do it.
+            # Rows with an empty length are kept as well if reduction
+            # > 1, since their starts still point to some candidates.
             startlengths = []
+            keepempty = self.reduction > 1
             for nrow, length in enumerate(self.lengths):
-                if length > 0:
+                if length > 0 or (keepempty and self.starts[nrow] > 0):
                     startlengths.append((nrow, self.starts[nrow], length))
             # Compute the size of the recarray (aproximately)
             # The +1 at the end is important to avoid 0 lengths
@@ -1943,43 +2367,199 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         return (start, stop)
 
 
+    def searchMany(self, items):
+        """Look up several keys or ranges in a single pass over the index.
+
+        `items` is either a 1-dimensional array of keys to be looked up
+        for equality or an array with shape ``(n, 2)`` of inclusive
+        ``(lo, hi)`` ranges.  It is converted to the type of the index
+        and must be sorted in ascending order, without overlapping
+        items.
+
+        Instead of doing a complete search for every item, the items
+        falling in the range of each slice are looked up all at once,
+        so that the bounds and the sorted values of every slice are
+        read only once.  The result is a list with an array of row
+        coordinates (in ascending order) for every item in `items`.
+        """
+
+        if profile: tref = time()
+        if profile: show_stats("Entering searchMany", tref)
+        items = numpy.asarray(items, dtype=self.dtype)
+        if items.ndim == 1:
+            los = his = items
+        elif items.ndim == 2 and items.shape[1] == 2:
+            los, his = items[:,0].copy(), items[:,1].copy()
+        else:
+            raise ValueError("``items`` must be an array of keys or "
+                             "an array of ``(lo, hi)`` ranges")
+        nitems = len(los)
+        if (his < los).any() or (los[1:] <= his[:-1]).any():
+            raise ValueError("``items`` must be sorted and must not overlap")
+        if nitems == 0:
+            return []
+
+        if self.dirtycache:
+            self.restorecache()
+
+        # Full indexes have the row coordinates in indices.  For the
+        # rest, look up the chunks where the items can be and filter
+        # the values in the table afterwards.
+        exact = (self.indsize == 8)
+        reduction = self.reduction
+        rslicesize = self.slicesize // reduction
+        rchunksize = self.chunksize // reduction
+        coords, owners = [], []
+        bucketmap = numpy.zeros(
+            shape=long(math.ceil(float(self.nelements)/self.lbucket)),
+            dtype="bool")
+
+        def lookup(nslice, sorted, offset, first, last):
+            """Look up items ``[first:last]`` in `sorted` values of `nslice`.
+
+            `offset` is the position of `sorted` in the slice.
+            """
+            starts = sorted.searchsorted(los[first:last], 'left')
+            stops = sorted.searchsorted(his[first:last], 'right')
+            starts += offset;  stops += offset
+            if exact:
+                lengths = stops - starts
+                nonempty = lengths.nonzero()[0]
+                if len(nonempty) == 0:
+                    return
+                starts = starts[nonempty];  lengths = lengths[nonempty]
+                # Items don't overlap, so ranges are sorted and disjoint
+                begin = starts[0];  end = starts[-1] + lengths[-1]
+                idx = self.read_indices_slice(nslice, begin, end)
+                rstarts = numpy.repeat(starts - begin, lengths)
+                roffsets = numpy.repeat(lengths.cumsum() - lengths, lengths)
+                positions = numpy.arange(lengths.sum()) - roffsets + rstarts
+                coords.append(idx[positions])
+                owners.append(
+                    numpy.repeat(nonempty + first, lengths).astype('int_'))
+            else:
+                # Map the reduced positions into positions in indices
+                # (the same than ``get_chunkmap()`` does)
+                stops = stops*reduction
+                starts = (starts-1)*reduction+1
+                starts[starts < 0] = 0
+                begin = starts[0];  end = stops[-1]
+                if end <= begin:
+                    return
+                mask = numpy.zeros(shape=end-begin, dtype='bool')
+                for start, stop in zip(starts-begin, stops-begin):
+                    mask[start:stop] = True
+                idx = self.read_indices_slice(nslice, begin, end)
+                bucketmap[self.idx2buckets(nslice, idx[mask])] = True
+
+        sortedarr = self.sorted
+        ranges = self.rvcache
+        if self.mappedcaches is not None:
+            bounds = self.mappedcaches[1]
+        else:
+            bounds = self.bounds
+        for nslice in xrange(self.nslices):
+            # Items that can be found in this slice
+            first = his.searchsorted(ranges[nslice,0], 'left')
+            last = los.searchsorted(ranges[nslice,1], 'right')
+            if first >= last:
+                continue
+            # Only read the chunks of sorted values that are needed
+            sbounds = bounds[nslice]
+            nchunk1 = sbounds.searchsorted(los[first], 'left')
+            nchunk2 = sbounds.searchsorted(his[last-1], 'right')
+            begin = nchunk1*rchunksize
+            end = min((nchunk2+1)*rchunksize, rslicesize)
+            lookup(nslice, sortedarr[nslice, begin:end], begin, first, last)
+        # Get possible remaining values in last row
+        if self.nelementsSLR > 0:
+            first = his.searchsorted(self.bebounds[0], 'left')
+            last = los.searchsorted(self.bebounds[-1], 'right')
+            if first < last:
+                lookup(self.nslices, self.sortedLR[:self.nelementsSLR], 0,
+                       first, last)
+
+        # Modified rows are looked up apart (see `update_rows()`)
+        dcoords, downers = self.search_deltas_many(los, his)
+        if exact:
+            if coords:
+                coords = numpy.concatenate(coords).astype(SizeType)
+                owners = numpy.concatenate(owners)
+            else:
+                coords = numpy.empty(0, dtype=SizeType)
+                owners = numpy.empty(0, dtype='int_')
+            if self.ndeltas > 0:
+                # Forget about the stale entries of modified and removed
+                # rows, and renumber the rest
+                live = self.live_coords(coords)
+                coords = numpy.concatenate((coords[live], dcoords))
+                owners = numpy.concatenate((owners[live], downers))
+                coords = self.current_coords(coords).astype(SizeType)
+        else:
+            chunkmap = self.buckets2chunks(bucketmap)
+            chunkmap = self.current_chunkmap(chunkmap, dcoords)
+            coords, owners = self.table._scanItems(
+                self.column.pathname, los, his, chunkmap)
+        if profile: show_stats("Exiting searchMany", tref)
+        return groupCoords(coords, owners, nitems)
+
+
     def get_chunkmap(self):
         """Compute a map with the interesting chunks in index"""
 
         if profile: tref = time()
         if profile: show_stats("Entering get_chunkmap", tref)
-        ss = self.slicesize;  bs = self.blocksize
-        nsb = self.nslicesblock;  nslices = self.nslices
-        lbucket = self.lbucket;  indsize = self.indsize
-        bucketsinblock = float(self.blocksize)/lbucket
+        lbucket = self.lbucket
         nchunks = long(math.ceil(float(self.nelements)/lbucket))
         chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
         reduction = self.reduction
         starts = (self.starts-1)*reduction+1
         stops = (self.starts+self.lengths)*reduction
         starts[starts < 0] = 0    # All negative values set to zero
-        indices = self.indices
         for nslice in xrange(self.nrows):
             start = starts[nslice];  stop = stops[nslice]
             if stop > start:
-                idx = numpy.empty(shape=stop-start, dtype='u%d' % indsize)
-                if nslice < nslices:
-                    indices._readIndexSlice(nslice, start, stop, idx)
-                else:
-                    self.indicesLR._readIndexSlice(start, stop, idx)
-                if indsize == 8:
-                    idx /= lbucket
-                elif indsize == 2:
-                    # The chunkmap size cannot be never larger than 'int_'
-                    idx = idx.astype("int_")
-                    offset = long((nslice/nsb)*bucketsinblock)
-                    idx += offset
-                elif indsize == 1:
-                    # The chunkmap size cannot be never larger than 'int_'
-                    idx = idx.astype("int_")
-                    offset = (nslice*ss)/lbucket
-                    idx += offset
-                chunkmap[idx] = True
+                idx = self.read_indices_slice(nslice, start, stop)
+                chunkmap[self.idx2buckets(nslice, idx)] = True
+        chunkmap = self.buckets2chunks(chunkmap)
+        chunkmap = self.current_chunkmap(chunkmap, self._deltacoords)
+        if profile: show_stats("Exiting get_chunkmap", tref)
+        return chunkmap
+
+
+    def read_indices_slice(self, nslice, start, stop):
+        """Read the ``[start:stop]`` part of the indices in `nslice`."""
+        idx = numpy.empty(shape=stop-start, dtype='u%d' % self.indsize)
+        if nslice < self.nslices:
+            self.indices._readIndexSlice(nslice, start, stop, idx)
+        else:
+            self.indicesLR._readIndexSlice(start, stop, idx)
+        return idx
+
+
+    def idx2buckets(self, nslice, idx):
+        """Convert the `idx` indices of `nslice` into bucket numbers."""
+        ss = self.slicesize;  lbucket = self.lbucket
+        indsize = self.indsize
+        if indsize == 8:
+            idx /= lbucket
+        elif indsize == 2:
+            # The chunkmap size cannot be never larger than 'int_'
+            idx = idx.astype("int_")
+            bucketsinblock = float(self.blocksize)/lbucket
+            offset = long((nslice/self.nslicesblock)*bucketsinblock)
+            idx += offset
+        elif indsize == 1:
+            # The chunkmap size cannot be never larger than 'int_'
+            idx = idx.astype("int_")
+            offset = (nslice*ss)/lbucket
+            idx += offset
+        return idx
+
+
+    def buckets2chunks(self, chunkmap):
+        """Map a bucket-level `chunkmap` into a map of table chunks."""
+        lbucket = self.lbucket
         # The case lbucket < nrowsinchunk should only happen in tests
         nrowsinchunk = self.nrowsinchunk
         if lbucket != nrowsinchunk:
@@ -1994,10 +2574,473 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             for i in range(len(idx)):
                 tchunkmap[starts[i]:stops[i]] = True
             chunkmap = tchunkmap
-        if profile: show_stats("Exiting get_chunkmap", tref)
         return chunkmap
 
 
+    # Incremental updates
+    # ~~~~~~~~~~~~~~~~~~~
+    #
+    # Modified rows are kept apart from the sorted arrays, in a log of
+    # changes made of the ``dcoords``, ``dvalues`` and ``doldvalues``
+    # arrays, and removed rows in the ``dremoved`` array of sorted
+    # ranges, until they are merged by `fold_deltas()`.  Row numbers in
+    # the index do not change when rows are removed from the table:
+    # they are mapped into current row numbers on the fly.
+
+    def _getdeltas(self):
+        """Get the pending modifications of rows.
+
+        Three arrays are returned, sorted by new value: the row numbers
+        in the index of the modified rows, their new values and their
+        values in the sorted arrays.
+        """
+        if self._deltas is None:
+            if 'dcoords' in self._v_children:
+                logcoords = self.dcoords.read()
+                values = self.dvalues.read()
+                oldvalues = self.doldvalues.read()
+            else:
+                logcoords = numpy.empty(0, dtype='int64')
+                values = oldvalues = numpy.empty(0, dtype=self.dtype)
+            # The new value of a row modified several times is the last
+            # one, but the one in the sorted arrays is the first one
+            coords, first = numpy.unique(logcoords, return_index=True)
+            last = numpy.unique(logcoords[::-1], return_index=True)[1]
+            values = values[len(values) - 1 - last]
+            oldvalues = oldvalues[first]
+            order = values.argsort()
+            self._deltas = (coords[order], values[order], oldvalues[order])
+        return self._deltas
+
+
+    def _create_deltas(self):
+        """Create the (empty) log of modified rows."""
+        atom = Atom.from_dtype(self.dtype)
+        EArray(self, 'dcoords', IntAtom(itemsize=8), (0,),
+               "Row numbers of modified rows", self.filters, _log=False)
+        EArray(self, 'dvalues', atom, (0,), "New values of modified rows",
+               self.filters, _log=False)
+        EArray(self, 'doldvalues', atom, (0,),
+               "Indexed values of modified rows", self.filters, _log=False)
+
+
+    def _remove_deltas(self):
+        """Remove the log of modified rows."""
+        for name in ['dcoords', 'dvalues', 'doldvalues']:
+            if name in self._v_children:
+                self._v_children[name]._g_remove(False, False)
+        self._deltas = None
+
+
+    def _getremoved(self):
+        """Get the sorted ranges of removed rows (in the index)."""
+        if self._removed is None:
+            if 'dremoved' in self._v_children:
+                self._removed = self.dremoved.read()
+            else:
+                self._removed = numpy.empty((0, 2), dtype='int64')
+        return self._removed
+
+
+    def _setremoved(self, removed):
+        """Save the sorted ranges of `removed` rows (in the index)."""
+        if 'dremoved' in self._v_children:
+            self._v_children['dremoved']._g_remove(False, False)
+        if len(removed) > 0:
+            dremoved = EArray(self, 'dremoved', IntAtom(itemsize=8), (0, 2),
+                              "Ranges of removed rows", self.filters,
+                              _log=False)
+            dremoved.append(removed)
+        self._removed = removed
+
+
+    def index_coords(self, coords):
+        """Map row numbers of the table into row numbers in the index."""
+        coords = numpy.array(coords, dtype='int64')
+        for start, stop in self._getremoved():
+            coords[coords >= start] += stop - start
+        return coords
+
+
+    def current_coords(self, coords):
+        """Map row numbers in the index into row numbers of the table.
+
+        Removed rows are mapped into the row following them.
+        """
+        coords = numpy.asarray(coords, dtype='int64')
+        removed = self._getremoved()
+        if len(removed) == 0:
+            return coords
+        # The number of removed rows before every range, and the
+        # current row number of its start
+        before = numpy.concatenate(([0], (removed[:,1]-removed[:,0]).cumsum()))
+        floor = numpy.concatenate(([0], removed[:,0] - before[:-1]))
+        n = removed[:,0].searchsorted(coords, 'right')
+        return numpy.maximum(coords - before[n], floor[n])
+
+
+    def live_coords(self, coords):
+        """Tell which entries of the rows at `coords` are up to date.
+
+        `coords` are row numbers in the index.  The entries of modified
+        and removed rows in the sorted arrays are stale.
+        """
+        coords = numpy.asarray(coords, dtype='int64')
+        live = numpy.ones(len(coords), dtype='bool')
+        removed = self._getremoved()
+        if len(removed) > 0:
+            stops = numpy.concatenate(([0], removed[:,1]))
+            live &= coords >= stops[removed[:,0].searchsorted(coords, 'right')]
+        dcoords = numpy.sort(self._getdeltas()[0])
+        if len(dcoords) > 0:
+            pos = dcoords.searchsorted(coords).clip(0, len(dcoords)-1)
+            live &= dcoords[pos] != coords
+        return live
+
+
+    def search_deltas(self, item):
+        """Look up the modified rows with a new value in `item` range.
+
+        Their row numbers in the index are kept for `get_chunkmap()`,
+        and their number is returned.
+        """
+        coords, values, oldvalues = self._getdeltas()
+        start = values.searchsorted(item[0], 'left')
+        stop = values.searchsorted(item[1], 'right')
+        self._deltacoords = coords[start:stop]
+        return stop - start
+
+
+    def search_deltas_many(self, los, his):
+        """Look up the modified rows with a new value in some item.
+
+        The items are given by `los` and `his` as in `searchMany()`.
+        The row numbers in the index of the rows found and the numbers
+        of the items they belong to are returned.
+        """
+        coords, values, oldvalues = self._getdeltas()
+        owners = his.searchsorted(values, 'left')
+        found = owners < len(his)
+        found[found] = los[owners[found]] <= values[found]
+        return coords[found], owners[found].astype('int_')
+
+
+    def current_chunkmap(self, chunkmap, dcoords=None):
+        """Map a `chunkmap` of the index into a map of current chunks.
+
+        Chunks of the table are numbered in the index as if no rows had
+        been removed.  The chunks of rows at `dcoords` (row numbers in
+        the index) are selected as well, if given.
+        """
+        nremoved = self.nremoved
+        if nremoved > 0:
+            nrowsinchunk = self.nrowsinchunk
+            nelements = self.nelements
+            nchunks = long(math.ceil(float(nelements-nremoved)/nrowsinchunk))
+            # Every chunk of the index is mapped into a range of current
+            # chunks, and these ranges come sorted
+            idx = chunkmap.nonzero()[0].astype('int64')
+            first = self.current_coords(idx*nrowsinchunk) // nrowsinchunk
+            last = self.current_coords(
+                numpy.minimum((idx+1)*nrowsinchunk, nelements) - 1)
+            last //= nrowsinchunk
+            allchunks = numpy.arange(nchunks)
+            nfirst = first.searchsorted(allchunks, 'right')
+            chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
+            selected = (nfirst > 0).nonzero()[0]
+            chunkmap[selected] = last[nfirst[selected]-1] >= selected
+        if dcoords is not None and len(dcoords) > 0:
+            chunks = self.current_coords(dcoords) // self.nrowsinchunk
+            chunkmap[chunks[chunks < len(chunkmap)]] = True
+        return chunkmap
+
+
+    def update_rows(self, coords, oldvalues, values):
+        """Account for the modification of some indexed rows.
+
+        `coords` are the row numbers in the table of the modified rows,
+        `oldvalues` their values before the modification and `values`
+        the new ones.  Changes are kept apart from the sorted arrays
+        (lookups take them into account) until `fold_deltas()` is
+        called.
+        """
+        changed = (oldvalues != values)
+        if not changed.any():
+            return
+        coords = self.index_coords(numpy.asarray(coords)[changed])
+        if 'dcoords' not in self._v_children:
+            self._create_deltas()
+        self.dcoords.append(coords)
+        self.dvalues.append(values[changed])
+        self.doldvalues.append(oldvalues[changed])
+        self._deltas = None
+
+
+    def drop_deltas(self, start, stop=None):
+        """Forget about the modifications of some rows.
+
+        The rows in ``[start:stop]`` (row numbers in the index, up to
+        the end if `stop` is `None`) are affected.
+        """
+        if 'dcoords' not in self._v_children:
+            return
+        coords = self.dcoords.read()
+        keep = coords < start
+        if stop is not None:
+            keep |= coords >= stop
+        if keep.all():
+            return
+        values = self.dvalues.read()[keep]
+        oldvalues = self.doldvalues.read()[keep]
+        self._remove_deltas()
+        if keep.any():
+            self._create_deltas()
+            self.dcoords.append(coords[keep])
+            self.dvalues.append(values)
+            self.doldvalues.append(oldvalues)
+
+
+    def remove_rows(self, start, stop):
+        """Account for the removal of the indexed rows in ``[start:stop]``.
+
+        `start` and `stop` are row numbers in the table before the
+        removal.  The entries of the removed rows stay in the sorted
+        arrays, but lookups do not take them into account, and the rest
+        of the rows are renumbered on the fly.  The rows in the last row
+        of the index (if any is removed) are indexed again from the
+        table, which must have the rows removed already.
+        """
+        nslices = self.nslices
+        startLR = nslices * self.slicesize
+        bstart, bstop = self.index_coords([start, stop-1])
+        bstop += 1
+        if bstart < startLR:
+            # Removed ranges are merged and they are always kept out of
+            # the last row
+            ranges = numpy.concatenate(
+                (self._getremoved(), [[bstart, min(bstop, startLR)]]))
+            ranges = ranges[ranges[:,0].argsort()]
+            merged = [list(ranges[0])]
+            for rstart, rstop in ranges[1:]:
+                if rstart <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], rstop)
+                else:
+                    merged.append([rstart, rstop])
+            self._setremoved(numpy.array(merged, dtype='int64'))
+        self.drop_deltas(bstart, bstop)
+        if bstop > startLR:
+            nleft = self.nelements - startLR - (bstop - max(bstart, startLR))
+            # Reset the last row and index the rows left in it again
+            self.drop_deltas(startLR)
+            self.nrows = nslices
+            self.nelements = startLR
+            self.nelementsSLR = 0
+            self.nelementsILR = 0
+            self.sortedLR.attrs.nelements = 0
+            self.indicesLR.attrs.nelements = 0
+            self.dirtycache = True
+            if nleft > 0:
+                tstart = startLR - self.nremoved
+                self.appendLastRow(
+                    [self.table._read(tstart, tstart+nleft, 1,
+                                      self.column.pathname)],
+                    update=True)
+
+
+    def _row_keys(self, coords):
+        """Get the keys in `_slice_keys()` of the rows at `coords`.
+
+        `coords` are row numbers in the index.
+        """
+        indsize = self.indsize
+        if indsize == 8:
+            return coords
+        ss = self.slicesize;  lbucket = self.lbucket
+        if indsize == 4:
+            return coords // lbucket
+        # The same buckets than ``init_slice()`` and ``idx2buckets()``
+        nrow, pos = coords // ss, coords % ss
+        offset = lbucket - ((nrow*(ss%lbucket)) % lbucket)
+        idx = numpy.where(pos < offset, 0, (pos-offset)//lbucket + 1)
+        if indsize == 2:
+            nslicesblock = self.nslicesblock
+            bucketsinblock = float(self.blocksize)/lbucket
+            idx += (nrow % nslicesblock)*ss // lbucket
+            idx += ((nrow // nslicesblock)*bucketsinblock).astype('int64')
+        else:
+            idx += (nrow*ss) // lbucket
+        return idx
+
+
+    def _slice_keys(self, nslice, idx):
+        """Get the keys of the `idx` indices of `nslice`.
+
+        Keys are row numbers for full indexes, and bucket numbers for
+        the rest.
+        """
+        if self.indsize == 8:
+            return idx.astype('int64')
+        return self.idx2buckets(nslice, idx.copy()).astype('int64')
+
+
+    def _read_fold_slice(self, nslice):
+        """Read the sorted values and indices of `nslice` (maybe LR)."""
+        if nslice < self.nslices:
+            return self.sorted[nslice], self.indices[nslice]
+        nelementsLR = self.nelementsILR
+        return self.sortedLR[:nelementsLR], self.indicesLR[:nelementsLR]
+
+
+    def _write_fold_slice(self, nslice, sorted, indices):
+        """Write the sorted values and indices of `nslice` (maybe LR)."""
+        if nslice < self.nslices:
+            self.write_slice(self.sorted, nslice, sorted)
+            self.write_slice(self.indices, nslice, indices)
+            self.update_caches(nslice, sorted, where=self)
+        else:
+            nelementsLR = len(sorted)
+            self.bebounds = numpy.concatenate(
+                (sorted[::self.chunksize], [sorted[-1]]))
+            offset2 = len(self.bebounds)
+            self.sortedLR[nelementsLR:nelementsLR+offset2] = self.bebounds
+            self.sortedLR[:nelementsLR] = sorted
+            self.indicesLR[:nelementsLR] = indices
+
+
+    def fold_deltas(self):
+        """Merge the pending changes into the sorted arrays.
+
+        Just the slices with modified rows are sorted and written again.
+        Removed rows can not be merged, nor modifications in indexes
+        with a reduction level other than 1: false is returned in these
+        cases, and the index should be rebuilt instead.
+        """
+        if self.ndeltas == 0:
+            return True
+        if self.nremoved > 0 or self.reduction > 1:
+            return False
+        coords, values, oldvalues = self._getdeltas()
+        keys = self._row_keys(coords)
+        nslices = self.nslices
+        ranges = self.ranges[:nslices]
+        # Find an entry with the old value and key of every modified row
+        found = numpy.zeros(len(coords), dtype='bool')
+        entries = []
+        for nslice in xrange(self.nrows):
+            if nslice < nslices:
+                lo, hi = ranges[nslice]
+            else:
+                lo, hi = self.bebounds[0], self.bebounds[-1]
+            candidates = numpy.flatnonzero(
+                ~found & (oldvalues >= lo) & (oldvalues <= hi))
+            if len(candidates) == 0:
+                continue
+            sorted, indices = self._read_fold_slice(nslice)
+            skeys = self._slice_keys(nslice, indices)
+            positions, numbers = [], []
+            used = set()
+            for i in candidates:
+                start = sorted.searchsorted(oldvalues[i], 'left')
+                stop = sorted.searchsorted(oldvalues[i], 'right')
+                for pos in numpy.flatnonzero(skeys[start:stop] == keys[i]):
+                    if pos + start not in used:
+                        used.add(pos + start)
+                        positions.append(pos + start)
+                        numbers.append(i)
+                        found[i] = True
+                        break
+            if positions:
+                entries.append((nslice, positions, numbers))
+        if not found.all():
+            return False
+        # Put the new values and sort the slices again
+        self._remove_mapped_caches()
+        for nslice, positions, numbers in entries:
+            sorted, indices = self._read_fold_slice(nslice)
+            sorted[positions] = values[numbers]
+            indexesExtension.keysort(sorted, indices)
+            self._write_fold_slice(nslice, sorted, indices)
+        self._remove_deltas()
+        if 'is_CSI' in self._v_attrs:
+            del self._v_attrs.is_CSI
+        self.noverlaps = -1
+        self.dirtycache = True
+        self.build_histogram()
+        return True
+
+
+    # Selectivity estimates
+    # ~~~~~~~~~~~~~~~~~~~~~
+    # An equi-depth histogram of the values in the slices of the index
+    # is kept in the ``histogram`` array, with the edges of its bins.
+
+    def build_histogram(self):
+        """Build the equi-depth histogram of the index.
+
+        The start and end values of the chunks in every slice (the
+        ``abounds`` and ``zbounds`` arrays) and the start values of the
+        chunks in the last row (the ``bebounds`` cache) are an evenly
+        spaced sample of the indexed values, so the edges of the bins
+        are taken from them.  The number of bins is given by the
+        ``INDEX_HISTOGRAM_BINS`` parameter.
+        """
+        if 'histogram' in self._v_children:
+            self._v_children['histogram']._g_remove(False, False)
+        self._histogram = None
+        nbins = self._v_file.params['INDEX_HISTOGRAM_BINS']
+        if nbins == 0:
+            return
+        samples = []
+        if self.nslices > 0:
+            samples.extend([self.abounds[:], self.zbounds[:]])
+        if self.nelementsILR > 0 and self.bebounds is not None:
+            # There is one bound per chunk in the last row, against two
+            # in the slices, so they are counted twice
+            samples.extend([self.bebounds, self.bebounds])
+        if not samples:
+            return
+        sample = numpy.concatenate(samples)
+        sample.sort()
+        positions = numpy.arange(nbins+1) * (len(sample)-1) // nbins
+        Array(self, 'histogram', sample[positions], "Equi-depth histogram",
+              byteorder=self.byteorder, _log=False)
+
+
+    def _gethistogram(self):
+        """Get the edges of the histogram (`None` if there is none)."""
+        if self._histogram is None and 'histogram' in self._v_children:
+            edges = self._v_children['histogram'].read()
+            if edges.dtype.kind in 'biuf':
+                edges = edges.astype('float64')
+            self._histogram = edges
+        return self._histogram
+
+
+    def estimate_selectivity(self, item):
+        """Estimate the ratio of indexed values in the `item` range.
+
+        `item` is a range like the ones returned by `getLookupRange()`.
+        The estimate comes from the histogram of the index, so it is
+        fast but it does not take pending changes into account.  `None`
+        is returned if the index has no histogram.
+        """
+        edges = self._gethistogram()
+        if edges is None:
+            return None
+        if not item or item[0] > item[1]:
+            return 0.0
+        lo, hi = item
+        nbins = len(edges) - 1
+        if self.dtype.kind in 'biu':
+            # Integers take the whole ``[value, value+1)`` interval
+            nlo = _histogramPosition(edges, float(lo), 'left')
+            nhi = _histogramPosition(edges, float(hi)+1, 'left')
+        else:
+            nlo = _histogramPosition(edges, lo, 'left')
+            nhi = _histogramPosition(edges, hi, 'right')
+        return max(nhi - nlo, 0.0) / nbins
+
+
     def getLookupRange(self, ops, limits):
         assert len(ops) in [1, 2]
         assert len(limits) in [1, 2]
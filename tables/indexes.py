@@ -83,7 +83,7 @@ class IndexArray(NotLoggedMixin, EArray, indexesExtension.IndexArray):
     # ~~~~~~~~~~~~~
     def __init__(self, parentNode, name,
                  atom=None, title="",
-                 filters=None, byteorder=None):
+                 filters=None, byteorder=None, delta=False):
         """Create an IndexArray instance.
 
         Keyword arguments:
@@ -104,8 +104,13 @@ class IndexArray(NotLoggedMixin, EArray, indexesExtension.IndexArray):
 
         byteorder -- The byteroder of the data on-disk.
 
+        delta -- Whether the differences between consecutive values are
+            stored instead of the values themselves (only for new
+            arrays).
+
         """
         self._v_pathname = parentNode._g_join(name)
+        self._v_delta = delta
         if atom is not None:
             # The shape and chunkshape needs to be fixed here
             if name == "sorted":
@@ -158,16 +163,22 @@ class IndexArray(NotLoggedMixin, EArray, indexesExtension.IndexArray):
         # Lookup in the middle of slice for item1
         chunksize = self.chunksize # Number of elements/chunksize
         nchunk = -1
-        # Try to get the bounds row from the LRU cache
-        nslot = boundscache.getslot(nrow)
-        if nslot >= 0:
-            # Cache hit. Use the row kept there.
-            bounds = boundscache.getitem(nslot)
+        mappedcaches = self._v_parent.mappedcaches
+        if mappedcaches is not None:
+            # The bounds are mapped in memory
+            bounds = mappedcaches[1][nrow]
         else:
-            # No luck with cached data. Read the row and put it in the cache.
-            bounds = self._v_parent.bounds[nrow]
-            size = bounds.size*bounds.itemsize
-            boundscache.setitem(nrow, bounds, size)
+            # Try to get the bounds row from the LRU cache
+            nslot = boundscache.getslot(nrow)
+            if nslot >= 0:
+                # Cache hit. Use the row kept there.
+                bounds = boundscache.getitem(nslot)
+            else:
+                # No luck with cached data. Read the row and put it in
+                # the cache.
+                bounds = self._v_parent.bounds[nrow]
+                size = bounds.size*bounds.itemsize
+                boundscache.setitem(nrow, bounds, size)
         if result1 < 0:
             # Search the appropriate chunk in bounds cache
             nchunk = bisect_left(bounds, item1)
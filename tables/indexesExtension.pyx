@@ -134,37 +134,43 @@ def keysort(ndarray array1, ndarray array2):
   array1 can be of any type, except complex or string.  array2 may be made of
   elements on any size.
 
+  The GIL is released during the sort, so several threads can sort
+  different arrays concurrently.
+
   """
   cdef npy_intp size
-  cdef int elsize1, elsize2
+  cdef int elsize1, elsize2, ret
+  cdef char *data1, *data2
+  cdef int typecode
 
   size = array1.size
   elsize1 = array1.itemsize
   elsize2 = array2.itemsize
-  if array1.dtype == "float64":
-    return keysort_f64(<npy_float64 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "float32":
-    return keysort_f32(<npy_float32 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "int64":
-    return keysort_i64(<npy_int64 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "uint64":
-    return keysort_u64(<npy_uint64 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "int32":
-    return keysort_i32(<npy_int32 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "uint32":
-    return keysort_u32(<npy_uint32 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "int16":
-    return keysort_i16(<npy_int16 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "uint16":
-    return keysort_u16(<npy_uint16 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "int8":
-    return keysort_i8(<npy_int8 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "uint8":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype == "bool":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
-  elif array1.dtype.char == "S":
-    return keysort_S(array1.data, elsize1, array2.data, size, elsize2)
+  data1 = array1.data
+  data2 = array2.data
+  dtype = array1.dtype
+  if dtype == "float64":
+    typecode = 0
+  elif dtype == "float32":
+    typecode = 1
+  elif dtype == "int64":
+    typecode = 2
+  elif dtype == "uint64":
+    typecode = 3
+  elif dtype == "int32":
+    typecode = 4
+  elif dtype == "uint32":
+    typecode = 5
+  elif dtype == "int16":
+    typecode = 6
+  elif dtype == "uint16":
+    typecode = 7
+  elif dtype == "int8":
+    typecode = 8
+  elif dtype == "uint8" or dtype == "bool":
+    typecode = 9
+  elif dtype.char == "S":
+    typecode = 10
     # As it turns out, an indirect sort is always faster, and much faster on
     # new processors.  See
     # http://www.mail-archive.com/numpy-discussion@scipy.org/msg06639.html
@@ -179,6 +185,32 @@ def keysort(ndarray array1, ndarray array2):
   else:
     raise ValueError, "This shouldn't happen!"
 
+  Py_BEGIN_ALLOW_THREADS
+  if typecode == 0:
+    ret = keysort_f64(<npy_float64 *>data1, data2, size, elsize2)
+  elif typecode == 1:
+    ret = keysort_f32(<npy_float32 *>data1, data2, size, elsize2)
+  elif typecode == 2:
+    ret = keysort_i64(<npy_int64 *>data1, data2, size, elsize2)
+  elif typecode == 3:
+    ret = keysort_u64(<npy_uint64 *>data1, data2, size, elsize2)
+  elif typecode == 4:
+    ret = keysort_i32(<npy_int32 *>data1, data2, size, elsize2)
+  elif typecode == 5:
+    ret = keysort_u32(<npy_uint32 *>data1, data2, size, elsize2)
+  elif typecode == 6:
+    ret = keysort_i16(<npy_int16 *>data1, data2, size, elsize2)
+  elif typecode == 7:
+    ret = keysort_u16(<npy_uint16 *>data1, data2, size, elsize2)
+  elif typecode == 8:
+    ret = keysort_i8(<npy_int8 *>data1, data2, size, elsize2)
+  elif typecode == 9:
+    ret = keysort_u8(<npy_uint8 *>data1, data2, size, elsize2)
+  else:
+    ret = keysort_S(data1, elsize1, data2, size, elsize2)
+  Py_END_ALLOW_THREADS
+  return ret
+
 
 # Classes
 
@@ -223,11 +255,12 @@ cdef class CacheArray(Array):
 cdef class IndexArray(Array):
   """Container for keeping sorted and indices values."""
   cdef void    *rbufst, *rbufln, *rbufrv, *rbufbc, *rbuflb
+  cdef char    *rbufbm
   cdef hid_t   mem_space_id
   cdef int     l_chunksize, l_slicesize, nbounds, indsize
   cdef CacheArray bounds_ext
   cdef NumCache boundscache, sortedcache
-  cdef ndarray bufferbc, bufferlb
+  cdef ndarray bufferbc, bufferlb, boundsmap
 
 
   def _readIndexSlice(self, hsize_t irow, hsize_t start, hsize_t stop,
@@ -274,7 +307,14 @@ cdef class IndexArray(Array):
     self.rbufst = starts.data
     self.rbufln = lengths.data
     # The 1st cache is loaded completely in memory and needs to be reloaded
-    rvcache = index.ranges[:]
+    # (unless it is mapped in memory, like the 2nd one)
+    if index.mappedcaches is not None:
+      rvcache, self.boundsmap = index.mappedcaches
+      self.rbufbm = self.boundsmap.data
+    else:
+      rvcache = index.ranges[:]
+      self.boundsmap = None
+      self.rbufbm = NULL
     self.rbufrv = rvcache.data
     index.rvcache = <object>rvcache
     # Init the bounds array for reading
@@ -287,13 +327,14 @@ cdef class IndexArray(Array):
       # already bound to the boundscache attribute. This way, the cache will
       # not be duplicated (I know, this smells badly, but anyway).
       params = self._v_file.params
-      rowsize = (self.bounds_ext._v_chunkshape[1] * dtype.itemsize)
-      maxslots = params['BOUNDS_MAX_SIZE'] / rowsize
-      self.boundscache = <NumCache>NumCache(
-        (maxslots, self.nbounds), dtype, 'non-opt types bounds')
-      self.bufferbc = numpy.empty(dtype=dtype, shape=self.nbounds)
-      # Get the pointer for the internal buffer for 2nd level cache
-      self.rbufbc = self.bufferbc.data
+      if self.rbufbm == NULL:
+        rowsize = (self.bounds_ext._v_chunkshape[1] * dtype.itemsize)
+        maxslots = params['BOUNDS_MAX_SIZE'] / rowsize
+        self.boundscache = <NumCache>NumCache(
+          (maxslots, self.nbounds), dtype, 'non-opt types bounds')
+        self.bufferbc = numpy.empty(dtype=dtype, shape=self.nbounds)
+        # Get the pointer for the internal buffer for 2nd level cache
+        self.rbufbc = self.bufferbc.data
       # Another NumCache for the sorted values
       rowsize = (self.chunksize*dtype.itemsize)
       maxslots = params['SORTED_MAX_SIZE'] / (self.chunksize*dtype.itemsize)
@@ -373,6 +414,9 @@ cdef class IndexArray(Array):
     cdef void *vpointer
     cdef long nslot
 
+    if self.rbufbm != NULL:
+      # Bounds are mapped in memory: no need to read nor cache them
+      return self.rbufbm + nrow * self.boundsmap.strides[0]
     nslot = self.boundscache.getslot_(nrow)
     if nslot >= 0:
       vpointer = self.boundscache.getitem1_(nslot)
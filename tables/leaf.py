@@ -271,6 +271,8 @@ class Leaf(Node):
         """
         self._flavor = None
         """Private storage for the `flavor` property."""
+        self._asyncAppender = None
+        """The active `AsyncAppender` of the leaf, if any."""
 
         if new:
             # Get filter properties from parent group if not given.
@@ -419,6 +421,8 @@ very small/large chunksize, you may want to increase/decrease it."""
 
     # This method is appropriate for calls to __getitem__ methods
     def _processRange(self, start, stop, step, dim=None, warn_negstep=True):
+        # Data handed to an asynchronous appender must be seen
+        self._drainAppender()
         if dim is None:
             nrows = self.nrows  # self.shape[self.maindim]
         else:
@@ -438,6 +442,7 @@ very small/large chunksize, you may want to increase/decrease it."""
 
     # This method is appropiate for calls to read() methods
     def _processRangeRead(self, start, stop, step, warn_negstep=True):
+        self._drainAppender()
         nrows = self.nrows
         if start is None and stop is None:
             start = 0
@@ -548,6 +553,7 @@ very small/large chunksize, you may want to increase/decrease it."""
         This is useful for whatever `Leaf` instance implementing a
         point-wise selection.
         """
+        self._drainAppender()
 
         if type(key) in (list, tuple):
             if type(key) is tuple and len(key) > len(self.shape):
@@ -699,6 +705,7 @@ very small/large chunksize, you may want to increase/decrease it."""
         # A non-enlargeable arrays (Array, CArray) cannot be truncated
         if self.extdim < 0:
             raise TypeError("non-enlargeable datasets cannot be truncated")
+        self._drainAppender()
         if (size > 0 or
             (size == 0 and whichLibVersion("hdf5")[1] >= "1.8.0")):
                 self._g_truncate(size)
@@ -756,10 +763,23 @@ With HDF5 1.8.0 and higher, `size` can also be 0 or greater.""")
         releases I/O buffers, so if you are filling many datasets in the
         same PyTables session, please call ``flush()`` extensively so as
         to help PyTables to keep memory requirements low.
+
+        If the leaf has an asynchronous appender, this waits for all the
+        data handed to it to be written.
         """
+        self._drainAppender()
         self._g_flush()
 
 
+    def _drainAppender(self):
+        """Wait for the data handed to an asynchronous appender (if any).
+
+        An exception raised by the writer of the appender is raised here.
+        """
+        if self._asyncAppender is not None:
+            self._asyncAppender._drain()
+
+
     def _f_close(self, flush=True):
         """
         Close this node in the tree.
@@ -772,6 +792,10 @@ With HDF5 1.8.0 and higher, `size` can also be 0 or greater.""")
         if not self._v_isopen:
             return  # the node is already closed or not initialized
 
+        # Data handed to an asynchronous appender must be written anyway
+        if self._asyncAppender is not None:
+            self._asyncAppender.close()
+
         # Only do a flush in case the leaf has an IO buffer.  The
         # internal buffers of HDF5 will be flushed afterwards during the
         # self._g_close() call.  Avoiding an unnecessary flush()
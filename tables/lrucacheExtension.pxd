@@ -14,6 +14,7 @@ cdef class NodeCache:
 cdef class BaseCache:
   cdef int iscachedisabled, incsetcount
   cdef long setcount, getcount, containscount
+  cdef readonly long long nlookups, nhits
   cdef long disablecyclecount, disableeverycycles
   cdef long enablecyclecount, enableeverycycles
   cdef double nprobes, hitratio
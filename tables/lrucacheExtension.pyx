@@ -169,6 +169,8 @@ cdef class BaseCache:
       raise ValueError, "Negative number (%s) of slots!" % nslots
     self.setcount = 0;  self.getcount = 0;  self.containscount = 0
     self.enablecyclecount = 0;  self.disablecyclecount = 0
+    # Counters of lookups and hits that are never reset
+    self.nlookups = 0;  self.nhits = 0
     self.iscachedisabled = False  # Cache is enabled by default
     self.disableeverycycles = DISABLE_EVERY_CYCLES
     self.enableeverycycles = ENABLE_EVERY_CYCLES
@@ -420,14 +422,17 @@ cdef class ObjectCache(BaseCache):
     if self.nslots == 0:   # The cache has been set to empty
       return -1
     self.containscount = self.containscount + 1
+    self.nlookups = self.nlookups + 1
     # Give a chance to the MRU node
     node = self.mrunode
     if node and node.key == key:
+      self.nhits = self.nhits + 1
       return node.nslot
     # No luck. Look in the dictionary.
     node = self.__dict.get(key)
     if node is <ObjectNode>None:
       return -1
+    self.nhits = self.nhits + 1
     return node.nslot
 
   # Return the object to the data in cache (for Python calls)
@@ -584,12 +589,14 @@ cdef class NumCache(BaseCache):
     cdef object nslot
 
     self.containscount = self.containscount + 1
+    self.nlookups = self.nlookups + 1
     if self.nextslot == 0:   # No chances for finding a slot
       return -1
     try:
       nslot = self.__dict[key]
     except KeyError:
       return -1
+    self.nhits = self.nhits + 1
     return nslot
 
 
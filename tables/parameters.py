@@ -74,6 +74,22 @@ bytes)."""
 SORTEDLR_MAX_SLOTS = 1024
 """The maximum number of chunks for SORTEDLR cache."""
 
+QUERY_CACHE_PERSISTENT = False
+"""Whether the coordinates selected by ``Table.getWhereList()`` and
+``Table.readWhere()`` should be cached in a hidden group of the HDF5
+file, so that identical queries can be answered from it by later
+processes.  The cache of a table is invalidated by any modification
+made to the table through PyTables.  Queries on read-only files can use
+existing entries, but do not add new ones."""
+
+QUERY_CACHE_MAX_SLOTS = 64
+"""The maximum number of query results kept in the persistent cache of
+each table."""
+
+QUERY_CACHE_MAX_ELEMENTS = 1024*1024
+"""The maximum number of coordinates of a query result for being kept
+in the persistent cache."""
+
 
 # Parameters for general cache behaviour
 # --------------------------------------
@@ -200,6 +216,117 @@ BUFFER_TIMES = 100
 """The maximum buffersize/rowsize ratio before issuing a
 ``PerformanceWarning``."""
 
+IO_PREFETCH = False
+"""Whether table row iterators (like the ones returned by
+``Table.iterrows()`` or ``Table.where()``) should read and decompress
+the next I/O buffer in a background thread while the current one is
+being consumed.  This overlaps I/O with computation on sequential
+scans.  If other HDF5 operations are performed while iterating, the
+HDF5 library must have been built with thread-safety enabled."""
+
+REMOVE_ROWS_LAZILY = False
+"""Whether ``Table.removeRows()`` should just mark rows as removed in a
+bitmap instead of moving all the rows after them, which is much faster
+for big tables.  Removed rows are skipped by reads, iterators and
+queries, but they keep taking space (and their row numbers) until
+``Table.compact()`` is called."""
+
+COMPACT_DEAD_RATIO = 0.5
+"""The ratio of rows removed lazily (see ``REMOVE_ROWS_LAZILY``) in a
+table above which it is compacted automatically.  Use 1 to compact
+only when all the rows have been removed."""
+
+COORDS_CHUNK_SPARSITY = 16
+"""The maximum ratio between the number of rows in the chunks touched by
+a read of scattered rows (``Table.readCoordinates()``,
+``Table.itersequence()``...) and the number of rows wanted for reading
+these chunks whole, just once each, instead of doing a point selection.
+Chunks of compressed tables are always read whole, as HDF5 needs to
+decompress them anyway.  Use 0 to always use point selections."""
+
+
+# Parameters for aggregations
+# ---------------------------
+
+GROUPBY_MAX_GROUPS = 1024*1024
+"""The maximum number of groups whose partial state is kept in memory by
+``Table.groupby()`` before moving it to a temporary file."""
+
+JOIN_MAX_MEMORY = 64*_MB
+"""The maximum amount of memory (in bytes) taken by the keys of the right
+table (and their row numbers) in ``tables.join()`` when its key columns
+are not completely sorted by an index.  Keys of bigger tables are split
+in partitions in a temporary file first."""
+
+
+# Parameters for index creation
+# -----------------------------
+
+INDEX_BUILD_MAX_MEMORY = 256*_MB
+"""The maximum amount of memory (in bytes) taken by the slices that are
+sorted concurrently while building or optimizing an index.  Slices are
+sorted in up to ``MAX_THREADS`` threads, as long as they fit within this
+budget.  The resulting index does not depend on the number of threads
+used."""
+
+BITMAP_MAX_VALUES = 1024
+"""The maximum number of distinct values of a column for creating a
+bitmap index on it with ``Column.createBitmapIndex()``.  Every value
+takes a bitmap with a bit per row of the table."""
+
+INDEX_MAX_DELTAS = 16*1024
+"""The maximum number of pending changes (modified rows and ranges of
+removed rows) kept apart from the sorted arrays of a column index.
+While ``Table.autoIndex`` is true, ``Table.modifyRows()``,
+``Table.modifyColumns()``, ``Table.removeRows()`` and the like update
+column indexes incrementally instead of rebuilding them, and changes are
+merged into the sorted arrays once there are more than this number of
+them (removed rows and indexes with a reduction level other than 1 are
+rebuilt instead).  Completely sorted indexes are always rebuilt.  Use 0
+to always rebuild indexes."""
+
+INDEX_MAPPED_CACHES = False
+"""Whether the ranges and bounds of the slices of column indexes (the
+metadata read by the first query using an index) should be mapped in
+memory instead of being read and cached by every process.  Contiguous
+and uncompressed copies of them are kept in the index for this, which
+are written by the first query after the index has been created or
+changed in a writable file.  Mapped data is shared by processes through
+the page cache of the operating system."""
+
+INDEX_HISTOGRAM_BINS = 256
+"""The number of bins of the equi-depth histograms kept by column
+indexes, which are used for estimating the ratio of rows fulfilling a
+condition before looking up the index.  Use 0 for not keeping
+histograms in new indexes."""
+
+INDEX_DELTA_ENCODING = False
+"""Whether the sorted values (of numerical columns) and the row numbers
+of new column indexes should be stored as the differences between
+consecutive elements in every chunk, before applying the filters of
+the index.  Sorted keys and the row numbers of sorted or clustered
+columns become long runs of small numbers this way, which shuffle and
+compressors pack in much less space.  This uses a filter of PyTables,
+so other HDF5 applications can not read these arrays.
+
+This is experimental: the filter ID has not been registered with The
+HDF Group yet, and it comes from the range reserved for testing and
+non-distributed uses.  An ``ExperimentalFeatureWarning`` is issued for
+every index created with it, and versions of PyTables using another ID
+ignore these indexes (versions without this feature fail to read their
+data).  Do not use it for files to be shared or kept."""
+
+
+# Parameters for queries
+# ----------------------
+
+INDEX_MAX_SELECTIVITY = 0.25
+"""The maximum estimated ratio of rows fulfilling a sub-condition of a
+query for using the index of its column.  Indexes of less selective
+sub-conditions are not looked up, as most chunks of the table would be
+read anyway: if no index is left, the query is run as an in-kernel
+scan.  Use 1 to always use indexes."""
+
 
 # Miscellaneous
 # -------------
@@ -0,0 +1,211 @@
+"""
+Persistent cache for the results of table queries.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`QueryCache`
+    Keeps the coordinates selected by table queries in the HDF5 file.
+
+Functions
+=========
+
+`_queryCacheNameOf`
+    Get the name of the query cache group of a table.
+`_queryCachePathnameOf`
+    Get the path name of the query cache group of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+try:
+    from hashlib import md5
+except ImportError:  # Python < 2.5
+    from md5 import new as md5
+
+import weakref
+
+import numpy
+
+from tables.atom import Int64Atom
+from tables.earray import EArray
+from tables.filters import Filters
+from tables.group import Group
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _queryCacheNameOf(node):
+    return '_p_qcache_%s' % node._v_name
+
+def _queryCachePathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _queryCacheNameOf(node))
+
+
+# Public classes
+# ==============
+class QueryCache(object):
+    """
+    Persistent cache for the coordinates selected by table queries.
+
+    Results are kept as compressed arrays of coordinates in a hidden
+    group beside the table (``_p_qcache_<name>``), so that they survive
+    the process and can be reused after reopening the file.  Entries
+    are keyed by the normalized condition key of the table (see
+    `Table._getConditionKey()`), the values of non-column variables,
+    the range of the query, the number of rows in the table and a
+    modification counter kept as the ``VERSION`` attribute of the
+    group.
+
+    Every modification of the table through PyTables calls
+    `invalidate()`, which removes all the entries and increments the
+    counter.  Modifications made by other programs can not be
+    detected, except for changes in the number of rows.
+
+    At most ``QUERY_CACHE_MAX_SLOTS`` entries are kept (the oldest
+    ones are evicted first), and results with more than
+    ``QUERY_CACHE_MAX_ELEMENTS`` coordinates are not cached.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=True)
+
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` whose query results are cached.")
+
+
+    def __init__(self, table):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self._clean = None
+        """Whether the group is known to hold no entries (`None` if
+        unknown)."""
+
+
+    def _getGroup(self, create=False):
+        """
+        Get the cache group of the table.
+
+        `None` is returned if it does not exist, unless `create` is
+        true.
+        """
+        table = self.table
+        pathname = _queryCachePathnameOf(table)
+        if table._v_file._hasNode(pathname):
+            return table._v_file._getNode(pathname)
+        if not create:
+            return None
+        group = Group( table._v_parent, _queryCacheNameOf(table),
+                       "Query results cache", new=True,
+                       filters=self._filters, _log=False )
+        group._v_attrs.VERSION = 0
+        group._v_attrs.ENTRIES = ''
+        return group
+
+
+    def _entryName(self, group, key):
+        """Get the name of the entry for `key` in the `group`."""
+        strkey = repr((key, int(group._v_attrs.VERSION), self.table.nrows))
+        return 'q%s' % md5(strkey).hexdigest(), strkey
+
+
+    def key(self, condition, condvars, start, stop, step):
+        """
+        Get the cache key of a query.
+
+        `condvars` must have been completed by
+        `Table._requiredExprVars()`.
+        """
+        condkey = self.table._getConditionKey(condition, condvars)
+        values = [ (var, val.tolist()) for (var, val) in condvars.items()
+                   if isinstance(val, numpy.ndarray) ]
+        values.sort()
+        start, stop, step = self.table._processRangeRead(start, stop, step)
+        return (condkey, tuple(values), (start, stop, step))
+
+
+    def get(self, key):
+        """
+        Get the coordinates cached for `key`.
+
+        `None` is returned if they are not in the cache.
+        """
+        group = self._getGroup()
+        if group is None:
+            self._clean = True
+            return None
+        name, strkey = self._entryName(group, key)
+        if name not in group._v_children:
+            return None
+        entry = group._v_children[name]
+        if entry._v_attrs.KEY != strkey:
+            return None
+        return entry.read()
+
+
+    def put(self, key, coords):
+        """Cache the `coords` selected by the query with `key`."""
+        tblfile = self.table._v_file
+        if (tblfile.mode == 'r' or
+            len(coords) > tblfile.params['QUERY_CACHE_MAX_ELEMENTS']):
+            return
+        group = self._getGroup(create=True)
+        self._clean = False
+        name, strkey = self._entryName(group, key)
+        entries = group._v_attrs.ENTRIES.split()
+        if name in entries:
+            return
+        # Evict the oldest entries
+        while len(entries) >= tblfile.params['QUERY_CACHE_MAX_SLOTS']:
+            group._v_children[entries.pop(0)]._g_remove(False, False)
+        entry = EArray( group, name, Int64Atom(), (0,), "Query result",
+                        expectedrows=max(len(coords), 1), _log=False )
+        if len(coords) > 0:
+            entry.append(numpy.asarray(coords, dtype='int64'))
+        entry._v_attrs.KEY = strkey
+        entries.append(name)
+        group._v_attrs.ENTRIES = ' '.join(entries)
+
+
+    def invalidate(self):
+        """Remove all the cached results."""
+        if self._clean:
+            return
+        group = self._getGroup()
+        if group is not None:
+            for name in group._v_attrs.ENTRIES.split():
+                group._v_children[name]._g_remove(False, False)
+            group._v_attrs.ENTRIES = ''
+            group._v_attrs.VERSION += 1
+        self._clean = True
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
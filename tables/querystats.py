@@ -0,0 +1,153 @@
+"""
+Statistics about the execution of table queries.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`QueryStats`
+    Counters and timings collected while running table queries.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Public classes
+# ==============
+class QueryStats(object):
+    """
+    Counters and timings collected while running table queries.
+
+    Collection is opt-in: assign an instance of this class to the
+    ``queryStats`` attribute of a `Table` and every query run on it
+    afterwards (`Table.where()`, `Table.readWhere()`,
+    `Table.getWhereList()`...) will update it.  Counters accumulate
+    over queries until `reset()` is called.
+
+    Public instance variables
+    -------------------------
+
+    nqueries
+        The number of queries run.
+    nindexed
+        The number of queries that used indexes.
+    lookuptime
+        Seconds spent looking up indexes and building chunkmaps.
+    scantime
+        Seconds spent iterating over the selected rows.  Only
+        iterators that have been exhausted are accounted for.
+    rowsread
+        The number of table rows read from disk (or from the chunk
+        cache) for evaluating the conditions.
+    bytesread
+        The number of bytes in `rowsread`.
+    rowsselected
+        The number of rows fulfilling the conditions.
+    chunkstotal
+        The number of table chunks that indexed queries could read.
+    chunksskipped
+        The number of those chunks skipped thanks to the indexes.
+    seqcachehits
+        The number of indexed queries answered from the cache of
+        row sequences.
+    limboundshits
+        The number of hits in the cache of index bounding limits.
+    chunkcachehits
+        The number of hits in the cache of table chunks.
+    querycachehits
+        The number of queries answered from the persistent cache of
+        query results (see ``QUERY_CACHE_PERSISTENT``).
+    ncostscans
+        The number of queries that could use indexes, but were run as
+        scans because no indexed sub-condition was estimated to be
+        selective enough (see ``INDEX_MAX_SELECTIVITY``).
+    nhybrid
+        The number of indexed queries that did not use the indexes of
+        some sub-conditions, as they were not selective enough.
+    indexesskipped
+        The number of indexed sub-conditions whose index was not used
+        because of that.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set all the counters and timings to zero."""
+        self.nqueries = 0
+        self.nindexed = 0
+        self.lookuptime = 0.0
+        self.scantime = 0.0
+        self.rowsread = 0
+        self.bytesread = 0
+        self.rowsselected = 0
+        self.chunkstotal = 0
+        self.chunksskipped = 0
+        self.seqcachehits = 0
+        self.limboundshits = 0
+        self.chunkcachehits = 0
+        self.querycachehits = 0
+        self.ncostscans = 0
+        self.nhybrid = 0
+        self.indexesskipped = 0
+
+    def _addRead(self, nrows, rowsize):
+        """Account for `nrows` rows of `rowsize` bytes being read."""
+        self.rowsread += nrows
+        self.bytesread += nrows * rowsize
+
+    def _addScan(self, scantime, nselected, chunkcachehits):
+        """Account for an exhausted iterator over selected rows."""
+        self.scantime += scantime
+        self.rowsselected += nselected
+        self.chunkcachehits += chunkcachehits
+
+    def __repr__(self):
+        return """%s
+  nqueries := %d
+  nindexed := %d
+  lookuptime := %.6f
+  scantime := %.6f
+  rowsread := %d
+  bytesread := %d
+  rowsselected := %d
+  chunkstotal := %d
+  chunksskipped := %d
+  seqcachehits := %d
+  limboundshits := %d
+  chunkcachehits := %d
+  querycachehits := %d
+  ncostscans := %d
+  nhybrid := %d
+  indexesskipped := %d""" % (
+            object.__repr__(self), self.nqueries, self.nindexed,
+            self.lookuptime, self.scantime, self.rowsread, self.bytesread,
+            self.rowsselected, self.chunkstotal, self.chunksskipped,
+            self.seqcachehits, self.limboundshits, self.chunkcachehits,
+            self.querycachehits, self.ncostscans, self.nhybrid,
+            self.indexesskipped)
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
@@ -30,8 +30,10 @@ Misc variables:
 
 import sys
 import math
+import weakref
 import warnings
 import os.path
+import threading
 from time import time
 
 import numpy
@@ -41,12 +43,12 @@ from tables import tableExtension
 from tables.utilsExtension import lrange
 from tables.lrucacheExtension import ObjectCache, NumCache
 from tables.atom import Atom
-from tables.conditions import compile_condition
+from tables.conditions import compile_condition, call_on_recarr
 from numexpr.necompiler import (
     getType as numexpr_getType, double, is_cpu_amd_intel)
 from numexpr.expressions import functions as numexpr_functions
 from tables.flavor import flavor_of, array_as_internal, internal_to_flavor, \
-        _numeric_deprecation, _numarray_deprecation
+        internal_flavor, _numeric_deprecation, _numarray_deprecation
 from tables.utils import is_idx, lazyattr, SizeType, NailedDict as CacheDict
 from tables.leaf import Leaf
 from tables.description import (
@@ -59,6 +61,18 @@ from tables.path import joinPath, splitPath
 from tables.index import (
     OldIndex, defaultIndexFilters, defaultAutoIndex, Index, IndexesDescG,
     IndexesTableG)
+from tables.idxutils import matchItems, groupCoords
+from tables.querycache import QueryCache, _queryCachePathnameOf, \
+     _queryCacheNameOf
+from tables.zonemap import ZoneMap, _zonemapPathnameOf, _zonemapNameOf
+from tables.bloomfilter import BloomFilter, _bloomPathnameOf, _bloomNameOf
+from tables.deadrows import DeadRows, _deadrowsPathnameOf, _deadrowsNameOf
+from tables.compositeindex import CompositeIndex, _compositePathnameOf, \
+     _compositeNameOf
+from tables.bitmapindex import BitmapIndex, _bitmapPathnameOf, _bitmapNameOf
+from tables.asyncappend import AsyncAppender
+from tables.aggregate import Aggregator, SpillingAggregator, \
+     _parseAggregates
 
 profile = False
 #profile = True  # Uncomment for profiling
@@ -191,10 +205,40 @@ def restorecache(self):
     self._dirtycache = False
 
 
+def _table__chooseIndexes(self, compiled, condvars):
+    """
+    Choose the indexed sub-conditions whose index is worth using.
+
+    The ratio of rows fulfilling every indexed sub-condition in the
+    `compiled` condition is estimated from the histogram of its index.
+    The index of a sub-condition is not used if this ratio is above
+    the ``INDEX_MAX_SELECTIVITY`` parameter, as most chunks would be
+    read anyway, and looking up the index and building the chunkmap
+    would just add to the cost of the query.  A list with the estimated
+    ratio (or `None` if unknown) and a list with a boolean telling
+    whether the index is used are returned, with an item for every
+    indexed sub-condition.
+    """
+    maxselectivity = self._v_file.params['INDEX_MAX_SELECTIVITY']
+    selectivities, useindexes = [], []
+    for var, ops, lims in compiled.index_expressions:
+        index = condvars[var].index
+        selectivity = index.estimate_selectivity(
+            index.getLookupRange(ops, lims))
+        selectivities.append(selectivity)
+        useindexes.append(
+            selectivity is None or selectivity <= maxselectivity)
+    return selectivities, useindexes
+
+
 def _table__whereIndexed(self, compiled, condition, condvars,
-                         start, stop, step):
+                         start, stop, step, limit=None, useindexes=None):
     if profile: tref = time()
     if profile: show_stats("Entering table_whereIndexed", tref)
+    stats = self.queryStats
+    if stats is not None:
+        tlookup = time()
+        stats.nindexed += 1
     self._useIndex = True
     # Clean the table caches for indexed queries if needed
     if self._dirtycache:
@@ -212,13 +256,18 @@ def _table__whereIndexed(self, compiled, condition, condvars,
     if nslot >= 0:
         # Get the row sequence from the cache
         seq = self._seqcache.getitem(nslot)
+        if stats is not None:
+            stats.seqcachehits += 1
+            stats.lookuptime += time() - tlookup
         if len(seq) == 0:
             return iter([])
         seq = numpy.array(seq, dtype='int64')
         # Correct the ranges in cached sequence
         if (start, stop, step) != (0, self.nrows, 1):
             seq = seq[(seq>=start)&(seq<stop)&((seq-start)%step==0)]
-        return self.itersequence(seq)
+        if stats is not None:
+            stats.rowsselected += len(seq)
+        return self._itersequence(seq, limit)
     else:
         # No luck.  Set row sequence to empty.  It will be populated
         # in the iterator. If not possible, the slot entry will be
@@ -230,6 +279,7 @@ def _table__whereIndexed(self, compiled, condition, condvars,
     strexpr = compiled.string_expression
     cmvars = {}
     tcoords = 0
+    skipped = False
     for i, idxexpr in enumerate(idxexprs):
         var, ops, lims = idxexpr
         col = condvars[var]
@@ -237,9 +287,23 @@ def _table__whereIndexed(self, compiled, condition, condvars,
         assert index is not None, "the chosen column is not indexed"
         assert not index.dirty, "the chosen column has a dirty index"
 
+        if useindexes is not None and not useindexes[i]:
+            # The index is not worth using: all the chunks are candidates
+            nrowsinchunk = self.chunkshape[0]
+            nchunks = long(math.ceil(
+                float(index.nelements - index.nremoved) / nrowsinchunk))
+            cmvars["e%d"%i] = numpy.ones(shape=nchunks, dtype="bool")
+            skipped = True
+            continue
+
         # Get the number of rows that the indexed condition yields.
         range_ = index.getLookupRange(ops, lims)
+        if index.dirtycache:
+            index.restorecache()
+        limboundshits = index.limboundscache.nhits
         ncoords = index.search(range_)
+        if stats is not None:
+            stats.limboundshits += index.limboundscache.nhits - limboundshits
         tcoords += ncoords
         if index.reduction == 1 and ncoords == 0:
             # No values from index condition, thus the chunkmap should be empty
@@ -252,12 +316,22 @@ def _table__whereIndexed(self, compiled, condition, condvars,
         # Assign the chunkmap to the cmvars dictionary
         cmvars["e%d"%i] = chunkmap
 
-    if index.reduction == 1 and tcoords == 0:
+    if not skipped and index.reduction == 1 and tcoords == 0:
         # No candidates found in any indexed expression component, so leave now
+        if stats is not None:
+            stats.lookuptime += time() - tlookup
         return iter([])
 
     # Compute the final chunkmap
     chunkmap = numexpr.evaluate(strexpr, cmvars)
+    if compiled.bitmap_expressions:
+        chunkmap &= _table__bitmapChunkmap(
+            self, compiled, condvars, len(chunkmap))
+    if stats is not None:
+        stats.lookuptime += time() - tlookup
+        nchunks = len(chunkmap)
+        stats.chunkstotal += nchunks
+        stats.chunksskipped += nchunks - chunkmap.sum()
     # Method .any() is twice as faster than method .sum()
     if not chunkmap.any():
         # The chunkmap is empty
@@ -267,6 +341,552 @@ def _table__whereIndexed(self, compiled, condition, condvars,
     return chunkmap
 
 
+def _table__compositeCoords(self, compiled, start, stop, step):
+    """Get the coordinates in a range selected by a composite index.
+
+    Coordinates are returned sorted, and only the comparisons in the
+    composite expressions of the `compiled` condition are fulfilled.
+    """
+    cindex = self._compositeindexes[compiled.composite_index]
+    coords = cindex.search(compiled.composite_expressions)
+    if (start, stop, step) != (0, self.nrows, 1):
+        coords = coords[ (coords >= start) & (coords < stop) &
+                         ((coords - start) % step == 0) ]
+    return coords
+
+
+def _table__whereComposite(self, compiled, condvars, start, stop, step):
+    """Get the coordinates fulfilling a condition by a composite index.
+
+    The rows selected by the composite index are read to evaluate the
+    rest of the condition, unless the index covers it exactly.  Rows
+    removed lazily are not filtered out.
+    """
+    stats = self.queryStats
+    if stats is not None:
+        tlookup = time()
+        stats.nindexed += 1
+    coords = _table__compositeCoords(self, compiled, start, stop, step)
+    if stats is not None:
+        stats.lookuptime += time() - tlookup
+    if compiled.composite_exact:
+        return coords
+    return _table__filterCoords(self, compiled, condvars, coords)
+
+
+def _table__bitmap(self, compiled, condvars):
+    """Get the bitmap of the rows selected by bitmap indexes.
+
+    The bitmaps of the bitmap expressions of the `compiled` condition
+    are combined as told by its bitmap string.  The bits of all the
+    rows of the table are returned packed in bytes.
+    """
+    nrows = self.nrows
+    bmvars = {}
+    for i, (var, ops, lims) in enumerate(compiled.bitmap_expressions):
+        bmindex = self._bitmapindexes[condvars[var].pathname]
+        bmvars["b%d"%i] = bmindex.get_bitmap(ops, lims, nrows)
+    return eval(compiled.bitmap_string, {'__builtins__': {}}, bmvars)
+
+
+def _table__bitmapCoords(self, compiled, condvars, start, stop, step):
+    """Get the coordinates in a range selected by bitmap indexes.
+
+    Coordinates are returned sorted, and only the bitmap expressions
+    of the `compiled` condition are fulfilled.
+    """
+    bitmap = _table__bitmap(self, compiled, condvars)
+    bits = numpy.unpackbits(bitmap[start//8:(stop+7)//8])
+    offset = start % 8
+    coords = numpy.flatnonzero(bits[offset:offset+stop-start]) + start
+    if step != 1:
+        coords = coords[(coords - start) % step == 0]
+    return coords
+
+
+def _table__bitmapChunkmap(self, compiled, condvars, nchunks):
+    """Get the chunks with rows selected by bitmap indexes."""
+    chunksize = self.chunkshape[0]
+    bitmap = _table__bitmap(self, compiled, condvars)
+    bits = numpy.zeros(nchunks * chunksize, dtype=numpy.uint8)
+    nrows = min(self.nrows, len(bits))
+    bits[:nrows] = numpy.unpackbits(bitmap)[:nrows]
+    return bits.reshape((nchunks, chunksize)).any(axis=1)
+
+
+def _table__whereBitmap(self, compiled, condvars, start, stop, step):
+    """Get the coordinates fulfilling a condition by bitmap indexes.
+
+    The rows selected by the bitmap indexes are read to evaluate the
+    rest of the condition, unless the bitmaps cover it exactly.  Rows
+    removed lazily are not filtered out.
+    """
+    stats = self.queryStats
+    if stats is not None:
+        tlookup = time()
+        stats.nindexed += 1
+    coords = _table__bitmapCoords(self, compiled, condvars, start, stop, step)
+    if stats is not None:
+        stats.lookuptime += time() - tlookup
+    if compiled.bitmap_exact:
+        return coords
+    return _table__filterCoords(self, compiled, condvars, coords)
+
+
+def _table__filterCoords(self, compiled, condvars, coords):
+    """Get the coordinates in `coords` fulfilling a condition.
+
+    The rows in `coords` are read to evaluate the `compiled` condition.
+    """
+    if len(coords) == 0:
+        return coords
+    args = [condvars[param] for param in compiled.parameters]
+    rdtype = self._topFieldsDtype([ arg.pathname for arg in args
+                                    if hasattr(arg, 'pathname') ])
+    valid = numpy.empty(len(coords), dtype=numpy.bool_)
+    for start in xrange(0, len(coords), self.nrowsinbuf):
+        stop = start + self.nrowsinbuf
+        recarr = self._readCoordinates(coords[start:stop], None, rdtype.names)
+        valid[start:stop] = call_on_recarr(compiled.function, args, recarr)
+    return coords[valid]
+
+
+def _table__whereChunkStats(self, compiled, condvars):
+    """Get the chunkmap of a condition from the chunk statistics of columns.
+
+    An empty iterator is returned if no chunk can fulfill the condition.
+    """
+    chunksize = self.chunkshape[0]
+    stats = self.queryStats
+    if stats is not None:
+        tlookup = time()
+    # Clean the table caches for indexed queries if needed
+    if self._dirtycache:
+        restorecache(self)
+
+    nchunks = (self.nrows + chunksize - 1) // chunksize
+    cmvars = {}
+    for i, (var, ops, lims) in enumerate(compiled.chunkstats_expressions):
+        cmvars["e%d"%i] = self._getChunkStatsMap(
+            condvars[var].pathname, ops, lims, nchunks)
+    chunkmap = numexpr.evaluate(compiled.chunkstats_string, cmvars)
+    if stats is not None:
+        stats.lookuptime += time() - tlookup
+        stats.chunkstotal += nchunks
+        stats.chunksskipped += nchunks - chunkmap.sum()
+    if not chunkmap.any():
+        return iter([])
+    # Go through the chunkmap iterator, without caching the sequence
+    self._useIndex = True
+    self._nslotseq = -1
+    return chunkmap
+
+
+# Neither HDF5 (unless built thread-safe) nor the Numexpr virtual
+# machine can be safely entered from several threads at once, so
+# parallel scans serialize these steps while overlapping them.
+_hdf5Lock = threading.Lock()
+_numexprLock = threading.Lock()
+
+def _table__partitions(self, start, stop):
+    """Split ``[start, stop)`` in chunk-aligned partitions.
+
+    There is a partition per thread (up to ``MAX_THREADS``).  A list of
+    ``(pstart, pstop)`` tuples is returned.
+    """
+    nthreads = self._v_file.params['MAX_THREADS']
+    chunksize = self.chunkshape[0]
+    firstchunk = start // chunksize
+    nchunks = (stop - 1) // chunksize - firstchunk + 1
+    chunksperpart = long(math.ceil(float(nchunks) / max(nthreads, 1)))
+    partitions = []
+    for nchunk in xrange(firstchunk, firstchunk+nchunks, chunksperpart):
+        pstart = max(nchunk * chunksize, start)
+        pstop = min((nchunk + chunksperpart) * chunksize, stop)
+        partitions.append((pstart, pstop))
+    return partitions
+
+
+def _table__iterPartition(self, buf, pstart, pstop, start, step):
+    """Iterate over the rows of a partition in buffers of whole chunks.
+
+    ``(bstart, recarr)`` tuples are yielded, where `recarr` holds the
+    rows in the `pstart` to `pstop` range starting at row `bstart`
+    which are selected by `start` and `step`.  Data is read into `buf`,
+    whose length must be a multiple of the chunk size, and reads are
+    serialized with the ones of other threads.
+    """
+    nrowsinbuf, chunksize = len(buf), self.chunkshape[0]
+    stats = self.queryStats
+    bufstart = pstart - (pstart % chunksize)
+    for bstart in xrange(bufstart, pstop, nrowsinbuf):
+        bstop = min(bstart + nrowsinbuf, pstop)
+        # First row in this buffer that belongs to the range
+        bstart = max(bstart, pstart)
+        bstart += (start - bstart) % step
+        if bstart >= bstop:
+            continue
+        _hdf5Lock.acquire()
+        try:
+            nrecords = self._read_records(bstart, bstop - bstart, buf)
+            if stats is not None:
+                stats._addRead(nrecords, buf.itemsize)
+        finally:
+            _hdf5Lock.release()
+        yield bstart, buf[:nrecords:step]
+
+
+def _runPartitions(scan, partitions):
+    """Run ``scan(npart, pstart, pstop)`` on every partition.
+
+    Every partition is scanned in its own thread, and the first error
+    raised in a thread (if any) is raised again.
+    """
+    errors = []
+
+    def run(npart, pstart, pstop):
+        try:
+            scan(npart, pstart, pstop)
+        except:
+            errors.append(sys.exc_info())
+
+    if len(partitions) == 1:
+        # Not worth starting a thread
+        run(0, *partitions[0])
+    else:
+        threads = [ threading.Thread(target=run, args=(i,)+partition)
+                    for i, partition in enumerate(partitions) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if errors:
+        # Propagate the first error raised in a worker thread
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+
+
+def _table__whereParallel(self, compiled, condvars, start, stop, step):
+    """Get the coordinates fulfilling an in-kernel condition in parallel.
+
+    The ``[start, stop)`` range is split into chunk-aligned partitions,
+    one per thread (up to ``MAX_THREADS``).  Every thread reads its
+    partition in buffers of whole chunks, evaluates the `compiled`
+    condition on them and keeps the coordinates of the selected rows.
+    Coordinates are returned as a `SizeType` array in row order.
+    """
+    if profile: tref = time()
+    if profile: show_stats("Entering table_whereParallel", tref)
+    chunksize = self.chunkshape[0]
+    # The buffers for reading must be made of whole chunks too
+    nrowsinbuf = max(self.nrowsinbuf // chunksize, 1) * chunksize
+    partitions = _table__partitions(self, start, stop)
+
+    condfunc = compiled.function
+    condargs = [condvars[param] for param in compiled.parameters]
+    stats = self.queryStats
+    if stats is not None:
+        tscan = time()
+    results = [None] * len(partitions)
+
+    def scan(npart, pstart, pstop):
+        buf = self._get_container(nrowsinbuf)
+        coords = []
+        for bstart, recarr in _table__iterPartition(
+            self, buf, pstart, pstop, start, step):
+            _numexprLock.acquire()
+            try:
+                valid = call_on_recarr(condfunc, condargs, recarr)
+            finally:
+                _numexprLock.release()
+            bcoords = numpy.arange(bstart, bstart + len(recarr) * step,
+                                   step, dtype=SizeType)
+            coords.append(bcoords[valid])
+        if coords:
+            results[npart] = numpy.concatenate(coords)
+        else:
+            results[npart] = numpy.empty(0, dtype=SizeType)
+
+    _runPartitions(scan, partitions)
+    coords = numpy.concatenate(results)
+    if stats is not None:
+        stats._addScan(time() - tscan, len(coords), 0)
+    if profile: show_stats("Exiting table_whereParallel", tref)
+    return coords
+
+
+def _table__aggregate(self, aggregator, exprvars, keycols, rdtype,
+                      condition, start, stop, step, parallel):
+    """Aggregate the rows in a range, optionally filtered by a condition.
+
+    The rows are accounted for in the `aggregator`, whose expressions
+    are evaluated with the variables in `exprvars`, and `keycols` are
+    the path names of the columns to group by (or `None`).  Just the
+    columns in the `rdtype` compound type are read.  `condition` is a
+    ``(function, args)`` tuple as the one used in
+    `Table._whereCondition`, or `None`.  If `parallel` is true,
+    chunk-aligned partitions of the range are aggregated in several
+    threads, each one with its own in-memory `Aggregator`.
+    """
+    chunksize = self.chunkshape[0]
+    nrowsinbuf = max(self.nrowsinbuf // chunksize, 1) * chunksize
+    if parallel:
+        partitions = _table__partitions(self, start, stop)
+    else:
+        partitions = [(start, stop)]
+    aggs = aggregator.aggs
+    deadrows = self._deadrows
+    results = [None] * len(partitions)
+
+    def scan(npart, pstart, pstop):
+        if len(partitions) == 1:
+            paggregator = aggregator
+        else:
+            paggregator = Aggregator(aggs)
+        buf = numpy.empty(shape=nrowsinbuf, dtype=rdtype)
+        for bstart, recarr in _table__iterPartition(
+            self, buf, pstart, pstop, start, step):
+            if deadrows.ndead:
+                live = deadrows.liveRange(
+                    bstart, bstart + len(recarr) * step, step)
+                recarr = recarr[live[:len(recarr)]]
+            _numexprLock.acquire()
+            try:
+                if condition is not None:
+                    valid = call_on_recarr(condition[0], condition[1], recarr)
+                    recarr = recarr[valid]
+                values = _aggregateValues(recarr, aggs, exprvars)
+            finally:
+                _numexprLock.release()
+            paggregator.update(
+                values, len(recarr), _aggregateKeys(recarr, keycols))
+        results[npart] = paggregator
+
+    if start < stop:
+        _runPartitions(scan, partitions)
+    if len(partitions) > 1:
+        for result in results:
+            aggregator.merge(result)
+
+
+def _table__groupbySorted(self, aggregator, exprvars, keycol, index, rdtype,
+                          condition, start, stop, step):
+    """Aggregate rows by key following the order of a CSI `index`.
+
+    As rows come sorted by the `keycol` column, the groups of every
+    block of rows but the last one are complete, and they are taken
+    out of the `aggregator` (which just holds the group in progress) as
+    a record array.  A list of these arrays is returned.  The meaning
+    of the other arguments is the same as in `_table__aggregate()`.
+    """
+    deadrows = self._deadrows
+    results = []
+    nrowsinbuf = self.nrowsinbuf
+    for istart in xrange(0, index.nelements, nrowsinbuf):
+        istop = min(istart + nrowsinbuf, index.nelements)
+        coords = index.readIndices(istart, istop)
+        selected = (coords >= start) & (coords < stop)
+        if step > 1:
+            selected &= (coords - start) % step == 0
+        if deadrows.ndead:
+            selected &= deadrows.live(coords)
+        if not selected.all():
+            coords = coords[selected]
+        if len(coords) == 0:
+            continue
+        recarr = self._readCoordinates(coords, None, rdtype.names)
+        if condition is not None:
+            valid = call_on_recarr(condition[0], condition[1], recarr)
+            recarr = recarr[valid]
+        aggregator.update(
+            _aggregateValues(recarr, aggregator.aggs, exprvars), len(recarr),
+            getNestedField(recarr, keycol), sortedkeys=True)
+        finished = aggregator.splitLast()
+        if finished.keys is not None:
+            results.append(finished.result([keycol]))
+    return results
+
+
+def _topkSelect(values, coords, k, largest):
+    """Get the positions of the `k` largest (or smallest) `values`.
+
+    Positions are sorted by value (in descending order if `largest`)
+    and then by their `coords`.  NaNs are taken as larger than any
+    other value.
+    """
+    if largest:
+        order = numpy.lexsort((-coords, values))[::-1]
+    else:
+        order = numpy.lexsort((coords, values))
+    return order[:k]
+
+
+def _topkBetter(values, kth, largest):
+    """Get which `values` are larger (or smaller) than the `kth` one.
+
+    NaNs are taken as larger than any other value, as in `_topkSelect()`.
+    """
+    errstate = numpy.errstate(invalid='ignore')
+    errstate.__enter__()
+    try:
+        if largest:
+            better = values > kth
+            if values.dtype.kind == 'f' and kth == kth:
+                better |= values != values
+        else:
+            better = values < kth
+            if values.dtype.kind == 'f' and kth != kth:
+                better |= values == values
+    finally:
+        errstate.__exit__()
+    return better
+
+
+def _table__topkScan(self, colpathname, k, largest, rdtype, condition):
+    """Get the rows with the `k` largest (or smallest) values by a scan.
+
+    The table is read in blocks of the columns in the `rdtype` compound
+    type, and just the values and coordinates of the best `k` rows so
+    far are kept, so the rows of a block not beating the current `k`-th
+    value are discarded right away.  `condition` is a ``(function,
+    args)`` tuple as the one used in `Table._whereCondition`, or
+    `None`.  The coordinates of the rows are returned, sorted as in
+    `_topkSelect()`.
+    """
+    chunksize = self.chunkshape[0]
+    nrowsinbuf = max(self.nrowsinbuf // chunksize, 1) * chunksize
+    buf = numpy.empty(shape=nrowsinbuf, dtype=rdtype)
+    deadrows = self._deadrows
+    bvalues = numpy.empty(0, dtype=self.coldtypes[colpathname])
+    bcoords = numpy.empty(0, dtype=SizeType)
+    for bstart, recarr in _table__iterPartition(
+        self, buf, 0, self.nrows, 0, 1):
+        coords = numpy.arange(bstart, bstart + len(recarr), dtype=SizeType)
+        selected = None
+        if deadrows.ndead:
+            selected = deadrows.liveRange(bstart, bstart + len(recarr))
+        if condition is not None:
+            valid = call_on_recarr(condition[0], condition[1], recarr)
+            if selected is None:
+                selected = valid
+            else:
+                selected &= valid
+        values = getNestedField(recarr, colpathname)
+        if len(bcoords) == k:
+            # Only values beating the current k-th one are candidates
+            # (equal values come from later rows, so they lose)
+            better = _topkBetter(values, bvalues[-1], largest)
+            if selected is None:
+                selected = better
+            else:
+                selected &= better
+        if selected is not None:
+            values, coords = values[selected], coords[selected]
+        if len(values) == 0:
+            continue
+        values = numpy.concatenate((bvalues, values))
+        coords = numpy.concatenate((bcoords, coords))
+        best = _topkSelect(values, coords, k, largest)
+        bvalues, bcoords = values[best], coords[best]
+    return bcoords
+
+
+def _table__topkSorted(self, index, k, largest, rdtype, condition):
+    """Get the rows with the `k` largest (or smallest) values by index.
+
+    Blocks of coordinates are read from the end (or the beginning) of
+    the completely sorted `index`, and reading stops as soon as `k`
+    rows have been selected and the values in the last block differ
+    from the `k`-th value.  Blocks start with about ``2*k`` elements
+    and double their size up to the number of rows in the I/O buffer,
+    so that selective conditions do not need many small reads.  The
+    meaning of the other arguments and of the returned value is the
+    same as in `_table__topkScan()`.
+    """
+    deadrows = self._deadrows
+    nelements = index.nelements
+    blocksize = min(max(2 * k, 256), self.nrowsinbuf)
+    bvalues, bcoords = [], []
+    nselected = 0
+    nread = 0
+    while nread < nelements:
+        nblock = min(blocksize, nelements - nread)
+        if largest:
+            istart, istop = nelements - nread - nblock, nelements - nread
+        else:
+            istart, istop = nread, nread + nblock
+        nread += nblock
+        blocksize = min(blocksize * 2, self.nrowsinbuf)
+        values = index.readSorted(istart, istop)
+        coords = index.readIndices(istart, istop).astype(SizeType)
+        # The boundary value for the blocks still to be read
+        if largest:
+            last = values[0]
+        else:
+            last = values[-1]
+        selected = None
+        if deadrows.ndead:
+            selected = deadrows.live(coords)
+        if condition is not None:
+            valid = numpy.zeros(len(coords), dtype=numpy.bool_)
+            if selected is None:
+                cselected = numpy.arange(len(coords))
+            else:
+                cselected = numpy.flatnonzero(selected)
+            recarr = self._readCoordinates(
+                coords[cselected], None, rdtype.names)
+            valid[cselected] = call_on_recarr(
+                condition[0], condition[1], recarr)
+            selected = valid
+        if selected is not None:
+            values, coords = values[selected], coords[selected]
+        bvalues.append(values)
+        bcoords.append(coords)
+        nselected += len(values)
+        if nselected >= k:
+            values = numpy.concatenate(bvalues)
+            coords = numpy.concatenate(bcoords)
+            best = _topkSelect(values, coords, k, largest)
+            bvalues, bcoords = [values[best]], [coords[best]]
+            nselected = len(best)
+            if values[best[-1]] != last:
+                # Rows with the k-th value can not be in later blocks
+                break
+    if not bcoords:
+        return numpy.empty(0, dtype=SizeType)
+    values = numpy.concatenate(bvalues)
+    coords = numpy.concatenate(bcoords)
+    return coords[_topkSelect(values, coords, k, largest)]
+
+
+def _aggregateValues(recarr, aggs, exprvars):
+    """Evaluate the expressions of the `aggs` on the `recarr` rows."""
+    colvars = {}
+    for var, val in exprvars.iteritems():
+        if hasattr(val, 'pathname'):  # a column
+            val = getNestedField(recarr, val.pathname)
+        colvars[var] = val
+    values = {}
+    for name, func, expr in aggs:
+        if expr is not None and expr not in values:
+            values[expr] = numexpr.evaluate(expr, local_dict=colvars)
+    return values
+
+
+def _aggregateKeys(recarr, keycols):
+    """Get the keys for grouping the `recarr` rows (or `None`)."""
+    if keycols is None:
+        return None
+    if len(keycols) == 1:
+        return getNestedField(recarr, keycols[0])
+    keys = numpy.empty(
+        len(recarr), dtype=[ ('f%d' % i, getNestedField(recarr, col).dtype)
+                             for i, col in enumerate(keycols) ])
+    for i, col in enumerate(keycols):
+        keys['f%d' % i] = getNestedField(recarr, col)
+    return keys
+
+
 def createIndexesTable(table):
     itgroup = IndexesTableG(
         table._v_parent, _indexNameOf(table),
@@ -480,6 +1100,9 @@ class Table(tableExtension.Table, Leaf):
         non-nested (`Column`) and nested (`Cols`) columns.
     coltypes
         Maps the name of a column to its PyTables data type.
+    compositeindexes
+        A list with the tuples of column path names of the composite
+        indexes of the table.
     description
         A `Description` instance reflecting the structure of the table.
     extdim
@@ -488,8 +1111,17 @@ class Table(tableExtension.Table, Leaf):
         Does this table have any indexed columns?
     indexedcolpathnames
         List of the pathnames of indexed columns in the table.
+    ndeadrows
+        The number of rows removed lazily which still take space in
+        the table (see the ``REMOVE_ROWS_LAZILY`` parameter and
+        `Table.compact()`).
     nrows
-        Current number of rows in the table.
+        Current number of rows in the table (including the rows
+        removed lazily, if any).
+    queryStats
+        A `QueryStats` instance collecting statistics about the
+        queries on this table, or `None` (the default) to disable
+        collection.
     row
         The associated `Row` instance.
     rowsize
@@ -512,6 +1144,9 @@ class Table(tableExtension.Table, Leaf):
     -------------------------
 
     * append(rows)
+    * appendColumns(columns)
+    * asyncAppender([queue_depth])
+    * compact()
     * modifyColumn([start][, stop][, step][, column][, colname])
     * modifyColumns([start][, stop][, step][, columns][, names])
     * modifyRows([start][, stop][, step][, rows])
@@ -521,24 +1156,39 @@ class Table(tableExtension.Table, Leaf):
     Public methods -- querying
     --------------------------
 
-    * getWhereList(condition[, condvars][, sort][, start][, stop][, step])
-    * readWhere(condition[, condvars][, field][, start][, stop][, step])
-    * where(condition[, condvars][, start][, stop][, step])
+    * aggregate(exprs[, condition][, condvars][, start][, stop][, step]
+                [, groupby][, parallel])
+    * groupby(keycols, aggs[, condition][, condvars][, start][, stop]
+              [, step][, tmp_dir])
+    * explainWhere(condition[, condvars][, start][, stop][, step])
+    * getWhereList(condition[, condvars][, sort][, start][, stop][, step]
+                   [, parallel][, limit])
+    * readWhere(condition[, condvars][, field][, start][, stop][, step]
+                [, parallel][, fields][, limit])
+    * topk(sortby, k[, largest][, condition][, condvars][, field])
+    * where(condition[, condvars][, start][, stop][, step][, parallel]
+            [, prefetch][, limit])
     * whereAppend(dstTable, condition[, condvars][, start][, stop][, step])
     * willQueryUseIndexing(condition[, condvars])
 
     Public methods -- other
     -----------------------
 
+    * createCompositeIndex(colpathnames)
     * flushRowsToIndex()
     * getEnum(colname)
     * reIndex()
     * reIndexDirty()
+    * removeCompositeIndex(colpathnames)
     """
 
     # Class identifier.
     _c_classId = 'TABLE'
 
+    queryStats = None
+    """A `QueryStats` instance collecting statistics about the queries
+    on this table (disabled when `None`)."""
+
 
     # Properties
     # ~~~~~~~~~~
@@ -563,6 +1213,10 @@ class Table(tableExtension.Table, Leaf):
         lambda self: self.description._v_dtype.itemsize, None, None,
         "The size in bytes of each row in the table.")
 
+    ndeadrows = property(
+        lambda self: self._deadrows.ndead, None, None,
+        "The number of rows removed lazily (see `Table.compact()`).")
+
     # Lazy attributes
     # ```````````````
     @lazyattr
@@ -570,6 +1224,66 @@ class Table(tableExtension.Table, Leaf):
         """A buffer for doing I/O."""
         return self._get_container(self.nrowsinbuf)
 
+    @lazyattr
+    def _querycache(self):
+        """The persistent cache of query results."""
+        return QueryCache(self)
+
+    @lazyattr
+    def _readaheads(self):
+        """The `ReadAhead` instances of the iterators over the table."""
+        return weakref.WeakKeyDictionary()
+
+    @lazyattr
+    def _deadrows(self):
+        """The bitmap of the rows removed lazily."""
+        return DeadRows(self)
+
+    @lazyattr
+    def _zonemaps(self):
+        """The `ZoneMap` instances of the columns, by path name."""
+        zonemaps = {}
+        zmpathname = _zonemapPathnameOf(self)
+        if self._v_file._hasNode(zmpathname):
+            for colpathname in self.colpathnames:
+                if self._v_file._hasNode(joinPath(zmpathname, colpathname)):
+                    zonemaps[colpathname] = ZoneMap(self, colpathname)
+        return zonemaps
+
+    @lazyattr
+    def _bloomfilters(self):
+        """The `BloomFilter` instances of the columns, by path name."""
+        bloomfilters = {}
+        bfpathname = _bloomPathnameOf(self)
+        if self._v_file._hasNode(bfpathname):
+            for colpathname in self.colpathnames:
+                if self._v_file._hasNode(joinPath(bfpathname, colpathname)):
+                    bloomfilters[colpathname] = BloomFilter(self, colpathname)
+        return bloomfilters
+
+    @lazyattr
+    def _bitmapindexes(self):
+        """The `BitmapIndex` instances of the columns, by path name."""
+        bmindexes = {}
+        bmpathname = _bitmapPathnameOf(self)
+        if self._v_file._hasNode(bmpathname):
+            for colpathname in self.colpathnames:
+                if self._v_file._hasNode(joinPath(bmpathname, colpathname)):
+                    bmindexes[colpathname] = BitmapIndex(self, colpathname)
+        return bmindexes
+
+    @lazyattr
+    def _compositeindexes(self):
+        """The `CompositeIndex` instances, by tuple of column path names."""
+        cindexes = {}
+        cipathname = _compositePathnameOf(self)
+        if self._v_file._hasNode(cipathname):
+            cigroup = self._v_file._getNode(cipathname)
+            for group in cigroup._v_groups.itervalues():
+                colpathnames = tuple(group._v_attrs.COLUMNS)
+                cindexes[colpathnames] = CompositeIndex(self, colpathnames)
+        return cindexes
+
     @lazyattr
     def _v_wdflts(self):
         """The defaults for writing in recarray format."""
@@ -624,6 +1338,13 @@ class Table(tableExtension.Table, Leaf):
         None, None,
         """Whether some index in table is dirty.""")
 
+    compositeindexes = property(
+        lambda self: sorted(self._compositeindexes.keys()),
+        None, None,
+        """
+        The tuples of column path names of the composite indexes.
+        """ )
+
 
     # Other methods
     # ~~~~~~~~~~~~~
@@ -876,6 +1597,10 @@ class Table(tableExtension.Table, Leaf):
                         indexed = False  # Not a vaild index
                         oldindexes = True
                         self._listoldindexes.append(colname)
+                    elif indexobj._v_unsupported:
+                        # The index has already warned about it
+                        indexed = False
+                        self.colindexed[colname] = False
                     else:
                         # Tell the condition cache about columns with dirty
                         # indexes.
@@ -901,7 +1626,7 @@ class Table(tableExtension.Table, Leaf):
         # since their respective index objects share
         # the same number of elements.
         if self.indexed:
-            self._indexedrows = indexobj.nelements
+            self._indexedrows = indexobj.nelements - indexobj.nremoved
             self._unsaved_indexedrows = self.nrows - self._indexedrows
             # Put the autoIndex value in a cache variable
             self._autoIndex = self.autoIndex
@@ -1292,7 +2017,8 @@ class Table(tableExtension.Table, Leaf):
 
         # Extract more information from referenced columns.
         typemap = dict(zip(varnames, vartypes))  # start with normal variables
-        indexedcols, copycols = [], []
+        indexedcols, copycols, chunkstatscols = [], [], {}
+        bitmapcols = []
         for colname in colnames:
             col = condvars[colname]
 
@@ -1304,6 +2030,17 @@ class Table(tableExtension.Table, Leaf):
             if ( self._enabledIndexingInQueries  # not test in-kernel searches
                  and self.colindexed[col.pathname] and not col.index.dirty ):
                 indexedcols.append(colname)
+            # Get the comparisons usable on columns with chunk statistics.
+            if self._enabledIndexingInQueries:
+                ops = frozenset()
+                for synopsis in self._getChunkStats(col.pathname):
+                    ops = ops.union(synopsis.ops)
+                if ops:
+                    chunkstatscols[colname] = ops
+            # Get the set of columns with bitmap indexes.
+            if ( self._enabledIndexingInQueries
+                 and col.pathname in self._bitmapindexes ):
+                bitmapcols.append(colname)
 
             # Get the list of unaligned, unidimensional columns.  See
             # the comments in `numexpr.evaluate()` for the
@@ -1313,8 +2050,19 @@ class Table(tableExtension.Table, Leaf):
             if not is_cpu_amd_intel and col.pathname in self._colunaligned:
                 copycols.append(colname)
         indexedcols = frozenset(indexedcols)
+        # Get the variables of the columns of usable composite indexes.
+        compositecols = {}
+        if self._enabledIndexingInQueries:
+            colvars = dict([ (condvars[colname].pathname, colname)
+                             for colname in colnames ])
+            for key, cindex in self._compositeindexes.iteritems():
+                if not cindex.dirty:
+                    compositecols[key] = tuple([ colvars.get(colpathname)
+                                                 for colpathname in key ])
         # Now let ``compile_condition()`` do the Numexpr-related job.
-        compiled = compile_condition(condition, typemap, indexedcols, copycols)
+        compiled = compile_condition(
+            condition, typemap, indexedcols, copycols, chunkstatscols,
+            compositecols, frozenset(bitmapcols), frozenset(colnames))
 
         # Check that there actually are columns in the condition.
         if not set(compiled.parameters).intersection(set(colnames)):
@@ -1347,11 +2095,237 @@ class Table(tableExtension.Table, Leaf):
         compiled = self._compileCondition(condition, condvars)
         # Return the columns in indexed expressions
         idxcols = [condvars[var].pathname for var in compiled.index_variables]
+        idxcols.extend([ condvars[var].pathname for var, ops, lims
+                         in compiled.composite_expressions ])
+        idxcols.extend([ condvars[var].pathname for var, ops, lims
+                         in compiled.bitmap_expressions ])
         return frozenset(idxcols)
 
 
+    def explainWhere( self, condition, condvars=None,
+                      start=None, stop=None, step=None ):
+        """
+        Describe how a query for the `condition` would be executed.
+
+        The meaning of the arguments is the same as in the
+        `Table.where()` method.  The query is not run, but the indexes
+        taking part in it are looked up, so the estimates are based on
+        the actual contents of the table.  A dictionary with the
+        following keys is returned:
+
+        ``condition``
+            The `condition` string.
+        ``nrows``
+            The number of rows in the selected range.
+        ``indexed``
+            Whether the query would use indexes.
+        ``composite_index``
+            The tuple of column path names of the composite index used
+            by the query, or `None`.  In this case, the rows selected
+            by the ``composite_expressions`` (with the ``column`` path
+            name, ``ops`` and ``limits`` for every covered column) are
+            read directly, and other indexes are not used.
+        ``bitmap_expressions``
+            A list with a dictionary per sub-expression on columns with
+            bitmap indexes, holding the ``column`` path name, the
+            ``ops`` and ``limits`` of the comparison and the number of
+            ``rows`` fulfilling it.
+        ``bitmap_expression``
+            The expression combining the bitmaps of these
+            sub-expressions (``b0``, ``b1``...), or `None`.  The rows
+            selected by it are read directly if it is the whole
+            condition or no other index is usable; otherwise, it
+            further restricts the chunks selected by other indexes.
+        ``index_expressions``
+            A list with a dictionary per indexed sub-expression, holding
+            the ``column`` path name, the ``ops`` and ``limits`` of the
+            range condition, the ``kind`` and ``optlevel`` of the index,
+            the ratio of rows fulfilling it estimated from the histogram
+            of the index (``selectivity``, or `None` if unknown),
+            whether the index is ``used`` (see the
+            ``INDEX_MAX_SELECTIVITY`` parameter), the estimated number
+            of ``candidates`` (exact when ``exact`` is true, that is,
+            for full indexes; `None` if the index is not used), and the
+            number of table ``chunks`` holding them.
+        ``chunkstats``
+            Whether the query would use chunk statistics, that is, zone
+            maps or Bloom filters (only when no index is usable).
+        ``chunkstats_expressions``
+            A list with a dictionary per sub-expression on columns with
+            chunk statistics, holding the ``column`` path name, the
+            ``ops`` and ``limits`` of the range condition, the
+            ``synopses`` used (``'zonemap'`` and/or ``'bloomfilter'``)
+            and the number of table ``chunks`` that may fulfill it.
+        ``chunkmap_expression``
+            The expression combining the chunkmaps of the indexed (or
+            chunk statistics) sub-expressions (``e0``, ``e1``...), or
+            `None`.
+        ``chunks``, ``selected_chunks``, ``density``
+            The number of table chunks in the selected range, those
+            that would be read and the ratio between both.
+        ``residual``
+            The condition evaluated in-kernel over the rows read
+            (the full `condition`, or `None` if the composite or bitmap
+            indexes cover it exactly).
+        ``rows_to_scan``
+            An estimate of the number of rows that would be read.
+
+        Keep in mind that, as with `Table.willQueryUseIndexing()`,
+        the result depends on the set of indexed columns and their
+        dirtyness.
+        """
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        compiled = self._compileCondition(condition, condvars)
+        selectivities, useindexes = [], []
+        if compiled.index_expressions and not compiled.composite_expressions:
+            selectivities, useindexes = _table__chooseIndexes(
+                self, compiled, condvars)
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        if start < stop:
+            nrows = (stop - start - 1) // step + 1
+        else:
+            nrows = 0
+        chunksize = self.chunkshape[0]
+        firstchunk = start // chunksize
+        lastchunk = (stop + chunksize - 1) // chunksize
+        nchunks = max(lastchunk - firstchunk, 0)
+        plan = { 'condition': condition,
+                 'nrows': nrows,
+                 'indexed': bool( True in useindexes or
+                                  compiled.composite_expressions or
+                                  compiled.bitmap_expressions ),
+                 'composite_index': compiled.composite_index,
+                 'composite_expressions': [
+                     { 'column': condvars[var].pathname,
+                       'ops': ops,
+                       'limits': lims, }
+                     for var, ops, lims in compiled.composite_expressions ],
+                 'bitmap_expressions': [],
+                 'bitmap_expression': None,
+                 'index_expressions': [],
+                 'chunkstats': False,
+                 'chunkstats_expressions': [],
+                 'chunkmap_expression': None,
+                 'chunks': nchunks,
+                 'selected_chunks': nchunks,
+                 'density': 1.0,
+                 'residual': condition,
+                 'rows_to_scan': nrows, }
+        if nrows == 0:
+            return plan
+
+        if compiled.composite_expressions:
+            coords = _table__compositeCoords(
+                self, compiled, start, stop, step)
+            nselected = len(numpy.unique(coords // chunksize))
+            plan['selected_chunks'] = nselected
+            if nchunks > 0:
+                plan['density'] = float(nselected) / nchunks
+            if compiled.composite_exact:
+                plan['residual'] = None
+            plan['rows_to_scan'] = len(coords)
+            return plan
+
+        if compiled.bitmap_expressions:
+            for var, ops, lims in compiled.bitmap_expressions:
+                colpathname = condvars[var].pathname
+                bitmap = self._bitmapindexes[colpathname].get_bitmap(
+                    ops, lims, self.nrows)
+                bits = numpy.unpackbits(bitmap)[:self.nrows]
+                plan['bitmap_expressions'].append(
+                    { 'column': colpathname,
+                      'ops': ops,
+                      'limits': lims,
+                      'rows': int(bits[start:stop:step].sum()), } )
+            plan['bitmap_expression'] = compiled.bitmap_string
+        if ( compiled.bitmap_exact or
+             (compiled.bitmap_expressions and True not in useindexes) ):
+            coords = _table__bitmapCoords(
+                self, compiled, condvars, start, stop, step)
+            nselected = len(numpy.unique(coords // chunksize))
+            plan['selected_chunks'] = nselected
+            if nchunks > 0:
+                plan['density'] = float(nselected) / nchunks
+            if compiled.bitmap_exact:
+                plan['residual'] = None
+            plan['rows_to_scan'] = len(coords)
+            return plan
+
+        cmvars = {}
+        for i, (var, ops, lims) in enumerate(compiled.index_expressions):
+            index = condvars[var].index
+            idxexpr = { 'column': condvars[var].pathname,
+                        'ops': ops,
+                        'limits': lims,
+                        'kind': index.kind,
+                        'optlevel': index.optlevel,
+                        'selectivity': selectivities[i],
+                        'used': useindexes[i],
+                        'candidates': None,
+                        'exact': False,
+                        'chunks': nchunks, }
+            if useindexes[i]:
+                range_ = index.getLookupRange(ops, lims)
+                ncoords = index.search(range_)
+                if index.reduction == 1 and ncoords == 0:
+                    chunkmap = numpy.zeros(
+                        shape=long(math.ceil(float(self.nrows)/chunksize)),
+                        dtype="bool")
+                else:
+                    chunkmap = index.get_chunkmap()
+                idxexpr['candidates'] = ncoords * index.reduction
+                idxexpr['exact'] = index.reduction == 1
+                idxexpr['chunks'] = int(chunkmap[firstchunk:lastchunk].sum())
+            else:
+                chunkmap = numpy.ones(
+                    shape=long(math.ceil(
+                        float(index.nelements - index.nremoved) / chunksize)),
+                    dtype="bool")
+            cmvars["e%d"%i] = chunkmap
+            plan['index_expressions'].append(idxexpr)
+        if True in useindexes:
+            strexpr = compiled.string_expression
+        elif compiled.chunkstats_expressions and self._chunkStatsUsable():
+            cmvars = {}
+            plan['chunkstats'] = True
+            strexpr = compiled.chunkstats_string
+            totalchunks = (self.nrows + chunksize - 1) // chunksize
+            csexprs = compiled.chunkstats_expressions
+            for i, (var, ops, lims) in enumerate(csexprs):
+                colpathname = condvars[var].pathname
+                chunkmap = self._getChunkStatsMap(
+                    colpathname, ops, lims, totalchunks)
+                cmvars["e%d"%i] = chunkmap
+                synopses = []
+                if colpathname in self._zonemaps:
+                    synopses.append('zonemap')
+                if 'eq' in ops and colpathname in self._bloomfilters:
+                    synopses.append('bloomfilter')
+                plan['chunkstats_expressions'].append(
+                    { 'column': colpathname,
+                      'ops': ops,
+                      'limits': lims,
+                      'synopses': synopses,
+                      'chunks': int(chunkmap[firstchunk:lastchunk].sum()), } )
+        else:
+            return plan
+
+        chunkmap = numexpr.evaluate(strexpr, cmvars)
+        if True in useindexes and compiled.bitmap_expressions:
+            chunkmap &= _table__bitmapChunkmap(
+                self, compiled, condvars, len(chunkmap))
+        nselected = int(chunkmap[firstchunk:lastchunk].sum())
+        plan['chunkmap_expression'] = strexpr
+        plan['selected_chunks'] = nselected
+        if nchunks > 0:
+            plan['density'] = float(nselected) / nchunks
+        plan['rows_to_scan'] = min(nselected * chunksize, stop - start)
+        return plan
+
+
     def where( self, condition, condvars=None,
-               start=None, stop=None, step=None ):
+               start=None, stop=None, step=None, parallel=False,
+               prefetch=None, limit=None ):
         """
         Iterate over values fulfilling a `condition`.
 
@@ -1387,6 +2361,23 @@ class Table(tableExtension.Table, Leaf):
         possible.  Anyway, this method has always better performance
         than standard Python selections on the table.
 
+        If `parallel` is true and no index can be used, the table is
+        scanned by several threads (up to the ``MAX_THREADS``
+        parameter), each one reading and filtering a chunk-aligned
+        partition of the range, and the selected rows are then
+        iterated in row order.  This may pay off for large, compressed
+        tables.
+
+        If `prefetch` is true, the next I/O buffer of an in-kernel query
+        is read in a background thread while the current one is being
+        evaluated and consumed.  If it is `None`, the ``IO_PREFETCH``
+        parameter is used.
+
+        If `limit` is not `None`, the iterator stops as soon as `limit`
+        rows have been selected, without reading the rest of the table.
+        Selected rows always come in row order, so these are the first
+        `limit` rows fulfilling the `condition`.
+
         You can mix this method with standard Python selections in order
         to support even more complex queries.  It is strongly
         recommended that you pass the most restrictive condition as the
@@ -1418,17 +2409,21 @@ class Table(tableExtension.Table, Leaf):
            the table (like ``Table.append()`` or ``Table.removeRows()``)
            or unexpected errors will happen.
         """
-        return self._where(condition, condvars, start, stop, step)
+        return self._where( condition, condvars, start, stop, step,
+                            parallel, prefetch, limit )
 
 
     def _where( self, condition, condvars,
-                start=None, stop=None, step=None ):
+                start=None, stop=None, step=None, parallel=False,
+                prefetch=None, limit=None ):
         """Low-level counterpart of `self.where()`."""
         if profile: tref = time()
         if profile: show_stats("Entering table._where", tref)
+        if limit is not None and limit < 0:
+            raise ValueError("``limit`` can not be negative: %s" % limit)
         # Adjust the slice to be used.
         (start, stop, step) = self._processRangeRead(start, stop, step)
-        if start >= stop:  # empty range, reset conditions
+        if start >= stop or limit == 0:  # empty range, reset conditions
             self._useIndex = False
             self._whereCondition = None
             return iter([])
@@ -1436,11 +2431,40 @@ class Table(tableExtension.Table, Leaf):
         # Compile the condition and extract usable index conditions.
         condvars = self._requiredExprVars(condition, condvars, depth=3)
         compiled = self._compileCondition(condition, condvars)
+        if self.queryStats is not None:
+            self.queryStats.nqueries += 1
+
+        # Are indexes worth using?
+        useindexes = []
+        if compiled.index_expressions and not compiled.composite_expressions:
+            useindexes = _table__chooseIndexes(self, compiled, condvars)[1]
+            stats = self.queryStats
+            if stats is not None:
+                nskipped = useindexes.count(False)
+                stats.indexesskipped += nskipped
+                if nskipped == len(useindexes):
+                    stats.ncostscans += 1
+                elif nskipped > 0:
+                    stats.nhybrid += 1
 
         # Can we use indexes?
-        if compiled.index_expressions:
+        if compiled.composite_expressions:
+            coords = _table__whereComposite(
+                self, compiled, condvars, start, stop, step)
+            self._useIndex = False
+            self._whereCondition = None
+            return self._itersequence(coords, limit)
+        elif ( compiled.bitmap_exact or
+               (compiled.bitmap_expressions and True not in useindexes) ):
+            coords = _table__whereBitmap(
+                self, compiled, condvars, start, stop, step)
+            self._useIndex = False
+            self._whereCondition = None
+            return self._itersequence(coords, limit)
+        elif True in useindexes:
             chunkmap = _table__whereIndexed(
-                self, compiled, condition, condvars, start, stop, step)
+                self, compiled, condition, condvars, start, stop, step, limit,
+                useindexes)
             if type(chunkmap) != numpy.ndarray:
                 # If it is not a NumPy array it should be an iterator
                 # Reset conditions
@@ -1448,14 +2472,59 @@ class Table(tableExtension.Table, Leaf):
                 self._whereCondition = None
                 # ...and return the iterator
                 return chunkmap
+        elif compiled.chunkstats_expressions and self._chunkStatsUsable():
+            chunkmap = _table__whereChunkStats(self, compiled, condvars)
+            if type(chunkmap) != numpy.ndarray:
+                self._whereCondition = None
+                return chunkmap
+        elif parallel:
+            # Select the coordinates in parallel and iterate over them
+            coords = _table__whereParallel(
+                self, compiled, condvars, start, stop, step)
+            self._useIndex = False
+            self._whereCondition = None
+            return self._itersequence(coords, limit)
         else:
             chunkmap = None  # default to an in-kernel query
 
+        if prefetch is None:
+            prefetch = self._v_file.params['IO_PREFETCH']
+
         args = [condvars[param] for param in compiled.parameters]
         self._whereCondition = (compiled.function, args)
         row = tableExtension.Row(self)
         if profile: show_stats("Exiting table._where", tref)
-        return row._iter(start, stop, step, chunkmap=chunkmap)
+        return row._iter(start, stop, step, chunkmap=chunkmap,
+                         prefetch=prefetch, limit=limit)
+
+
+    def _whereParallel(self, condition, condvars, start, stop, step):
+        """
+        Get the coordinates fulfilling `condition` by a parallel scan.
+
+        `None` is returned when the `condition` can use indexes, as the
+        regular indexed query is preferred then.
+        """
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        if start >= stop:
+            return numpy.empty(0, dtype=SizeType)
+        condvars = self._requiredExprVars(condition, condvars, depth=3)
+        compiled = self._compileCondition(condition, condvars)
+        if ( compiled.index_expressions or compiled.composite_expressions or
+             compiled.bitmap_expressions ):
+            return None
+        if compiled.chunkstats_expressions and self._chunkStatsUsable():
+            return None
+        if self.queryStats is not None:
+            self.queryStats.nqueries += 1
+        return _table__whereParallel(
+            self, compiled, condvars, start, stop, step)
+
+
+    def _checkRowAlive(self, nrow):
+        """Check that row `nrow` has not been removed lazily."""
+        if self._deadrows.ndead and not self._deadrows.live([nrow])[0]:
+            raise IndexError("row %d has been removed" % nrow)
 
 
     def _checkFieldIfNumeric(self, field):
@@ -1468,7 +2537,8 @@ class Table(tableExtension.Table, Leaf):
 
 
     def readWhere( self, condition, condvars=None, field=None,
-                   start=None, stop=None, step=None ):
+                   start=None, stop=None, step=None, parallel=False,
+                   fields=None, limit=None ):
         """
         Read table data fulfilling the given `condition`.
 
@@ -1481,18 +2551,18 @@ class Table(tableExtension.Table, Leaf):
         """
         self._checkFieldIfNumeric(field)
 
-        coords = [ p.nrow for p in
-                   self._where(condition, condvars, start, stop, step) ]
-        self._whereCondition = None  # reset the conditions
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        coords = self._whereCoords(
+            condition, condvars, start, stop, step, parallel, limit)
         if len(coords) > 1:
             cstart, cstop = coords[0], coords[-1]+1
             if cstop - cstart == len(coords):
                 # Chances for monotonically increasing row values. Refine.
-                inc_seq = numpy.alltrue(
-                    numpy.arange(cstart, cstop) == numpy.array(coords))
+                inc_seq = numpy.alltrue(numpy.arange(cstart, cstop) == coords)
                 if inc_seq:
-                    return self.read(cstart, cstop, field=field)
-        return self.readCoordinates(coords, field)
+                    return self.read(cstart, cstop, field=field,
+                                     fields=fields)
+        return self.readCoordinates(coords, field, fields)
 
 
     def whereAppend( self, dstTable, condition, condvars=None,
@@ -1527,7 +2597,8 @@ class Table(tableExtension.Table, Leaf):
 
 
     def getWhereList( self, condition, condvars=None, sort=False,
-                      start=None, stop=None, step=None ):
+                      start=None, stop=None, step=None, parallel=False,
+                      limit=None ):
         """
         Get the row coordinates fulfilling the given `condition`.
 
@@ -1539,16 +2610,485 @@ class Table(tableExtension.Table, Leaf):
         `Table.where()` method.
         """
 
-        coords = [ p.nrow for p in
-                   self._where(condition, condvars, start, stop, step) ]
-        coords = numpy.array(coords, dtype=SizeType)
-        # Reset the conditions
-        self._whereCondition = None
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        coords = self._whereCoords(
+            condition, condvars, start, stop, step, parallel, limit)
         if sort:
             coords = numpy.sort(coords)
         return internal_to_flavor(coords, self.flavor)
 
 
+    def aggregate( self, exprs, condition=None, condvars=None,
+                   start=None, stop=None, step=None, groupby=None,
+                   parallel=False ):
+        """
+        Compute aggregations over the rows of the table.
+
+        `exprs` is a mapping from names to aggregations.  Every
+        aggregation is one of ``count()``, ``sum(expr)``, ``min(expr)``,
+        ``max(expr)`` or ``mean(expr)``, where `expr` is an expression
+        on columns like the ones used in conditions (e.g. ``price*qty``).
+        Its variables are looked up in `condvars` and the columns of
+        the table in the same way as in `Table.where()`.
+
+        If a `condition` is given, only the rows fulfilling it are
+        aggregated, using indexes if possible.  The meaning of the
+        `condvars`, `start`, `stop`, `step` and `parallel` arguments is
+        the same as in `Table.where()`.  Rows are read in blocks and
+        only the partial state of the aggregations is kept, so memory
+        does not depend on the number of rows, and only the columns
+        actually needed are read.
+
+        If `groupby` is `None`, a dictionary mapping the names in
+        `exprs` to their values is returned.  For an empty selection,
+        counts and sums are zero and other aggregations are `None`.
+        Sums of integer or boolean values are 64-bit integers, and sums
+        of floating point values are double precision.
+
+        Otherwise, `groupby` is the name of a column or a sequence of
+        names, and a record array with a row per distinct key (sorted
+        by key) is returned, with fields for the key columns followed by
+        fields for the aggregations (sorted by name).
+
+        Example of use::
+
+            result = table.aggregate(
+                {'total': 'sum(price*qty)', 'n': 'count()'},
+                condition='qty > 0', groupby='store')
+        """
+        return self._aggregate( exprs, groupby, condition, condvars,
+                                start, stop, step, parallel, False, None )
+
+
+    def groupby( self, keycols, aggs, condition=None, condvars=None,
+                 start=None, stop=None, step=None, tmp_dir=None ):
+        """
+        Compute aggregations over the rows of the table by key.
+
+        `keycols` is the name of a column or a sequence of names, whose
+        values are the keys for grouping rows.  `aggs` is a mapping
+        from names to aggregations, as the `exprs` argument of
+        `Table.aggregate()`.  The meaning of the `condition`,
+        `condvars`, `start`, `stop` and `step` arguments is the same as
+        in `Table.where()`.
+
+        A record array with a row per distinct key (sorted by key) is
+        returned, with fields for the key columns followed by fields
+        for the aggregations (sorted by name).
+
+        Unlike ``Table.aggregate(groupby=...)``, this method is suited
+        for a large number of groups.  If there is a single key column
+        with a completely sorted index (see `Column.createCSIndex()`),
+        rows are read following the order of the index, so every group
+        is complete when the next one starts, and just one group is
+        kept in memory (reading is faster if the table is roughly
+        sorted by the key, though).  Otherwise, rows are read in table order, and
+        the partial state of the groups is moved to a temporary file
+        in `tmp_dir` (the default directory for temporary files if
+        `None`) whenever there are more than ``GROUPBY_MAX_GROUPS``
+        groups in memory.
+        """
+        return self._aggregate( aggs, keycols, condition, condvars,
+                                start, stop, step, False, True, tmp_dir )
+
+
+    def _aggregate( self, exprs, groupby, condition, condvars,
+                    start, stop, step, parallel, spill, tmp_dir ):
+        """
+        Private part of `aggregate()` and `groupby()`.
+
+        If `spill` is true, a `SpillingAggregator` using `tmp_dir` is
+        used, as well as completely sorted indexes on the key.
+        """
+        aggs = _parseAggregates(exprs)
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        keycols = None
+        if groupby is not None:
+            if isinstance(groupby, str):
+                keycols = [groupby]
+            else:
+                keycols = list(groupby)
+            for colname in keycols:
+                if colname not in self.colpathnames:
+                    raise KeyError( "table ``%s`` does not have a column "
+                                    "named ``%s``"
+                                    % (self._v_pathname, colname) )
+                if self.coldtypes[colname].shape != ():
+                    raise TypeError( "multidimensional columns can not be "
+                                     "used for grouping: %s" % colname )
+
+        # Get the variables used by the expressions
+        exprvars = {}
+        for name, func, expr in aggs:
+            if expr is not None:
+                exprvars.update(self._requiredExprVars(expr, condvars, depth=3))
+        needed = list(keycols or [])
+        needed.extend([ val.pathname for val in exprvars.itervalues()
+                        if hasattr(val, 'pathname') ])
+
+        coords, cond = None, None
+        if condition is not None:
+            condvars = self._requiredExprVars(condition, condvars, depth=3)
+            compiled = self._compileCondition(condition, condvars)
+            if ( compiled.index_expressions or
+                 compiled.composite_expressions or
+                 compiled.bitmap_expressions or
+                 (compiled.chunkstats_expressions and
+                  self._chunkStatsUsable()) ):
+                coords = self._whereCoords(
+                    condition, condvars, start, stop, step, False)
+            else:
+                cond = ( compiled.function,
+                         [condvars[param] for param in compiled.parameters] )
+                needed.extend([ arg.pathname for arg in cond[1]
+                                if hasattr(arg, 'pathname') ])
+        if not needed:
+            # Just counting rows, but read something anyway
+            needed = [self.colpathnames[0]]
+        rdtype = self._topFieldsDtype(needed)
+
+        # Look for a completely sorted index on the key
+        index = None
+        if spill and coords is None and len(keycols) == 1:
+            column = self.cols._f_col(keycols[0])
+            if ( column.is_indexed and column.index.kind == 'full' and
+                 column.index.is_CSI and not column.index.dirty ):
+                index = column.index
+
+        if not spill:
+            aggregator = Aggregator(aggs)
+        else:
+            aggregator = SpillingAggregator(
+                aggs, self._v_file.params['GROUPBY_MAX_GROUPS'], tmp_dir)
+        results = []
+        if coords is not None:
+            # Aggregate the rows selected by indexes
+            for i in xrange(0, len(coords), self.nrowsinbuf):
+                recarr = self._readCoordinates(
+                    coords[i:i+self.nrowsinbuf], None, rdtype.names)
+                aggregator.update(
+                    _aggregateValues(recarr, aggs, exprvars), len(recarr),
+                    _aggregateKeys(recarr, keycols))
+        elif index is not None:
+            results = _table__groupbySorted(
+                self, aggregator, exprvars, keycols[0], index, rdtype, cond,
+                start, stop, step)
+        else:
+            _table__aggregate(
+                self, aggregator, exprvars, keycols, rdtype, cond,
+                start, stop, step, parallel)
+
+        if keycols is None:
+            return aggregator.result()
+        if aggregator.keys is None:
+            # No rows, but the types of the results are still needed
+            recarr = numpy.empty(0, dtype=rdtype)
+            aggregator.update(
+                _aggregateValues(recarr, aggs, exprvars), 0,
+                _aggregateKeys(recarr, keycols))
+        results.append(aggregator.result(keycols))
+        if len(results) > 1:
+            result = numpy.concatenate(results)
+        else:
+            result = results[0]
+        return internal_to_flavor(result, self.flavor)
+
+
+    def _whereCoords( self, condition, condvars, start, stop, step,
+                      parallel, limit=None ):
+        """
+        Get the coordinates fulfilling `condition`.
+
+        `condvars` must have been completed by `self._requiredExprVars()`.
+        The persistent cache of query results is used if the
+        ``QUERY_CACHE_PERSISTENT`` parameter is true.  If `limit` is not
+        `None`, only the first `limit` coordinates are got (and they
+        are not put in the cache).
+        """
+        qcache = None
+        if self._v_file.params['QUERY_CACHE_PERSISTENT']:
+            qcache = self._querycache
+            qkey = qcache.key(condition, condvars, start, stop, step)
+            coords = qcache.get(qkey)
+            if coords is not None:
+                if limit is not None:
+                    coords = coords[:limit]
+                stats = self.queryStats
+                if stats is not None:
+                    stats.nqueries += 1
+                    stats.querycachehits += 1
+                    stats.rowsselected += len(coords)
+                return coords
+            if limit is not None:
+                qcache = None
+
+        coords = None
+        compiled = self._compileCondition(condition, condvars)
+        if compiled.composite_exact or compiled.bitmap_exact:
+            # The indexes give the coordinates without reading rows
+            (start, stop, step) = self._processRangeRead(start, stop, step)
+            if self.queryStats is not None:
+                self.queryStats.nqueries += 1
+            if compiled.composite_exact:
+                coords = _table__whereComposite(
+                    self, compiled, condvars, start, stop, step)
+            else:
+                coords = _table__whereBitmap(
+                    self, compiled, condvars, start, stop, step)
+        elif parallel:
+            coords = self._whereParallel(
+                condition, condvars, start, stop, step)
+        if coords is None:
+            coords = [ p.nrow for p in self._where(
+                condition, condvars, start, stop, step, limit=limit) ]
+            coords = numpy.array(coords, dtype=SizeType)
+            # Reset the conditions
+            self._whereCondition = None
+        else:
+            if self._deadrows.ndead:
+                coords = coords[self._deadrows.live(coords)]
+            if limit is not None:
+                coords = coords[:limit]
+        if qcache is not None:
+            qcache.put(qkey, coords)
+        return coords
+
+
+    def _invalidateQueryCache(self):
+        """Remove the results in the persistent cache of queries."""
+        if self._v_file.mode != 'r':
+            self._querycache.invalidate()
+
+
+    def _getChunkStats(self, colpathname=None):
+        """
+        Get the chunk statistics (zone maps and Bloom filters).
+
+        Only the ones of the column in `colpathname` are returned if it
+        is given.
+        """
+        synopses = []
+        for mapping in (self._zonemaps, self._bloomfilters):
+            if colpathname is None:
+                synopses.extend(mapping.values())
+            elif colpathname in mapping:
+                synopses.append(mapping[colpathname])
+        return synopses
+
+
+    def _getSynopses(self):
+        """
+        Get the chunk statistics and bitmap indexes of the table.
+
+        These are the structures that are kept up to date by any
+        modification of the table.
+        """
+        return self._getChunkStats() + self._bitmapindexes.values()
+
+
+    def _getChunkStatsMap(self, colpathname, ops, limits, nchunks):
+        """
+        Get the chunkmap of a range condition on the `colpathname` column.
+
+        The chunkmaps of all the chunk statistics of the column which
+        support the comparisons in `ops` are combined.
+        """
+        chunkmap = None
+        for synopsis in self._getChunkStats(colpathname):
+            if not synopsis.ops.issuperset(ops):
+                continue
+            cmap = synopsis.get_chunkmap(ops, limits, nchunks)
+            if chunkmap is None:
+                chunkmap = cmap
+            else:
+                chunkmap &= cmap
+        return chunkmap
+
+
+    def _chunkStatsUsable(self):
+        """Can chunk statistics be used for building chunkmaps?"""
+        # The chunkmap iterator needs whole chunks in the I/O buffer
+        return self.nrowsinbuf >= self.chunkshape[0]
+
+
+    def _mayHaveNaNs(self, colpathname):
+        """
+        Can the `colpathname` column have NaNs?
+
+        Only floating point columns can, and they are known not to have
+        them only if their zone map says so.
+        """
+        if self.coldtypes[colpathname].kind != 'f':
+            return False
+        zonemap = self._zonemaps.get(colpathname)
+        if zonemap is None:
+            return True
+        nchunks = (self.nrows + self.chunkshape[0] - 1) // self.chunkshape[0]
+        return zonemap.may_have_nans(nchunks)
+
+
+    def _refreshChunkStats(self, start, stop, synopses=None):
+        """
+        Recompute chunk statistics for the chunks of rows in
+        ``[start, stop)``.
+
+        Statistics for chunks after the end of the table are dropped.
+        Bitmap indexes are refreshed too.  If `synopses` is given, only
+        these `ZoneMap`, `BloomFilter` or `BitmapIndex` instances are
+        refreshed.
+        """
+        if synopses is None:
+            synopses = self._getSynopses()
+        if not synopses:
+            return
+        nrows = self.nrows
+        chunksize = self.chunkshape[0]
+        stop = min(((stop + chunksize - 1) // chunksize) * chunksize, nrows)
+        bufsize = max(self.nrowsinbuf // chunksize, 1) * chunksize
+        for bstart in xrange((start // chunksize) * chunksize, stop, bufsize):
+            bstop = min(bstart + bufsize, stop)
+            for synopsis in synopses:
+                values = self._read(bstart, bstop, 1,
+                                    field=synopsis.colpathname)
+                synopsis.refresh(bstart // chunksize, values)
+        nchunks = (nrows + chunksize - 1) // chunksize
+        for synopsis in synopses:
+            synopsis.truncate(nchunks)
+
+
+    def _refreshChunkStatsAt(self, coords):
+        """Recompute chunk statistics for the chunks of rows in `coords`."""
+        if not self._getSynopses() or len(coords) == 0:
+            return
+        chunksize = self.chunkshape[0]
+        nchunks = numpy.unique(numpy.asarray(coords) // chunksize)
+        # Refresh runs of consecutive chunks at once
+        bounds = numpy.where(numpy.diff(nchunks) > 1)[0] + 1
+        for run in numpy.split(nchunks, bounds):
+            self._refreshChunkStats(run[0] * chunksize,
+                                    (run[-1] + 1) * chunksize)
+
+
+    def getWhereListIn(self, colname, values, grouped=False):
+        """
+        Get the row coordinates where the `colname` column is in `values`.
+
+        This is equivalent to getting the coordinates for the
+        ``colname == value`` condition for every value in `values`, but
+        much faster.  If the column has a usable index, all the values
+        are looked up in a single pass over it (see
+        `Index.searchMany()`).  Otherwise, the column is scanned just
+        once.  Values which can not be represented in the type of the
+        column never match.
+
+        The coordinates are returned in ascending order as an array of
+        the current flavor.  If `grouped` is true, a list with the
+        coordinates of the rows matching every value in `values` is
+        returned instead (in the same order than `values`).
+        """
+        keys, groups, positions = self._whereListIn(colname, values)
+        if grouped:
+            result = []
+            for pos in positions:
+                if pos >= 0:
+                    coords = groups[pos]
+                else:
+                    coords = numpy.empty(0, dtype=SizeType)
+                result.append(internal_to_flavor(coords, self.flavor))
+            return result
+        if groups:
+            coords = numpy.sort(numpy.concatenate(groups))
+        else:
+            coords = numpy.empty(0, dtype=SizeType)
+        return internal_to_flavor(coords, self.flavor)
+
+
+    def readWhereIn(self, colname, values, field=None, fields=None):
+        """
+        Read the rows where the `colname` column is in `values`.
+
+        Rows are returned in ascending order of their coordinates.  See
+        `Table.getWhereListIn()` for details on how rows are selected
+        and `Table.read()` for the meaning of `field` and `fields`.
+        """
+        self._checkFieldIfNumeric(field)
+        keys, groups, positions = self._whereListIn(colname, values)
+        if groups:
+            coords = numpy.sort(numpy.concatenate(groups))
+        else:
+            coords = numpy.empty(0, dtype=SizeType)
+        return self.readCoordinates(coords, field, fields)
+
+
+    def _whereListIn(self, colname, values):
+        """
+        Get the coordinates of rows where `colname` is in `values`.
+
+        Return the sorted unique keys looked up, a list with the
+        coordinates for every key and, for every value in `values`, the
+        position of its key (or -1 if the value can not be represented
+        in the type of the column).
+        """
+        column = self.cols._f_col(colname)
+        if column.dtype.shape != ():
+            raise TypeError("only scalar columns are supported: %s"
+                            % column.pathname)
+        values = numpy.asarray(values).ravel()
+        keys = values.astype(column.dtype)
+        exact = (keys == values)
+        ukeys = numpy.unique(keys[exact])
+        positions = ukeys.searchsorted(keys)
+        positions[~exact] = -1
+        if len(ukeys) == 0:
+            return ukeys, [], positions
+        if ( self._enabledIndexingInQueries
+             and self.colindexed[column.pathname]
+             and not column.index.dirty ):
+            groups = column.index.searchMany(ukeys)
+        else:
+            coords, owners = self._scanItems(column.pathname, ukeys, ukeys)
+            groups = groupCoords(coords, owners, len(ukeys))
+        if self._deadrows.ndead:
+            groups = [ coords[self._deadrows.live(coords)]
+                       for coords in groups ]
+        return ukeys, groups, positions
+
+
+    def _scanItems(self, colname, los, his, chunkmap=None):
+        """
+        Scan the `colname` column looking for values in some item.
+
+        `los` and `his` are the inclusive limits of sorted items that
+        do not overlap (see `idxutils.matchItems()`).  If a `chunkmap`
+        is given, only the chunks with a true value in it are scanned.
+        Return the coordinates of the matching rows and the number of
+        the item they fall in.
+        """
+        nrows = self.nrows
+        nrowsinbuf = self.nrowsinbuf
+        if chunkmap is None:
+            spans = [(0, nrows)]
+        else:
+            # Read runs of consecutive chunks at a time
+            nrowsinchunk = self.chunkshape[0]
+            chunks = chunkmap.nonzero()[0]
+            breaks = (numpy.diff(chunks) != 1).nonzero()[0] + 1
+            spans = [ (run[0]*nrowsinchunk,
+                       min((run[-1]+1)*nrowsinchunk, nrows))
+                      for run in numpy.split(chunks, breaks) if len(run) ]
+        coords, owners = [], []
+        for start, stop in spans:
+            for bstart in xrange(start, stop, nrowsinbuf):
+                bstop = min(bstart + nrowsinbuf, stop)
+                values = self._read(bstart, bstop, 1, colname)
+                rows, items = matchItems(values, los, his)
+                coords.append(rows.astype(SizeType) + bstart)
+                owners.append(items)
+        if coords:
+            return numpy.concatenate(coords), numpy.concatenate(owners)
+        return numpy.empty(0, dtype=SizeType), numpy.empty(0, dtype='int_')
+
+
     def itersequence(self, sequence):
         """
         Iterate over a `sequence` of row coordinates.
@@ -1560,6 +3100,17 @@ class Table(tableExtension.Table, Leaf):
         if not hasattr(sequence, '__getitem__'):
             raise TypeError("""\
 Wrong 'sequence' parameter type. Only sequences are suported.""")
+        self._drainAppender()
+        return self._itersequence(sequence)
+
+
+    def _itersequence(self, sequence, limit=None):
+        """
+        Private part of `itersequence()`.
+
+        If `limit` is not `None`, the iterator stops after returning
+        `limit` rows.
+        """
         # start, stop and step are necessary for the new iterator for
         # coordinates, and perhaps it would be useful to add them as
         # parameters in the future (not now, because I've just removed
@@ -1574,7 +3125,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         if (start > stop) or (len(sequence) == 0):
             return iter([])
         row = tableExtension.Row(self)
-        return row._iter(start, stop, step, coords=sequence)
+        return row._iter(start, stop, step, coords=sequence, limit=limit)
 
 
     def _check_sortby_CSI(self, sortby, checkCSI):
@@ -1587,6 +3138,12 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
                 "`sortby` can only be a `Column` or string object, "
                 "but you passed an object of type: %s" % type(sortby))
         if icol.is_indexed and icol.index.kind == "full":
+            if icol.index.ndeltas > 0:
+                # Pending changes must be in the sorted arrays
+                self._v_file._checkWritable()
+                if not self._foldIndexDeltas(icol.pathname, force=True):
+                    icol.index.dirty = True
+                    self._doReIndex(dirty=True)
             if checkCSI and not icol.index.is_CSI:
                 # The index exists, but it is not a CSI one.
                 raise ValueError(
@@ -1653,7 +3210,96 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         return self.readCoordinates(coords, field)
 
 
-    def iterrows(self, start=None, stop=None, step=None):
+    def topk( self, sortby, k, largest=True, condition=None,
+              condvars=None, field=None ):
+        """
+        Read the rows with the `k` largest values of the `sortby` column.
+
+        `sortby` is a `Column` or the name of a column.  If `largest`
+        is false, the rows with the `k` smallest values are read
+        instead.  Rows are returned sorted by the `sortby` column (in
+        descending order if `largest` is true), and rows with equal
+        values are sorted by row number.  Fewer than `k` rows are
+        returned if there are not enough.
+
+        If a `condition` is given, only the rows fulfilling it are
+        considered.  The meaning of the `condvars` and `field` arguments
+        is the same as in `Table.readWhere()`.
+
+        NaNs are taken as larger than any other value, as in NumPy
+        sorts.
+
+        If the column has a completely sorted index (see
+        `Column.createCSIndex()`) and the `condition` can not use other
+        indexes, the rows are taken from the end (or the beginning) of
+        the index, so just a few blocks of it are usually read.
+        Otherwise, the table is scanned and only the best `k` rows so
+        far are kept in memory.  Since indexes are not sorted around
+        NaNs, the index of a floating point column is only used if the
+        zone map of the column (see `Column.createZoneMap()`) shows
+        that it has no NaNs.
+
+        Example of use::
+
+            latest = table.topk('timestamp', 100, condition='level > 2')
+        """
+        self._checkFieldIfNumeric(field)
+        if isinstance(sortby, Column):
+            colpathname = sortby.pathname
+        else:
+            colpathname = sortby
+        if colpathname not in self.colpathnames:
+            raise KeyError( "table ``%s`` does not have a column named "
+                            "``%s``" % (self._v_pathname, colpathname) )
+        if self.coldtypes[colpathname].shape != ():
+            raise TypeError( "multidimensional columns can not be used "
+                             "for sorting: %s" % colpathname )
+        if k < 0:
+            raise ValueError("``k`` can not be negative: %s" % k)
+
+        needed = [colpathname]
+        coords, cond = None, None
+        if condition is not None:
+            condvars = self._requiredExprVars(condition, condvars, depth=2)
+            compiled = self._compileCondition(condition, condvars)
+            if ( compiled.index_expressions or
+                 compiled.composite_expressions or
+                 compiled.bitmap_expressions or
+                 (compiled.chunkstats_expressions and
+                  self._chunkStatsUsable()) ):
+                coords = self._whereCoords(
+                    condition, condvars, None, None, None, False)
+            else:
+                cond = ( compiled.function,
+                         [condvars[param] for param in compiled.parameters] )
+                needed.extend([ arg.pathname for arg in cond[1]
+                                if hasattr(arg, 'pathname') ])
+        rdtype = self._topFieldsDtype(needed)
+
+        column = self.cols._f_col(colpathname)
+        index = None
+        if ( column.is_indexed and column.index.kind == 'full' and
+             column.index.is_CSI and not column.index.dirty and
+             column.index.nelements == self.nrows and
+             not self._mayHaveNaNs(colpathname) ):
+            index = column.index
+
+        if k == 0:
+            coords = numpy.empty(0, dtype=SizeType)
+        elif coords is not None:
+            # Select among the rows got from other indexes
+            values = self._readCoordinates(coords, colpathname)
+            coords = coords[_topkSelect(values, coords, k, largest)]
+        elif index is not None:
+            coords = _table__topkSorted(self, index, k, largest, rdtype, cond)
+        else:
+            coords = _table__topkScan(
+                self, colpathname, k, largest, rdtype, cond)
+        return self.readCoordinates(coords, field)
+
+
+    def iterrows( self, start=None, stop=None, step=None, prefetch=None,
+                  fields=None ):
         """
         Iterate over the table using a `Row` instance.
 
@@ -1664,6 +3310,16 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         `stop` and `step` parameters, which have the same meaning as in
         `Table.read()`.
 
+        If `prefetch` is true, the next I/O buffer is read in a
+        background thread while the current one is being consumed,
+        overlapping I/O and decompression with the processing of rows.
+        If it is `None`, the ``IO_PREFETCH`` parameter is used.
+
+        If `fields` is a sequence of column names, only the top-level
+        columns holding them are read, and only these can be accessed
+        through the returned `Row` (which cannot be used for updating
+        rows in this case).
+
         Example of use::
 
             result = [ row['var2'] for row in table.iterrows(step=5)
@@ -1678,9 +3334,14 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
            unexpected errors will happen.
         """
         (start, stop, step) = self._processRangeRead(start, stop, step)
+        if prefetch is None:
+            prefetch = self._v_file.params['IO_PREFETCH']
+        if fields is not None:
+            fields = self._topFieldsDtype(self._fieldsDtype(fields).names)
         if start < stop:
             row = tableExtension.Row(self)
-            return row._iter(start, stop, step)
+            return row._iter(start, stop, step, prefetch=prefetch,
+                             fields=fields)
         # Fall-back action is to return an empty iterator
         return iter([])
 
@@ -1697,75 +3358,271 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
             result = [ row['var2'] for row in table
                        if row['var1'] <= 20 ]
 
-        Which is equivalent to::
+        Which is equivalent to::
+
+            result = [ row['var2'] for row in table.iterrows()
+                       if row['var1'] <= 20 ]
+
+        .. Note:: This iterator can be nested (see `Table.where()` for
+           an example).
+        """
+        return self.iterrows()
+
+
+    def iterblocks( self, start=None, stop=None, step=None, fields=None,
+                    blocksize=None, copy=True ):
+        """
+        Iterate over the table in blocks of rows.
+
+        This method yields in-memory objects (of the current flavor)
+        holding up to `blocksize` rows each, which defaults to the
+        number of rows in the I/O buffer of the table.  Working on whole
+        blocks avoids the overhead of handling one `Row` per record.
+        The meaning of the `start`, `stop` and `step` parameters is the
+        same as in `Table.read()`.
+
+        If `fields` is `None`, blocks are record arrays with all the
+        fields in the table.  If it is a string, blocks only contain
+        the values of the field with that name.  If it is a sequence of
+        names, blocks are record arrays with just those fields.
+
+        If `copy` is false and `step` is 1, the yielded blocks are views
+        of an internal buffer whenever possible, and they are
+        overwritten in the next iteration.  Use this only when each
+        block is completely processed before asking for the next one.
+
+        Example of use::
+
+            total = 0
+            for var1 in table.iterblocks(fields='var1'):
+                total += var1.sum()
+        """
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        blocksize = self._checkBlocksize(blocksize)
+        if fields is not None and not isinstance(fields, str):
+            fields = self._fieldsDtype(fields)
+        return self._iterblocks(
+            start, stop, step, fields, blocksize, copy, None)
+
+
+    def whereblocks( self, condition, condvars=None,
+                     start=None, stop=None, step=None, fields=None,
+                     blocksize=None ):
+        """
+        Iterate over blocks of rows fulfilling a `condition`.
+
+        This is the block counterpart of `Table.where()`: the rows
+        fulfilling the `condition` are yielded as in-memory objects of
+        up to `blocksize` rows each.  The meaning of the `condition`,
+        `condvars`, `start`, `stop` and `step` arguments is the same as
+        in `Table.where()`, while `fields` and `blocksize` have the
+        same meaning as in `Table.iterblocks()`.  Blocks with no
+        selected rows are not yielded.
+        """
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        blocksize = self._checkBlocksize(blocksize)
+        if fields is not None and not isinstance(fields, str):
+            fields = self._fieldsDtype(fields)
+        if start >= stop:
+            return iter([])
+
+        # Compile the condition and extract usable index conditions.
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        compiled = self._compileCondition(condition, condvars)
+        if ( compiled.index_expressions or compiled.composite_expressions or
+             compiled.bitmap_expressions ):
+            # Get the selected coordinates from indexes and read them
+            coords = [ p.nrow for p in
+                       self._where(condition, condvars, start, stop, step) ]
+            self._whereCondition = None  # reset the conditions
+            return self._itercoordblocks(
+                numpy.array(coords, dtype=SizeType), fields, blocksize)
+        args = [condvars[param] for param in compiled.parameters]
+        return self._iterblocks(
+            start, stop, step, fields, blocksize, True,
+            (compiled.function, args))
+
+
+    def _checkBlocksize(self, blocksize):
+        """Check the `blocksize` for block iterators, or get a default."""
+        if blocksize is None:
+            return self.nrowsinbuf
+        if blocksize < 1:
+            raise ValueError("``blocksize`` must be a positive integer")
+        return blocksize
+
+
+    def _fieldsDtype(self, fields):
+        """Get a compound dtype with just the given `fields`."""
+        descr = []
+        for field in fields:
+            dtype = self._v_dtype
+            try:
+                for name in field.split('/'):
+                    dtype = dtype[name]
+            except KeyError:
+                raise KeyError( "Field %s not found in table %s"
+                                % (field, self) )
+            descr.append((field, dtype))
+        return numpy.dtype(descr)
+
+
+    def _topFieldsDtype(self, fields):
+        """Get a compound dtype with the top-level columns of `fields`.
+
+        Only these columns need to be read from disk for getting the
+        given `fields`.
+        """
+        descr, tops = [], []
+        for field in fields:
+            top = field.split('/')[0]
+            if top not in tops:
+                tops.append(top)
+                descr.append((top, self._v_dtype[top]))
+        return numpy.dtype(descr)
+
+
+    def _selectFields(self, recarr, fields, copy=True):
+        """Get the `fields` (a name or a dtype) from the `recarr` rows."""
+        if fields is None:
+            if copy:
+                recarr = recarr.copy()
+            return recarr
+        if isinstance(fields, str):
+            result = getNestedField(recarr, fields)
+            if copy:
+                result = result.copy()
+            return result
+        result = numpy.empty(shape=len(recarr), dtype=fields)
+        for field in fields.names:
+            result[field] = getNestedField(recarr, field)
+        return result
+
 
-            result = [ row['var2'] for row in table.iterrows()
-                       if row['var1'] <= 20 ]
+    def _iterblocks(self, start, stop, step, fields, blocksize, copy,
+                    condition):
+        """Iterate over blocks, filtering them with `condition` if given.
 
-        .. Note:: This iterator can be nested (see `Table.where()` for
-           an example).
+        `condition` is a ``(function, args)`` tuple as the one used in
+        `Table._whereCondition`.
         """
-        return self.iterrows()
+        # Only read the columns needed for the fields and the condition
+        rdtype = self._v_dtype
+        if fields is not None:
+            if isinstance(fields, str):
+                needed = [fields]
+            else:
+                needed = list(fields.names)
+            if condition is not None:
+                needed.extend([ arg.pathname for arg in condition[1]
+                                if hasattr(arg, 'pathname') ])
+            rdtype = self._topFieldsDtype(needed)
+        if step == 1:
+            buf = numpy.empty(shape=blocksize, dtype=rdtype)
+        deadrows = self._deadrows
+        for bstart in xrange(start, stop, blocksize*step):
+            bstop = min(bstart + blocksize*step, stop)
+            if step == 1:
+                nrecords = self._read_records(bstart, bstop-bstart, buf)
+                block, private = buf[:nrecords], False
+            else:
+                block = self._readFields(bstart, bstop, step, rdtype)
+                private = True
+            if deadrows.ndead:
+                live = deadrows.liveRange(bstart, bstop, step)[:len(block)]
+                block, private = block[live], True
+                if len(block) == 0:
+                    continue
+            if condition is not None:
+                valid = call_on_recarr(condition[0], condition[1], block)
+                block, private = block[valid], True
+                if len(block) == 0:
+                    continue
+            block = self._selectFields(block, fields, copy and not private)
+            if self.flavor != internal_flavor:
+                block = internal_to_flavor(block, self.flavor)
+            yield block
+
+
+    def _itercoordblocks(self, coords, fields, blocksize):
+        """Iterate over the rows in `coords` in blocks."""
+        for i in xrange(0, len(coords), blocksize):
+            block = self._readCoordinates(coords[i:i+blocksize])
+            block = self._selectFields(block, fields, False)
+            if self.flavor != internal_flavor:
+                block = internal_to_flavor(block, self.flavor)
+            yield block
+
+
+    def _readFields(self, start, stop, step, dtype):
+        """Read a range of rows with just the fields in `dtype`.
+
+        Only the top-level columns holding these fields are read from
+        disk, and HDF5 neither converts nor copies the other ones.
+        """
+        rdtype = self._topFieldsDtype(dtype.names)
+        nrows = 0
+        if start < stop:
+            nrows = lrange(start, stop, step).length
+        result = numpy.empty(shape=nrows, dtype=rdtype)
+
+        if nrows == 0:
+            pass
+        elif step == 1:
+            self._read_records(start, nrows, result)
+        elif step >= self.nrowsinbuf:
+            # Rows are far apart, so read them by point selection
+            coords = numpy.arange(start, stop, step, dtype=SizeType)
+            self._read_elements(coords, result)
+        else:
+            # Read buffers of contiguous rows and pick the wanted ones
+            buf = numpy.empty(shape=self.nrowsinbuf, dtype=rdtype)
+            bufsize = (self.nrowsinbuf // step) * step
+            nrow = 0
+            for bstart in xrange(start, stop, bufsize):
+                nrecords = self._read_records(
+                    bstart, min(bufsize, stop-bstart), buf)
+                rows = buf[:nrecords:step]
+                result[nrow:nrow+len(rows)] = rows
+                nrow += len(rows)
+
+        if rdtype != dtype:
+            result = self._selectFields(result, dtype)
+        return result
 
 
-    def _read(self, start, stop, step, field=None):
+    def _read(self, start, stop, step, field=None, fields=None):
         """Read a range of rows and return an in-memory object.
         """
 
-        select_field = None
+        if fields is not None:
+            return self._readFields(
+                start, stop, step, self._fieldsDtype(fields))
         if field:
-            if field not in self.coldtypes:
-                if field in self.description._v_names:
-                    # Remember to select this field
-                    select_field = field
-                    field = None
-                else:
-                    raise KeyError, "Field %s not found in table %s" % \
-                          (field, self)
-            else:
-                # The column hangs directly from the top
-                dtypeField = self.coldtypes[field]
-                typeField = self.coltypes[field]
+            # Only read the column holding this field from disk
+            result = self._readFields(
+                start, stop, step, self._fieldsDtype([field]))
+            return result[field]
 
         # Return a rank-0 array if start > stop
         if start >= stop:
-            if field == None:
-                nra = self._get_container(0)
-                return nra
-            return numpy.empty(shape=0, dtype=dtypeField)
+            return self._get_container(0)
 
         nrows = lrange(start, stop, step).length
-
-        # Compute the shape of the resulting column object
-        if field:
-            # Create a container for the results
-            result = numpy.empty(shape=nrows, dtype=dtypeField)
-        else:
-            # Recarray case
-            result = self._get_container(nrows)
+        result = self._get_container(nrows)
 
         # Call the routine to fill-up the resulting array
-        if step == 1 and not field:
+        if step == 1:
             # This optimization works three times faster than
             # the row._fillCol method (up to 170 MB/s on a pentium IV @ 2GHz)
             self._read_records(start, stop-start, result)
-        # Warning!: _read_field_name should not be used until
-        # H5TBread_fields_name in tableExtension will be finished
-        # F. Alted 2005/05/26
-        # XYX Ho implementem per a PyTables 2.0??
-        elif field and step > 15 and 0:
-            # For step>15, this seems to work always faster than row._fillCol.
-            self._read_field_name(result, start, stop, step, field)
-        else:
-            self.row._fillCol(result, start, stop, step, field)
-
-        if select_field:
-            return result[select_field]
         else:
-            return result
+            self.row._fillCol(result, start, stop, step, None)
+        return result
 
 
-    def read(self, start=None, stop=None, step=None, field=None):
+    def read(self, start=None, stop=None, step=None, field=None,
+             fields=None):
         """
         Get data in the table as a (record) array.
 
@@ -1786,8 +3643,18 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         Columns under a nested column can be specified in the `field`
         parameter by using a slash character (``/``) as a separator
         (e.g. ``'position/x'``).
+
+        If `fields` is supplied, it must be a sequence of column names
+        (which can also use slashes) and a record array with only these
+        columns, in the given order, is returned.  The other columns
+        are not even read from disk, which is much faster for tables
+        with many columns.  `field` and `fields` cannot be used at the
+        same time.
         """
 
+        if field and fields is not None:
+            raise ValueError(
+                "``field`` and ``fields`` can not be used at the same time")
         if field:
             self._checkColumn(field)
         else:
@@ -1795,16 +3662,83 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
 
         (start, stop, step) = self._processRangeRead(start, stop, step)
 
-        arr = self._read(start, stop, step, field)
+        arr = self._read(start, stop, step, field, fields)
+        if self._deadrows.ndead:
+            # Skip the rows removed lazily
+            arr = arr[self._deadrows.liveRange(start, stop, step)]
         return internal_to_flavor(arr, self.flavor)
 
 
-    def _readCoordinates(self, coords, field=None):
+    def _readElements(self, coords, result):
+        """
+        Read the rows at `coords` into the `result` array.
+
+        `coords` must be a contiguous array of ``SizeType``.  Unless
+        the rows are too sparse (see ``COORDS_CHUNK_SPARSITY``), the
+        coordinates are sorted and grouped by chunk, every touched
+        chunk is read (and decompressed) just once, and rows are
+        scattered back in the requested order.  Otherwise, an HDF5
+        point selection is used.  The number of rows read is returned.
+        """
+        ncoords = len(coords)
+        sparsity = self._v_file.params['COORDS_CHUNK_SPARSITY']
+        if ncoords < 2 or sparsity <= 0:
+            return self._read_elements(coords, result)
+        # Point selections may come as an ``(ncoords, 1)`` array
+        coords = coords.ravel()
+        order, scoords = None, coords
+        if (coords[1:] < coords[:-1]).any():
+            order = numpy.argsort(coords, kind='mergesort')
+            scoords = coords[order]
+        if scoords[-1] >= self.nrows:
+            # Let HDF5 complain about the wrong coordinates
+            return self._read_elements(coords, result)
+        # Get the touched chunks and the first coordinate in each one
+        chunksize = self.chunkshape[0]
+        cchunks = scoords // chunksize
+        firsts = numpy.flatnonzero(numpy.concatenate(
+            ([True], cchunks[1:] != cchunks[:-1])))
+        chunks = cchunks[firsts]
+        if ( self.filters.complevel == 0
+             and len(chunks) * chunksize > sparsity * ncoords ):
+            return self._read_elements(coords, result)
+
+        # Split runs of consecutive chunks in blocks fitting a buffer
+        bufchunks = max(self.nrowsinbuf // chunksize, 1)
+        newrun = numpy.empty(len(chunks), dtype=numpy.bool_)
+        newrun[0] = True
+        newrun[1:] = numpy.diff(chunks) != 1
+        runstarts = numpy.flatnonzero(newrun)
+        runpos = numpy.arange(len(chunks)) - runstarts[newrun.cumsum() - 1]
+        blocks = numpy.flatnonzero(runpos % bufchunks == 0)
+        bounds = numpy.append(blocks, len(chunks))
+        firsts = numpy.append(firsts, ncoords)
+
+        buf = numpy.empty(shape=bufchunks * chunksize, dtype=result.dtype)
+        for i, j in zip(bounds[:-1], bounds[1:]):
+            bstart = chunks[i] * chunksize
+            self._read_records(bstart, (chunks[j-1] + 1) * chunksize - bstart,
+                               buf)
+            lo, hi = firsts[i], firsts[j]
+            rows = buf[(scoords[lo:hi] - bstart).astype(numpy.intp)]
+            if order is None:
+                result[lo:hi] = rows
+            else:
+                result[order[lo:hi]] = rows
+        return ncoords
+
+
+    def _readCoordinates(self, coords, field=None, fields=None):
         """Private part of `readCoordinates()` with no flavor conversion."""
 
         ncoords = len(coords)
+        if fields is not None:
+            # Only read the columns needed for the `fields`
+            dtype = self._fieldsDtype(fields)
+            result = numpy.empty(
+                shape=ncoords, dtype=self._topFieldsDtype(fields))
         # Create a read buffer only if needed
-        if field is None or ncoords > 0:
+        elif field is None or ncoords > 0:
             # Doing a copy is faster when ncoords is small (<1000)
             if ncoords < min(1000, self.nrowsinbuf):
                 result = self._v_iobuf[:ncoords].copy()
@@ -1820,10 +3754,13 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
                     coords.flags.aligned):
                 # Get a contiguous and aligned coordinate array
                 coords = numpy.array(coords, dtype=SizeType)
-            self._read_elements(coords, result)
+            self._readElements(coords, result)
 
         # Do the final conversions, if needed
-        if field:
+        if fields is not None:
+            if result.dtype != dtype:
+                result = self._selectFields(result, dtype)
+        elif field:
             if ncoords > 0:
                 result = getNestedField(result, field)
             else:
@@ -1832,7 +3769,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         return result
 
 
-    def readCoordinates(self, coords, field=None):
+    def readCoordinates(self, coords, field=None, fields=None):
         """
         Get a set of rows given their indexes as a (record) array.
 
@@ -1843,8 +3780,16 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         The selected rows are returned in an array or record array of
         the current flavor.
         """
+        if field and fields is not None:
+            raise ValueError(
+                "``field`` and ``fields`` can not be used at the same time")
         self._checkFieldIfNumeric(field)
-        result = self._readCoordinates(coords, field)
+        self._drainAppender()
+        if self._deadrows.ndead:
+            # Skip the rows removed lazily
+            coords = numpy.asarray(coords, dtype=SizeType)
+            coords = coords[self._deadrows.live(coords)]
+        result = self._readCoordinates(coords, field, fields)
         return internal_to_flavor(result, self.flavor)
 
 
@@ -1926,6 +3871,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         `read()` or `readCoordinates()` methods.
         """
 
+        self._drainAppender()
         if is_idx(key):
             # Index out of range protection
             if key >= self.nrows:
@@ -1934,6 +3880,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
                 # To support negative values
                 key += self.nrows
             (start, stop, step) = self._processRange(key, key+1, 1)
+            self._checkRowAlive(start)
             return self.read(start, stop, step)[0]
         elif isinstance(key, slice):
             (start, stop, step) = self._processRange(
@@ -1942,6 +3889,10 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         # Try with a boolean or point selection
         elif type(key) in (list, tuple) or isinstance(key, numpy.ndarray):
             coords = self._pointSelection(key)
+            if self._deadrows.ndead:
+                # Skip the rows removed lazily
+                coords = coords.ravel()
+                coords = coords[self._deadrows.live(coords)]
             return self._readCoordinates(coords, None)
         else:
             raise IndexError("Invalid index or slice: %r" % (key,))
@@ -1992,6 +3943,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
 
         self._v_file._checkWritable()
 
+        self._drainAppender()
         if is_idx(key):
             # Index out of range protection
             if key >= self.nrows:
@@ -2012,10 +3964,28 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
 
 
     def _saveBufferedRows(self, wbufRA, lenrows):
-        """Update the indexes after a flushing of rows"""
+        """Save `lenrows` rows from `wbufRA` at the end of the table."""
+        appender = self._asyncAppender
+        if appender is not None:
+            # The buffer may be reused by the caller before it is written
+            appender._put(self._writeBufferedRows,
+                          wbufRA[:lenrows].copy(), lenrows)
+        else:
+            self._writeBufferedRows(wbufRA, lenrows)
+
+
+    def _writeBufferedRows(self, wbufRA, lenrows):
+        """Write rows and update the indexes after a flushing of rows"""
+        # Update chunk statistics before the types of rows are converted
+        for synopsis in self._getSynopses():
+            synopsis.append(
+                self.nrows,
+                getNestedField(wbufRA, synopsis.colpathname)[:lenrows])
         self._open_append(wbufRA)
         self._append_records(lenrows)
         self._close_append()
+        # Composite indexes are not updated incrementally
+        self._markCompositeIndexesAsDirty(self.colpathnames)
         if self.indexed:
             self._unsaved_indexedrows += lenrows
             # The table caches for indexed queries are dirty now
@@ -2082,6 +4052,120 @@ You cannot append rows to a non-chunked table.""")
             self._saveBufferedRows(wbufRA, lenrows)
 
 
+    def appendColumns(self, columns):
+        """
+        Append rows to the end of the table from separate columns.
+
+        `columns` is a mapping from column path names (like ``'x'`` or
+        ``'info/value'``) to sequences with the values of the column
+        for the new rows, all of them having the same length.  This is
+        handy when data is already kept in an array per column, since
+        they are not interleaved into a record array first: the values
+        of each column are copied directly into the I/O buffer of the
+        table, which is written every ``nrowsinbuf`` rows.  Columns not
+        in `columns` take their default values.  If a column has an
+        index and ``autoIndex`` is true, the new rows are indexed as
+        with `Table.append()`.
+
+        A `KeyError` is raised if some name is not a column of the
+        table, and a `ValueError` if the sequences do not have the same
+        length or they can not be converted to the types of the columns.
+
+        Example of use::
+
+            table.appendColumns({'name': names, 'pressure': pressures})
+        """
+
+        self._v_file._checkWritable()
+
+        if not self._chunked:
+            raise HDF5ExtError("""\
+You cannot append rows to a non-chunked table.""")
+
+        arrays = []
+        nrows = None
+        for name, column in columns.iteritems():
+            self._getColumnInstance(name)  # the column must exist
+            try:
+                iflavor = flavor_of(column)
+                if iflavor != 'python':
+                    column = array_as_internal(column, iflavor)
+                column = numpy.asarray(column)
+            except Exception, exc:  #XXX
+                raise ValueError, \
+"column ``%s`` cannot be converted into an array. The error was: <%s>" % (name, exc)
+            if column.ndim == 0:
+                raise ValueError( "column ``%s`` is not a sequence of values"
+                                  % name )
+            if nrows is None:
+                nrows = len(column)
+            elif len(column) != nrows:
+                raise ValueError( "column ``%s`` has %d values, but other "
+                                  "columns have %d" % (name, len(column),
+                                                       nrows) )
+            arrays.append((name, column))
+        if not nrows:
+            return
+
+        # Columns not given (maybe as a part of a nested one) take
+        # their default values
+        defaults = []
+        for colpathname in self.colpathnames:
+            for name, column in arrays:
+                if ( colpathname == name
+                     or colpathname.startswith(name + '/') ):
+                    break
+            else:
+                defaults.append((colpathname, self.coldflts[colpathname]))
+
+        iobuf = self._v_iobuf
+        nrowsinbuf = len(iobuf)
+        # The fields of the buffer are views which are filled in place
+        dfltfields = [ (getNestedField(iobuf, colpathname), default)
+                       for colpathname, default in defaults ]
+        fields = [ (getNestedField(iobuf, name), column)
+                   for name, column in arrays ]
+        for start in xrange(0, nrows, nrowsinbuf):
+            stop = min(start + nrowsinbuf, nrows)
+            lenrows = stop - start
+            for field, default in dfltfields:
+                field[:lenrows] = default
+            for field, column in fields:
+                try:
+                    field[:lenrows] = column[start:stop]
+                except Exception, exc:  #XXX
+                    raise ValueError, \
+"columns cannot be converted into rows compliant with table '%s'. The error was: <%s>" % (str(self), exc)
+            self._saveBufferedRows(iobuf, lenrows)
+
+
+    def asyncAppender(self, queue_depth=4):
+        """
+        Start appending rows to the table in a background thread.
+
+        From now on, the buffers of rows filled by `Row.append()` and
+        the rows passed to `Table.append()` are converted, compressed
+        and written to disk by a writer thread, so that the caller can
+        go on producing rows meanwhile.  Up to `queue_depth` buffers may
+        be waiting to be written before appends block.  An
+        `AsyncAppender` object is returned; closing it (or the table)
+        writes all the pending rows and goes back to synchronous
+        appends.
+
+        Calling `Table.flush()` waits for all the pending rows to be
+        written, and it raises any exception raised while writing them.
+        Until then, ``nrows`` does not account for them, but reading,
+        modifying or removing rows waits for them to be written first.
+        A `ValueError` is raised if the table already has an active
+        appender.
+        """
+        self._v_file._checkWritable()
+        if not self._chunked:
+            raise HDF5ExtError("""\
+You cannot append rows to a non-chunked table.""")
+        return AsyncAppender(self, queue_depth)
+
+
     def _conv_to_recarr(self, obj):
         """Try to convert the object into a recarray."""
         try:
@@ -2133,12 +4217,13 @@ table format '%s'. The error was: <%s>
         # Convert rows into a recarray
         recarr = self._conv_to_recarr(rows)
 
+        deltas = self._getIndexDeltas(self.colpathnames, coords)
         if len(coords) > 0:
             # Do the actual update of rows
             self._update_elements(lcoords, coords, recarr)
 
         # Redo the index if needed
-        self._reIndex(self.colpathnames)
+        self._reIndex(self.colpathnames, self._applyIndexDeltas(deltas))
 
         return SizeType(lcoords)
 
@@ -2188,10 +4273,12 @@ table format '%s'. The error was: <%s>
 "This modification will exceed the length of the table. Giving up."
 
         # Do the actual update
+        deltas = self._getIndexDeltas(
+            self.colpathnames, numpy.arange(start, stop, step))
         self._update_records(start, stop, step, recarr)
 
         # Redo the index if needed
-        self._reIndex(self.colpathnames)
+        self._reIndex(self.colpathnames, self._applyIndexDeltas(deltas))
 
         return SizeType(lenrows)
 
@@ -2270,9 +4357,11 @@ table format '%s'. The error was: <%s>
         mod_col = getNestedField(mod_recarr, colname)
         mod_col[:] = column
         # save this modified rows in table
+        deltas = self._getIndexDeltas(
+            [colname], numpy.arange(start, stop, step))
         self._update_records(start, stop, step, mod_recarr)
         # Redo the index if needed
-        self._reIndex([colname])
+        self._reIndex([colname], self._applyIndexDeltas(deltas))
 
         return SizeType(nrows)
 
@@ -2346,9 +4435,10 @@ The 'names' parameter must be a list of strings.""")
             mod_col = getNestedField(mod_recarr, names[i])
             mod_col[:] = recarray[name].squeeze()
         # save this modified rows in table
+        deltas = self._getIndexDeltas(names, numpy.arange(start, stop, step))
         self._update_records(start, stop, step, mod_recarr)
         # Redo the index if needed
-        self._reIndex(names)
+        self._reIndex(names, self._applyIndexDeltas(deltas))
 
         return SizeType(nrows)
 
@@ -2391,15 +4481,24 @@ The 'names' parameter must be a list of strings.""")
         # deal with long ints (i.e. more than 32-bit integers)
         # This allows to index columns with more than 2**31 rows
         # F. Alted 2005-05-09
-        startLR = index.sorted.nrows*slicesize
+        # Rows removed from the table are still counted in the index
+        startLR = index.sorted.nrows*slicesize - index.nremoved
         indexedrows = startLR - start
         stop = start+nrows-slicesize+1
+        if ( index.indsize < 8 and index.ndeltas > 0 and
+             (startLR < stop or (lastrow and startLR < self.nrows)) ):
+            # The last row is read again from the table
+            index.drop_deltas(index.sorted.nrows*slicesize)
+        # Several slices are sorted at a time, within the memory budget
+        nslices = index.build_nslices()
         while startLR < stop:
-            index.append(
-                [self._read(startLR, startLR+slicesize, 1, colname)],
-                update=update)
-            indexedrows += slicesize
-            startLR += slicesize
+            xarrs = []
+            while startLR < stop and len(xarrs) < nslices:
+                xarrs.append(
+                    [self._read(startLR, startLR+slicesize, 1, colname)])
+                indexedrows += slicesize
+                startLR += slicesize
+            index.append_slices(xarrs, update=update)
         # index the remaining rows in last row
         if lastrow and startLR < self.nrows:
             index.appendLastRow(
@@ -2430,20 +4529,96 @@ The 'names' parameter must be a list of strings.""")
             Negative values are also accepted.  A special value of
             ``None`` (the default) means removing just the row supplied
             in `start`.
+
+        If the ``REMOVE_ROWS_LAZILY`` parameter is true, the rows are
+        just marked as removed, which takes a time proportional to the
+        number of removed rows instead of to the number of rows after
+        them.  Reads, iterators and queries skip them, but they keep
+        their space and row numbers until `Table.compact()` is called,
+        which is done automatically when the ratio of removed rows
+        exceeds ``COMPACT_DEAD_RATIO``.
+
+        The number of removed rows is returned.
         """
 
         (start, stop, step) = self._processRangeRead(start, stop, 1)
         nrows = stop - start
+        if self._v_file.params['REMOVE_ROWS_LAZILY']:
+            self._v_file._checkWritable()
+            nrows = self._deadrows.mark(start, stop)
+            if nrows > 0:
+                # The table caches for queries are dirty now
+                self._dirtycache = True
+                self._invalidateQueryCache()
+                ratio = self._v_file.params['COMPACT_DEAD_RATIO']
+                if self._deadrows.ndead > ratio * self.nrows:
+                    self.compact()
+            return SizeType(nrows)
         if nrows >= self.nrows:
             raise NotImplementedError, \
 """You are trying to delete all the rows in table "%s". This is not supported right now due to limitations on the underlying HDF5 library. Sorry!""" % self._v_pathname
         nrows = self._remove_row(start, nrows)
-        # removeRows is a invalidating index operation
-        self._reIndex(self.colpathnames)
+        self._deadrows.remove(start, nrows)
+        # removeRows is a invalidating index operation (but indexes may
+        # be updated incrementally)
+        self._reIndex(self.colpathnames, self._removeIndexedRows(start, nrows))
 
         return SizeType(nrows)
 
 
+    def compact(self):
+        """
+        Get rid of the rows removed lazily.
+
+        The rows that have not been removed are moved over the removed
+        ones in a single pass over the table, which is then truncated,
+        and indexes are recomputed (if ``autoIndex`` is true, otherwise
+        they are marked as dirty).  Row numbers change for all the rows
+        after the first removed one.  The number of rows taken out of
+        the table is returned.
+
+        See the ``REMOVE_ROWS_LAZILY`` parameter for more information.
+        """
+
+        self._v_file._checkWritable()
+        self._drainAppender()
+        deadrows = self._deadrows
+        ndead = deadrows.ndead
+        if ndead == 0:
+            return SizeType(0)
+        nrows = self.nrows
+        # Rows before the first removed one stay where they are
+        bits = deadrows.bits
+        nbyte = numpy.flatnonzero(bits)[0]
+        first = nbyte * 8 + int(
+            numpy.flatnonzero(numpy.unpackbits(bits[nbyte:nbyte+1]))[0])
+        buf = self._get_container(self.nrowsinbuf)
+        nlive = first
+        for bstart in xrange(first, nrows, self.nrowsinbuf):
+            bstop = min(bstart + self.nrowsinbuf, nrows)
+            self._read_records(bstart, bstop - bstart, buf)
+            rows = buf[:bstop-bstart][deadrows.liveRange(bstart, bstop)]
+            if len(rows) > 0:
+                self._update_records(nlive, nlive + len(rows), 1, rows)
+                nlive += len(rows)
+        deadrows.clear()
+        self.truncate(nlive)
+        # Moving rows is a invalidating index operation
+        self._reIndex(self.colpathnames)
+        self._dirtycache = True
+
+        return SizeType(nrows - nlive)
+
+
+    def _g_truncate(self, size):
+        oldnrows = self.nrows
+        super(Table, self)._g_truncate(size)
+        self._deadrows.truncate(size)
+        self._invalidateQueryCache()
+        self._refreshChunkStats(min(oldnrows, size), size)
+        self._markCompositeIndexesAsDirty(self.colpathnames)
+
+
     def _g_updateDependent(self):
         super(Table, self)._g_updateDependent()
 
@@ -2463,10 +4638,64 @@ The 'names' parameter must be a list of strings.""")
         """
 
         itgpathname = _indexPathnameOf(self)
+        qcgpathname = _queryCachePathnameOf(self)
+        zmgpathname = _zonemapPathnameOf(self)
+        bfgpathname = _bloomPathnameOf(self)
+        cigpathname = _compositePathnameOf(self)
+        bmgpathname = _bitmapPathnameOf(self)
+        drpathname = _deadrowsPathnameOf(self)
 
         # First, move the table to the new location.
         super(Table, self)._g_move(newParent, newName)
 
+        # Then move the associated query cache group (if any).
+        try:
+            qcgroup = self._v_file._getNode(qcgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            qcgroup._g_move(self._v_parent, _queryCacheNameOf(self))
+
+        # Then move the associated zone maps group (if any).
+        try:
+            zmgroup = self._v_file._getNode(zmgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            zmgroup._g_move(self._v_parent, _zonemapNameOf(self))
+
+        # Then move the associated Bloom filters group (if any).
+        try:
+            bfgroup = self._v_file._getNode(bfgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            bfgroup._g_move(self._v_parent, _bloomNameOf(self))
+
+        # Then move the associated composite indexes group (if any).
+        try:
+            cigroup = self._v_file._getNode(cigpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            cigroup._g_move(self._v_parent, _compositeNameOf(self))
+
+        # Then move the associated bitmap indexes group (if any).
+        try:
+            bmgroup = self._v_file._getNode(bmgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            bmgroup._g_move(self._v_parent, _bitmapNameOf(self))
+
+        # Then move the associated bitmap of removed rows (if any).
+        try:
+            drarray = self._v_file._getNode(drpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            drarray._g_move(self._v_parent, _deadrowsNameOf(self))
+
         # Then move the associated index group (if any).
         try:
             itgroup = self._v_file._getNode(itgpathname)
@@ -2489,6 +4718,48 @@ The 'names' parameter must be a list of strings.""")
         else:
             itgroup._f_remove(recursive=True)
             self.indexed = False   # there are indexes no more
+        # Remove the associated query cache group (if any).
+        try:
+            qcgroup = self._v_file._getNode(_queryCachePathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            qcgroup._g_remove(recursive=True)
+        # Remove the associated zone maps group (if any).
+        try:
+            zmgroup = self._v_file._getNode(_zonemapPathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            zmgroup._g_remove(recursive=True)
+        # Remove the associated Bloom filters group (if any).
+        try:
+            bfgroup = self._v_file._getNode(_bloomPathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            bfgroup._g_remove(recursive=True)
+        # Remove the associated composite indexes group (if any).
+        try:
+            cigroup = self._v_file._getNode(_compositePathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            cigroup._g_remove(recursive=True)
+        # Remove the associated bitmap indexes group (if any).
+        try:
+            bmgroup = self._v_file._getNode(_bitmapPathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            bmgroup._g_remove(recursive=True)
+        # Remove the associated bitmap of removed rows (if any).
+        try:
+            drarray = self._v_file._getNode(_deadrowsPathnameOf(self))
+        except NoSuchNodeError:
+            pass
+        else:
+            drarray._g_remove(False, False)
 
         # Remove the leaf itself from the hierarchy.
         super(Table, self)._g_remove(recursive, force)
@@ -2508,40 +4779,176 @@ The 'names' parameter must be a list of strings.""")
         self.indexed = max(colindexed.values())  # this is an OR :)
 
 
-    def _markColumnsAsDirty(self, colnames):
-        """Mark column indexes in `colnames` as dirty."""
+    def _markCompositeIndexesAsDirty(self, colnames):
+        """
+        Mark composite indexes over columns in `colnames` as dirty.
+
+        The list of the composite indexes marked is returned.
+        """
+        colnames = set(colnames)
+        cindexes = []
+        for colpathnames, cindex in self._compositeindexes.iteritems():
+            if colnames.intersection(colpathnames):
+                cindex.dirty = True
+                cindexes.append(cindex)
+        return cindexes
+
+
+    def _markColumnsAsDirty(self, colnames, updated=()):
+        """
+        Mark column indexes in `colnames` as dirty.
+
+        The indexes of columns in `updated` are not marked, as they have
+        been updated incrementally (see `_applyIndexDeltas()`).
+        """
         assert len(colnames) > 0
+        self._markCompositeIndexesAsDirty(colnames)
         if self.indexed:
             colindexed, cols = self.colindexed, self.cols
             # Mark the proper indexes as dirty
             for colname in colnames:
-                if colindexed[colname]:
+                if colindexed[colname] and colname not in updated:
                     col = cols._g_col(colname)
                     col.index.dirty = True
+            if updated:
+                # The table caches for indexed queries are dirty now
+                self._dirtycache = True
 
 
-    def _reIndex(self, colnames):
-        """Re-index columns in `colnames` if automatic indexing is true."""
+    def _reIndex(self, colnames, updated=()):
+        """
+        Re-index columns in `colnames` if automatic indexing is true.
+
+        The indexes of columns in `updated` are left alone, as they have
+        been updated incrementally (see `_applyIndexDeltas()`).
+        """
 
+        cindexes = self._markCompositeIndexesAsDirty(colnames)
+        if self.autoIndex:
+            for cindex in cindexes:
+                cindex.build()
         if self.indexed:
             colindexed, cols = self.colindexed, self.cols
             colstoindex = []
             # Mark the proper indexes as dirty
             for colname in colnames:
-                if colindexed[colname]:
+                if colindexed[colname] and colname not in updated:
                     col = cols._g_col(colname)
                     col.index.dirty = True
                     colstoindex.append(colname)
             # Now, re-index the dirty ones
             if self.autoIndex and colstoindex:
+                if updated:
+                    # Rebuilt indexes take all the rows in the table
+                    self.flushRowsToIndex()
                 self._doReIndex(dirty=True)
             # The table caches for indexed queries are dirty now
             self._dirtycache = True
 
 
+    def _getIndexDeltas(self, colnames, coords):
+        """
+        Get the values of indexed columns before modifying some rows.
+
+        Indexes of columns in `colnames` are updated incrementally when
+        automatic indexing is on, they are not dirty nor completely
+        sorted by design, and no more than ``INDEX_MAX_DELTAS`` rows
+        are modified.  The row numbers out of `coords` which are already
+        indexed and a dictionary with the values of these columns there
+        are returned, to be passed to `_applyIndexDeltas()` once rows
+        are modified.  `None` is returned if no index can be updated.
+        """
+        maxdeltas = self._v_file.params['INDEX_MAX_DELTAS']
+        if not (self.indexed and self.autoIndex and maxdeltas > 0):
+            return None
+        coords = numpy.asarray(coords, dtype=SizeType)
+        coords = coords[coords < self._indexedrows]
+        if len(coords) > maxdeltas:
+            return None
+        oldvalues = {}
+        for colname in colnames:
+            if not self.colindexed[colname]:
+                continue
+            index = self.cols._g_col(colname).index
+            if not (index.dirty or index.want_complete_sort):
+                oldvalues[colname] = self._readCoordinates(coords, colname)
+        if not oldvalues:
+            return None
+        return coords, oldvalues
+
+
+    def _applyIndexDeltas(self, deltas):
+        """
+        Update indexes incrementally after modifying some rows.
+
+        `deltas` is the result of `_getIndexDeltas()`.  The names of the
+        columns whose indexes have been updated are returned.
+        """
+        if deltas is None:
+            return []
+        coords, oldvalues = deltas
+        updated = []
+        for colname, values in oldvalues.iteritems():
+            index = self.cols._g_col(colname).index
+            if len(coords) > 0:
+                index.update_rows(
+                    coords, values, self._readCoordinates(coords, colname))
+            if self._foldIndexDeltas(colname):
+                updated.append(colname)
+        return updated
+
+
+    def _removeIndexedRows(self, start, nrows):
+        """
+        Update indexes incrementally after removing some rows.
+
+        This is like `_applyIndexDeltas()` for the `nrows` rows that
+        were at `start`, and it also updates the counters of indexed
+        rows if some index is updated.
+        """
+        if not (self.indexed and self.autoIndex):
+            return []
+        if self._v_file.params['INDEX_MAX_DELTAS'] == 0:
+            return []
+        nindexed = max(0, min(start + nrows, self._indexedrows) - start)
+        updated = []
+        for (colname, colindexed) in self.colindexed.iteritems():
+            if not colindexed:
+                continue
+            index = self.cols._g_col(colname).index
+            if index.dirty or index.want_complete_sort:
+                continue
+            if nindexed > 0:
+                index.remove_rows(start, start + nindexed)
+            if self._foldIndexDeltas(colname):
+                updated.append(colname)
+        if updated:
+            self._indexedrows -= nindexed
+            self._unsaved_indexedrows -= nrows - nindexed
+        return updated
+
+
+    def _foldIndexDeltas(self, colname, force=False):
+        """
+        Merge the pending changes of the index of `colname` into it.
+
+        This is only done when there are more than ``INDEX_MAX_DELTAS``
+        changes, unless `force` is true.  False is returned if changes
+        can not be merged (the index must be rebuilt then).
+        """
+        index = self.cols._g_col(colname).index
+        maxdeltas = self._v_file.params['INDEX_MAX_DELTAS']
+        if not force and index.ndeltas <= maxdeltas:
+            return True
+        return index.fold_deltas()
+
+
     def _doReIndex(self, dirty):
         """Common code for `reIndex()` and `reIndexDirty()`."""
 
+        for cindex in self._compositeindexes.itervalues():
+            if not dirty or cindex.dirty:
+                cindex.build()
         indexedrows = 0
         for (colname, colindexed) in self.colindexed.iteritems():
             if colindexed:
@@ -2580,9 +4987,85 @@ The 'names' parameter must be a list of strings.""")
         self._doReIndex(dirty=True)
 
 
+    def _checkCompositeColumns(self, colpathnames):
+        """Check and normalize the columns of a composite index."""
+        colpathnames = [ isinstance(col, Column) and col.pathname or col
+                         for col in colpathnames ]
+        if len(colpathnames) < 2:
+            raise ValueError( "composite indexes need at least two columns: "
+                              "%r" % (colpathnames,) )
+        if len(set(colpathnames)) != len(colpathnames):
+            raise ValueError( "repeated columns in composite index: %r"
+                              % (colpathnames,) )
+        for colpathname in colpathnames:
+            if colpathname not in self.colpathnames:
+                raise KeyError( "table ``%s`` does not have a column named "
+                                "``%s``" % (self._v_pathname, colpathname) )
+            dtype = self.coldtypes[colpathname]
+            if dtype.shape != ():
+                raise TypeError( "multidimensional columns can not be "
+                                 "indexed: %s" % colpathname )
+            if dtype.kind == 'c':
+                raise TypeError( "complex columns can not be indexed: %s"
+                                 % colpathname )
+        return tuple(colpathnames)
+
+
+    def createCompositeIndex(self, colpathnames):
+        """
+        Create an index over the compound key of several columns.
+
+        `colpathnames` is a sequence of (at least two) column path names
+        or `Column` instances, in the order of the key.  Conditions
+        combining with ``&`` equality comparisons on a leading prefix of
+        these columns and, optionally, a range comparison on the next
+        one (e.g. ``(sensor == 3) & (time >= t0) & (time < t1)`` for an
+        index on ``['sensor', 'time']``) are resolved by a single
+        bisection over the compound keys.  The number of rows indexed is
+        returned.
+
+        Composite indexes are marked as dirty (and not used) when rows
+        are appended or modified, until they are rebuilt by
+        `Table.reIndex()` or `Table.reIndexDirty()`.
+
+        Example of use::
+
+            table.createCompositeIndex(['sensor', 'time'])
+            rows = table.readWhere('(sensor == 3) & (time > t0)')
+        """
+        self._v_file._checkWritable()
+        colpathnames = self._checkCompositeColumns(colpathnames)
+        if colpathnames in self._compositeindexes:
+            raise ValueError( "composite index on %r already exists; "
+                              "use ``reIndex()`` to rebuild it"
+                              % (colpathnames,) )
+        cindex = CompositeIndex(self, colpathnames, new=True)
+        nrows = cindex.build()
+        self._compositeindexes[colpathnames] = cindex
+        self._conditionCache.clear()
+        return SizeType(nrows)
+
+
+    def removeCompositeIndex(self, colpathnames):
+        """
+        Remove the composite index over the columns in `colpathnames`.
+
+        A `KeyError` is raised if there is no such composite index.
+        """
+        self._v_file._checkWritable()
+        colpathnames = tuple([ isinstance(col, Column) and col.pathname
+                               or col for col in colpathnames ])
+        if colpathnames not in self._compositeindexes:
+            raise KeyError( "table ``%s`` does not have a composite index "
+                            "on %r" % (self._v_pathname, colpathnames) )
+        cindex = self._compositeindexes.pop(colpathnames)
+        cindex.remove()
+        self._conditionCache.clear()
+
+
     def _g_copyRows(self, object, start, stop, step, sortby, checkCSI):
         "Copy rows from self to object"
-        if sortby is None:
+        if sortby is None and not self._deadrows.ndead:
             self._g_copyRows_optim(object, start, stop, step)
             return
         lenbuf = self.nrowsinbuf
@@ -2699,6 +5182,8 @@ The 'names' parameter must be a list of strings.""")
         # Flush rows that remains to be appended
         if 'row' in self.__dict__:
             self.row._flushBufferedRows()
+        # Wait for rows handed to an asynchronous appender to be written
+        self._drainAppender()
         if self.indexed and self.autoIndex:
             # Flush any unindexed row
             rowsadded = self.flushRowsToIndex(_lastrow=True)
@@ -2760,6 +5245,15 @@ table ``%s`` is being preempted from alive nodes without its buffers being flush
         #   to first close ``Table`` objects and then ``Index`` hierarchies.
         #
 
+        # Do not leave reads ahead of iterators behind
+        if '_readaheads' in self.__dict__:
+            for readahead in self._readaheads.keys():
+                readahead.wait()
+
+        # Data handed to an asynchronous appender must be written anyway
+        if self._asyncAppender is not None:
+            self._asyncAppender.close()
+
         # Flush right now so the row object does not get in the middle.
         if flush:
             self.flush()
@@ -2956,6 +5450,7 @@ class Cols(object):
         """
 
         table = self._v_table
+        table._drainAppender()
         nrows = table.nrows
         if is_idx(key):
             # Index out of range protection
@@ -2965,6 +5460,7 @@ class Cols(object):
                 # To support negative values
                 key += nrows
             (start, stop, step) = table._processRange(key, key+1, 1)
+            table._checkRowAlive(start)
             colgroup = self._v_desc._v_pathname
             if colgroup == "":  # The root group
                 return table.read(start, stop, step)[0]
@@ -3011,6 +5507,7 @@ class Cols(object):
         """
 
         table = self._v_table
+        table._drainAppender()
         nrows = table.nrows
         if is_idx(key):
             # Index out of range protection
@@ -3099,15 +5596,24 @@ class Column(object):
     Public instance variables
     -------------------------
 
+    bitmapindex
+        The `BitmapIndex` instance associated with this column
+        (``None`` if the column has no bitmap index).
     descr
         The `Description` instance of the parent table or nested column.
     dtype
         The NumPy ``dtype`` that most closely matches this column.
+    bloomfilter
+        The `BloomFilter` instance associated with this column
+        (``None`` if the column has no Bloom filter).
     index
         The `Index` instance associated with this column (``None`` if
         the column is not indexed).
     is_indexed
         True if the column is indexed, false otherwise.
+    zonemap
+        The `ZoneMap` instance associated with this column (``None``
+        if the column has no zone map).
     name
         The name of the associated column.
     pathname
@@ -3121,16 +5627,28 @@ class Column(object):
     Public methods
     --------------
 
+    createBitmapIndex()
+        Create a bitmap index (bitmap of rows per value) for this column.
+    createBloomFilter([fpp])
+        Create a Bloom filter (per-chunk set of values) for this column.
     createIndex([optlevel][, kind][, filters][, tmp_dir])
         Create an index for this column.
     createCSIndex([filters][, tmp_dir])
         Create a completely sorted index (CSI) for this column.
+    createZoneMap()
+        Create a zone map (per-chunk statistics) for this column.
     reIndex()
         Recompute the index associated with this column.
     reIndexDirty()
         Recompute the associated index only if it is dirty.
+    removeBitmapIndex()
+        Remove the bitmap index associated with this column.
+    removeBloomFilter()
+        Remove the Bloom filter associated with this column.
     removeIndex()
         Remove the index associated with this column.
+    removeZoneMap()
+        Remove the zone map associated with this column.
 
     Special methods
     ---------------
@@ -3188,6 +5706,24 @@ class Column(object):
 
     is_indexed = property(_isindexed)
 
+
+    def _getzonemap(self):
+        return self.table._zonemaps.get(self.pathname)
+
+    zonemap = property(_getzonemap)
+
+
+    def _getbloomfilter(self):
+        return self.table._bloomfilters.get(self.pathname)
+
+    bloomfilter = property(_getbloomfilter)
+
+
+    def _getbitmapindex(self):
+        return self.table._bitmapindexes.get(self.pathname)
+
+    bitmapindex = property(_getbitmapindex)
+
     maindim = property(
         lambda self: 0, None, None,
         "The main dimension for this column.")
@@ -3273,6 +5809,7 @@ class Column(object):
         if type(key) == tuple and len(key) == 1:
             key = key[0]
 
+        table._drainAppender()
         if is_idx(key):
             # Index out of range protection
             if key >= table.nrows:
@@ -3281,6 +5818,7 @@ class Column(object):
                 # To support negative values
                 key += table.nrows
             (start, stop, step) = table._processRange(key, key+1, 1)
+            table._checkRowAlive(start)
             return table.read(start, stop, step, self.pathname)[0]
         elif isinstance(key, slice):
             (start, stop, step) = table._processRange(
@@ -3324,6 +5862,7 @@ class Column(object):
         if type(key) == tuple and len(key) == 1:
             key = key[0]
 
+        table._drainAppender()
         if is_idx(key):
             # Index out of range protection
             if key >= table.nrows:
@@ -3510,6 +6049,191 @@ class Column(object):
             self.table._setColumnIndexing(self.pathname, False)
 
 
+    def createZoneMap(self):
+        """
+        Create a zone map for this column.
+
+        A zone map keeps the minimum and maximum values and the number
+        of NaNs of the column in every chunk of the table.  Queries with
+        range conditions on the column (like ``col > 3`` or ``(t0 <= t)
+        & (t < t1)``) which can not use an index read only the chunks
+        whose statistics may fulfill the condition.  This is much
+        cheaper to build and keep than an index, and very effective
+        when the column is (roughly) sorted, like timestamps in time
+        series.
+
+        The zone map is updated by any modification of the table.  Only
+        scalar numerical and boolean columns are supported.
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        if self.pathname in table._zonemaps:
+            raise ValueError( "column ``%s`` already has a zone map"
+                              % self.pathname )
+        if ( self.dtype.kind not in 'biuf'
+             or self.descr._v_dtypes[self.name].shape != () ):
+            raise TypeError( "zone maps are only supported for scalar "
+                             "numerical or boolean columns" )
+        zonemap = ZoneMap(table, self.pathname, new=True)
+        table._refreshChunkStats(0, table.nrows, [zonemap])
+        table._zonemaps[self.pathname] = zonemap
+        # Changing the set of zone maps invalidates the condition cache
+        table._conditionCache.clear()
+
+
+    def removeZoneMap(self):
+        """
+        Remove the zone map associated with this column.
+
+        This method does nothing if the column has no zone map.
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        zonemap = table._zonemaps.pop(self.pathname, None)
+        if zonemap is None:
+            return
+        self._removeChunkStatsGroup(zonemap._group,
+                                    _zonemapPathnameOf(table))
+        table._conditionCache.clear()
+
+
+    def createBloomFilter(self, fpp=0.01):
+        """
+        Create a Bloom filter for this column.
+
+        A Bloom filter keeps a compact representation of the set of
+        values of the column in every chunk of the table.  Queries with
+        equality conditions on the column (like ``col == 'abc'`` or
+        ``(col == 1) | (col == 5)``) which can not use an index read
+        only the chunks that may contain the values.  This is much
+        cheaper to build and keep than an index, and very effective
+        for looking up values of high cardinality columns (like
+        identifiers) which are scattered over the table, where zone
+        maps are useless.
+
+        The `fpp` argument is the probability of a chunk not containing
+        a value being read anyway when all the values in the chunk are
+        distinct (lower values need more space, about 10 bits per row
+        for the default 0.01).
+
+        The Bloom filter is updated by any modification of the table.
+        Only scalar columns are supported.
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        if self.pathname in table._bloomfilters:
+            raise ValueError( "column ``%s`` already has a Bloom filter"
+                              % self.pathname )
+        if ( self.dtype.kind not in 'biufS'
+             or self.descr._v_dtypes[self.name].shape != () ):
+            raise TypeError( "Bloom filters are only supported for scalar "
+                             "numerical, boolean or string columns" )
+        bloomfilter = BloomFilter(table, self.pathname, new=True, fpp=fpp)
+        table._refreshChunkStats(0, table.nrows, [bloomfilter])
+        table._bloomfilters[self.pathname] = bloomfilter
+        # Changing the set of Bloom filters invalidates the condition cache
+        table._conditionCache.clear()
+
+
+    def removeBloomFilter(self):
+        """
+        Remove the Bloom filter associated with this column.
+
+        This method does nothing if the column has no Bloom filter.
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        bloomfilter = table._bloomfilters.pop(self.pathname, None)
+        if bloomfilter is None:
+            return
+        self._removeChunkStatsGroup(bloomfilter._group,
+                                    _bloomPathnameOf(table))
+        table._conditionCache.clear()
+
+
+    def createBitmapIndex(self):
+        """
+        Create a bitmap index for this column.
+
+        A bitmap index keeps a bitmap of the rows holding each distinct
+        value of the column.  It is meant for columns with few distinct
+        values (like enumerated, boolean or status code columns), where
+        regular indexes select too many rows to be useful.  The bitmaps
+        of the comparisons in a query (like ``(state == 2) | ~flag`` or
+        ``state != 0``) are combined with bitwise operations, and the
+        rows are read directly when the whole condition is resolved by
+        bitmap indexes.  Otherwise, they narrow the rows selected by
+        other indexes or the rows on which the condition is evaluated.
+
+        The bitmap index is updated by any modification of the table.
+        Only scalar integer, boolean and string columns with no more
+        than ``BITMAP_MAX_VALUES`` distinct values are supported (a
+        `ValueError` is raised otherwise).
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        if self.pathname in table._bitmapindexes:
+            raise ValueError( "column ``%s`` already has a bitmap index"
+                              % self.pathname )
+        if ( self.dtype.kind not in 'biuS'
+             or self.descr._v_dtypes[self.name].shape != () ):
+            raise TypeError( "bitmap indexes are only supported for scalar "
+                             "integer, boolean or string columns" )
+        bmindex = BitmapIndex(table, self.pathname, new=True)
+        table._refreshChunkStats(0, table.nrows, [bmindex])
+        maxvalues = table._v_file.params['BITMAP_MAX_VALUES']
+        if bmindex.nvalues > maxvalues:
+            self._removeChunkStatsGroup(bmindex._group,
+                                        _bitmapPathnameOf(table))
+            raise ValueError( "column ``%s`` has more than %d distinct "
+                              "values; use a regular index instead"
+                              % (self.pathname, maxvalues) )
+        table._bitmapindexes[self.pathname] = bmindex
+        # Changing the set of bitmap indexes invalidates the condition cache
+        table._conditionCache.clear()
+
+
+    def removeBitmapIndex(self):
+        """
+        Remove the bitmap index associated with this column.
+
+        This method does nothing if the column has no bitmap index.
+        """
+
+        self._tableFile._checkWritable()
+        table = self.table
+        bmindex = table._bitmapindexes.pop(self.pathname, None)
+        if bmindex is None:
+            return
+        self._removeChunkStatsGroup(bmindex._group, _bitmapPathnameOf(table))
+        table._conditionCache.clear()
+
+
+    def _removeChunkStatsGroup(self, group, gpathname):
+        """
+        Remove the chunk statistics `group` of this column.
+
+        `gpathname` is the path name of the group of chunk statistics
+        of the table.  Parent groups which are left empty are removed
+        too.
+        """
+        group._g_remove(recursive=True)
+        parentpath = splitPath('/' + self.pathname)[0]
+        while True:
+            group = self._tableFile._getNode(joinPath(gpathname, parentpath))
+            if group._v_nchildren > 0:
+                break
+            group._g_remove()
+            if parentpath == '/':
+                break
+            parentpath = splitPath(parentpath)[0]
+
+
     def close(self):
         """Close this column"""
         self.__dict__.clear()
@@ -25,6 +25,7 @@ Misc variables:
 """
 
 import sys
+import threading
 import numpy
 from time import time
 
@@ -51,6 +52,7 @@ from definitions cimport import_array, ndarray, \
      H5Pclose, H5Sget_simple_extent_ndims, H5Sget_simple_extent_dims, \
      H5Sclose, H5Tget_size, H5Tset_size, H5Tcreate, H5Tcopy, H5Tclose, \
      H5Tget_nmembers, H5Tget_member_name, H5Tget_member_type, \
+     H5Tget_member_index, \
      H5Tget_native_type, H5Tget_member_value, H5Tinsert, \
      H5Tget_class, H5Tget_super, H5Tget_offset, \
      H5ATTRset_attribute_string, H5ATTRset_attribute, \
@@ -411,6 +413,9 @@ cdef class Table(Leaf):
     to NumPy conversion is performed.  The conversion is done in place,
     i.e. 'recarr' is modified."""
 
+    # Buffers may only have some of the top-level fields
+    names = recarr.dtype.names
+
     # For reading, first swap the byteorder by hand
     # (this is not currently supported by HDF5)
     if sense == 1:
@@ -418,15 +423,17 @@ cdef class Table(Leaf):
         if self.coltypes[colpathname] in ["time32", "time64"]:
           colobj = self.coldescrs[colpathname]
           if hasattr(colobj, "_byteorder"):
-            if colobj._byteorder != platform_byteorder:
+            if (colobj._byteorder != platform_byteorder and
+                colpathname.split('/')[0] in names):
               column = getNestedField(recarr, colpathname)
               # Do an *inplace* byteswapping
               column.byteswap(True)
 
     # This should be generalised to support other type conversions.
     for t64cname in self._time64colnames:
-      column = getNestedField(recarr, t64cname)
-      self._convertTime64_(column, nrecords, sense)
+      if t64cname.split('/')[0] in names:
+        column = getNestedField(recarr, t64cname)
+        self._convertTime64_(column, nrecords, sense)
 
 
   def _open_append(self, ndarray recarr):
@@ -469,6 +476,7 @@ cdef class Table(Leaf):
     # Set the caches to dirty (in fact, and for the append case,
     # it should be only the caches based on limits, but anyway)
     self._dirtycache = True
+    self._invalidateQueryCache()
     # Delete the reference to recarray as we doesn't need it anymore
     self._v_recarray = None
 
@@ -500,6 +508,9 @@ cdef class Table(Leaf):
 
     # Set the caches to dirty
     self._dirtycache = True
+    self._invalidateQueryCache()
+    if nrecords > 0:
+      self._refreshChunkStats(start, start + (nrecords - 1) * step + 1)
 
 
   def _update_elements(self, hsize_t nrecords, ndarray coords,
@@ -526,11 +537,39 @@ cdef class Table(Leaf):
 
     # Set the caches to dirty
     self._dirtycache = True
+    self._invalidateQueryCache()
+    self._refreshChunkStatsAt(coords[:nrecords])
+
+
+  cdef hid_t _get_mem_type(self, object dtype) except -1:
+    """Get the HDF5 memory type for reading into buffers of `dtype`.
+
+    If `dtype` only has some of the top-level fields in the table, a
+    partial compound type with just these members is built, so that
+    HDF5 does not convert nor copy the rest.  Such a type must be
+    closed after use.
+    """
+    cdef hid_t mem_type_id, member_type_id
+    cdef int i
+
+    if dtype == self._v_dtype:
+      return self.type_id
+    mem_type_id = H5Tcreate(H5T_COMPOUND, dtype.itemsize)
+    for name in dtype.names:
+      i = H5Tget_member_index(self.type_id, name)
+      if i < 0:
+        H5Tclose(mem_type_id)
+        raise KeyError("no such top-level column: %s" % (name,))
+      member_type_id = H5Tget_member_type(self.type_id, i)
+      H5Tinsert(mem_type_id, name, dtype.fields[name][1], member_type_id)
+      H5Tclose(member_type_id)
+    return mem_type_id
 
 
   def _read_records(self, hsize_t start, hsize_t nrecords, ndarray recarr):
     cdef void *rbuf
     cdef int ret
+    cdef hid_t mem_type_id
 
     # Correct the number of records to read, if needed
     if (start + nrecords) > self.nrows:
@@ -540,10 +579,13 @@ cdef class Table(Leaf):
     rbuf = recarr.data
 
     # Read the records from disk
+    mem_type_id = self._get_mem_type(recarr.dtype)
     Py_BEGIN_ALLOW_THREADS
-    ret = H5TBOread_records(self.dataset_id, self.type_id, start,
+    ret = H5TBOread_records(self.dataset_id, mem_type_id, start,
                             nrecords, rbuf)
     Py_END_ALLOW_THREADS
+    if mem_type_id != self.type_id:
+      H5Tclose(mem_type_id)
     if ret < 0:
       raise HDF5ExtError("Problems reading records.")
 
@@ -580,6 +622,8 @@ cdef class Table(Leaf):
       Py_END_ALLOW_THREADS
       if ret < 0:
         raise HDF5ExtError("Problems reading chunk records.")
+      # Convert some HDF5 types to NumPy after reading (and caching).
+      self._convertTypes(IObuf[cstart:cstart+nrecords], nrecords, 1)
       nslot = chunkcache.setitem_(nchunk, rbuf, 0)
     return nrecords
 
@@ -588,6 +632,7 @@ cdef class Table(Leaf):
     cdef long nrecords
     cdef void *rbuf, *rbuf2
     cdef int ret
+    cdef hid_t mem_type_id
 
     # Get the chunk of the coords that correspond to a buffer
     nrecords = coords.size
@@ -596,10 +641,13 @@ cdef class Table(Leaf):
     # Get the pointer to the buffer coords area
     rbuf2 = coords.data
 
+    mem_type_id = self._get_mem_type(recarr.dtype)
     Py_BEGIN_ALLOW_THREADS
-    ret = H5TBOread_elements(self.dataset_id, self.type_id,
+    ret = H5TBOread_elements(self.dataset_id, mem_type_id,
                              nrecords, rbuf2, rbuf)
     Py_END_ALLOW_THREADS
+    if mem_type_id != self.type_id:
+      H5Tclose(mem_type_id)
     if ret < 0:
       raise HDF5ExtError("Problems reading records.")
 
@@ -633,11 +681,86 @@ cdef class Table(Leaf):
                           0, NULL, <char *>&nrecords2)
     # Set the caches to dirty
     self._dirtycache = True
+    self._invalidateQueryCache()
+    self._refreshChunkStats(nrow, self.nrows)
     # Return the number of records removed
     return nrecords
 
 
 
+class ReadAhead(object):
+  """Read the I/O buffers of a table ahead of time.
+
+  While the caller consumes a buffer of rows, the next one (the one
+  following the rows just delivered) is read and decompressed in a
+  background thread.  If the caller then asks for a different start,
+  the prefetched buffer is discarded and a regular read is done.
+
+  Pending reads are waited for when the iterator is restarted, finished
+  or deallocated, and when the table is closed.
+  """
+
+  def __init__(self, table, IObuf, stop):
+    # Reads are serialized with the ones in parallel scans
+    from tables.table import _hdf5Lock
+    self.lock = _hdf5Lock
+    self.table = table
+    self.nrowsinbuf = len(IObuf)
+    self.stop = stop
+    self.buf = numpy.empty_like(IObuf)
+    self.thread = None
+    self.start = 0
+    self.nrecords = 0
+    self.excinfo = None
+    table._readaheads[self] = None
+
+
+  def _fetch(self):
+    self.lock.acquire()
+    try:
+      try:
+        self.nrecords = self.table._read_records(
+          self.start, self.nrowsinbuf, self.buf)
+      except:
+        self.excinfo = sys.exc_info()
+    finally:
+      self.lock.release()
+
+
+  def wait(self):
+    """Wait for a pending read (if any) and return its start row."""
+    if self.thread is None:
+      return -1
+    self.thread.join()
+    self.thread = None
+    return self.start
+
+
+  def read(self, start, IObuf):
+    """Fill `IObuf` with rows from `start` on and prefetch the next ones.
+
+    The number of rows put in `IObuf` is returned.
+    """
+    if self.wait() == start:
+      if self.excinfo is not None:
+        exc_type, exc_value, exc_tb = self.excinfo
+        self.excinfo = None
+        raise exc_type, exc_value, exc_tb
+      nrecords = self.nrecords
+      IObuf[:nrecords] = self.buf[:nrecords]
+    else:
+      self.excinfo = None
+      nrecords = self.table._read_records(start, self.nrowsinbuf, IObuf)
+    # Launch the read of the next buffer
+    if nrecords > 0 and start + nrecords < self.stop:
+      self.start = start + nrecords
+      self.thread = threading.Thread(target=self._fetch)
+      self.thread.setDaemon(True)
+      self.thread.start()
+    return nrecords
+
+
+
 cdef class Row:
   """
   Table row iterator and field accessor.
@@ -690,12 +813,13 @@ cdef class Row:
   cdef int     exist_enum_cols
   cdef int     _riterator, _stride, _rowsize
   cdef int     whereCond, indexed
-  cdef int     ro_filemode, chunked
+  cdef int     ro_filemode, chunked, fieldsbuf
   cdef int     _bufferinfo_done, sss_on
   cdef int     iterseqMaxElements
-  cdef ndarray bufcoords, indexValid, indexValues, chunkmap
+  cdef ndarray bufcoords, indexValid, indexValues, chunkmap, liveMask
   cdef hsize_t *bufcoordsData, *indexValuesData
-  cdef char    *chunkmapData, *indexValidData
+  cdef char    *chunkmapData, *indexValidData, *liveMaskData
+  cdef object  deadrows
   cdef object  dtype
   cdef object  IObuf, IObufcpy
   cdef object  wrec, wreccpy
@@ -707,6 +831,11 @@ cdef class Row:
   cdef object  _tableFile, _tablePath
   cdef object  modified_fields
   cdef object  seq_available
+  cdef object  readahead
+  cdef object  stats
+  cdef double  statstime
+  cdef long long statshits, nselected
+  cdef long long limit
 
   # The nrow() method has been converted into a property, which is handier
   property nrow:
@@ -736,6 +865,7 @@ cdef class Row:
     self._nrow = 0   # Useful in mod_append read iterators
     self._riterator = 0
     self._bufferinfo_done = 0
+    self.fieldsbuf = 0
     # Some variables from table will be cached here
     if table._v_file.mode == 'r':
       self.ro_filemode = 1
@@ -755,10 +885,28 @@ cdef class Row:
     self.modified_fields = set()
 
 
-  def _iter(self, start=0, stop=0, step=1, coords=None, chunkmap=None):
-    """Return an iterator for traversiong the data in table."""
+  def __dealloc__(self):
+    # Do not leave reads behind for an iterator which was not exhausted
+    if self.readahead is not None:
+      self.readahead.wait()
+
+
+  def _iter(self, start=0, stop=0, step=1, coords=None, chunkmap=None,
+            prefetch=False, fields=None, limit=None):
+    """Return an iterator for traversiong the data in table.
+
+    If `fields` is a dtype with some of the top-level fields of the
+    table, only them are read into the buffer of this row.  If `limit`
+    is not `None`, the iterator stops after returning `limit` rows.
+    """
 
+    if fields is not None:
+      self._newReadBuffer(fields)
     self._initLoop(start, stop, step, coords, chunkmap)
+    if limit is not None:
+      self.limit = limit
+    if prefetch and not self.indexed and coords is None:
+      self.readahead = ReadAhead(self.table, self.IObuf, self.stop)
     return iter(self)
 
 
@@ -800,6 +948,18 @@ cdef class Row:
     self.nrows = table.nrows  # This value may change
 
 
+  cdef _newReadBuffer(self, dtype):
+    """Replace the read buffer by one with just the fields in `dtype`"""
+
+    buff = self.IObuf = numpy.empty(self.nrowsinbuf, dtype=dtype)
+    self.rfields = {}
+    for i, name in enumerate(dtype.names):
+      self.rfields[i] = buff[name]
+      self.rfields[name] = buff[name]
+    self._stride = buff.strides[0]
+    self.fieldsbuf = 1
+
+
   cdef _initLoop(self, hsize_t start, hsize_t stop, hsize_t step,
                  object coords, object chunkmap):
     """Initialization for the __iter__ iterator"""
@@ -816,6 +976,15 @@ cdef class Row:
     self._row = -1  # a sentinel
     self.whereCond = 0
     self.indexed = 0
+    if self.readahead is not None:
+      self.readahead.wait()    # do not leave reads behind
+      self.readahead = None
+    self.stats = None
+    self.limit = -1  # no limit on the number of rows
+    # Rows removed lazily are skipped
+    self.deadrows = None
+    if table._deadrows.ndead:
+      self.deadrows = table._deadrows
 
     self.nrows = table.nrows   # Update the row counter
 
@@ -849,11 +1018,26 @@ cdef class Row:
       self.iterseqMaxElements = table._v_file.params['ITERSEQ_MAX_ELEMENTS']
       self.seq_available = True
 
+    # Collect statistics for queries, if asked to
+    self.stats = None
+    if self.whereCond:
+      self.stats = table.queryStats
+      if self.stats is not None:
+        self.statstime = time()
+        self.nselected = 0
+        if self.indexed:
+          self.statshits = table._chunkcache.nhits
+
   def __next__(self):
     """next() method for __iter__() that is called on each iteration"""
     if not self._riterator:
       # The iterator is already exhausted!
       raise StopIteration
+    if self.limit == 0:
+      # Enough rows have been returned
+      self._stopEarly()
+    elif self.limit > 0:
+      self.limit = self.limit - 1
     if self.indexed:
         return self.__next__indexed()
     elif self.coords is not None:
@@ -916,6 +1100,9 @@ cdef class Row:
         IObuf = IObuf[:recout]
         self.indexValid = call_on_recarr(
           self.condfunc, self.condargs, IObuf)
+        if self.deadrows is not None:
+          self.indexValid = self.indexValid & self.deadrows.live(
+            self.bufcoords[:recout])
         self.indexValidData = <char *>self.indexValid.data
         # Get the valid coordinates
         self.indexValues = self.bufcoords[:recout][self.indexValid]
@@ -923,6 +1110,8 @@ cdef class Row:
         self.lenbuf = self.indexValues.size
         # Place the valid results at the beginning of the buffer
         IObuf[:self.lenbuf] = IObuf[self.indexValid]
+        if self.stats is not None:
+          self.stats._addRead(recout, self._stride)
 
         # Initialize the internal buffer row counter
         self._row = -1
@@ -962,6 +1151,7 @@ cdef class Row:
           continue
       # Return this row
       self.nextelement = self._nrow + 1
+      self.nselected = self.nselected + 1
       return self
     else:
       # All the elements have been read for this mode
@@ -971,7 +1161,7 @@ cdef class Row:
   cdef __next__coords(self):
     """The version of next() for user-required coordinates"""
     cdef int recout
-    cdef long long lenbuf, nextelement
+    cdef long long lenbuf, nextelement, ndropped
     cdef object tmp
 
     while self.nextelement < self.stop:
@@ -984,9 +1174,15 @@ cdef class Row:
         tmp = self.coords[self.nrowsread:self.nrowsread+lenbuf:self.step]
         # We have to get a contiguous buffer, so numpy.array is the way to go
         self.bufcoords = numpy.array(tmp, dtype="uint64")
+        if self.deadrows is not None:
+          ndropped = self.bufcoords.size
+          self.bufcoords = self.bufcoords[
+            self.deadrows.live(self.bufcoords)]
+          ndropped = ndropped - self.bufcoords.size
+          self.nextelement = self.nextelement + ndropped * self.absstep
         self._row = -1
         if self.bufcoords.size > 0:
-          recout = self.table._read_elements(self.bufcoords, self.IObuf)
+          recout = self.table._readElements(self.bufcoords, self.IObuf)
         else:
           recout = 0
         self.bufcoordsData = <hsize_t*>self.bufcoords.data
@@ -1020,14 +1216,22 @@ cdef class Row:
           self.stopb = self.nrowsinbuf
         self._row = self.startb - self.step
         # Read a chunk
-        recout = self.table._read_records(self.nextelement, self.nrowsinbuf,
-                                          self.IObuf)
+        if self.readahead is not None:
+          recout = self.readahead.read(self.nextelement, self.IObuf)
+        else:
+          recout = self.table._read_records(self.nextelement,
+                                            self.nrowsinbuf, self.IObuf)
         self.nrowsread = self.nrowsread + recout
         self.indexChunk = -self.step
+        if self.stats is not None:
+          self.stats._addRead(recout, self._stride)
 
         # Evaluate the condition on this table fragment.
         self.indexValid = call_on_recarr(
           self.condfunc, self.condargs, self.IObuf[:recout] )
+        if self.deadrows is not None:
+          self.indexValid = self.indexValid & self.deadrows.liveRange(
+            self.nextelement, self.nextelement + recout)
 
         # Is there any interesting information in this buffer?
         if not numpy.sometrue(self.indexValid):
@@ -1053,6 +1257,7 @@ cdef class Row:
       # Return only if this value is interesting
       self.indexChunk = self.indexChunk + self.step
       if self.indexValidData[self.indexChunk]:
+        self.nselected = self.nselected + 1
         return self
     else:
       self._finish_riterator()
@@ -1075,8 +1280,15 @@ cdef class Row:
           self.stopb = self.nrowsinbuf
         self._row = self.startb - self.step
         # Read a chunk
-        recout = self.table._read_records(self.nrowsread, self.nrowsinbuf,
-                                          self.IObuf)
+        if self.readahead is not None:
+          recout = self.readahead.read(self.nrowsread, self.IObuf)
+        else:
+          recout = self.table._read_records(self.nrowsread, self.nrowsinbuf,
+                                            self.IObuf)
+        if self.deadrows is not None:
+          self.liveMask = self.deadrows.liveRange(
+            self.nrowsread, self.nrowsread + recout)
+          self.liveMaskData = <char *>self.liveMask.data
         self.nrowsread = self.nrowsread + recout
 
       self._row = self._row + self.step
@@ -1086,20 +1298,48 @@ cdef class Row:
         self.startb = (self._row + self.step) % self.nrowsinbuf
 
       self.nextelement = self._nrow + self.step
+      # Skip rows removed lazily
+      if self.deadrows is not None and not self.liveMaskData[self._row]:
+        continue
       # Return this value
       return self
     else:
       self._finish_riterator()
 
 
+  cdef _stopEarly(self):
+    """Finish the iterator before all the selected rows are read"""
+    cdef ObjectCache seqcache
+
+    table = self.table
+    if self.indexed and self.seq_available and table._nslotseq >= 0:
+      # The sequence of selected rows is not complete, so do not cache it
+      seqcache = table._seqcache
+      seqcache.removeslot_(table._nslotseq)
+      self.seq_available = False
+    self._finish_riterator()
+
+
   cdef _finish_riterator(self):
     """Clean-up things after iterator has been done"""
 
     self.rfieldscache = {}     # empty rfields cache
     self.wfieldscache = {}     # empty wfields cache
+    if self.readahead is not None:
+      self.readahead.wait()    # do not leave reads behind
+      self.readahead = None
+    if self.stats is not None:
+      chunkhits = 0
+      if self.indexed:
+        chunkhits = self.table._chunkcache.nhits - self.statshits
+      self.stats._addScan(time() - self.statstime, self.nselected, chunkhits)
+      self.stats = None
     # Make a copy of the last read row in the private record
     # (this is useful for accessing the last row after an iterator loop)
-    if self._row >= 0:
+    if self._row >= 0 and self.fieldsbuf:
+      for name in self.IObuf.dtype.names:
+        self.wrec[name] = self.IObuf[name][self._row]
+    elif self._row >= 0:
       self.wrec[:] = self.IObuf[self._row]
     self._riterator = 0        # out of iterator
     if self._mod_nrows > 0:    # Check if there is some modified row
@@ -1257,6 +1497,9 @@ cdef class Row:
     if not self._riterator:
       raise NotImplementedError("You are only allowed to update rows through the Row.update() method if you are in the middle of a table iterator.")
 
+    if self.fieldsbuf:
+      raise NotImplementedError("You cannot update rows when iterating over just some fields of a table.")
+
     if self.mod_elements is None:
       # Initialize an array for keeping the modified elements
       # (just in case Row.update() would be used)
@@ -1283,12 +1526,16 @@ cdef class Row:
     """Flush any possible modified row using Row.update()"""
 
     table = self.table
+    # Get the values needed for updating indexes incrementally
+    deltas = table._getIndexDeltas(self.modified_fields,
+                                   self.mod_elements[:self._mod_nrows])
     # Save the records on disk
     table._update_elements(self._mod_nrows, self.mod_elements, self.IObufcpy)
     # Reset the counter of modified rows to 0
     self._mod_nrows = 0
-    # Mark the modified fields' indexes as dirty.
-    table._markColumnsAsDirty(self.modified_fields)
+    # Mark the modified fields' indexes as dirty (unless updated).
+    table._markColumnsAsDirty(self.modified_fields,
+                              table._applyIndexDeltas(deltas))
 
 
   def __contains__(self, item):
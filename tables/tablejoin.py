@@ -0,0 +1,464 @@
+"""
+Joins of tables on key columns.
+
+:License: BSD
+:Revision: $Id$
+
+Functions
+=========
+
+`join`
+    Join the rows of two tables with equal keys.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import math
+import os
+import tempfile
+
+import numpy
+
+from tables.bloomfilter import _hashValues
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _sortedIndex(table, colname):
+    """
+    Get the completely sorted index of a column, or `None`.
+
+    The index must be up to date and cover all the rows of the table.
+    """
+    column = table.cols._f_col(colname)
+    if not column.is_indexed:
+        return None
+    index = column.index
+    if ( index.kind != 'full' or not index.is_CSI or index.dirty or
+         index.nelements != table.nrows ):
+        return None
+    return index
+
+
+def _iterSortedKeys(table, index, kdtype, blocksize):
+    """
+    Iterate over the keys of a `table` in the order of its `index`.
+
+    ``(keys, coords)`` tuples are yielded, with keys converted to
+    `kdtype`.  Rows removed lazily are skipped.
+    """
+    deadrows = table._deadrows
+    for start in xrange(0, index.nelements, blocksize):
+        stop = min(start + blocksize, index.nelements)
+        keys = index.readSorted(start, stop).astype(kdtype)
+        coords = index.readIndices(start, stop).astype(numpy.int64)
+        if deadrows.ndead:
+            live = deadrows.live(coords)
+            keys, coords = keys[live], coords[live]
+        yield keys, coords
+
+
+def _iterKeys(table, colname, kdtype, blocksize):
+    """
+    Iterate over the keys of a `table` in the order of its rows.
+
+    ``(keys, coords)`` tuples are yielded, with keys converted to
+    `kdtype`.  Rows removed lazily are skipped.
+    """
+    deadrows = table._deadrows
+    for start in xrange(0, table.nrows, blocksize):
+        stop = min(start + blocksize, table.nrows)
+        keys = table._read(start, stop, 1, colname).astype(kdtype)
+        coords = numpy.arange(start, stop, dtype=numpy.int64)
+        if deadrows.ndead:
+            live = deadrows.liveRange(start, stop)
+            keys, coords = keys[live], coords[live]
+        yield keys, coords
+
+
+def _matchKeys(lkeys, rkeys, outer):
+    """
+    Get the positions of the pairs of equal keys.
+
+    `rkeys` must be sorted.  A ``(lidx, ridx)`` tuple is returned, with
+    the positions in `lkeys` (in ascending order) and the positions in
+    `rkeys` of every pair of equal keys.  If `outer` is true, left keys
+    without any equal right key get a single pair with a right position
+    of -1.
+    """
+    lo = rkeys.searchsorted(lkeys, 'left')
+    counts = rkeys.searchsorted(lkeys, 'right') - lo
+    if outer:
+        npairs = numpy.maximum(counts, 1)
+    else:
+        npairs = counts
+    lidx = numpy.repeat(numpy.arange(len(lkeys)), npairs)
+    firsts = numpy.cumsum(npairs) - npairs
+    ridx = ( numpy.repeat(lo - firsts, npairs) +
+             numpy.arange(len(lidx), dtype=lo.dtype) )
+    if outer:
+        ridx[numpy.repeat(counts == 0, npairs)] = -1
+    return lidx, ridx
+
+
+def _pairCoords(lcoords, lidx, rcoords, ridx):
+    """Get the coordinates of the rows in the pairs of positions."""
+    lcoords = lcoords[lidx]
+    matched = ridx >= 0
+    if matched.all():
+        return lcoords, rcoords[ridx]
+    pcoords = numpy.empty(len(ridx), dtype=numpy.int64)
+    pcoords[:] = -1
+    pcoords[matched] = rcoords[ridx[matched]]
+    return lcoords, pcoords
+
+
+class _SortedBuffer(object):
+    """Keys and coordinates sorted by key which are read block by block."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        """The iterator over ``(keys, coords)`` blocks."""
+        self.keys, self.coords = None, None
+        """The keys and coordinates in the buffer."""
+        self.more = True
+        """Whether there are more blocks to be read."""
+        self.load()
+
+    def load(self):
+        """Append the next block (if any) to the buffer."""
+        try:
+            keys, coords = self.blocks.next()
+        except StopIteration:
+            self.more = False
+            if self.keys is None:
+                self.keys = numpy.zeros(0)
+                self.coords = numpy.zeros(0, dtype=numpy.int64)
+            return
+        if self.keys is None:
+            self.keys, self.coords = keys, coords
+        else:
+            self.keys = numpy.concatenate((self.keys, keys))
+            self.coords = numpy.concatenate((self.coords, coords))
+
+    def fill(self):
+        """Read blocks until there are keys in the buffer or no more."""
+        while self.more and len(self.keys) == 0:
+            self.load()
+
+    def drop(self, n):
+        """Take the first `n` keys out of the buffer."""
+        self.keys, self.coords = self.keys[n:], self.coords[n:]
+
+
+def _mergePairs(lblocks, rblocks, outer):
+    """
+    Get the coordinates of the pairs of rows with equal keys.
+
+    `lblocks` and `rblocks` are iterators over ``(keys, coords)``
+    blocks sorted by key.  They are merged and ``(lcoords, rcoords)``
+    tuples are yielded for every batch of keys whose rows have all been
+    read from both sides.  Only the rows with the keys in the current
+    batch are kept in memory.
+    """
+    lbuf, rbuf = _SortedBuffer(lblocks), _SortedBuffer(rblocks)
+    while True:
+        lbuf.fill()
+        if len(lbuf.keys) == 0:
+            return
+        rbuf.fill()
+        if lbuf.more or rbuf.more:
+            # Rows with the last key of a side may continue in its next
+            # block, so only smaller keys are complete
+            if not rbuf.more:
+                bound = lbuf.keys[-1]
+            elif not lbuf.more:
+                bound = rbuf.keys[-1]
+            else:
+                bound = min(lbuf.keys[-1], rbuf.keys[-1])
+            nleft = lbuf.keys.searchsorted(bound, 'left')
+            nright = rbuf.keys.searchsorted(bound, 'left')
+            if nleft == 0:
+                # Right keys smaller than any left key never match
+                rbuf.drop(nright)
+                if lbuf.more and lbuf.keys[-1] == bound:
+                    lbuf.load()
+                if rbuf.more and len(rbuf.keys) and rbuf.keys[-1] == bound:
+                    rbuf.load()
+                continue
+        else:
+            nleft, nright = len(lbuf.keys), len(rbuf.keys)
+        lidx, ridx = _matchKeys(lbuf.keys[:nleft], rbuf.keys[:nright], outer)
+        yield _pairCoords(lbuf.coords[:nleft], lidx, rbuf.coords[:nright], ridx)
+        lbuf.drop(nleft)
+        rbuf.drop(nright)
+
+
+def _hashPairs(lblocks, rblocks, outer):
+    """
+    Get the coordinates of the pairs of rows with equal keys.
+
+    The ``(keys, coords)`` blocks of the right side are all read and
+    sorted by key, and the blocks of the left side are probed against
+    them.  ``(lcoords, rcoords)`` tuples are yielded for every left
+    block.
+    """
+    rkeys, rcoords = [], []
+    for keys, coords in rblocks:
+        rkeys.append(keys)
+        rcoords.append(coords)
+    if rkeys:
+        rkeys = numpy.concatenate(rkeys)
+        rcoords = numpy.concatenate(rcoords)
+        order = rkeys.argsort(kind='mergesort')
+        rkeys, rcoords = rkeys[order], rcoords[order]
+    else:
+        rcoords = numpy.zeros(0, dtype=numpy.int64)
+    for lkeys, lcoords in lblocks:
+        if len(rcoords) == 0:
+            if not outer:
+                return
+            lidx = numpy.arange(len(lkeys))
+            ridx = numpy.zeros(len(lkeys), dtype=numpy.intp) - 1
+        else:
+            lidx, ridx = _matchKeys(lkeys, rkeys, outer)
+        yield _pairCoords(lcoords, lidx, rcoords, ridx)
+
+
+def _partitionPairs(lblocks, rblocks, outer, nparts, blocksize, tmp_dir):
+    """
+    Get the coordinates of the pairs of rows with equal keys.
+
+    The ``(keys, coords)`` blocks of both sides are split in `nparts`
+    partitions by key hash in a temporary file in `tmp_dir`, and the
+    pairs of every partition are got in turn with `_hashPairs()`, so
+    only the keys of a partition of the right side are kept in memory.
+    """
+    from tables.file import openFile
+    fd, tmpfilename = tempfile.mkstemp(".tmp", "pytables-", tmp_dir)
+    # Close the file descriptor so as to avoid leaks
+    os.close(fd)
+    tmpfile = openFile(tmpfilename, "w")
+    try:
+        for side, blocks in [('l', lblocks), ('r', rblocks)]:
+            for keys, coords in blocks:
+                pairs = numpy.empty(
+                    len(keys), dtype=[('key', keys.dtype), ('coord', 'i8')])
+                pairs['key'], pairs['coord'] = keys, coords
+                parts = _hashValues(keys) % numpy.uint64(nparts)
+                for npart in xrange(nparts):
+                    name = '%s%d' % (side, npart)
+                    if name not in tmpfile.root:
+                        tmpfile.createTable(
+                            tmpfile.root, name, pairs.dtype,
+                            expectedrows=blocksize * 16)
+                    tmpfile.root._f_getChild(name).append(
+                        pairs[parts == npart])
+
+        def partBlocks(name):
+            if name not in tmpfile.root:
+                return
+            table = tmpfile.root._f_getChild(name)
+            for start in xrange(0, table.nrows, blocksize):
+                pairs = table.read(start, start + blocksize)
+                yield pairs['key'], pairs['coord']
+
+        for npart in xrange(nparts):
+            for pairs in _hashPairs( partBlocks('l%d' % npart),
+                                     partBlocks('r%d' % npart), outer ):
+                yield pairs
+    finally:
+        tmpfile.close()
+        os.remove(tmpfilename)
+
+
+def _joinDescr(left, lon, right, ron, suffixes):
+    """
+    Get the fields of the result of a join.
+
+    A list of ``(name, side, colname)`` tuples is returned, where
+    `side` is 0 for columns of the `left` table and 1 for columns of
+    the `right` one.  Columns are the top-level ones of the left table
+    followed by the ones of the right table, except for the right key
+    column if it has the same name as the left one.  Other names in
+    both tables get the respective `suffixes`.
+    """
+    rnames = [ name for name in right.colnames
+               if not (name == ron and ron == lon) ]
+    fields = []
+    for name in left.colnames:
+        if name in rnames:
+            fields.append((name + suffixes[0], 0, name))
+        else:
+            fields.append((name, 0, name))
+    for name in rnames:
+        if name in left.colnames:
+            fields.append((name + suffixes[1], 1, name))
+        else:
+            fields.append((name, 1, name))
+    return fields
+
+
+def _joinRows(left, right, fields, dtype, lcoords, rcoords):
+    """
+    Read the rows in the pairs of coordinates and join them.
+
+    Rows of the `right` table with a coordinate of -1 get the default
+    values of its columns.  A record array of `dtype` with the given
+    `fields` (as returned by `_joinDescr()`) is returned.
+    """
+    lrows = left._readCoordinates(lcoords)
+    matched = rcoords >= 0
+    if matched.all():
+        rrows = right._readCoordinates(rcoords)
+    else:
+        rrows = numpy.zeros(len(rcoords), dtype=right._v_dtype)
+        if right._v_wdflts is not None:
+            rrows[:] = right._v_wdflts[0]
+        rrows[matched] = right._readCoordinates(rcoords[matched])
+    result = numpy.empty(len(lcoords), dtype=dtype)
+    for name, side, colname in fields:
+        if side == 0:
+            result[name] = lrows[colname]
+        else:
+            result[name] = rrows[colname]
+    return result
+
+
+def _iterJoin(left, right, fields, dtype, pairs, blocksize):
+    """Iterate over the joined rows of the `pairs` in blocks."""
+    for lcoords, rcoords in pairs:
+        for start in xrange(0, len(lcoords), blocksize):
+            yield _joinRows( left, right, fields, dtype,
+                             lcoords[start:start+blocksize],
+                             rcoords[start:start+blocksize] )
+
+
+# Public functions
+# ================
+def join( left, right, on, how='inner', dest=None, suffixes=('_l', '_r'),
+          blocksize=None, tmp_dir=None ):
+    """
+    Join the rows of two tables with equal keys.
+
+    The rows of the `left` and `right` tables whose `on` columns have
+    equal values are joined.  `on` is the name of a column in both
+    tables, or a ``(leftname, rightname)`` tuple.  If `how` is
+    ``'inner'`` (the default), only rows with a key in both tables are
+    returned; if it is ``'left'``, rows of the left table without a
+    match are returned too, with the default values of the right
+    columns.
+
+    Joined rows have the top-level columns of the left table followed
+    by the ones of the right table (without the right key column if it
+    has the same name as the left one).  Other columns with the same
+    name in both tables get the respective `suffixes`.
+
+    If both key columns have a completely sorted index (see
+    `Column.createCSIndex()`), both tables are streamed in key order and
+    merged, and joined rows come sorted by key.  Otherwise, the keys of
+    the right table are kept in memory, sorted, and the left table is
+    scanned in blocks, so joined rows come in the order of the left
+    table; if they take more than ``JOIN_MAX_MEMORY`` bytes, the keys
+    of both tables are split by hash in partitions of a temporary file
+    in `tmp_dir` first, and partitions are joined in turn.  Only keys
+    and row coordinates are kept in memory, and rows are read in blocks
+    of up to `blocksize` rows (the number of rows in the I/O buffer of
+    the left table by default).
+
+    If `dest` is `None`, an iterator over record arrays with the joined
+    rows is returned.  Otherwise, it must be a table with the columns
+    of the joined rows, they are appended to it and the number of rows
+    appended is returned.
+    """
+    if isinstance(on, str):
+        lon = ron = on
+    else:
+        lon, ron = on
+    if how not in ('inner', 'left'):
+        raise ValueError( "``how`` must be either 'inner' or 'left', "
+                          "not %r" % (how,) )
+    outer = (how == 'left')
+    if blocksize is None:
+        blocksize = left.nrowsinbuf
+    elif blocksize < 1:
+        raise ValueError("``blocksize`` must be a positive integer")
+    for table, colname in [(left, lon), (right, ron)]:
+        if colname not in table.colpathnames:
+            raise KeyError( "table ``%s`` does not have a column named "
+                            "``%s``" % (table._v_pathname, colname) )
+        if table.coldtypes[colname].shape != ():
+            raise TypeError( "multidimensional columns can not be used "
+                             "as keys: %s" % colname )
+    kdtype = numpy.find_common_type(
+        [left.coldtypes[lon], right.coldtypes[ron]], [])
+
+    fields = _joinDescr(left, lon, right, ron, suffixes)
+    dtype = numpy.dtype([ (name, (left, right)[side]._v_dtype[colname])
+                          for name, side, colname in fields ])
+    if dest is not None:
+        dest._v_file._checkWritable()
+        names = list(dtype.names)
+        names.sort()
+        dnames = list(dest.colnames)
+        dnames.sort()
+        if names != dnames:
+            raise ValueError( "the columns of table ``%s`` do not match "
+                              "the ones of the joined rows: %s"
+                              % (dest._v_pathname, list(dtype.names)) )
+
+    lindex, rindex = _sortedIndex(left, lon), _sortedIndex(right, ron)
+    if lindex is not None and rindex is not None:
+        pairs = _mergePairs(
+            _iterSortedKeys(left, lindex, kdtype, blocksize),
+            _iterSortedKeys(right, rindex, kdtype, blocksize), outer)
+    else:
+        lblocks = _iterKeys(left, lon, kdtype, blocksize)
+        rblocks = _iterKeys(right, ron, kdtype, blocksize)
+        rsize = right.nrows * (kdtype.itemsize + 8)
+        maxmemory = left._v_file.params['JOIN_MAX_MEMORY']
+        nparts = int(math.ceil(float(rsize) / maxmemory))
+        if nparts > 1:
+            pairs = _partitionPairs(
+                lblocks, rblocks, outer, nparts, blocksize, tmp_dir)
+        else:
+            pairs = _hashPairs(lblocks, rblocks, outer)
+
+    blocks = _iterJoin(left, right, fields, dtype, pairs, blocksize)
+    if dest is None:
+        return blocks
+    nrows = 0
+    for block in blocks:
+        if dest._v_dtype != dtype:
+            rows = numpy.empty(len(block), dtype=dest._v_dtype)
+            for name in dtype.names:
+                rows[name] = block[name]
+            block = rows
+        # The block is private, so it can be converted in place
+        dest._saveBufferedRows(block, len(block))
+        nrows += len(block)
+    return nrows
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End:
@@ -2585,6 +2585,46 @@ class MDAtomReopen(MDAtomTestCase):
     reopen = True
 
 
+class AsyncAppendTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def test00_append(self):
+        "Append to an EArray in a background writer thread."
+        ea = self.h5file.createEArray('/', 'test', Int32Atom(), (0, 2),
+                                      filters=Filters(complevel=1),
+                                      chunkshape=(16, 2))
+        appender = ea.asyncAppender(queue_depth=2)
+        chunk = numpy.zeros((10, 2), 'i4')
+        for i in range(50):
+            chunk[:] = i
+            # The sequence is reused before being written
+            ea.append(chunk)
+        ea.flush()
+        self.assertEqual(ea.nrows, 500)
+        self.assertEqual(appender.pending, 0)
+        self.assertTrue(allequal(ea[:, 0], numpy.arange(500, dtype='i4') // 10))
+        ea.append(chunk)
+        # Closing the file writes the pending data
+        self._reopen()
+        ea = self.h5file.root.test
+        self.assertEqual(ea.nrows, 510)
+        self.assertTrue(allequal(ea[-10:], chunk))
+
+    def test01_read(self):
+        "Reads right after appending see all the data."
+        ea = self.h5file.createEArray('/', 'test', Int32Atom(), (0,),
+                                      chunkshape=(16,))
+        appender = ea.asyncAppender()
+        for i in range(10):
+            ea.append(numpy.arange(i*100, (i+1)*100, dtype='i4'))
+        self.assertTrue(allequal(ea.read(), numpy.arange(1000, dtype='i4')))
+        ea.append([1000])
+        self.assertEqual(ea[1000], 1000)
+        ea.append([1001])
+        ea.truncate(1001)
+        self.assertEqual(ea.nrows, 1001)
+        appender.close()
+
+
 
 #----------------------------------------------------------------------
 
@@ -2650,6 +2690,7 @@ def suite():
         theSuite.addTest(unittest.makeSuite(ZeroSizedTestCase))
         theSuite.addTest(unittest.makeSuite(MDAtomNoReopen))
         theSuite.addTest(unittest.makeSuite(MDAtomReopen))
+        theSuite.addTest(unittest.makeSuite(AsyncAppendTestCase))
     if common.heavy:
         theSuite.addTest(unittest.makeSuite(Slices3EArrayTestCase))
         theSuite.addTest(unittest.makeSuite(Slices4EArrayTestCase))
@@ -2,13 +2,14 @@ import unittest
 import os
 import tempfile
 import copy
+import warnings
 
 from tables import *
 from tables.index import Index, defaultAutoIndex, defaultIndexFilters
 from tables.idxutils import calcChunksize
 from tables.tests.common import verbose, allequal, heavy, cleanup, \
      PyTablesTestCase, TempFileMixin
-from tables.exceptions import OldIndexWarning
+from tables.exceptions import OldIndexWarning, ExperimentalFeatureWarning
 
 # To delete the internal attributes automagically
 unittest.TestCase.tearDown = cleanup
@@ -2221,6 +2222,695 @@ class CompletelySortedIndexTestCase(TempFileMixin, PyTablesTestCase):
 
 
 
+class ThreadedIndexBuildTestCase(TempFileMixin, PyTablesTestCase):
+    """Indexes built in several threads must be identical to serial ones."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(ThreadedIndexBuildTestCase, self).setUp()
+        # Lots of repeated values, so that ties are sorted out too
+        numpy.random.seed(23)
+        self.data = numpy.random.randint(0, 50, self.nrows)
+
+    def _buildIndex(self, name, kind, optlevel, nthreads, memory=None):
+        params = self.h5file.params
+        table = self.h5file.createTable(
+            '/', name, {'icol': Int32Col(pos=0), 'fcol': Float64Col(pos=1)})
+        table.append(zip(self.data, self.data / 3.))
+        table.flush()
+        oldparams = params['MAX_THREADS'], params['INDEX_BUILD_MAX_MEMORY']
+        params['MAX_THREADS'] = nthreads
+        if memory is not None:
+            params['INDEX_BUILD_MAX_MEMORY'] = memory
+        try:
+            for col in (table.cols.icol, table.cols.fcol):
+                col.createIndex(kind=kind, optlevel=optlevel,
+                                _blocksizes=small_blocksizes)
+        finally:
+            params['MAX_THREADS'], params['INDEX_BUILD_MAX_MEMORY'] = \
+                                   oldparams
+        return table
+
+    def _checkIndexes(self, kind, optlevel, memory=None):
+        serial = self._buildIndex('serial', kind, optlevel, 1)
+        threaded = self._buildIndex('threaded', kind, optlevel, 4, memory)
+        for colname in ('icol', 'fcol'):
+            sindex = serial.cols._f_col(colname).index
+            tindex = threaded.cols._f_col(colname).index
+            for sleaf in sindex._f_walkNodes('Leaf'):
+                tleaf = tindex._f_getChild(sleaf.name)
+                if verbose:
+                    print "Comparing leaf:", tleaf._v_pathname
+                self.assertTrue(allequal(sleaf.read(), tleaf.read()))
+        self.assertEqual(threaded.getWhereList('icol == 7').tolist(),
+                         numpy.where(self.data == 7)[0].tolist())
+
+    def test00_ultralight(self):
+        """Building ultralight indexes in several threads."""
+        self._checkIndexes('ultralight', 6)
+
+    def test01_light(self):
+        """Building light indexes in several threads."""
+        self._checkIndexes('light', 9)
+
+    def test02_medium(self):
+        """Building medium indexes in several threads."""
+        self._checkIndexes('medium', 6)
+
+    def test03_full(self):
+        """Building full indexes in several threads."""
+        self._checkIndexes('full', 9)
+
+    def test04_memory(self):
+        """Building indexes in several threads with a tiny memory budget."""
+        self._checkIndexes('full', 6, memory=1)
+
+
+class SearchManyTestCase(TempFileMixin, PyTablesTestCase):
+    """Batched lookups of several keys and ranges in indexes."""
+
+    nrows = 1003   # some elements in the last row too
+
+    def setUp(self):
+        super(SearchManyTestCase, self).setUp()
+        numpy.random.seed(19)
+        self.data = numpy.random.randint(0, 200, self.nrows)
+        self.table = self.h5file.createTable(
+            '/', 'table', {'icol': Int32Col(pos=0), 'fcol': Float64Col(pos=1),
+                           'scol': StringCol(4, pos=2)})
+        self.table.append(zip(self.data, self.data / 2.,
+                              [str(i) for i in self.data]))
+        self.table.flush()
+
+    def _checkSearchMany(self, kind, optlevel, blocksizes=small_blocksizes):
+        table = self.table
+        for colname in ('icol', 'fcol'):
+            table.cols._f_col(colname).createIndex(
+                kind=kind, optlevel=optlevel, _blocksizes=blocksizes)
+        values = table.col('icol')
+        index = table.cols.icol.index
+        keys = numpy.array([-5, 0, 3, 7, 8, 120, 199, 500])
+        groups = index.searchMany(keys)
+        self.assertEqual(len(groups), len(keys))
+        for key, coords in zip(keys, groups):
+            if verbose:
+                print "Coordinates for key %s: %s" % (key, coords)
+            self.assertEqual(coords.tolist(),
+                             numpy.where(values == key)[0].tolist())
+        ranges = numpy.array([[-10, 2], [5, 5], [20, 99], [150, 300]])
+        groups = index.searchMany(ranges)
+        for (lo, hi), coords in zip(ranges, groups):
+            self.assertEqual(
+                coords.tolist(),
+                numpy.where((values >= lo) & (values <= hi))[0].tolist())
+        fvalues = table.col('fcol')
+        groups = table.cols.fcol.index.searchMany([[1.5, 4.5], [50., 51.]])
+        for (lo, hi), coords in zip([[1.5, 4.5], [50., 51.]], groups):
+            self.assertEqual(
+                coords.tolist(),
+                numpy.where((fvalues >= lo) & (fvalues <= hi))[0].tolist())
+
+    def test00_ultralight(self):
+        """Batched lookups in ultralight indexes."""
+        self._checkSearchMany('ultralight', 3)
+
+    def test01_light(self):
+        """Batched lookups in light indexes."""
+        self._checkSearchMany('light', 6)
+
+    def test02_medium(self):
+        """Batched lookups in medium indexes."""
+        self._checkSearchMany('medium', 6)
+
+    def test03_full(self):
+        """Batched lookups in full indexes."""
+        self._checkSearchMany('full', 9)
+
+    def test03b_reduction(self):
+        """Batched lookups in indexes with reduced sorted values."""
+        self._checkSearchMany('ultralight', 3, (1024, 512, 256, 8))
+        self.assertEqual(self.table.cols.icol.index.reduction, 8)
+
+    def test04_wrongItems(self):
+        """Batched lookups with unsorted or overlapping items."""
+        self.table.cols.icol.createIndex(_blocksizes=small_blocksizes)
+        index = self.table.cols.icol.index
+        self.assertRaises(ValueError, index.searchMany, [3, 1])
+        self.assertRaises(ValueError, index.searchMany, [1, 1])
+        self.assertRaises(ValueError, index.searchMany, [[1, 5], [4, 8]])
+        self.assertRaises(ValueError, index.searchMany, [[5, 1]])
+        self.assertEqual(index.searchMany([]), [])
+
+    def _checkWhereListIn(self):
+        table = self.table
+        values = [7, 3.5, 120, 7, 1000, 0]
+        coords = table.getWhereListIn('icol', values)
+        expected = numpy.where(numpy.in1d(self.data, [7, 120, 1000, 0]))[0]
+        self.assertEqual(coords.tolist(), expected.tolist())
+        groups = table.getWhereListIn('icol', values, grouped=True)
+        self.assertEqual(len(groups), len(values))
+        for value, coords in zip(values, groups):
+            self.assertEqual(coords.tolist(),
+                             numpy.where(self.data == value)[0].tolist())
+        rows = table.readWhereIn('scol', ['7', '120'])
+        self.assertEqual(
+            rows['icol'].tolist(),
+            self.data[(self.data == 7) | (self.data == 120)].tolist())
+        rows = table.readWhereIn('icol', [7], field='fcol')
+        self.assertEqual(rows.tolist(),
+                         (self.data[self.data == 7] / 2.).tolist())
+        self.assertEqual(table.getWhereListIn('icol', []).tolist(), [])
+
+    def test05_getWhereListIn(self):
+        """Table.getWhereListIn() and Table.readWhereIn() without indexes."""
+        self._checkWhereListIn()
+
+    def test06_getWhereListInIndexed(self):
+        """Table.getWhereListIn() and Table.readWhereIn() with indexes."""
+        for colname in ('icol', 'scol'):
+            self.table.cols._f_col(colname).createIndex(
+                _blocksizes=small_blocksizes)
+        self._checkWhereListIn()
+
+
+class IncrementalIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Incremental updates of indexes after modifying or removing rows."""
+
+    nrows = 1003   # some elements in the last row too
+
+    def setUp(self):
+        super(IncrementalIndexTestCase, self).setUp()
+        numpy.random.seed(23)
+        data = numpy.random.randint(0, 100, self.nrows)
+        self.table = self.h5file.createTable(
+            '/', 'table', {'icol': Int32Col(pos=0), 'fcol': Float64Col(pos=1)},
+            chunkshape=16)
+        self.table.append(zip(data, data / 2.))
+        self.table.flush()
+
+    def _createIndexes(self, kind='full', optlevel=6):
+        for colname in ('icol', 'fcol'):
+            self.table.cols._f_col(colname).createIndex(
+                kind=kind, optlevel=optlevel, _blocksizes=small_blocksizes)
+
+    def _checkQueries(self):
+        table = self.table
+        values = table.col('icol')
+        for cond, expected in [
+            ('icol == 7', values == 7),
+            ('(icol > 20) & (icol <= 25)', (values > 20) & (values <= 25)),
+            ('icol >= 200', values >= 200),
+            ('fcol < 3', values / 2. < 3) ]:
+            self.assertTrue(table.willQueryUseIndexing(cond))
+            coords = table.getWhereList(cond)
+            if verbose:
+                print "Coordinates for %s: %s" % (cond, coords)
+            self.assertEqual(coords.tolist(),
+                             numpy.where(expected)[0].tolist())
+        keys = numpy.array([7, 30, 200])
+        groups = table.cols.icol.index.searchMany(keys)
+        for key, coords in zip(keys, groups):
+            self.assertEqual(coords.tolist(),
+                             numpy.where(values == key)[0].tolist())
+
+    def _checkUpdated(self, ndeltas=True):
+        for colname in ('icol', 'fcol'):
+            index = self.table.cols._f_col(colname).index
+            self.assertFalse(index.dirty)
+            self.assertEqual(index.ndeltas > 0, ndeltas)
+        self._checkQueries()
+
+    def _modify(self):
+        table = self.table
+        table.modifyRows(10, 13, rows=[(200, 100.), (7, 3.5), (0, 0.)])
+        table.modifyColumns(table.nrows-3, names=['icol', 'fcol'],
+                            columns=[[7, 200], [3.5, 100.]])
+        table.modifyCoordinates([500, 20, table.nrows-4],
+                                [(22, 11.), (7, 3.5), (300, 150.)])
+        for row in table.where('icol == 30'):
+            row['icol'] = 7
+            row['fcol'] = 3.5
+            row.update()
+        table.flush()
+
+    def test00_modifyFull(self):
+        """Modifying rows with full indexes."""
+        self._createIndexes('full')
+        self._modify()
+        self._checkUpdated()
+
+    def test01_modifyMedium(self):
+        """Modifying rows with medium indexes."""
+        self._createIndexes('medium')
+        self._modify()
+        self._checkUpdated()
+
+    def test02_modifyLight(self):
+        """Modifying rows with light and ultralight indexes."""
+        self.table.cols.icol.createIndex(
+            kind='light', _blocksizes=small_blocksizes)
+        self.table.cols.fcol.createIndex(
+            kind='ultralight', _blocksizes=small_blocksizes)
+        self._modify()
+        self._checkUpdated()
+
+    def test03_remove(self):
+        """Removing rows (also in the last row of indexes)."""
+        self._createIndexes('full')
+        table = self.table
+        table.removeRows(100, 150)
+        table.removeRows(90, 110)
+        self._modify()
+        self._checkUpdated()
+        index = table.cols.icol.index
+        self.assertEqual(index.nremoved, 70)
+        self.assertEqual(table._indexedrows, table.nrows)
+        table.removeRows(table.nrows - 10)
+        self.assertEqual(index.nremoved, 70)
+        self._checkUpdated()
+
+    def test04_removeAppend(self):
+        """Appending rows after removing some."""
+        self._createIndexes('medium')
+        table = self.table
+        table.removeRows(0, 20)
+        table.modifyRows(500, rows=[(7, 3.5)])
+        table.append([(7, 3.5)] * 10 + [(30, 15.)] * 10)
+        table.flush()
+        self.assertEqual(table._indexedrows, table.nrows)
+        self._checkUpdated()
+        self._reopen('a')
+        self.table = self.h5file.root.table
+        self.assertEqual(self.table.cols.icol.index.nremoved, 20)
+        self._checkUpdated()
+
+    def test05_fold(self):
+        """Merging modifications into the sorted arrays."""
+        self._createIndexes('full')
+        self.h5file.params['INDEX_MAX_DELTAS'] = 5
+        table = self.table
+        table.modifyRows(10, 13, rows=[(200, 100.), (7, 3.5), (0, 0.)])
+        table.modifyCoordinates([500, 20, 1000],
+                                [(22, 11.), (7, 3.5), (300, 150.)])
+        self._checkUpdated(ndeltas=False)
+        self.table.removeRows(0, 10)
+        self.table.removeRows(40, 50)
+        self.assertTrue(self.table.cols.icol.index.nremoved > 0)
+        self._checkUpdated()
+
+    def test06_foldRebuild(self):
+        """Rebuilding indexes when removed rows must be merged."""
+        self._createIndexes('full')
+        self.h5file.params['INDEX_MAX_DELTAS'] = 1
+        self.table.removeRows(0, 10)
+        self.table.removeRows(40, 50)
+        self.assertEqual(self.table.cols.icol.index.nremoved, 0)
+        self._checkUpdated(ndeltas=False)
+
+    def _checkReadSorted(self):
+        values = self.table.readSorted('icol', field='icol')
+        index = self.table.cols.icol.index
+        self.assertEqual(index.ndeltas, 0)
+        # Slices of the index are sorted, although they may overlap
+        self.assertEqual(sorted(values), sorted(self.table.col('icol')))
+        for nslice in xrange(index.nslices):
+            svalues = values[nslice*index.slicesize:(nslice+1)*index.slicesize]
+            self.assertEqual(svalues.tolist(), sorted(svalues))
+        self.assertEqual(values[index.nslices*index.slicesize:].tolist(),
+                         index.sortedLR[:index.nelementsILR].tolist())
+
+    def test07_readSorted(self):
+        """Reading sorted rows with pending modifications."""
+        self._createIndexes('full')
+        table = self.table
+        self._modify()
+        self.assertTrue(table.cols.icol.index.ndeltas > 0)
+        self.assertFalse(table.cols.icol.index.is_CSI)
+        self._checkReadSorted()
+        table.removeRows(0, 10)
+        self._checkReadSorted()
+
+    def test08_noDeltas(self):
+        """Rebuilding indexes instead of updating them."""
+        self._createIndexes('full')
+        self.h5file.params['INDEX_MAX_DELTAS'] = 0
+        self._modify()
+        self.table.removeRows(0, 10)
+        self._checkUpdated(ndeltas=False)
+
+    def test09_completelySorted(self):
+        """Completely sorted indexes are rebuilt."""
+        self._createIndexes('full', 9)
+        self._modify()
+        self.table.removeRows(0, 10)
+        self._checkUpdated(ndeltas=False)
+        self.assertTrue(self.table.cols.icol.index.is_CSI)
+
+    def test10_limitsCache(self):
+        """Lookups hitting the limits cache after modifying rows."""
+        # Few rows per value, so that many values fall between the
+        # samples kept by the ultralight index
+        data = numpy.random.randint(0, 600, 4000)
+        table = self.h5file.createTable(
+            '/', 'sparse', {'icol': Int32Col()}, chunkshape=100)
+        table.append(zip(data))
+        table.cols.icol.createIndex(kind='ultralight', optlevel=3)
+        self.assertTrue(table.cols.icol.index.reduction > 1)
+        for key in range(50):
+            table.getWhereList('icol == %d' % key)
+        table.modifyRows(100, 130, 3, rows=[(1000,)] * 10)
+        values = table.col('icol')
+        for key in range(50):
+            coords = table.getWhereList('icol == %d' % key)
+            self.assertEqual(coords.tolist(),
+                             numpy.where(values == key)[0].tolist())
+
+
+class MappedCachesTestCase(TempFileMixin, PyTablesTestCase):
+    """Index lookups with ranges and bounds mapped in memory."""
+
+    nrows = 1003
+
+    def setUp(self):
+        super(MappedCachesTestCase, self).setUp()
+        self.h5file.params['INDEX_MAPPED_CACHES'] = True
+        numpy.random.seed(23)
+        data = numpy.random.randint(0, 100, self.nrows)
+        self.table = self.h5file.createTable(
+            '/', 'table',
+            {'icol': Int32Col(pos=0), 'scol': StringCol(4, pos=1)})
+        self.table.append(zip(data, data.astype('S4')))
+        self.table.flush()
+        for colname in ('icol', 'scol'):
+            self.table.cols._f_col(colname).createIndex(
+                _blocksizes=small_blocksizes)
+
+    def _reopen(self, mode='r'):
+        self.h5file.close()
+        self.h5file = openFile(self.h5fname, mode, INDEX_MAPPED_CACHES=True)
+        self.table = self.h5file.root.table
+
+    def _checkQueries(self, mapped=True):
+        table = self.table
+        values = table.read()
+        for cond, expected in [
+            ('(icol > 20) & (icol <= 25)',
+             (values['icol'] > 20) & (values['icol'] <= 25)),
+            ('icol == 7', values['icol'] == 7),
+            ('scol == "42"', values['scol'] == "42") ]:
+            coords = table.getWhereList(cond)
+            self.assertEqual(coords.tolist(),
+                             numpy.where(expected)[0].tolist())
+        for colname in ('icol', 'scol'):
+            index = table.cols._f_col(colname).index
+            if not mapped:
+                self.assertTrue(index.mappedcaches is None)
+                continue
+            ranges, bounds = index.mappedcaches
+            self.assertTrue(isinstance(ranges, numpy.memmap))
+            self.assertEqual(ranges.tolist(), index.ranges[:].tolist())
+            self.assertEqual(bounds.tolist(), index.bounds[:].tolist())
+
+    def test00_query(self):
+        """Querying with mapped caches."""
+        self._checkQueries()
+
+    def test01_reopen(self):
+        """Querying with mapped caches in a read-only file."""
+        self._checkQueries()
+        self._reopen()
+        self._checkQueries()
+
+    def test02_readOnly(self):
+        """Caches are not mapped if they can not be written."""
+        self._reopen()
+        self._checkQueries(mapped=False)
+
+    def test03_append(self):
+        """Caches are written again after appending rows."""
+        self._checkQueries()
+        self.table.append([(7, "7")] * 100)
+        self.table.flush()
+        self._checkQueries()
+        self._reopen()
+        self._checkQueries()
+
+    def test04_modify(self):
+        """Caches are written again after merging modified rows."""
+        self._checkQueries()
+        self.h5file.params['INDEX_MAX_DELTAS'] = 1
+        self.table.modifyRows(0, rows=[(7, "42")])
+        self.table.modifyRows(500, rows=[(7, "42")])
+        index = self.table.cols.icol.index
+        self.assertEqual(index.ndeltas, 0)
+        self.assertTrue(index.nslices > 0)
+        self._checkQueries()
+
+
+class SortedColumnIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Building indexes for (nearly) sorted columns."""
+
+    nrows = 1003
+
+    def setUp(self):
+        super(SortedColumnIndexTestCase, self).setUp()
+        self.nswaps = 0
+        self._swap = Index.swap
+        def swap(index, what, mode=None):
+            self.nswaps += 1
+            return self._swap(index, what, mode)
+        Index.swap = swap
+
+    def tearDown(self):
+        Index.swap = self._swap
+        super(SortedColumnIndexTestCase, self).tearDown()
+
+    def _checkIndex(self, data, cs=False, kind='full', optlevel=6):
+        table = self.h5file.createTable(
+            '/', 'table', {'icol': Int32Col(pos=0), 'scol': StringCol(8)})
+        table.append(zip(data, ['%08d' % value for value in data]))
+        table.flush()
+        for col in (table.cols.icol, table.cols.scol):
+            if cs:
+                col.createCSIndex(_blocksizes=small_blocksizes)
+            else:
+                col.createIndex(kind=kind, optlevel=optlevel,
+                                _blocksizes=small_blocksizes)
+        index = table.cols.icol.index
+        self.assertTrue(index.nslices > 0)
+        if cs:
+            self.assertTrue(index.is_CSI)
+            self.assertEqual(index.readSorted().tolist(),
+                             numpy.sort(data).tolist())
+        middle = data[len(data) // 2]
+        for cond, expected in [
+            ('(icol > 200) & (icol <= 250)', (data > 200) & (data <= 250)),
+            ('icol == 7', data == 7),
+            ('scol == "%08d"' % middle, data == middle) ]:
+            self.assertEqual(table.getWhereList(cond).tolist(),
+                             numpy.where(expected)[0].tolist())
+        return table
+
+    def test00_sorted(self):
+        """Indexing a sorted column does not swap chunks nor slices."""
+        table = self._checkIndex(numpy.arange(self.nrows))
+        self.assertEqual(self.nswaps, 0)
+        self.assertTrue(table.cols.icol.index.is_CSI)
+        self.assertTrue(table.cols.scol.index.is_CSI)
+
+    def test01_nearlySorted(self):
+        """Indexing a nearly sorted column does not swap chunks nor slices."""
+        numpy.random.seed(23)
+        # Slices only overlap a little with their neighbours
+        data = numpy.arange(self.nrows) * 100 + numpy.random.randint(
+            0, 120, self.nrows)
+        self._checkIndex(data)
+        self.assertEqual(self.nswaps, 0)
+
+    def test01b_nearlySortedCS(self):
+        """Completely sorted indexes of a nearly sorted column."""
+        numpy.random.seed(23)
+        data = numpy.arange(self.nrows) + numpy.random.randint(0, 20,
+                                                               self.nrows)
+        for cs in (True, False):
+            self._checkIndex(data, cs=cs, optlevel=9)
+            self._checkOverlaps(self.h5file.root.table)
+            self.h5file.root.table.remove()
+
+    def test02_light(self):
+        """Indexing a sorted column with a light index."""
+        self._checkIndex(numpy.arange(self.nrows), kind='light')
+        self.assertEqual(self.nswaps, 0)
+
+    def test03_unsorted(self):
+        """Indexing an unsorted column still swaps chunks and slices."""
+        numpy.random.seed(23)
+        data = numpy.random.randint(0, 1000, self.nrows)
+        table = self._checkIndex(data, cs=True)
+        self.assertTrue(self.nswaps > 0)
+        self.assertTrue(table.cols.icol.index.is_CSI)
+
+    def _checkOverlaps(self, table, maxtover=0.):
+        index = table.cols.icol.index
+        nover, mult, tover = index.compute_overlaps(index, "test", verbose)
+        self.assertEqual(nover, 0)
+        self.assertTrue(tover <= maxtover)
+
+    def test04_twoSlices(self):
+        """Indexing an unsorted column with two overlapping slices."""
+        numpy.random.seed(23)
+        nrows = small_blocksizes[2] * 2  # no last row
+        data = numpy.random.randint(0, 1000, nrows)
+        for kind in ('medium', 'full'):
+            self._checkIndex(data, kind=kind)
+            self.assertTrue(self.nswaps > 0)
+            self._checkOverlaps(self.h5file.root.table)
+            self.h5file.root.table.remove()
+        self._checkIndex(data, cs=True)
+
+    def test05_shuffledPairs(self):
+        """Indexing a column shuffled within pairs of slices."""
+        numpy.random.seed(23)
+        nslices = self.nrows // small_blocksizes[2]
+        pairsize = small_blocksizes[2] * 2
+        data = numpy.arange(nslices * small_blocksizes[2])
+        for start in xrange(0, len(data), pairsize):
+            numpy.random.shuffle(data[start:start+pairsize])
+        for kind in ('medium', 'full'):
+            self._checkIndex(data, kind=kind)
+            self._checkOverlaps(self.h5file.root.table)
+            self.h5file.root.table.remove()
+
+
+class DeltaEncodingTestCase(TempFileMixin, PyTablesTestCase):
+    """Indexes storing the differences of sorted values and row numbers."""
+
+    nrows = 1003
+    byteorder = None
+
+    def setUp(self):
+        super(DeltaEncodingTestCase, self).setUp()
+        numpy.random.seed(23)
+        self.values = values = numpy.empty(self.nrows, dtype=[
+            ('tcol', 'i8'), ('icol', 'i4'), ('fcol', 'f8'), ('scol', 'S4')])
+        values['tcol'] = numpy.arange(self.nrows) * 1000 - 500000
+        values['icol'] = numpy.random.randint(-100, 100, self.nrows)
+        values['fcol'] = numpy.random.normal(size=self.nrows)
+        values['scol'] = values['icol'].astype('S4')
+        # The same indexes without differences, for comparison
+        self.plain = self._createTable('plain', False)
+        self.table = self._createTable('table', True)
+
+    def _createTable(self, name, delta):
+        self.h5file.params['INDEX_DELTA_ENCODING'] = delta
+        # Values may be byteswapped in place by the table
+        table = self.h5file.createTable(
+            '/', name, self.values.copy(), byteorder=self.byteorder)
+        warnings.filterwarnings('ignore', category=ExperimentalFeatureWarning)
+        try:
+            for colname, kind in [('tcol', 'full'), ('icol', 'light'),
+                                  ('fcol', 'full'), ('scol', 'medium')]:
+                table.cols._f_col(colname).createIndex(
+                    kind=kind, _blocksizes=small_blocksizes)
+        finally:
+            warnings.filterwarnings(
+                'default', category=ExperimentalFeatureWarning)
+        return table
+
+    def _reopen(self):
+        self.h5file.close()
+        self.h5file = openFile(self.h5fname)
+        self.plain = self.h5file.root.plain
+        self.table = self.h5file.root.table
+
+    def _checkQueries(self):
+        table = self.table
+        values = self.values
+        for cond, expected in [
+            ('(tcol > -2000) & (tcol <= 25000)',
+             (values['tcol'] > -2000) & (values['tcol'] <= 25000)),
+            ('icol == 7', values['icol'] == 7),
+            ('(fcol > 0.5) & (fcol < 0.7)',
+             (values['fcol'] > 0.5) & (values['fcol'] < 0.7)),
+            ('scol == "42"', values['scol'] == "42") ]:
+            self.assertEqual(table.getWhereList(cond).tolist(),
+                             numpy.where(expected)[0].tolist())
+        for colname in ('tcol', 'icol', 'fcol', 'scol'):
+            index = table.cols._f_col(colname).index
+            pindex = self.plain.cols._f_col(colname).index
+            for name in ('sorted', 'indices'):
+                self.assertTrue(allequal(index._f_getChild(name).read(),
+                                         pindex._f_getChild(name).read()))
+
+    def test00_filters(self):
+        """The delta filter is used by the arrays of numerical indexes."""
+        from tables.utilsExtension import getFilters
+        for colname in ('tcol', 'icol', 'fcol', 'scol'):
+            index = self.table.cols._f_col(colname).index
+            for name in ('sorted', 'indices'):
+                filters = getFilters(index._v_objectID, name)
+                if verbose:
+                    print "Filters of %s/%s:" % (colname, name), filters
+                self.assertEqual('delta' in filters,
+                                 colname != 'scol' or name == 'indices')
+            # The filters of the index are not changed
+            self.assertEqual(index.filters, defaultIndexFilters)
+
+    def test00b_filterid(self):
+        """The ID of the delta filter is recorded in the indexes."""
+        from tables.utilsExtension import delta_filter_id
+        for table in (self.plain, self.table):
+            index = table.cols.tcol.index
+            if table is self.table:
+                self.assertEqual(index._v_attrs.deltafilter, delta_filter_id)
+            else:
+                self.assertFalse('deltafilter' in index._v_attrs)
+        # Creating indexes with differences issues a warning
+        table = self.h5file.createTable('/', 'other', self.values[:10])
+        self.assertWarns(ExperimentalFeatureWarning,
+                         table.cols.tcol.createIndex)
+        # Indexes using another delta filter are ignored
+        self.table.cols.tcol.index._v_attrs.deltafilter = numpy.uint32(
+            delta_filter_id + 1)
+        self.h5file.close()
+        self.h5file = openFile(self.h5fname)
+        table = self.assertWarns(OldIndexWarning, getattr,
+                                 self.h5file.root, 'table')
+        self.assertFalse(table.colindexed['tcol'])
+        self.assertTrue(table.colindexed['icol'])
+        self.assertFalse(table.willQueryUseIndexing('tcol < 0'))
+        self.assertEqual(len(table.getWhereList('tcol < 0')), 500)
+
+    def test01_query(self):
+        """Querying indexes with differences."""
+        self._checkQueries()
+
+    def test02_reopen(self):
+        """Querying indexes with differences after reopening."""
+        self._reopen()
+        self._checkQueries()
+
+    def test03_append(self):
+        """Appending rows to indexes with differences."""
+        values = self.values.copy()
+        values['tcol'] += self.nrows * 1000
+        for table in (self.plain, self.table):
+            table.append(values.copy())
+            table.flush()
+        self.values = numpy.concatenate((self.values, values))
+        self._reopen()
+        self._checkQueries()
+
+
+class BigEndianDeltaEncodingTestCase(DeltaEncodingTestCase):
+    byteorder = 'big'
+
+
+class LittleEndianDeltaEncodingTestCase(DeltaEncodingTestCase):
+    byteorder = 'little'
+
+
 class readSortedIndexTestCase(TempFileMixin, PyTablesTestCase):
     """Test case for testing sorted reading in a "full" sorted column."""
 
@@ -2347,6 +3037,15 @@ def suite():
         theSuite.addTest(unittest.makeSuite(OldIndexTestCase))
         theSuite.addTest(unittest.makeSuite(CompletelySortedIndexTestCase))
         theSuite.addTest(unittest.makeSuite(ManyNodesTestCase))
+        theSuite.addTest(unittest.makeSuite(ThreadedIndexBuildTestCase))
+        theSuite.addTest(unittest.makeSuite(SearchManyTestCase))
+        theSuite.addTest(unittest.makeSuite(IncrementalIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(MappedCachesTestCase))
+        theSuite.addTest(unittest.makeSuite(SortedColumnIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(DeltaEncodingTestCase))
+        theSuite.addTest(unittest.makeSuite(BigEndianDeltaEncodingTestCase))
+        theSuite.addTest(unittest.makeSuite(
+            LittleEndianDeltaEncodingTestCase))
         theSuite.addTest(unittest.makeSuite(readSortedIndex0))
         theSuite.addTest(unittest.makeSuite(readSortedIndex3))
         theSuite.addTest(unittest.makeSuite(readSortedIndex6))
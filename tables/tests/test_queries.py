@@ -9,8 +9,10 @@ Test module for queries on datasets
 :Revision: $Id$
 """
 
+import os
 import re
 import new
+import tempfile
 import unittest
 
 import numpy
@@ -1068,6 +1070,1592 @@ class IndexedTableUsage32(IndexedTableUsage):
     str_expr = ''
 
 
+class ParallelQueryTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries performed with the parallel scan."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(ParallelQueryTestCase, self).setUp()
+        self.h5file.params['MAX_THREADS'] = 4
+        table = self.h5file.createTable(
+            '/', 'test', {'c_int': tables.Int32Col(pos=0),
+                          'c_float': tables.Float64Col(pos=1)},
+            chunkshape=64)
+        table.nrowsinbuf = 200  # force several buffers per partition
+        values = numpy.arange(self.nrows)
+        table.append(zip(values % 101, values * 0.5))
+        self.table = table
+
+    def checkQuery(self, condition, condvars=None, **kwargs):
+        table = self.table
+        coords = table.getWhereList(condition, condvars, **kwargs)
+        pcoords = table.getWhereList(condition, condvars, parallel=True,
+                                     **kwargs)
+        self.assertTrue(len(coords) > 0)
+        self.assertTrue(common.areArraysEqual(coords, pcoords))
+        rows = table.readWhere(condition, condvars, **kwargs)
+        prows = table.readWhere(condition, condvars, parallel=True,
+                                **kwargs)
+        self.assertTrue(common.areArraysEqual(rows, prows))
+        nrows = [r.nrow for r in table.where(condition, condvars, **kwargs)]
+        pnrows = [r.nrow for r in table.where(condition, condvars,
+                                              parallel=True, **kwargs)]
+        self.assertEqual(nrows, pnrows)
+
+    def test00_full(self):
+        """Parallel scan on the whole table."""
+        self.checkQuery('(c_int < 10) & (c_float > 100)')
+
+    def test01_range(self):
+        """Parallel scan on a range not aligned with chunks."""
+        self.checkQuery('c_int < 10', start=33, stop=4321)
+
+    def test02_step(self):
+        """Parallel scan with a step."""
+        self.checkQuery('c_int < 50', start=7, stop=4900, step=13)
+
+    def test03_condvars(self):
+        """Parallel scan with variables in condition."""
+        self.checkQuery('c_int == v', {'v': 42})
+
+    def test04_empty(self):
+        """Parallel scan with no matches."""
+        table = self.table
+        self.assertEqual(len(table.getWhereList('c_int > 200',
+                                                parallel=True)), 0)
+        self.assertEqual(len(table.readWhere('c_int > 200', parallel=True)),
+                         0)
+        self.assertEqual(len(table.getWhereList('c_int > 0', start=10,
+                                                stop=10, parallel=True)), 0)
+
+    def test05_indexed(self):
+        """Parallel flag with an indexed condition."""
+        self.table.cols.c_int.createIndex()
+        self.checkQuery('c_int < 10')
+
+    def test06_error(self):
+        """Errors in worker threads are propagated."""
+        def _read_records(start, nrecords, recarr):
+            raise ValueError("read failure")
+        self.table._read_records = _read_records
+        self.assertRaises(ValueError, self.table.readWhere,
+                          'c_int < 10', parallel=True)
+
+
+class ExplainQueryTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test query plans and query statistics."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(ExplainQueryTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'c_int': tables.Int32Col(pos=0),
+                          'c_float': tables.Float64Col(pos=1)},
+            chunkshape=100)
+        values = numpy.arange(self.nrows)
+        table.append(zip(values, values * 0.5))
+        self.table = table
+
+    def test00_inkernel(self):
+        """Plan of a non-indexed query."""
+        plan = self.table.explainWhere('c_int < 10', start=10, stop=1010)
+        self.assertFalse(plan['indexed'])
+        self.assertEqual(plan['index_expressions'], [])
+        self.assertEqual(plan['nrows'], 1000)
+        self.assertEqual(plan['chunks'], 11)
+        self.assertEqual(plan['selected_chunks'], 11)
+        self.assertEqual(plan['rows_to_scan'], 1000)
+        self.assertEqual(plan['residual'], 'c_int < 10')
+
+    def test01_indexed(self):
+        """Plan of an indexed query."""
+        self.table.cols.c_int.createIndex(kind='full')
+        condition = '(c_int >= 1000) & (c_int < 1250) & (c_float > 0)'
+        plan = self.table.explainWhere(condition)
+        self.assertTrue(plan['indexed'])
+        self.assertEqual(len(plan['index_expressions']), 1)
+        iexpr = plan['index_expressions'][0]
+        self.assertEqual(iexpr['column'], 'c_int')
+        self.assertEqual(iexpr['kind'], 'full')
+        self.assertTrue(iexpr['exact'])
+        self.assertEqual(iexpr['candidates'], 250)
+        self.assertEqual(iexpr['chunks'], 3)
+        self.assertEqual(plan['chunks'], 50)
+        self.assertEqual(plan['selected_chunks'], 3)
+        self.assertEqual(plan['rows_to_scan'], 300)
+        self.assertEqual(plan['residual'], condition)
+        # The plan does not change the results of the query
+        self.assertEqual(len(self.table.getWhereList(condition)), 250)
+
+    def test02_indexed_empty(self):
+        """Plan of an indexed query with no candidates."""
+        self.table.cols.c_int.createIndex(kind='full')
+        plan = self.table.explainWhere('c_int < 0')
+        self.assertTrue(plan['indexed'])
+        self.assertEqual(plan['index_expressions'][0]['candidates'], 0)
+        self.assertEqual(plan['selected_chunks'], 0)
+        self.assertEqual(plan['rows_to_scan'], 0)
+
+    def test03_stats_inkernel(self):
+        """Statistics of a non-indexed query."""
+        table = self.table
+        table.queryStats = stats = tables.QueryStats()
+        self.assertEqual(len(table.getWhereList('c_int < 10')), 10)
+        self.assertEqual(stats.nqueries, 1)
+        self.assertEqual(stats.nindexed, 0)
+        self.assertEqual(stats.rowsread, self.nrows)
+        self.assertEqual(stats.bytesread, self.nrows * table.rowsize)
+        self.assertEqual(stats.rowsselected, 10)
+        stats.reset()
+        self.assertEqual(stats.nqueries, 0)
+        self.assertEqual(stats.rowsread, 0)
+
+    def test04_stats_indexed(self):
+        """Statistics of an indexed query."""
+        table = self.table
+        table.cols.c_int.createIndex(kind='full')
+        table.queryStats = stats = tables.QueryStats()
+        condition = '(c_int >= 1000) & (c_int < 1250)'
+        self.assertEqual(len(table.getWhereList(condition)), 250)
+        self.assertEqual(stats.nqueries, 1)
+        self.assertEqual(stats.nindexed, 1)
+        self.assertEqual(stats.chunkstotal, 50)
+        self.assertEqual(stats.chunksskipped, 47)
+        self.assertEqual(stats.rowsread, 300)
+        self.assertEqual(stats.rowsselected, 250)
+        # The second time the row sequence is cached
+        self.assertEqual(len(table.getWhereList(condition)), 250)
+        self.assertEqual(stats.nqueries, 2)
+        self.assertEqual(stats.seqcachehits, 1)
+        self.assertEqual(stats.rowsselected, 500)
+
+    def test05_stats_parallel(self):
+        """Statistics of a parallel query."""
+        table = self.table
+        table.queryStats = stats = tables.QueryStats()
+        self.assertEqual(len(table.getWhereList('c_int < 10',
+                                                parallel=True)), 10)
+        self.assertEqual(stats.nqueries, 1)
+        self.assertEqual(stats.rowsread, self.nrows)
+        self.assertEqual(stats.rowsselected, 10)
+
+    def test06_stats_disabled(self):
+        """No statistics are collected by default."""
+        self.assertTrue(self.table.queryStats is None)
+        self.table.getWhereList('c_int < 10')
+
+    def _createIndexes(self, colnames):
+        for colname in colnames:
+            self.table.cols._f_col(colname).createIndex(
+                kind='full', _blocksizes=(2000, 1000, 500, 100))
+
+    def test07_selectivity(self):
+        """Selectivity estimates of indexed conditions."""
+        self._createIndexes(['c_int'])
+        index = self.table.cols.c_int.index
+        for ops, limits, ratio in [ (('lt',), (1000,), 0.2),
+                                    (('eq',), (1234,), 0.0002),
+                                    (('ge', 'lt'), (2500, 3000), 0.1),
+                                    (('gt',), (self.nrows,), 0.0) ]:
+            selectivity = index.estimate_selectivity(
+                index.getLookupRange(ops, limits))
+            vprint( "Selectivity of %s %s: %s"
+                    % (ops, limits, selectivity) )
+            self.assertTrue(abs(selectivity - ratio) < 0.02)
+        iexpr = self.table.explainWhere('c_int < 1000')['index_expressions'][0]
+        self.assertTrue(iexpr['used'])
+        self.assertTrue(abs(iexpr['selectivity'] - 0.2) < 0.02)
+
+    def test07b_selectivity_lastrow(self):
+        """Selectivity estimates of indexes with values in the last row."""
+        column = self.table.cols.c_int
+        for blocksizes, nslices in [ ((8000, 8000, 8000, 100), 0),
+                                     ((6000, 3000, 1500, 100), 3) ]:
+            column.createIndex(kind='full', _blocksizes=blocksizes)
+            index = column.index
+            self.assertEqual(index.nslices, nslices)
+            self.assertTrue(index.nelementsILR > 0)
+            for ops, limits, ratio in [ (('lt',), (1000,), 0.2),
+                                        (('ge',), (4600,), 0.08) ]:
+                selectivity = index.estimate_selectivity(
+                    index.getLookupRange(ops, limits))
+                vprint( "Selectivity of %s %s with %d slices: %s"
+                        % (ops, limits, nslices, selectivity) )
+                self.assertTrue(selectivity is not None)
+                self.assertTrue(abs(selectivity - ratio) < 0.03)
+            column.removeIndex()
+
+    def test08_cost_scan(self):
+        """Unselective indexed queries are run as scans."""
+        self._createIndexes(['c_int'])
+        table = self.table
+        plan = table.explainWhere('c_int < 4000')
+        self.assertFalse(plan['indexed'])
+        iexpr = plan['index_expressions'][0]
+        self.assertFalse(iexpr['used'])
+        self.assertTrue(iexpr['candidates'] is None)
+        self.assertEqual(plan['rows_to_scan'], self.nrows)
+        table.queryStats = stats = tables.QueryStats()
+        self.assertEqual(len(table.getWhereList('c_int < 4000')), 4000)
+        self.assertEqual(stats.nindexed, 0)
+        self.assertEqual(stats.ncostscans, 1)
+        self.assertEqual(stats.indexesskipped, 1)
+        self.assertEqual(stats.rowsread, self.nrows)
+        # Indexes can be always used
+        self.h5file.params['INDEX_MAX_SELECTIVITY'] = 1
+        self.assertTrue(table.explainWhere('c_int < 4000')['indexed'])
+        self.assertEqual(len(table.getWhereList('c_int < 4000')), 4000)
+        self.assertEqual(stats.nindexed, 1)
+        self.assertEqual(stats.ncostscans, 1)
+
+    def test09_cost_hybrid(self):
+        """Only the indexes of selective sub-conditions are used."""
+        self._createIndexes(['c_int', 'c_float'])
+        table = self.table
+        condition = '(c_int < 4000) & (c_float < 100)'
+        plan = table.explainWhere(condition)
+        self.assertTrue(plan['indexed'])
+        self.assertEqual([ iexpr['used'] for iexpr
+                           in plan['index_expressions'] ], [False, True])
+        self.assertEqual(plan['selected_chunks'], 2)
+        table.queryStats = stats = tables.QueryStats()
+        self.assertEqual(len(table.getWhereList(condition)), 200)
+        self.assertEqual(stats.nindexed, 1)
+        self.assertEqual(stats.nhybrid, 1)
+        self.assertEqual(stats.indexesskipped, 1)
+        self.assertEqual(stats.rowsread, 200)
+
+
+class PersistentQueryCacheTestCase(common.TempFileMixin,
+                                   common.PyTablesTestCase):
+
+    """Test the persistent cache of query results."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(PersistentQueryCacheTestCase, self).setUp()
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = True
+        table = self.h5file.createTable(
+            '/', 'test', {'c_int': tables.Int32Col(pos=0),
+                          'c_float': tables.Float64Col(pos=1)})
+        values = numpy.arange(self.nrows)
+        table.append(zip(values % 100, values * 0.5))
+        table.cols.c_int.createIndex()
+        self.table = table
+
+    def _reopen(self, mode='r'):
+        super(PersistentQueryCacheTestCase, self)._reopen(mode)
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = True
+        self.table = self.h5file.root.test
+
+    def cacheGroup(self):
+        return self.h5file.root._f_getChild('_p_qcache_test')
+
+    def checkQuery(self, condition, condvars=None, hit=False):
+        table = self.table
+        table.queryStats = stats = tables.QueryStats()
+        coords = table.getWhereList(condition, condvars)
+        rows = table.readWhere(condition, condvars)
+        self.assertEqual(stats.querycachehits, hit and 2 or 1)
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = False
+        self.assertTrue(common.areArraysEqual(
+            coords, table.getWhereList(condition, condvars)))
+        self.assertTrue(common.areArraysEqual(
+            rows, table.readWhere(condition, condvars)))
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = True
+        table.queryStats = None
+        return coords
+
+    def test00_reopen(self):
+        """Results are reused after reopening the file."""
+        self.checkQuery('(c_int == 3) & (c_float < 300)')
+        self._reopen()
+        coords = self.checkQuery('(c_int == 3) & (c_float < 300)', hit=True)
+        self.assertEqual(list(coords), [3, 103, 203, 303, 403, 503])
+        self.assertFalse('_p_qcache_test' in self.h5file.root._v_children)
+
+    def test01_keys(self):
+        """Different variables and ranges give different entries."""
+        table = self.table
+        self.checkQuery('c_int == v', {'v': 3})
+        self.checkQuery('c_int == v', {'v': 4})
+        self.checkQuery('c_int == v', {'v': 3}, hit=True)
+        self.assertEqual(list(table.getWhereList('c_int == 4', start=200,
+                                                 stop=500)),
+                         [204, 304, 404])
+        self.assertEqual(len(self.cacheGroup()._v_attrs.ENTRIES.split()), 3)
+
+    def test02_append(self):
+        """Appending rows invalidates the cache."""
+        table = self.table
+        self.checkQuery('c_int == 3')
+        table.append([(3, 0.)])
+        coords = self.checkQuery('c_int == 3')
+        self.assertEqual(coords[-1], self.nrows)
+        row = table.row
+        row['c_int'] = 3
+        row.append()
+        table.flush()
+        coords = self.checkQuery('c_int == 3')
+        self.assertEqual(coords[-1], self.nrows + 1)
+        self.assertEqual(self.cacheGroup()._v_attrs.VERSION, 2)
+
+    def test03_modify(self):
+        """Modifying rows invalidates the cache."""
+        table = self.table
+        self.checkQuery('c_int == 3')
+        table.modifyRows(0, 1, rows=[(3, 0.)])
+        self.assertEqual(self.checkQuery('c_int == 3')[0], 0)
+        table.modifyColumn(1, 2, column=[3], colname='c_int')
+        self.assertEqual(self.checkQuery('c_int == 3')[1], 1)
+        table.cols.c_int[2] = 3
+        self.assertEqual(self.checkQuery('c_int == 3')[2], 2)
+        table.modifyCoordinates([4], [(3, 0.)])
+        self.assertEqual(self.checkQuery('c_int == 3')[4], 4)
+
+    def test04_remove(self):
+        """Removing rows invalidates the cache."""
+        table = self.table
+        self.checkQuery('c_int == 3')
+        table.removeRows(0, 10)
+        self.assertEqual(self.checkQuery('c_int == 3')[0], 93)
+        table.truncate(100)
+        self.assertEqual(list(self.checkQuery('c_int == 3')), [93])
+
+    def test05_maxslots(self):
+        """The oldest entries are evicted."""
+        self.h5file.params['QUERY_CACHE_MAX_SLOTS'] = 2
+        self.checkQuery('c_int == 1')
+        self.checkQuery('c_int == 2')
+        self.checkQuery('c_int == 3')
+        self.checkQuery('c_int == 3', hit=True)
+        self.checkQuery('c_int == 1')
+        self.assertEqual(len(self.cacheGroup()._v_children), 2)
+
+    def test06_disabled(self):
+        """Nothing is cached by default."""
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = False
+        self.table.getWhereList('c_int == 3')
+        self.assertRaises(LookupError, self.cacheGroup)
+
+    def test07_move_remove(self):
+        """The cache follows the table."""
+        self.checkQuery('c_int == 3')
+        self.table.move('/', 'test2')
+        self.assertTrue(self.h5file.root._f_getChild('_p_qcache_test2'))
+        self.table.remove()
+        self.assertRaises(LookupError, self.h5file.root._f_getChild,
+                          '_p_qcache_test2')
+
+
+class ZoneMapTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries pruned by zone maps."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(ZoneMapTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'c_time': tables.Float64Col(pos=0),
+                          'c_int': tables.Int32Col(pos=1),
+                          'c_nan': tables.Float64Col(pos=2),
+                          'c_str': tables.StringCol(4, pos=3)},
+            chunkshape=100)
+        values = numpy.arange(self.nrows)
+        nans = values * 1.
+        nans[values % 1000 == 7] = numpy.nan
+        table.append([values * 0.5, values % 97, nans, values.astype('S4')])
+        table.cols.c_time.createZoneMap()
+        table.cols.c_nan.createZoneMap()
+        self.table = table
+
+    def checkQuery(self, condition, condvars=None, zonemapped=True):
+        table = self.table
+        self.assertEqual(table.explainWhere(condition, condvars)['chunkstats'],
+                         zonemapped)
+        coords = table.getWhereList(condition, condvars)
+        table._disableIndexingInQueries()
+        try:
+            expected = table.getWhereList(condition, condvars)
+        finally:
+            table._enableIndexingInQueries()
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(list(coords), list(expected))
+        rows = [r.nrow for r in table.where(condition, condvars)]
+        self.assertEqual(rows, list(expected))
+
+    def test00_prune(self):
+        """Chunks out of the condition range are not read."""
+        table = self.table
+        table.queryStats = stats = tables.QueryStats()
+        condition = '(c_time >= 100) & (c_time < 200) & (c_int > 3)'
+        self.checkQuery(condition)
+        stats.reset()
+        table.getWhereList(condition)
+        self.assertEqual(stats.chunkstotal, 50)
+        self.assertEqual(stats.chunksskipped, 48)
+        self.assertEqual(stats.rowsread, 200)
+        plan = table.explainWhere(condition)
+        self.assertFalse(plan['indexed'])
+        self.assertEqual(plan['chunkstats_expressions'][0]['column'], 'c_time')
+        self.assertEqual(plan['selected_chunks'], 2)
+
+    def test01_combinations(self):
+        """Disjunctions and variables in conditions."""
+        self.checkQuery('(c_time < 10) | (c_time > 2400)')
+        self.checkQuery('c_time == v', {'v': 123.5})
+        self.checkQuery('(c_time > 2400) | (c_nan < 100)')
+        self.checkQuery('c_int < 3', zonemapped=False)
+
+    def test02_nans(self):
+        """Chunks with NaNs are always read."""
+        self.checkQuery('~(c_nan >= 10)')
+        self.assertEqual(len(self.table.getWhereList('~(c_nan >= 10)')),
+                         14)
+
+    def test03_append(self):
+        """Zone maps are updated when appending rows."""
+        table = self.table
+        table.append([(-1., 0, -1., 'a')] * 10)
+        row = table.row
+        for i in xrange(120):
+            row['c_time'] = -2.
+            row.append()
+        table.flush()
+        self.assertEqual(table.cols.c_time.zonemap.nchunks, 52)
+        self.checkQuery('c_time < 0')
+        self.assertEqual(len(table.getWhereList('c_time < -1.5')), 120)
+
+    def test04_modify(self):
+        """Zone maps are updated when modifying rows."""
+        table = self.table
+        table.modifyRows(4000, 4001, rows=[(-1., 0, 0., 'a')])
+        table.cols.c_time[2000] = -1.
+        table.modifyColumn(3001, 3003, 1, [[-1.], [-1.]], 'c_time')
+        table.modifyCoordinates([1500], [(-1., 0, 0., 'a')])
+        for row in table.where('c_int == 96'):
+            row['c_time'] = -2.
+            row.update()
+        self.checkQuery('c_time < 0')
+        self.assertEqual(list(table.getWhereList('c_time == -1')),
+                         [1500, 2000, 3001, 3002, 4000])
+
+    def test05_remove(self):
+        """Zone maps are updated when removing rows."""
+        table = self.table
+        table.removeRows(10, 160)
+        self.assertEqual(table.cols.c_time.zonemap.nchunks, 49)
+        self.checkQuery('(c_time >= 100) & (c_time < 200)')
+        table.truncate(1000)
+        self.assertEqual(table.cols.c_time.zonemap.nchunks, 10)
+        self.checkQuery('c_time > 500')
+
+    def test06_reopen(self):
+        """Zone maps are persistent."""
+        self._reopen()
+        self.table = self.h5file.root.test
+        self.assertTrue(self.table.cols.c_time.zonemap is not None)
+        self.assertTrue(self.table.cols.c_int.zonemap is None)
+        self.checkQuery('(c_time >= 100) & (c_time < 200)')
+
+    def test07_remove_zonemap(self):
+        """Removing zone maps."""
+        table = self.table
+        table.cols.c_time.removeZoneMap()
+        self.assertTrue(table.cols.c_time.zonemap is None)
+        self.checkQuery('c_time < 100', zonemapped=False)
+        table.cols.c_nan.removeZoneMap()
+        self.assertRaises(LookupError, self.h5file.root._f_getChild,
+                          '_p_zmap_test')
+
+    def test08_errors(self):
+        """Columns not supporting zone maps."""
+        cols = self.table.cols
+        self.assertRaises(TypeError, cols.c_str.createZoneMap)
+        self.assertRaises(ValueError, cols.c_time.createZoneMap)
+
+    def test09_indexed(self):
+        """Indexes are preferred over zone maps."""
+        self.table.cols.c_int.createIndex()
+        self.checkQuery('(c_int < 3) & (c_time < 100)', zonemapped=False)
+        self.assertTrue(self.table.explainWhere('c_int < 3')['indexed'])
+
+    def test10_time64(self):
+        """Zone maps on time columns."""
+        table = self.h5file.createTable(
+            '/', 'times', {'t': tables.Time64Col(pos=0)}, chunkshape=100)
+        table.append([1e9 + numpy.arange(3000.)])
+        table.cols.t.createZoneMap()
+        self.table = table
+        self.checkQuery('(t >= 1e9 + 150) & (t < 1e9 + 250)')
+        self.assertEqual(len(table.getWhereList('t < 1e9 + 150')), 150)
+
+    def test11_move(self):
+        """Zone maps follow the table."""
+        self.table.move('/', 'test2')
+        self.checkQuery('c_time < 100')
+        self.table.remove()
+        self.assertRaises(LookupError, self.h5file.root._f_getChild,
+                          '_p_zmap_test2')
+
+    def test12_columns(self):
+        """Comparisons between columns are not pruned."""
+        self.checkQuery('c_time == c_time', zonemapped=False)
+        self.checkQuery('c_time < c_int', zonemapped=False)
+        self.checkQuery('c_nan > c_time', zonemapped=False)
+        self.checkQuery('(c_time > 10) & (c_time < c_int)')
+
+
+class BloomFilterTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries pruned by Bloom filters."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(BloomFilterTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'c_id': tables.StringCol(8, pos=0),
+                          'c_int': tables.Int64Col(pos=1),
+                          'c_float': tables.Float64Col(pos=2),
+                          'c_bool': tables.BoolCol(pos=3)},
+            chunkshape=100)
+        # Scattered values, so that zone maps would be useless
+        values = (numpy.arange(self.nrows) * 7919) % self.nrows
+        table.append([ numpy.array(['id%d' % v for v in values]), values,
+                       values * 0.5, values % 2 == 0 ])
+        table.cols.c_id.createBloomFilter()
+        table.cols.c_int.createBloomFilter(fpp=0.001)
+        self.table = table
+
+    def checkQuery(self, condition, condvars=None, bloomed=True, nrows=None):
+        table = self.table
+        self.assertEqual(table.explainWhere(condition, condvars)['chunkstats'],
+                         bloomed)
+        coords = table.getWhereList(condition, condvars)
+        table._disableIndexingInQueries()
+        try:
+            expected = table.getWhereList(condition, condvars)
+        finally:
+            table._enableIndexingInQueries()
+        if nrows is not None:
+            self.assertEqual(len(expected), nrows)
+        self.assertEqual(list(coords), list(expected))
+        rows = [r.nrow for r in table.where(condition, condvars)]
+        self.assertEqual(rows, list(expected))
+
+    def test00_prune(self):
+        """Chunks not containing the value are not read."""
+        table = self.table
+        table.queryStats = stats = tables.QueryStats()
+        self.checkQuery('c_id == "id1234"', nrows=1)
+        stats.reset()
+        table.getWhereList('c_id == "id1234"')
+        self.assertEqual(stats.chunkstotal, 50)
+        self.assertTrue(stats.chunksskipped >= 45)
+        plan = table.explainWhere('c_int == 1234')
+        self.assertEqual(plan['chunkstats_expressions'][0]['synopses'],
+                         ['bloomfilter'])
+        self.assertTrue(plan['selected_chunks'] <= 2)
+
+    def test01_combinations(self):
+        """Disjunctions, conjunctions and variables in conditions."""
+        self.checkQuery('(c_id == "id3") | (c_int == 4999)', nrows=2)
+        self.checkQuery('(c_int == v) & (c_float > 0)', {'v': 42}, nrows=1)
+        self.checkQuery('c_id == "nothere"', nrows=0)
+        self.checkQuery('c_int == 1.5', nrows=0)
+        # Only equalities can use Bloom filters
+        self.checkQuery('c_int < 3', bloomed=False, nrows=3)
+        self.checkQuery('~(c_int == 3)', bloomed=False, nrows=4999)
+        self.checkQuery('(c_int == 3) | (c_float < 1)', bloomed=False,
+                        nrows=3)
+
+    def test01b_columns(self):
+        """Comparisons between columns do not use Bloom filters."""
+        self.checkQuery('c_int == c_int', bloomed=False, nrows=self.nrows)
+        self.checkQuery('c_float == c_int', bloomed=False, nrows=1)
+        self.checkQuery('(c_int == 42) & (c_float < c_int)', nrows=1)
+
+    def test02_zonemap(self):
+        """Bloom filters and zone maps of the same column."""
+        table = self.table
+        table.cols.c_int.createZoneMap()
+        self.checkQuery('c_int < 3', nrows=3)
+        plan = table.explainWhere('c_int == 3')
+        self.assertEqual(plan['chunkstats_expressions'][0]['synopses'],
+                         ['zonemap', 'bloomfilter'])
+        self.checkQuery('c_int == 3', nrows=1)
+
+    def test03_append(self):
+        """Bloom filters are updated when appending rows."""
+        table = self.table
+        table.append([('new', -1, 0., True)] * 10)
+        row = table.row
+        for i in xrange(120):
+            row['c_id'] = 'new%d' % i
+            row['c_int'] = -2
+            row.append()
+        table.flush()
+        self.assertEqual(table.cols.c_id.bloomfilter.nchunks, 52)
+        self.checkQuery('c_id == "new"', nrows=10)
+        self.checkQuery('c_id == "new119"', nrows=1)
+        self.checkQuery('c_int == -2', nrows=120)
+
+    def test04_modify(self):
+        """Bloom filters are updated when modifying rows."""
+        table = self.table
+        table.modifyRows(4000, 4001, rows=[('mod', -1, 0., True)])
+        table.cols.c_id[2000] = 'mod'
+        table.modifyColumn(3001, 3003, 1, [['mod'], ['mod']], 'c_id')
+        table.modifyCoordinates([1500], [('mod', -1, 0., True)])
+        self.checkQuery('c_id == "mod"', nrows=5)
+        self.checkQuery('c_int == -1', nrows=2)
+
+    def test05_remove(self):
+        """Bloom filters are updated when removing rows."""
+        table = self.table
+        value = table[20]['c_id']
+        table.removeRows(10, 160)
+        self.assertEqual(table.cols.c_id.bloomfilter.nchunks, 49)
+        self.checkQuery('c_id == value', {'value': value}, nrows=0)
+        self.checkQuery('c_id == value', {'value': table[20]['c_id']},
+                        nrows=1)
+        table.truncate(1000)
+        self.assertEqual(table.cols.c_id.bloomfilter.nchunks, 10)
+
+    def test06_reopen(self):
+        """Bloom filters are persistent."""
+        self._reopen()
+        self.table = self.h5file.root.test
+        self.assertTrue(self.table.cols.c_id.bloomfilter is not None)
+        self.assertTrue(self.table.cols.c_float.bloomfilter is None)
+        self.checkQuery('c_id == "id77"', nrows=1)
+
+    def test07_remove_bloomfilter(self):
+        """Removing Bloom filters."""
+        table = self.table
+        table.cols.c_id.removeBloomFilter()
+        self.assertTrue(table.cols.c_id.bloomfilter is None)
+        self.checkQuery('c_id == "id77"', bloomed=False, nrows=1)
+        table.cols.c_int.removeBloomFilter()
+        self.assertRaises(LookupError, self.h5file.root._f_getChild,
+                          '_p_bloom_test')
+
+    def test08_errors(self):
+        """Bad arguments for Bloom filters."""
+        cols = self.table.cols
+        self.assertRaises(ValueError, cols.c_id.createBloomFilter)
+        self.assertRaises(ValueError, cols.c_float.createBloomFilter, 1.5)
+
+    def test09_floats_and_booleans(self):
+        """Bloom filters on float and boolean columns."""
+        table = self.table
+        table.cols.c_float.createBloomFilter()
+        table.cols.c_bool.createBloomFilter()
+        self.checkQuery('c_float == 617.5', nrows=1)
+        self.checkQuery('c_float == -0.0', nrows=1)
+        self.checkQuery('c_bool', nrows=2500)
+        self.checkQuery('~c_bool & (c_float == 0.5)', nrows=1)
+
+    def test10_indexed(self):
+        """Indexes are preferred over Bloom filters."""
+        self.table.cols.c_int.createIndex()
+        self.assertTrue(self.table.explainWhere('c_int == 3')['indexed'])
+        self.checkQuery('c_int == 3', bloomed=False, nrows=1)
+        self.checkQuery('~(c_int == 3)', bloomed=False, nrows=4999)
+
+    def test11_move(self):
+        """Bloom filters follow the table."""
+        self.table.move('/', 'test2')
+        self.checkQuery('c_id == "id77"', nrows=1)
+        self.table.remove()
+        self.assertRaises(LookupError, self.h5file.root._f_getChild,
+                          '_p_bloom_test2')
+
+
+class AggregateTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test aggregations over tables."""
+
+    nrows = 3000
+
+    def setUp(self):
+        super(AggregateTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'store': tables.StringCol(4, pos=0),
+                          'qty': tables.Int32Col(pos=1),
+                          'price': tables.Float64Col(pos=2),
+                          'extra': tables.Float64Col(shape=(4,), pos=3)},
+            chunkshape=64)
+        table.nrowsinbuf = 256
+        i = numpy.arange(self.nrows)
+        self.data = data = numpy.empty(self.nrows, dtype=table.dtype)
+        data['store'] = numpy.array(['a', 'bb', 'ccc'])[(i * 7) % 3]
+        data['qty'] = (i * 37) % 11 - 3
+        data['price'] = (i % 101) * 0.25
+        data['extra'] = 0
+        table.append(data)
+        self.table = table
+
+    def checkTotals(self, result, rows):
+        self.assertEqual(result['n'], len(rows))
+        self.assertEqual(result['qty'], rows['qty'].sum())
+        self.assertEqual(result['qty'].dtype, numpy.int64)
+        self.assertAlmostEqual(result['total'],
+                               (rows['price'] * rows['qty']).sum())
+        self.assertEqual(result['lo'], rows['price'].min())
+        self.assertEqual(result['hi'], rows['qty'].max())
+        self.assertAlmostEqual(result['avg'], rows['price'].mean())
+
+    exprs = {'n': 'count()', 'qty': 'sum(qty)', 'total': 'sum(price*qty)',
+             'lo': 'min(price)', 'hi': 'max(qty)', 'avg': 'mean(price)'}
+
+    def test00_all(self):
+        """Aggregating all the rows."""
+        self.checkTotals(self.table.aggregate(self.exprs), self.data)
+        self.assertEqual(self.table.aggregate({'n': 'count()'}),
+                         {'n': self.nrows})
+
+    def test01_range(self):
+        """Aggregating a range of rows."""
+        self.checkTotals(self.table.aggregate(self.exprs, start=10, stop=2000,
+                                              step=3),
+                         self.data[10:2000:3])
+
+    def test02_condition(self):
+        """Aggregating the rows fulfilling a condition."""
+        limit = 4
+        rows = self.data[(self.data['qty'] > 0) & (self.data['qty'] < limit)]
+        result = self.table.aggregate(
+            self.exprs, condition='(qty > 0) & (qty < limit)')
+        self.checkTotals(result, rows)
+        result = self.table.aggregate(
+            self.exprs, condition='(qty > 0) & (qty < limit)',
+            condvars={'limit': limit})
+        self.checkTotals(result, rows)
+
+    def test03_indexed(self):
+        """Aggregating the rows selected by an index."""
+        self.table.cols.qty.createIndex()
+        rows = self.data[self.data['qty'] == 2]
+        self.assertTrue(self.table.willQueryUseIndexing('qty == 2'))
+        self.checkTotals(self.table.aggregate(self.exprs, 'qty == 2'), rows)
+
+    def test04_parallel(self):
+        """Aggregating partitions in several threads."""
+        self.h5file.params['MAX_THREADS'] = 4
+        rows = self.data[100:2900][self.data['qty'][100:2900] > 3]
+        result = self.table.aggregate(
+            self.exprs, 'qty > 3', start=100, stop=2900, parallel=True)
+        self.checkTotals(result, rows)
+
+    def test05_groupby(self):
+        """Aggregating rows by key."""
+        result = self.table.aggregate(
+            {'n': 'count()', 'total': 'sum(price*qty)'},
+            condition='qty != 0', groupby='store')
+        self.assertEqual(result.dtype.names, ('store', 'n', 'total'))
+        self.assertEqual(list(result['store']), ['a', 'bb', 'ccc'])
+        for row in result:
+            rows = self.data[(self.data['store'] == row['store']) &
+                             (self.data['qty'] != 0)]
+            self.assertEqual(row['n'], len(rows))
+            self.assertAlmostEqual(row['total'],
+                                   (rows['price'] * rows['qty']).sum())
+
+    def test06_groupby_many(self):
+        """Aggregating rows by several keys."""
+        result = self.table.aggregate(
+            {'n': 'count()'}, groupby=['qty', 'store'], parallel=True)
+        self.assertEqual(result.dtype.names, ('qty', 'store', 'n'))
+        keys = [(row['qty'], row['store']) for row in result]
+        self.assertEqual(keys, sorted(set(
+            [(row['qty'], row['store']) for row in self.data])))
+        self.assertEqual(result['n'].sum(), self.nrows)
+
+    def test07_empty(self):
+        """Aggregating no rows."""
+        result = self.table.aggregate(self.exprs, 'qty > 100')
+        self.assertEqual(result, {'n': 0, 'qty': 0, 'total': 0, 'lo': None,
+                                  'hi': None, 'avg': None})
+        result = self.table.aggregate(self.exprs, 'qty > 100',
+                                      groupby='store')
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result.dtype['hi'], numpy.int32)
+        self.assertEqual(result.dtype['avg'], numpy.float64)
+
+    def test08_deadrows(self):
+        """Rows removed lazily are not aggregated."""
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.table.removeRows(100, 1000)
+        rows = numpy.concatenate((self.data[:100], self.data[1000:]))
+        self.checkTotals(self.table.aggregate(self.exprs), rows)
+        self.checkTotals(self.table.aggregate(self.exprs, parallel=True),
+                         rows)
+
+    def test09_errors(self):
+        """Invalid aggregations."""
+        aggregate = self.table.aggregate
+        self.assertRaises(ValueError, aggregate, {'x': 'median(qty)'})
+        self.assertRaises(ValueError, aggregate, {'x': 'qty'})
+        self.assertRaises(ValueError, aggregate, {'x': 'sum()'})
+        self.assertRaises(ValueError, aggregate, {'x': 'count(qty)'})
+        self.assertRaises(NameError, aggregate, {'x': 'sum(foo)'}, None, {})
+        self.assertRaises(KeyError, aggregate, {'x': 'count()'},
+                          groupby='foo')
+        self.assertRaises(TypeError, aggregate, {'x': 'count()'},
+                          groupby='extra')
+
+
+class GroupByTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test aggregations by key for many groups."""
+
+    nrows = 2000
+    aggs = {'n': 'count()', 'total': 'sum(price*qty)', 'hi': 'max(qty)'}
+
+    def setUp(self):
+        super(GroupByTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'key': tables.Int32Col(pos=0),
+                          'tag': tables.StringCol(2, pos=1),
+                          'qty': tables.Int32Col(pos=2),
+                          'price': tables.Float64Col(pos=3)},
+            chunkshape=64)
+        table.nrowsinbuf = 128
+        i = numpy.arange(self.nrows)
+        data = numpy.empty(self.nrows, dtype=table.dtype)
+        data['key'] = (i * 7919) % 97
+        data['tag'] = numpy.array(['a', 'b'])[i % 2]
+        data['qty'] = (i * 37) % 11 - 3
+        data['price'] = (i % 101) * 0.25
+        table.append(data)
+        self.table = table
+        self.h5file.params['GROUPBY_MAX_GROUPS'] = 10
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+        os.rmdir(self.tmp_dir)
+        super(GroupByTestCase, self).tearDown()
+
+    def checkGroups(self, keycols, condition=None, start=None, stop=None,
+                    step=None):
+        table = self.table
+        result = table.groupby(keycols, self.aggs, condition, start=start,
+                               stop=stop, step=step, tmp_dir=self.tmp_dir)
+        expected = table.aggregate(self.aggs, condition, start=start,
+                                   stop=stop, step=step, groupby=keycols)
+        self.assertEqual(result.dtype, expected.dtype)
+        self.assertEqual(len(result), len(expected))
+        for name in expected.dtype.names:
+            if name == 'total':
+                self.assertTrue(numpy.allclose(result[name],
+                                               expected[name]))
+            else:
+                self.assertEqual(list(result[name]), list(expected[name]))
+        return result
+
+    def test00_spill(self):
+        """Spilling the state of groups to disk."""
+        result = self.checkGroups('key')
+        self.assertEqual(list(result['key']), range(97))
+        self.assertEqual(result['n'].sum(), self.nrows)
+        self.checkGroups('key', 'qty > 2', start=10, stop=1900, step=3)
+
+    def test01_keys(self):
+        """Spilling groups with several keys."""
+        result = self.checkGroups(['tag', 'key'], 'price < 20')
+        self.assertEqual(result.dtype.names[:2], ('tag', 'key'))
+
+    def test02_sorted(self):
+        """Aggregating by key in the order of a sorted index."""
+        self.table.cols.key.createCSIndex()
+        self.checkGroups('key')
+        self.checkGroups('key', 'qty > 2', start=10, stop=1900, step=3)
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.table.removeRows(0, 500)
+        self.checkGroups('key', 'qty != 0')
+
+    def test03_empty(self):
+        """Aggregating no rows by key."""
+        result = self.checkGroups('key', 'qty > 100')
+        self.assertEqual(len(result), 0)
+        self.table.cols.key.createCSIndex()
+        self.checkGroups('key', 'qty > 100')
+
+
+class JoinTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test joins of tables on key columns."""
+
+    nleft = 300
+    nright = 200
+
+    def setUp(self):
+        super(JoinTestCase, self).setUp()
+        left = self.h5file.createTable(
+            '/', 'left', {'key': tables.Int32Col(pos=0),
+                          'lval': tables.Int32Col(pos=1),
+                          'name': tables.StringCol(4, pos=2)},
+            chunkshape=32)
+        i = numpy.arange(self.nleft)
+        data = numpy.empty(self.nleft, dtype=left.dtype)
+        data['key'] = (i * 7919) % 50
+        data['lval'] = i
+        data['name'] = ['l%d' % n for n in i]
+        left.append(data)
+        right = self.h5file.createTable(
+            '/', 'right', {'key': tables.Int64Col(pos=0),
+                           'rval': tables.Float64Col(dflt=-1, pos=1),
+                           'name': tables.StringCol(4, pos=2)},
+            chunkshape=32)
+        i = numpy.arange(self.nright)
+        data = numpy.empty(self.nright, dtype=right.dtype)
+        data['key'] = (i * 13) % 70 + 10
+        data['rval'] = i * 0.5
+        data['name'] = ['r%d' % n for n in i]
+        right.append(data)
+        self.left, self.right = left, right
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+        os.rmdir(self.tmp_dir)
+        super(JoinTestCase, self).tearDown()
+
+    def expected(self, how):
+        rrows = {}
+        for row in self.right:
+            rrows.setdefault(row['key'], []).append(
+                (row['rval'], row['name']))
+        result = []
+        for row in self.left:
+            lrow = (row['key'], row['lval'], row['name'])
+            if row['key'] in rrows:
+                for rrow in rrows[row['key']]:
+                    result.append(lrow + rrow)
+            elif how == 'left':
+                result.append(lrow + (-1.0, ''))
+        result.sort()
+        return result
+
+    def checkJoin(self, how, **kwargs):
+        blocks = list(tables.join(self.left, self.right, 'key', how,
+                                  blocksize=16, tmp_dir=self.tmp_dir,
+                                  **kwargs))
+        for block in blocks:
+            self.assertTrue(0 < len(block) <= 16)
+            self.assertEqual(block.dtype.names,
+                             ('key', 'lval', 'name_l', 'rval', 'name_r'))
+        if blocks:
+            result = numpy.concatenate(blocks)
+        else:
+            result = numpy.zeros(0, dtype=self.left.dtype)
+        rows = [tuple(row) for row in result.tolist()]
+        rows.sort()
+        self.assertEqual(rows, self.expected(how))
+        return result
+
+    def test00_inner(self):
+        """Inner joins of tables without indexes."""
+        result = self.checkJoin('inner')
+        # Rows come in the order of the left table
+        self.assertEqual(list(result['lval']), sorted(result['lval']))
+
+    def test01_left(self):
+        """Left outer joins of tables without indexes."""
+        self.checkJoin('left')
+
+    def test02_merge(self):
+        """Joins of tables with completely sorted indexes."""
+        self.left.cols.key.createCSIndex()
+        self.right.cols.key.createCSIndex()
+        for how in ['inner', 'left']:
+            result = self.checkJoin(how)
+            # Rows come in key order
+            self.assertEqual(list(result['key']), sorted(result['key']))
+
+    def test03_partitions(self):
+        """Joins of tables partitioned in a temporary file."""
+        self.h5file.params['JOIN_MAX_MEMORY'] = 256
+        self.checkJoin('inner')
+        self.checkJoin('left')
+
+    def test04_deadrows(self):
+        """Joins of tables with rows removed lazily."""
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.left.removeRows(10, 40)
+        self.right.removeRows(50, 60)
+        self.checkJoin('left')
+        self.left.cols.key.createCSIndex()
+        self.right.cols.key.createCSIndex()
+        self.checkJoin('inner')
+
+    def test05_dest(self):
+        """Appending joined rows to a table."""
+        blocks = tables.join(self.left, self.right, 'key', 'left')
+        dtype = blocks.next().dtype
+        dest = self.h5file.createTable('/', 'dest', dtype)
+        dest.cols.key.createIndex()
+        nrows = tables.join(self.left, self.right, 'key', 'left',
+                            dest=dest, blocksize=16)
+        self.assertEqual(nrows, len(self.expected('left')))
+        self.assertEqual(dest.nrows, nrows)
+        rows = [tuple(row) for row in dest.read().tolist()]
+        rows.sort()
+        self.assertEqual(rows, self.expected('left'))
+        dest.flush()
+        self.assertEqual(len(dest.readWhere('key == 12')),
+                         len([row for row in rows if row[0] == 12]))
+
+    def test06_on(self):
+        """Joins on columns with different names."""
+        result = numpy.concatenate(list(tables.join(
+            self.left, self.right, ('lval', 'key'))))
+        self.assertEqual(result.dtype.names,
+                         ('key_l', 'lval', 'name_l', 'key_r', 'rval',
+                          'name_r'))
+        self.assertEqual(list(result['lval']), list(result['key_r']))
+        self.assertEqual(len(result), self.nright)
+
+    def test07_errors(self):
+        """Invalid arguments for joins."""
+        self.assertRaises(ValueError, tables.join,
+                          self.left, self.right, 'key', 'outer')
+        self.assertRaises(KeyError, tables.join,
+                          self.left, self.right, 'rval')
+        self.assertRaises(ValueError, tables.join,
+                          self.left, self.right, 'key', dest=self.left)
+
+
+class LimitTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries with a limit on the number of selected rows."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(LimitTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': tables.Int32Col(pos=0),
+                          'b': tables.Float64Col(pos=1)},
+            chunkshape=64)
+        table.nrowsinbuf = 128
+        i = numpy.arange(self.nrows)
+        data = numpy.empty(self.nrows, dtype=table.dtype)
+        data['a'] = (i * 7919) % 1000
+        data['b'] = i * 0.5
+        table.append(data)
+        self.table = table
+
+    def checkLimit(self, condition, limit, **kwargs):
+        table = self.table
+        expected = list(table.getWhereList(condition, **kwargs))
+        coords = table.getWhereList(condition, limit=limit, **kwargs)
+        self.assertEqual(list(coords), expected[:limit])
+        rows = table.readWhere(condition, limit=limit, **kwargs)
+        self.assertEqual(list(rows['b']), [c * 0.5 for c in expected[:limit]])
+        nrows = [ row.nrow for row in
+                  table.where(condition, limit=limit, **kwargs) ]
+        self.assertEqual(nrows, expected[:limit])
+
+    def test00_inkernel(self):
+        """Limits in in-kernel queries."""
+        for limit in [0, 1, 7, 200, self.nrows]:
+            self.checkLimit('a < 100', limit)
+            self.checkLimit('a < 100', limit, start=10, stop=4000, step=3)
+            self.checkLimit('a < 100', limit, parallel=True)
+
+    def test01_early(self):
+        """Queries with a limit stop reading the table early."""
+        table = self.table
+        table.queryStats = tables.QueryStats()
+        self.assertEqual(len(table.readWhere('a < 500', limit=5)), 5)
+        self.assertTrue(table.queryStats.rowsread <= table.nrowsinbuf)
+
+    def test02_indexed(self):
+        """Limits in indexed queries."""
+        self.table.cols.a.createIndex()
+        for limit in [0, 3, 40, self.nrows]:
+            self.checkLimit('a < 100', limit)
+            self.checkLimit('(a > 10) & (a < 200)', limit, start=100)
+        # An incomplete sequence of rows is not cached
+        self.table.getWhereList('a < 300', limit=2)
+        self.assertEqual(len(self.table.getWhereList('a < 300')), 1500)
+
+    def test03_deadrows(self):
+        """Limits in queries on tables with rows removed lazily."""
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.table.removeRows(0, 700)
+        self.checkLimit('a < 100', 20)
+        self.checkLimit('a < 100', 20, parallel=True)
+
+    def test04_querycache(self):
+        """Limits in queries using the persistent cache."""
+        self.h5file.params['QUERY_CACHE_PERSISTENT'] = True
+        self.checkLimit('a < 100', 20)
+        self.checkLimit('a < 100', 20)
+
+    def test05_negative(self):
+        """Negative limits are not allowed."""
+        self.assertRaises(ValueError, self.table.getWhereList, 'a < 1',
+                          limit=-1)
+
+
+class TopKTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test reading the rows with the largest values of a column."""
+
+    nrows = 3000
+
+    def setUp(self):
+        super(TopKTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': tables.Int32Col(pos=0),
+                          'b': tables.Float64Col(pos=1),
+                          'c': tables.StringCol(4, pos=2)},
+            chunkshape=64)
+        table.nrowsinbuf = 128
+        i = numpy.arange(self.nrows)
+        data = numpy.empty(self.nrows, dtype=table.dtype)
+        data['a'] = (i * 7919) % 1000
+        data['b'] = i * 0.5
+        data['c'] = ['%04d' % n for n in (i * 31) % 997]
+        table.append(data)
+        self.table = table
+
+    def expected(self, colname, k, largest, condition=None):
+        table = self.table
+        if condition is None:
+            coords = [ row.nrow for row in table ]
+        else:
+            coords = list(table.getWhereList(condition))
+        values = table.readCoordinates(coords, colname)
+        # Sorting is stable, so equal values stay in row order
+        pairs = zip(values, coords)
+        pairs.sort(key=lambda p: p[0], reverse=largest)
+        return [ c for (v, c) in pairs[:k] ]
+
+    def checkTopK(self, colname, k, largest=True, condition=None):
+        rows = self.table.topk(colname, k, largest, condition)
+        expected = self.expected(colname, k, largest, condition)
+        self.assertEqual(list(rows['b']), [c * 0.5 for c in expected])
+
+    def test00_scan(self):
+        """Top rows by scanning the table."""
+        for k in [0, 1, 10, 500, self.nrows + 10]:
+            self.checkTopK('a', k)
+            self.checkTopK('a', k, largest=False)
+            self.checkTopK('c', k, condition='b < 1000')
+            self.checkTopK('b', k, largest=False, condition='a > 900')
+
+    def test01_sorted(self):
+        """Top rows following a completely sorted index."""
+        self.table.cols.a.createCSIndex()
+        for k in [0, 1, 10, 500, self.nrows + 10]:
+            self.checkTopK('a', k)
+            self.checkTopK('a', k, largest=False)
+            self.checkTopK('a', k, condition='b < 1000')
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.table.removeRows(100, 200)
+        self.checkTopK('a', 30)
+        self.checkTopK('a', 30, largest=False, condition='b > 10')
+
+    def test02_indexed(self):
+        """Top rows among the ones selected by an index."""
+        self.table.cols.b.createIndex()
+        self.checkTopK('a', 25, condition='b < 1000')
+        self.checkTopK('c', 25, largest=False, condition='b > 10')
+
+    def test03_errors(self):
+        """Invalid arguments for top rows."""
+        self.assertRaises(KeyError, self.table.topk, 'x', 3)
+        self.assertRaises(ValueError, self.table.topk, 'a', -3)
+        self.assertEqual(list(self.table.topk(self.table.cols.a, 1)['a']),
+                         [999])
+
+    def checkTopKNaNs(self):
+        table = self.table
+        b = table.col('b')
+        # Sorting is stable, and NaNs go after any other value
+        coords = list(numpy.argsort(b, kind='mergesort'))
+        nnans = numpy.isnan(b).sum()
+        nans, others = coords[len(coords)-nnans:], coords[:len(coords)-nnans]
+        for k in [1, 10, 50, self.nrows + 10]:
+            for largest, expected in [(True, nans + others[::-1]),
+                                      (False, others + nans)]:
+                rows = table.topk('b', k, largest)
+                self.assertEqual(
+                    rows.tostring(),
+                    table.readCoordinates(expected[:k]).tostring())
+
+    def test04_nans(self):
+        """Top rows of a column with NaNs, with or without indexes."""
+        table = self.table
+        table.cols.b.createZoneMap()
+        table.cols.b.createCSIndex()
+        self.checkTopKNaNs()
+        b = table.col('b')
+        b[7::97] = numpy.nan
+        table.modifyColumn(0, column=b, colname='b')
+        self.checkTopKNaNs()
+        table.cols.b.removeZoneMap()
+        self.checkTopKNaNs()
+        table.cols.b.removeIndex()
+        self.checkTopKNaNs()
+
+
+
+class CompositeIndexTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries using indexes over several columns."""
+
+    nrows = 5000
+
+    def setUp(self):
+        super(CompositeIndexTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': tables.Int32Col(pos=0),
+                          'b': tables.Float64Col(pos=1),
+                          'c': tables.StringCol(4, pos=2)},
+            chunkshape=64)
+        i = numpy.arange(self.nrows)
+        data = numpy.empty(self.nrows, dtype=table.dtype)
+        data['a'] = i % 17
+        data['b'] = ((i * 7919) % 1000) * 0.5
+        data['c'] = ['%04d' % n for n in (i * 31) % 97]
+        table.append(data)
+        self.table = table
+
+    def expected(self, condition, condvars=None):
+        """Get the coordinates selected by a scan of the table."""
+        table = self.table
+        # Compiled conditions do not depend on indexing being enabled
+        table._conditionCache.clear()
+        table._enabledIndexingInQueries = False
+        try:
+            return list(table.getWhereList(condition, condvars))
+        finally:
+            table._enabledIndexingInQueries = True
+            table._conditionCache.clear()
+
+    def checkQuery(self, condition, condvars=None, exact=None):
+        table = self.table
+        self.assertTrue(table.willQueryUseIndexing(condition, condvars))
+        plan = table.explainWhere(condition, condvars)
+        self.assertEqual(plan['composite_index'], ('a', 'b'))
+        if exact is not None:
+            self.assertEqual(plan['residual'] is None, exact)
+        expected = self.expected(condition, condvars)
+        self.assertEqual(list(table.getWhereList(condition, condvars)),
+                         expected)
+        self.assertEqual([ row.nrow for row in
+                           table.where(condition, condvars) ], expected)
+        self.assertEqual(list(table.readWhere(condition, condvars)['b']),
+                         list(table.readCoordinates(expected, 'b')))
+
+    def test00_prefix(self):
+        """Equality on the first column and range on the second one."""
+        self.assertEqual(self.table.createCompositeIndex(['a', 'b']),
+                         self.nrows)
+        self.assertEqual(self.table.compositeindexes, [('a', 'b')])
+        self.checkQuery('(a == 3) & (b >= 100) & (b < 300)', exact=True)
+        self.checkQuery('(a == 3) & (b > 100.5)', exact=True)
+        self.checkQuery('(a == 16) & (b <= 20)', exact=True)
+        self.checkQuery('(a == 5) & (b == 250)', exact=True)
+        self.checkQuery('(a == 5) & (b == 250.25)', exact=True)
+        self.checkQuery('(a == 18) & (b > 0)', exact=True)
+        self.checkQuery('(b < bmax) & (a == amin)', {'amin': 2, 'bmax': 50},
+                        exact=True)
+
+    def test01_residual(self):
+        """Conditions with comparisons not covered by the index."""
+        self.table.createCompositeIndex(['a', 'b'])
+        self.checkQuery('(a == 3) & (b >= 100) & (c > "0050")', exact=False)
+        self.checkQuery('(a == 3) & (b >= 100) & (b != 200)', exact=False)
+        self.checkQuery('(a == 3) & (b > 100) & (b > 200)', exact=False)
+        self.assertFalse(self.table.willQueryUseIndexing('(a == 3) | (b > 1)'))
+        plan = self.table.explainWhere('(a > 3) & (b == 1)')
+        self.assertEqual(plan['composite_index'], None)
+
+    def test01b_columns(self):
+        """Comparisons between columns are not covered by the index."""
+        table = self.table
+        table.createCompositeIndex(['a', 'b'])
+        self.checkQuery('(a == 3) & (b > 100) & (b > a)', exact=False)
+        for condition in ['(a == b) & (b > 2)', '(a == 1) & (b == a)']:
+            plan = table.explainWhere(condition)
+            self.assertEqual(plan['composite_index'], None)
+            self.assertEqual(list(table.getWhereList(condition)),
+                             self.expected(condition))
+
+    def test02_strings(self):
+        """Composite indexes with string columns."""
+        self.table.createCompositeIndex([self.table.cols.c, 'a'])
+        condition = '(c == "0010") & (a < 8)'
+        self.assertTrue(self.table.willQueryUseIndexing(condition))
+        self.assertEqual(list(self.table.getWhereList(condition)),
+                         self.expected(condition))
+
+    def test03_dirty(self):
+        """Composite indexes are not used after modifications."""
+        table = self.table
+        table.autoIndex = False
+        table.createCompositeIndex(['a', 'b'])
+        condition = '(a == 3) & (b < 200)'
+        table.append([(3, 1.0, 'x')])
+        table.flush()
+        self.assertFalse(table.willQueryUseIndexing(condition))
+        self.assertEqual(table.getWhereList(condition)[-1], self.nrows)
+        table.modifyColumn(0, 1, column=[3], colname='a')
+        table.reIndexDirty()
+        self.checkQuery(condition)
+        self.assertEqual(table.getWhereList(condition)[0], 0)
+        # Automatic re-indexing after removing rows
+        table.autoIndex = True
+        table.removeRows(0, 100)
+        self.checkQuery(condition)
+
+    def test04_deadrows(self):
+        """Rows removed lazily are not selected."""
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.table.createCompositeIndex(['a', 'b'])
+        self.table.removeRows(0, 1000)
+        self.checkQuery('(a == 3) & (b >= 100)')
+        self.assertTrue(self.table.getWhereList('(a == 3)')[0] >= 1000)
+
+    def test05_range(self):
+        """Composite queries with ranges and limits."""
+        table = self.table
+        table.createCompositeIndex(['a', 'b'])
+        condition = '(a == 3) & (b >= 100)'
+        expected = self.expected(condition)
+        self.assertEqual(list(table.getWhereList(condition, start=1000,
+                                                 stop=4000, step=3)),
+                         [ c for c in expected
+                           if 1000 <= c < 4000 and (c - 1000) % 3 == 0 ])
+        self.assertEqual(list(table.getWhereList(condition, limit=5)),
+                         expected[:5])
+
+    def test06_persistence(self):
+        """Composite indexes are kept in the file."""
+        self.table.createCompositeIndex(['a', 'b'])
+        self.assertRaises(ValueError, self.table.createCompositeIndex,
+                          ['a', 'b'])
+        self._reopen('a')
+        table = self.h5file.root.test
+        self.assertEqual(table.compositeindexes, [('a', 'b')])
+        self.assertTrue(table.willQueryUseIndexing('(a == 1) & (b > 5)'))
+        table.rename('test2')
+        self._reopen('a')
+        table = self.h5file.root.test2
+        self.assertTrue(table.willQueryUseIndexing('(a == 1) & (b > 5)'))
+        table.removeCompositeIndex(('a', 'b'))
+        self.assertEqual(table.compositeindexes, [])
+        self.assertFalse('_p_cidx_test2' in self.h5file.root)
+        self.assertFalse(table.willQueryUseIndexing('(a == 1) & (b > 5)'))
+        self.assertRaises(KeyError, table.removeCompositeIndex, ('a', 'b'))
+
+    def test07_errors(self):
+        """Invalid columns for composite indexes."""
+        table = self.table
+        self.assertRaises(ValueError, table.createCompositeIndex, ['a'])
+        self.assertRaises(ValueError, table.createCompositeIndex, ['a', 'a'])
+        self.assertRaises(KeyError, table.createCompositeIndex, ['a', 'x'])
+
+
+
+class BitmapIndexTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test queries using bitmap indexes."""
+
+    nrows = 3001
+
+    def setUp(self):
+        super(BitmapIndexTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'s': tables.Int8Col(pos=0),
+                          'f': tables.BoolCol(pos=1),
+                          'c': tables.StringCol(3, pos=2),
+                          'x': tables.Float64Col(pos=3)},
+            chunkshape=64)
+        table.append(self.rows(0, self.nrows))
+        table.cols.s.createBitmapIndex()
+        table.cols.f.createBitmapIndex()
+        table.cols.c.createBitmapIndex()
+        self.table = table
+
+    def rows(self, start, stop):
+        i = numpy.arange(start, stop)
+        data = numpy.empty(len(i), dtype=self.h5file.root.test.dtype)
+        data['s'] = i % 7
+        data['f'] = (i // 100) % 2 == 0
+        data['c'] = ['k%d' % (j % 4) for j in i]
+        data['x'] = i
+        return data
+
+    def expected(self, condition, **kwargs):
+        """Get the coordinates selected by a scan of the table."""
+        table = self.table
+        table._conditionCache.clear()
+        table._enabledIndexingInQueries = False
+        try:
+            return list(table.getWhereList(condition, **kwargs))
+        finally:
+            table._enabledIndexingInQueries = True
+            table._conditionCache.clear()
+
+    def checkQuery(self, condition, exact=None):
+        table = self.table
+        expected = self.expected(condition)
+        self.assertTrue(table.willQueryUseIndexing(condition))
+        if exact is not None:
+            plan = table.explainWhere(condition)
+            self.assertEqual(plan['residual'] is None, exact)
+            self.assertEqual(plan['rows_to_scan'] == len(expected), exact)
+        self.assertEqual(list(table.getWhereList(condition)), expected)
+        self.assertEqual([ row.nrow for row in table.where(condition) ],
+                         expected)
+        self.assertEqual(list(table.readWhere(condition)['x']),
+                         list(table.readCoordinates(expected, 'x')))
+
+    def checkQueries(self):
+        self.checkQuery('s == 3')
+        self.checkQuery('(s == 2) | ~f')
+        self.checkQuery('~((s > 4) & f) & (c != "k1")')
+        self.checkQuery('(s >= 2) & (x < 1500)')
+
+    def test00_exact(self):
+        """Conditions resolved by bitmaps alone."""
+        self.checkQuery('s == 3', exact=True)
+        self.checkQuery('s != 3', exact=True)
+        self.checkQuery('f', exact=True)
+        self.checkQuery('~f & (s < 2)', exact=True)
+        self.checkQuery('(s == 2) | ~f', exact=True)
+        self.checkQuery('~((s > 4) & f) & (c != "k1")', exact=True)
+        self.checkQuery('(c == "k2") | (c == "k3") | (s == 9)', exact=True)
+        self.checkQuery('(2 <= s) & (s < 4)', exact=True)
+        plan = self.table.explainWhere('(s == 2) | ~f')
+        self.assertEqual(plan['bitmap_expression'], '(b0 | ~b1)')
+        self.assertEqual([ expr['column']
+                           for expr in plan['bitmap_expressions'] ],
+                         ['s', 'f'])
+
+    def test01_residual(self):
+        """Conditions evaluated on the rows selected by bitmaps."""
+        self.checkQuery('(s == 2) & (x < 1500)', exact=False)
+        self.checkQuery('~f & (x > 100) & (c == "k0")', exact=False)
+        self.assertFalse(self.table.willQueryUseIndexing('(s == 2) | (x > 1)'))
+        # Bitmaps narrow the chunks selected by regular indexes
+        self.table.cols.x.createIndex()
+        self.checkQuery('(s == 2) & (x < 1500)')
+        plan = self.table.explainWhere('(x < 1500) & f')
+        self.assertEqual(plan['bitmap_expression'], 'b0')
+        self.assertTrue(plan['selected_chunks'] <
+                        self.table.explainWhere('x < 1500')['selected_chunks'])
+
+    def test01b_columns(self):
+        """Comparisons between columns are not resolved by bitmaps."""
+        table = self.table
+        self.checkQuery('(s == 2) & (x < s + 100)', exact=False)
+        plan = table.explainWhere('(x == s) & (s == 1)')
+        self.assertEqual(plan['bitmap_expression'], 'b0')
+        for condition in ['s == x', '(x == s) & (s == 1)']:
+            self.assertEqual(list(table.getWhereList(condition)),
+                             self.expected(condition))
+
+    def test02_range(self):
+        """Bitmap queries with ranges and limits."""
+        table = self.table
+        for condition in ['(s == 2) | ~f', '(s == 2) & (x > 100)']:
+            for start, stop, step in [(0, 1, 1), (5, 2900, 3),
+                                      (1003, 1011, 1), (64, 3001, 64)]:
+                self.assertEqual(
+                    list(table.getWhereList(condition, start=start,
+                                            stop=stop, step=step)),
+                    self.expected(condition, start=start, stop=stop,
+                                  step=step))
+            self.assertEqual(list(table.getWhereList(condition, limit=7)),
+                             self.expected(condition)[:7])
+
+    def test03_append(self):
+        """Bitmap indexes are updated on appends."""
+        table = self.table
+        for nrows in [1, 5, 13, 200, 3]:
+            table.append(self.rows(table.nrows, table.nrows + nrows))
+            table.flush()
+        # New distinct values
+        table.append([(9, True, 'zz', 1.0)] * 3)
+        table.flush()
+        self.assertEqual(table.cols.s.bitmapindex.nvalues, 8)
+        self.checkQueries()
+        self.checkQuery('(s == 9) | (c == "zz")', exact=True)
+
+    def test04_modify(self):
+        """Bitmap indexes are updated on modifications."""
+        table = self.table
+        table.modifyColumn(3, 2000, 7, column=[9] * 286, colname='s')
+        table.modifyRows(10, 20, rows=self.rows(30, 40))
+        table.cols.f[100:300] = [False] * 200
+        self.checkQueries()
+        self.checkQuery('s == 9', exact=True)
+        for row in table.where('s == 9'):
+            row['c'] = 'k5'
+            row.update()
+        self.checkQuery('c == "k5"')
+
+    def test05_remove(self):
+        """Bitmap indexes are updated on removals."""
+        table = self.table
+        table.removeRows(1000, 1600)
+        self.checkQueries()
+        table.truncate(1203)
+        self.checkQueries()
+        table.append(self.rows(0, 20))
+        self.checkQueries()
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        table.removeRows(1, 500)
+        self.checkQueries()
+
+    def test06_persistence(self):
+        """Bitmap indexes are kept in the file."""
+        self._reopen('a')
+        table = self.table = self.h5file.root.test
+        self.assertFalse(table.cols.s.bitmapindex is None)
+        self.checkQueries()
+        table.rename('test2')
+        self._reopen('a')
+        table = self.table = self.h5file.root.test2
+        self.checkQueries()
+        for colname in ['s', 'f', 'c']:
+            table.colinstances[colname].removeBitmapIndex()
+        self.assertTrue(table.cols.s.bitmapindex is None)
+        self.assertFalse('_p_bmap_test2' in self.h5file.root)
+        self.assertFalse(table.willQueryUseIndexing('s == 3'))
+        table.remove()
+        self.assertEqual(self.h5file.root._v_hidden.keys(), [])
+
+    def test07_errors(self):
+        """Invalid columns for bitmap indexes."""
+        table = self.table
+        self.assertRaises(ValueError, table.cols.s.createBitmapIndex)
+        self.assertRaises(TypeError, table.cols.x.createBitmapIndex)
+        self.h5file.params['BITMAP_MAX_VALUES'] = 2
+        table.cols.s.removeBitmapIndex()
+        self.assertRaises(ValueError, table.cols.s.createBitmapIndex)
+        self.assertTrue(table.cols.s.bitmapindex is None)
+        table.cols.f.createBloomFilter()
+
+
 
 # Main part
 # ---------
@@ -1130,6 +2718,18 @@ def suite():
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage30))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage31))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage32))
+        testSuite.addTest(unittest.makeSuite(ParallelQueryTestCase))
+        testSuite.addTest(unittest.makeSuite(ExplainQueryTestCase))
+        testSuite.addTest(unittest.makeSuite(PersistentQueryCacheTestCase))
+        testSuite.addTest(unittest.makeSuite(ZoneMapTestCase))
+        testSuite.addTest(unittest.makeSuite(BloomFilterTestCase))
+        testSuite.addTest(unittest.makeSuite(AggregateTestCase))
+        testSuite.addTest(unittest.makeSuite(GroupByTestCase))
+        testSuite.addTest(unittest.makeSuite(JoinTestCase))
+        testSuite.addTest(unittest.makeSuite(LimitTestCase))
+        testSuite.addTest(unittest.makeSuite(TopKTestCase))
+        testSuite.addTest(unittest.makeSuite(CompositeIndexTestCase))
+        testSuite.addTest(unittest.makeSuite(BitmapIndexTestCase))
 
     return testSuite
 
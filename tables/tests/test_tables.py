@@ -5479,6 +5479,697 @@ class RowContainsTestCase(common.TempFileMixin, common.PyTablesTestCase):
         self.assertTrue(4 not in row)
 
 
+class PrefetchTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test row iterators reading buffers ahead of time."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(PrefetchTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1)},
+            filters=Filters(complevel=1), chunkshape=16)
+        table.nrowsinbuf = 64  # force a lot of buffers
+        table.append([(i, i*2.) for i in xrange(self.nrows)])
+        self.table = table
+
+    def test00_iterrows(self):
+        """Checking iterrows() with prefetch."""
+        table = self.table
+        for (start, stop, step) in [(None, None, None), (3, 900, 1),
+                                    (0, 1000, 7), (10, 999, 100)]:
+            rows = [r[:] for r in table.iterrows(start, stop, step)]
+            prows = [r[:] for r in table.iterrows(start, stop, step,
+                                                  prefetch=True)]
+            if common.verbose:
+                print "Rows read with prefetch:", len(prows)
+            self.assertEqual(rows, prows)
+
+    def test01_where(self):
+        """Checking where() with prefetch."""
+        table = self.table
+        for (start, stop, step) in [(None, None, None), (5, 777, 3)]:
+            rows = [r.nrow for r in table.where('a % 3 == 0', {},
+                                                start, stop, step)]
+            prows = [r.nrow for r in table.where('a % 3 == 0', {},
+                                                 start, stop, step,
+                                                 prefetch=True)]
+            self.assertEqual(rows, prows)
+
+    def test02_param(self):
+        """Checking the IO_PREFETCH parameter."""
+        self.h5file.params['IO_PREFETCH'] = True
+        table = self.table
+        self.assertEqual([r['a'] for r in table],
+                         range(self.nrows))
+        self.assertEqual(len(table.readWhere('a < 100')), 100)
+
+    def test03_break(self):
+        """Checking nested iterators and breaks with prefetch."""
+        table = self.table
+        result = []
+        for r1 in table.iterrows(stop=200, step=50, prefetch=True):
+            for r2 in table.iterrows(prefetch=True):
+                if r2.nrow > r1.nrow:
+                    result.append(r2['a'])
+                    break
+        self.assertEqual(result, [1, 51, 101, 151])
+
+    def test04_pending(self):
+        """Checking that pending reads ahead are not left behind."""
+        table = self.table
+        rows = table.iterrows(prefetch=True)
+        rows.next()
+        (readahead,) = table._readaheads.keys()
+        self.assertTrue(readahead.thread is not None)
+        # Stopping early and dropping the iterator waits for the read
+        del rows
+        self.assertTrue(readahead.thread is None)
+        del readahead
+        rows = table.iterrows(prefetch=True)
+        rows.next()
+        (readahead,) = table._readaheads.keys()
+        # Closing the file waits for the read as well
+        self._reopen()
+        self.assertTrue(readahead.thread is None)
+
+
+class BlockIteratorTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test iterating tables in blocks of rows."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(BlockIteratorTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1),
+                          'c': {'d': Int16Col(pos=0)}}, chunkshape=32)
+        table.nrowsinbuf = 100
+        table.append([(i, i*2., (i%7,)) for i in xrange(self.nrows)])
+        self.table = table
+
+    def test00_all(self):
+        """Checking iterblocks() over the whole table."""
+        table = self.table
+        blocks = list(table.iterblocks())
+        self.assertEqual([len(b) for b in blocks], [100]*10)
+        self.assertTrue(allequal(concatenate(blocks), table.read()))
+
+    def test01_range(self):
+        """Checking iterblocks() with ranges and block sizes."""
+        table = self.table
+        for (start, stop, step, blocksize) in [(3, 997, 1, 64),
+                                               (5, 1000, 3, 33),
+                                               (0, 1000, 250, 2)]:
+            blocks = list(table.iterblocks(start, stop, step,
+                                           blocksize=blocksize))
+            self.assertTrue(max([len(b) for b in blocks]) <= blocksize)
+            self.assertTrue(allequal(concatenate(blocks),
+                                     table.read(start, stop, step)))
+
+    def test02_fields(self):
+        """Checking iterblocks() with field selections."""
+        table = self.table
+        blocks = list(table.iterblocks(fields='b', blocksize=300))
+        self.assertTrue(allequal(concatenate(blocks), table.col('b')))
+        blocks = list(table.iterblocks(fields=['c/d', 'a']))
+        result = concatenate(blocks)
+        self.assertEqual(result.dtype.names, ('c/d', 'a'))
+        self.assertTrue(allequal(result['a'], table.col('a')))
+        self.assertTrue(allequal(result['c/d'], table.col('c/d')))
+        self.assertRaises(KeyError, table.iterblocks, fields=['x'])
+
+    def test03_nocopy(self):
+        """Checking iterblocks() with views of the internal buffer."""
+        table = self.table
+        total, first = 0, None
+        for block in table.iterblocks(fields='a', copy=False):
+            if first is None:
+                first = block
+            total += block.sum()
+        self.assertEqual(total, sum(range(self.nrows)))
+        # The buffer has been reused for the next blocks
+        self.assertEqual(first[0], 900)
+
+    def test04_where(self):
+        """Checking whereblocks() in-kernel."""
+        table = self.table
+        blocks = list(table.whereblocks('(a % 3 == 0) & (b < 1000)',
+                                        blocksize=64))
+        self.assertTrue(allequal(concatenate(blocks),
+                                 table.readWhere('(a % 3 == 0) & (b < 1000)')))
+        blocks = list(table.whereblocks('a < v', {'v': 10}, fields='b',
+                                        start=1, stop=1000, step=2))
+        self.assertTrue(allequal(concatenate(blocks),
+                                 array([2., 6., 10., 14., 18.])))
+        self.assertEqual(list(table.whereblocks('a < 0')), [])
+
+    def test05_where_indexed(self):
+        """Checking whereblocks() with an indexed condition."""
+        table = self.table
+        table.cols.a.createIndex()
+        condition = '(a >= 10) & (a < 500)'
+        self.assertTrue(table.willQueryUseIndexing(condition))
+        blocks = list(table.whereblocks(condition, blocksize=100,
+                                        fields=['a']))
+        self.assertEqual([len(b) for b in blocks], [100]*4 + [90])
+        self.assertTrue(allequal(concatenate(blocks)['a'],
+                                 arange(10, 500, dtype='int32')))
+
+    def test06_blocksize(self):
+        """Checking wrong block sizes."""
+        self.assertRaises(ValueError, self.table.iterblocks, blocksize=0)
+
+
+class FieldsReadTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test reading just some fields of a table."""
+
+    nrows = 500
+
+    def setUp(self):
+        super(FieldsReadTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1),
+                          'c': {'d': Int16Col(pos=0), 'e': Int8Col(pos=1),
+                                '_v_pos': 2},
+                          't': Time64Col(pos=3)}, chunkshape=16)
+        table.nrowsinbuf = 50
+        table.append([(i, i*2., (i%7, i%3), i+.5)
+                      for i in xrange(self.nrows)])
+        self.table = table
+        self.all = table.read()
+
+    def checkFields(self, result, expected, fields):
+        self.assertEqual(result.dtype.names, tuple(fields))
+        self.assertEqual(len(result), len(expected))
+        for field in fields:
+            self.assertTrue(allequal(result[field],
+                                     self.table._selectFields(expected,
+                                                              field)))
+
+    def test00_read(self):
+        """Checking read() with fields."""
+        table = self.table
+        for (start, stop, step) in [(None, None, None), (3, 400, 1),
+                                    (1, 499, 7), (0, 500, 120)]:
+            for fields in [['b'], ['t', 'a'], ['c'], ['c/e', 'b']]:
+                if common.verbose:
+                    print "Reading fields:", fields, (start, stop, step)
+                result = table.read(start, stop, step, fields=fields)
+                expected = self.all[start:stop:step]
+                self.checkFields(result, expected, fields)
+
+    def test01_readCoordinates(self):
+        """Checking readCoordinates() with fields."""
+        table = self.table
+        coords = [5, 1, 499, 250]
+        result = table.readCoordinates(coords, fields=['t', 'c/d'])
+        self.checkFields(result, self.all[coords], ['t', 'c/d'])
+        result = table.readCoordinates([], fields=['a'])
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result.dtype.names, ('a',))
+
+    def test02_readWhere(self):
+        """Checking readWhere() with fields."""
+        table = self.table
+        for condition in ['(a > 10) & (a < 100)', 'a % 10 == 0']:
+            result = table.readWhere(condition, fields=['b', 'c/d'])
+            expected = table.readWhere(condition)
+            self.checkFields(result, expected, ['b', 'c/d'])
+
+    def test03_iterrows(self):
+        """Checking iterrows() with fields."""
+        table = self.table
+        rows = [(r['a'], r['c/e'], r['t'])
+                for r in table.iterrows(2, 300, 3, fields=['t', 'c/e', 'a'])]
+        expected = [(r['a'], r['c/e'], r['t'])
+                    for r in table.iterrows(2, 300, 3)]
+        self.assertEqual(rows, expected)
+        for row in table.iterrows(fields=['a']):
+            self.assertRaises(KeyError, row.__getitem__, 'b')
+            break
+
+    def test04_update(self):
+        """Checking that rows read with fields cannot be updated."""
+        for row in self.table.iterrows(fields=['a']):
+            row['a'] = 0
+            self.assertRaises(NotImplementedError, row.update)
+            break
+
+    def test05_errors(self):
+        """Checking wrong field selections."""
+        table = self.table
+        self.assertRaises(KeyError, table.read, fields=['x'])
+        self.assertRaises(KeyError, table.read, fields=['c/x'])
+        self.assertRaises(ValueError, table.read, field='a', fields=['b'])
+
+
+class CoordinatesReadTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test reading scattered rows grouped by chunks."""
+
+    nrows = 1000
+    filters = Filters()
+
+    def setUp(self):
+        super(CoordinatesReadTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1),
+                          't': Time64Col(pos=2)},
+            filters=self.filters, chunkshape=16)
+        table.nrowsinbuf = 50
+        table.append([(i, i*2., i+.5) for i in xrange(self.nrows)])
+        self.table = table
+        self.all = table.read()
+
+    def checkCoords(self, coords):
+        table = self.table
+        result = table.readCoordinates(coords)
+        self.assertTrue(allequal(result, self.all[coords]))
+        rows = [(r.nrow, r['a'], r['t']) for r in table.itersequence(coords)]
+        expected = [(r['a'], r['a'], r['t']) for r in self.all[coords]]
+        self.assertEqual(rows, expected)
+
+    def test00_scattered(self):
+        """Reading scattered rows in any order."""
+        random.seed(1)
+        self.checkCoords(random.randint(0, self.nrows, 300))
+        self.checkCoords(sort(random.randint(0, self.nrows, 300)))
+        self.checkCoords([999, 0, 500, 0, 17, 16, 15, 999])
+        self.checkCoords(arange(self.nrows)[::-1])
+
+    def test01_sparse(self):
+        """Reading rows much sparser than chunks."""
+        self.checkCoords([3, 990, 470])
+        self.checkCoords(arange(0, self.nrows, 97))
+
+    def test02_point_selections(self):
+        """Disabling reads of whole chunks."""
+        self.h5file.params['COORDS_CHUNK_SPARSITY'] = 0
+        self.checkCoords([999, 0, 500, 0, 17])
+
+    def test03_fields(self):
+        """Reading scattered rows with fields."""
+        coords = [400, 3, 3, 200, 201]
+        result = self.table.readCoordinates(coords, fields=['t', 'a'])
+        self.assertTrue(allequal(result['t'], self.all['t'][coords]))
+        self.assertTrue(allequal(result['a'], self.all['a'][coords]))
+        result = self.table.readCoordinates(coords, field='b')
+        self.assertTrue(allequal(result, self.all['b'][coords]))
+
+    def test04_where(self):
+        """Indexed queries with cached sequences."""
+        table = self.table
+        table.cols.a.createIndex()
+        condition = '(a > 100) & (a < 700) & (a % 3 == 0)'
+        for i in range(3):
+            rows = [r['b'] for r in table.where(condition)]
+        expected = [r['b'] for r in self.all if 100 < r['a'] < 700
+                    and r['a'] % 3 == 0]
+        self.assertEqual(rows, expected)
+
+
+class CompressedCoordinatesReadTestCase(CoordinatesReadTestCase):
+    filters = Filters(complevel=1)
+
+
+class LazyRemoveTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test removing rows lazily and compacting tables."""
+
+    nrows = 500
+
+    def setUp(self):
+        super(LazyRemoveTestCase, self).setUp()
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        self.h5file.params['COMPACT_DEAD_RATIO'] = 1
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1)},
+            chunkshape=16)
+        table.nrowsinbuf = 50
+        table.append([(i, i*2.) for i in xrange(self.nrows)])
+        self.table = table
+        self.alive = ones(self.nrows, dtype=bool)
+
+    def remove(self, start, stop):
+        nremoved = self.table.removeRows(start, stop)
+        self.assertEqual(nremoved, self.alive[start:stop].sum())
+        self.alive[start:stop] = False
+
+    def checkTable(self, table):
+        expected = arange(self.nrows)[self.alive]
+        self.assertEqual(table.nrows, self.nrows)
+        self.assertEqual(table.ndeadrows, self.nrows - len(expected))
+        self.assertEqual(list(table.read()['a']), list(expected))
+        self.assertEqual(list(table.read(10, 300, 7)['a']),
+                         list(arange(10, 300, 7)[self.alive[10:300:7]]))
+        self.assertEqual(list(table.cols.a[:]), list(expected))
+        self.assertEqual([r['a'] for r in table], list(expected))
+        self.assertEqual([r.nrow for r in table.iterrows(3, 400, 3)],
+                         [i for i in range(3, 400, 3) if self.alive[i]])
+        coords = [0, self.nrows-1, 250, 33, 120, 121]
+        selected = [i for i in coords if self.alive[i]]
+        self.assertEqual(list(table.readCoordinates(coords)['a']), selected)
+        self.assertEqual([r['a'] for r in table.itersequence(coords)],
+                         selected)
+        self.assertEqual(list(table[coords]['a']), selected)
+        condition = '(a % 3 == 0) & (b < 900)'
+        selected = [i for i in expected if i % 3 == 0 and i < 450]
+        self.assertEqual([r['a'] for r in table.where(condition)], selected)
+        self.assertEqual(list(table.getWhereList(condition)), selected)
+        blocks = [block['a'] for block in table.iterblocks()]
+        self.assertEqual(list(concatenate(blocks)), list(expected))
+
+    def test00_read(self):
+        """Reading and querying tables with rows removed lazily."""
+        self.remove(10, 20)
+        self.remove(15, 120)
+        self.remove(300, 301)
+        self.remove(499, 500)
+        self.assertEqual(self.table.nrows, self.nrows)
+        self.checkTable(self.table)
+
+    def test01_indexed(self):
+        """Indexed queries skip the rows removed lazily."""
+        table = self.table
+        table.cols.a.createIndex()
+        self.remove(100, 200)
+        self.remove(350, 360)
+        self.checkTable(table)
+        condition = '(a > 50) & (a < 400)'
+        selected = [i for i in range(51, 400) if self.alive[i]]
+        for i in range(3):
+            self.assertEqual([r['a'] for r in table.where(condition)],
+                             selected)
+
+    def test01b_getitem(self):
+        """Getting single rows removed lazily raises an error."""
+        table = self.table
+        self.remove(10, 20)
+        self.assertEqual(table[9]['a'], 9)
+        self.assertEqual(table[20]['a'], 20)
+        self.assertEqual(table.cols.a[20], 20)
+        self.assertEqual(table.cols[9]['b'], 18.)
+        for getitem in (table.__getitem__, table.cols.__getitem__,
+                        table.cols.a.__getitem__):
+            self.assertRaises(IndexError, getitem, 10)
+            self.assertRaises(IndexError, getitem, 19)
+            self.assertRaises(IndexError, getitem, 10 - self.nrows)
+
+    def test01c_readSorted(self):
+        """Sorted reads skip the rows removed lazily."""
+        table = self.table
+        table.cols.a.createCSIndex()
+        self.remove(100, 115)
+        expected = [i for i in range(self.nrows) if self.alive[i]]
+        self.assertEqual(list(table.readSorted('a', field='a')), expected)
+        self.assertEqual([r['a'] for r in table.itersorted('a')], expected)
+        # The index itself still has the rows removed lazily
+        self.assertEqual(len(table.cols.a.index.readSorted()), self.nrows)
+
+    def test02_reopen(self):
+        """The removed rows persist across openings."""
+        self.remove(5, 55)
+        self._reopen('a')
+        table = self.h5file.root.test
+        self.checkTable(table)
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = True
+        table.removeRows(40, 80)
+        self.alive[40:80] = False
+        self.checkTable(table)
+
+    def test03_compact(self):
+        """Compacting tables."""
+        table = self.table
+        table.cols.a.createIndex()
+        self.remove(0, 3)
+        self.remove(100, 200)
+        self.remove(480, 500)
+        expected = arange(self.nrows)[self.alive]
+        self.assertEqual(table.compact(), self.nrows - len(expected))
+        self.assertEqual(table.nrows, len(expected))
+        self.assertEqual(table.ndeadrows, 0)
+        self.assertEqual(list(table.read()['a']), list(expected))
+        self.assertEqual(list(table.getWhereList('a == 250')), [147])
+        self.assertEqual(table.compact(), 0)
+        self.assertTrue('_p_dead_test' not in self.h5file.root._v_hidden)
+
+    def test04_auto_compact(self):
+        """Compacting tables when too many rows are removed."""
+        self.h5file.params['COMPACT_DEAD_RATIO'] = 0.5
+        table = self.table
+        table.removeRows(0, 200)
+        self.assertEqual(table.nrows, self.nrows)
+        table.removeRows(200, 300)
+        self.assertEqual(table.nrows, 200)
+        self.assertEqual(table.ndeadrows, 0)
+        self.assertEqual(list(table.cols.a[:]), range(300, 500))
+
+    def test05_append_truncate(self):
+        """Appending and truncating tables with rows removed lazily."""
+        table = self.table
+        self.remove(490, 495)
+        table.append([(i, i*2.) for i in xrange(500, 600)])
+        self.nrows = 600
+        self.alive = concatenate((self.alive, ones(100, dtype=bool)))
+        self.checkTable(table)
+        table.truncate(492)
+        self.nrows = 492
+        self.alive = self.alive[:492]
+        self.checkTable(table)
+        table.truncate(490)
+        self.assertEqual(table.ndeadrows, 0)
+        self.assertTrue('_p_dead_test' not in self.h5file.root._v_hidden)
+
+    def test06_remove_physically(self):
+        """Removing rows physically shifts the removed ones."""
+        table = self.table
+        self.remove(100, 110)
+        self.h5file.params['REMOVE_ROWS_LAZILY'] = False
+        table.removeRows(50, 60)
+        self.nrows = 490
+        self.alive = concatenate((self.alive[:50], self.alive[60:]))
+        self.assertEqual(table.ndeadrows, 10)
+        self.assertEqual([r['a'] for r in table.where('a < 130')],
+                         range(50) + range(60, 100) + range(110, 130))
+
+    def test07_copy(self):
+        """Copies do not keep the rows removed lazily."""
+        self.remove(200, 400)
+        table = self.table.copy('/', 'copy')
+        self.assertEqual(table.nrows, 300)
+        self.assertEqual(table.ndeadrows, 0)
+        self.assertEqual(list(table.cols.a[:]),
+                         list(arange(self.nrows)[self.alive]))
+
+    def test08_move_remove(self):
+        """Moving and removing tables with rows removed lazily."""
+        self.remove(0, 10)
+        self.h5file.createGroup('/', 'group')
+        self.table.move('/group')
+        self.assertTrue('_p_dead_test' in self.h5file.root.group._v_hidden)
+        self.checkTable(self.table)
+        self.table.remove()
+        self.assertEqual(self.h5file.root.group._v_hidden.keys(), [])
+
+
+class AsyncAppendTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test appending rows in a background writer thread."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(AsyncAppendTestCase, self).setUp()
+        table = self.h5file.createTable(
+            '/', 'test', {'a': Int32Col(pos=0), 'b': Float64Col(pos=1)},
+            filters=Filters(complevel=1), chunkshape=16)
+        table.nrowsinbuf = 64  # force a lot of buffers
+        self.table = table
+
+    def checkTable(self, table):
+        self.assertEqual(table.nrows, self.nrows)
+        self.assertEqual(list(table.cols.a[:]), range(self.nrows))
+        self.assertEqual(list(table.cols.b[:]),
+                         [i*2. for i in xrange(self.nrows)])
+
+    def test00_row(self):
+        """Appending with Row.append() in the background."""
+        table = self.table
+        appender = table.asyncAppender(queue_depth=2)
+        self.assertEqual(appender.queue_depth, 2)
+        row = table.row
+        for i in xrange(self.nrows):
+            row['a'] = i
+            row['b'] = i*2.
+            row.append()
+        table.flush()
+        self.assertEqual(appender.pending, 0)
+        self.checkTable(table)
+        appender.close()
+        self.assertTrue(appender.leaf is None)
+        self.assertTrue(table._asyncAppender is None)
+
+    def test01_append(self):
+        """Appending with Table.append() in the background."""
+        table = self.table
+        appender = table.asyncAppender()
+        rows = zeros(100, dtype=table.dtype)
+        for start in xrange(0, self.nrows, 100):
+            rows['a'] = arange(start, start+100)
+            rows['b'] = rows['a'] * 2.
+            # The buffer is reused before being written
+            appender.append(rows)
+        appender.flush()
+        self.checkTable(table)
+        appender.close()
+        # Later appends are synchronous
+        table.append(rows[:1])
+        self.assertEqual(table.nrows, self.nrows + 1)
+
+    def test02_indexed(self):
+        """Indexes are kept up to date by the writer."""
+        table = self.table
+        table.cols.a.createIndex()
+        appender = table.asyncAppender()
+        table.append([(i, i*2.) for i in xrange(self.nrows)])
+        table.flush()
+        self.assertTrue(table.willQueryUseIndexing('a < 10'))
+        self.assertEqual(list(table.readWhere('a < 10')['a']), range(10))
+        appender.close()
+
+    def test03_error(self):
+        """Errors of the writer are raised by the caller."""
+        table = self.table
+        appender = table.asyncAppender()
+        def failing(wbufRA, lenrows):
+            raise IOError("writing failed")
+        table._writeBufferedRows = failing
+        table.append([(1, 2.)])
+        def appendAndFlush():
+            # The error may be seen by either call
+            table.append([(2, 4.)])
+            table.flush()
+        self.assertRaises(IOError, appendAndFlush)
+        self.assertTrue(appender.leaf is None)
+        self.assertTrue(table._asyncAppender is None)
+        self.assertRaises(ValueError, appender.append, [(3, 6.)])
+        del table._writeBufferedRows
+        table.flush()
+        self.assertEqual(table.nrows, 0)
+
+    def test04_close(self):
+        """Closing the file writes the pending rows."""
+        table = self.table
+        table.asyncAppender()
+        self.assertRaises(ValueError, table.asyncAppender)
+        table.append([(i, i*2.) for i in xrange(self.nrows)])
+        self._reopen()
+        self.checkTable(self.h5file.root.test)
+
+    def test05_read(self):
+        """Reads right after appending see all the rows."""
+        table = self.table
+        appender = table.asyncAppender()
+        table.append([(i, i*2.) for i in xrange(self.nrows)])
+        self.assertEqual(len(table.read()), self.nrows)
+        self.checkTable(table)
+        table.append([(self.nrows, 0.)])
+        self.assertEqual(table[self.nrows]['a'], self.nrows)
+        table.append([(self.nrows+1, 0.)])
+        self.assertEqual(len(table.readWhere('a > 500')), self.nrows - 499)
+        table.append([(self.nrows+2, 0.)])
+        table.modifyColumn(self.nrows+2, colname='b', column=[4.])
+        self.assertEqual(table.cols.b[-1], 4.)
+        table.append([(self.nrows+3, 0.)])
+        table.removeRows(self.nrows, self.nrows+4)
+        self.checkTable(table)
+        appender.close()
+
+
+class AppendColumnsTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test appending rows from separate columns."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(AppendColumnsTestCase, self).setUp()
+        class Info(IsDescription):
+            a = Int32Col(pos=0)
+            b = Float64Col(pos=1, dflt=-1.)
+            class info(IsDescription):
+                _v_pos = 2
+                name = StringCol(8, pos=0, dflt='none')
+                value = Int16Col(pos=1, dflt=7)
+        table = self.h5file.createTable('/', 'test', Info, chunkshape=16)
+        table.nrowsinbuf = 64  # force a lot of buffers
+        self.table = table
+
+    def test00_all(self):
+        """Appending all the columns."""
+        table = self.table
+        a = arange(self.nrows, dtype='int32')
+        names = array(['n%d' % i for i in xrange(self.nrows)])
+        table.appendColumns({'a': a, 'b': a * 2., 'info/name': names,
+                             'info/value': a % 100})
+        table.append([(self.nrows, 0., ('last', 1))])
+        self.assertEqual(table.nrows, self.nrows + 1)
+        self.assertTrue(allequal(table.cols.a[:-1], a))
+        self.assertTrue(allequal(table.cols.b[:-1], a * 2.))
+        self.assertEqual(list(table.cols.info.name[:3]), ['n0', 'n1', 'n2'])
+        self.assertTrue(allequal(table.cols.info.value[:-1],
+                                 (a % 100).astype('int16')))
+        self.assertEqual(table[-1]['info']['name'], 'last')
+
+    def test01_defaults(self):
+        """Missing columns take their default values."""
+        table = self.table
+        table.appendColumns({'a': range(self.nrows)})
+        self.assertEqual(table.nrows, self.nrows)
+        self.assertEqual(list(table.cols.a[:]), range(self.nrows))
+        self.assertTrue(allequal(table.cols.b[:], -ones(self.nrows)))
+        self.assertTrue(allequal(table.cols.info.value[:],
+                                 7 * ones(self.nrows, dtype='int16')))
+        self.assertEqual(list(table.cols.info.name[-2:]), ['none', 'none'])
+
+    def test02_nested(self):
+        """Appending whole nested columns."""
+        table = self.table
+        info = zeros(10, dtype=table.dtype['info'])
+        info['name'] = 'x'
+        info['value'] = arange(10)
+        table.appendColumns({'b': arange(10.), 'info': info})
+        self.assertEqual(list(table.cols.a[:]), [0] * 10)
+        self.assertEqual(list(table.cols.info.value[:]), range(10))
+        self.assertEqual(list(table.cols.info.name[:]), ['x'] * 10)
+
+    def test03_indexed(self):
+        """Appended rows are indexed."""
+        table = self.table
+        table.cols.a.createIndex()
+        table.appendColumns({'a': arange(self.nrows)[::-1]})
+        table.flush()
+        self.assertEqual(table.cols.a.index.nelements, self.nrows)
+        self.assertTrue(table.willQueryUseIndexing('a < 10'))
+        self.assertEqual(sorted(table.readWhere('a < 10')['a']), range(10))
+
+    def test04_errors(self):
+        """Checking errors of appendColumns()."""
+        table = self.table
+        self.assertRaises(KeyError, table.appendColumns, {'c': [1]})
+        self.assertRaises(ValueError, table.appendColumns,
+                          {'a': [1, 2], 'b': [1.]})
+        self.assertRaises(ValueError, table.appendColumns, {'a': 1})
+        self.assertRaises(ValueError, table.appendColumns,
+                          {'a': [[1, 2], [3, 4]]})
+        table.appendColumns({})
+        self.assertEqual(table.nrows, 0)
+
+
 #----------------------------------------------------------------------
 
 def suite():
@@ -5547,6 +6238,14 @@ def suite():
         theSuite.addTest(unittest.makeSuite(ExhaustedIter))
         theSuite.addTest(unittest.makeSuite(SpecialColnamesTestCase))
         theSuite.addTest(unittest.makeSuite(RowContainsTestCase))
+        theSuite.addTest(unittest.makeSuite(PrefetchTestCase))
+        theSuite.addTest(unittest.makeSuite(BlockIteratorTestCase))
+        theSuite.addTest(unittest.makeSuite(FieldsReadTestCase))
+        theSuite.addTest(unittest.makeSuite(CoordinatesReadTestCase))
+        theSuite.addTest(unittest.makeSuite(CompressedCoordinatesReadTestCase))
+        theSuite.addTest(unittest.makeSuite(LazyRemoveTestCase))
+        theSuite.addTest(unittest.makeSuite(AsyncAppendTestCase))
+        theSuite.addTest(unittest.makeSuite(AppendColumnsTestCase))
 
     if common.heavy:
         theSuite.addTest(unittest.makeSuite(CompressBzip2TablesTestCase))
@@ -84,6 +84,12 @@ cdef extern from "utils.h":
                          hsize_t *slicelength)
 
 
+# The delta filter
+cdef extern from "H5Zdelta.h":
+  int register_delta()
+  int FILTER_DELTA
+
+
 # Functions from Blosc
 cdef extern from "blosc.h":
   int blosc_set_nthreads(int nthreads)
@@ -111,6 +117,12 @@ cdef register_blosc_():
 blosc_version = register_blosc_()
 blosc_version_string, blosc_version_date = blosc_version
 
+# The delta filter is used by indexes.  Its ID is a provisional one
+# (from the range reserved by HDF5 for non-distributed uses) until one
+# is registered with The HDF Group.
+register_delta()
+delta_filter_id = FILTER_DELTA
+
 
 # Important: Blosc calls that modifies global variables in Blosc must be
 # called from the same extension where Blosc is registered in HDF5.
@@ -0,0 +1,290 @@
+"""
+Per-chunk statistics for pruning queries on unindexed columns.
+
+:License: BSD
+:Revision: $Id$
+
+Classes
+=======
+
+`ZoneMap`
+    Minimum, maximum and NaN count of a column in every table chunk.
+
+Functions
+=========
+
+`_zonemapNameOf`
+    Get the name of the zone maps group of a table.
+`_zonemapPathnameOf`
+    Get the path name of the zone maps group of a table.
+
+Variables
+=========
+
+`__docformat`__
+    The format of documentation strings in this module.
+`__version__`
+    Repository version of this file.
+"""
+
+import weakref
+
+import numpy
+
+from tables.atom import Atom, Int64Atom
+from tables.earray import EArray
+from tables.filters import Filters
+from tables.group import Group
+from tables.path import joinPath, splitPath
+
+
+# Public variables
+# ================
+__docformat__ = 'reStructuredText'
+"""The format of documentation strings in this module."""
+
+__version__ = '$Revision$'
+"""Repository version of this file."""
+
+
+# Private functions
+# =================
+def _zonemapNameOf(node):
+    return '_p_zmap_%s' % node._v_name
+
+def _zonemapPathnameOf(node):
+    nodeParentPath = splitPath(node._v_pathname)[0]
+    return joinPath(nodeParentPath, _zonemapNameOf(node))
+
+
+# Public classes
+# ==============
+class ZoneMap(object):
+    """
+    Minimum, maximum and NaN count of a column in every table chunk.
+
+    Zone maps are kept in a hidden group beside the table
+    (``_p_zmap_<name>``), with a ``bounds`` array (the minimum and
+    maximum of every chunk, ignoring NaNs) and a ``nnans`` array (the
+    number of NaNs in every chunk) for each column.  They are updated
+    whenever the table is modified, and they are used for building the
+    chunkmap of queries on columns without a usable index, so that
+    chunks which can not fulfill the condition are never read.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    nchunks
+        The number of chunks described by the zone map.
+    table
+        The `Table` of the column.
+
+    Public methods
+    --------------
+
+    get_chunkmap(ops, limits, nchunks)
+        Get the chunks that may fulfill a range condition.
+    may_have_nans(nchunks)
+        Whether some of the first chunks may contain NaNs.
+    """
+
+    _filters = Filters(complevel=1, complib='zlib', shuffle=True)
+
+    ops = frozenset(['lt', 'le', 'gt', 'ge', 'eq'])
+    """The comparisons that can be used with zone maps."""
+
+    # Properties
+    # ~~~~~~~~~~
+    def _gettable(self):
+        return self._tableRef()
+
+    table = property(_gettable, None, None,
+                     "The `Table` of the column.")
+
+    def _getgroup(self):
+        table = self.table
+        return table._v_file._getNode(
+            joinPath(_zonemapPathnameOf(table), self.colpathname))
+
+    _group = property(_getgroup)
+
+    def _getnchunks(self):
+        return self._group.bounds.nrows
+
+    nchunks = property(_getnchunks, None, None,
+                       "The number of chunks described by the zone map.")
+
+
+    def __init__(self, table, colpathname, new=False):
+        self._tableRef = weakref.ref(table)
+        """A weak reference to the table (avoiding a reference cycle)."""
+        self.colpathname = colpathname
+        """The path name of the column."""
+        self._cache = None
+        """The ``(bounds, nnans)`` arrays kept in memory, if read."""
+        if new:
+            self._create()
+
+
+    def _create(self):
+        """Create the group and arrays for the zone map."""
+        table = self.table
+        parent = table._v_parent
+        name = _zonemapNameOf(table)
+        for gname in [name] + self.colpathname.split('/'):
+            if gname in parent._v_groups or gname in parent._v_hidden:
+                parent = parent._f_getChild(gname)
+            else:
+                parent = Group( parent, gname, new=True,
+                                filters=self._filters, _log=False )
+        dtype = table.coldtypes[self.colpathname]
+        chunksize = table.chunkshape[0]
+        expectedrows = table.nrows // chunksize + 1
+        EArray( parent, 'bounds', Atom.from_dtype(dtype), (0, 2),
+                "Minimum and maximum values in chunks", self._filters,
+                expectedrows, _log=False )
+        EArray( parent, 'nnans', Int64Atom(), (0,),
+                "Number of NaNs in chunks", self._filters,
+                expectedrows, _log=False )
+
+
+    def _chunkStats(self, values, offset):
+        """
+        Get the statistics of the chunks covered by `values`.
+
+        `values` are the column values starting at row `offset`
+        (counted from the start of the first chunk).
+        """
+        chunksize = self.table.chunkshape[0]
+        starts = numpy.arange(0, len(values) + offset, chunksize)
+        starts[1:] -= offset
+        if values.dtype.kind == 'f':
+            mins = numpy.fmin.reduceat(values, starts)
+            maxs = numpy.fmax.reduceat(values, starts)
+            nnans = numpy.add.reduceat(
+                numpy.isnan(values).astype('int64'), starts)
+        else:
+            mins = numpy.minimum.reduceat(values, starts)
+            maxs = numpy.maximum.reduceat(values, starts)
+            nnans = numpy.zeros(len(starts), dtype='int64')
+        return numpy.column_stack((mins, maxs)), nnans
+
+
+    def append(self, start, values):
+        """
+        Account for `values` being appended at row `start`.
+
+        The statistics of the last (partially filled) chunk are merged
+        with the ones of the new values.
+        """
+        if len(values) == 0:
+            return
+        chunksize = self.table.chunkshape[0]
+        nchunk, offset = divmod(start, chunksize)
+        bounds, nnans = self._chunkStats(values, offset)
+        group = self._group
+        if offset > 0 and nchunk < group.bounds.nrows:
+            # Merge with the statistics of the existing rows
+            oldbounds = group.bounds[nchunk]
+            if bounds.dtype.kind == 'f':
+                bounds[0, 0] = numpy.fmin(bounds[0, 0], oldbounds[0])
+                bounds[0, 1] = numpy.fmax(bounds[0, 1], oldbounds[1])
+            else:
+                bounds[0, 0] = min(bounds[0, 0], oldbounds[0])
+                bounds[0, 1] = max(bounds[0, 1], oldbounds[1])
+            nnans[0] += group.nnans[nchunk]
+        self._write(nchunk, bounds, nnans)
+
+
+    def refresh(self, nchunk, values):
+        """
+        Recompute the statistics of chunks from their `values`.
+
+        `values` must hold the values of whole chunks starting at chunk
+        number `nchunk` (the last one may be partially filled).
+        """
+        if len(values) == 0:
+            return
+        bounds, nnans = self._chunkStats(values, 0)
+        self._write(nchunk, bounds, nnans)
+
+
+    def _write(self, nchunk, bounds, nnans):
+        """Write statistics for chunks starting at `nchunk`."""
+        group = self._group
+        nexisting = min(max(group.bounds.nrows - nchunk, 0), len(bounds))
+        if nexisting > 0:
+            group.bounds[nchunk:nchunk+nexisting] = bounds[:nexisting]
+            group.nnans[nchunk:nchunk+nexisting] = nnans[:nexisting]
+        if nexisting < len(bounds):
+            group.bounds.append(bounds[nexisting:])
+            group.nnans.append(nnans[nexisting:])
+        self._cache = None
+
+
+    def truncate(self, nchunks):
+        """Forget about chunks after the first `nchunks`."""
+        group = self._group
+        if group.bounds.nrows > nchunks:
+            group.bounds.truncate(nchunks)
+            group.nnans.truncate(nchunks)
+            self._cache = None
+
+
+    def _getstats(self):
+        """Get the ``(bounds, nnans)`` arrays, reading them if needed."""
+        if self._cache is None:
+            group = self._group
+            self._cache = (group.bounds.read(), group.nnans.read())
+        return self._cache
+
+
+    def may_have_nans(self, nchunks):
+        """
+        Whether some of the first `nchunks` chunks may contain NaNs.
+
+        Chunks without statistics may always contain NaNs.
+        """
+        bounds, nnans = self._getstats()
+        return len(nnans) < nchunks or bool(nnans[:nchunks].any())
+
+
+    def get_chunkmap(self, ops, limits, nchunks):
+        """
+        Get the chunks that may fulfill a range condition.
+
+        `ops` and `limits` describe the condition as in the index
+        expressions of compiled conditions (for instance, ``('gt',
+        'le')`` and ``(1, 3)`` for ``(1 < col) & (col <= 3)``).  A
+        boolean array of `nchunks` elements is returned.  Chunks
+        containing NaNs or without statistics are always selected.
+        """
+        bounds, nnans = self._getstats()
+        n = min(len(bounds), nchunks)
+        mins, maxs = bounds[:n, 0], bounds[:n, 1]
+        chunkmap = numpy.ones(nchunks, dtype='bool')
+        selected = chunkmap[:n]
+        for op, limit in zip(ops, limits):
+            if op == 'lt':
+                selected &= mins < limit
+            elif op == 'le':
+                selected &= mins <= limit
+            elif op == 'gt':
+                selected &= maxs > limit
+            elif op == 'ge':
+                selected &= maxs >= limit
+            elif op == 'eq':
+                selected &= (mins <= limit) & (maxs >= limit)
+        selected |= nnans[:n] > 0
+        return chunkmap
+
+
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## fill-column: 72
+## End: